@@ -10,6 +10,7 @@ from .use_cases import (
     GetUserUseCase,
     CreateRequestUseCase,
     AssignRequestUseCase,
+    CreateSessionUseCase,
 )
 
 __all__ = [
@@ -17,4 +18,5 @@ __all__ = [
     "GetUserUseCase",
     "CreateRequestUseCase",
     "AssignRequestUseCase",
+    "CreateSessionUseCase",
 ]
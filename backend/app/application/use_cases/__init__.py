@@ -8,10 +8,12 @@ from .create_user import CreateUserUseCase
 from .get_user import GetUserUseCase
 from .create_request import CreateRequestUseCase
 from .assign_request import AssignRequestUseCase
+from .create_session import CreateSessionUseCase
 
 __all__ = [
     "CreateUserUseCase",
     "GetUserUseCase",
     "CreateRequestUseCase",
     "AssignRequestUseCase",
+    "CreateSessionUseCase",
 ]
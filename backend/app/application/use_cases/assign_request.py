@@ -6,8 +6,10 @@ Asigna una solicitud de asesoría a un asesor.
 
 from ...domain.entities import Request
 from ...domain.repositories import RequestRepositoryPort
+from ...observability.tracing import trace_methods
 
 
+@trace_methods
 class AssignRequestUseCase:
     """
     Caso de uso para asignar una solicitud a un asesor.
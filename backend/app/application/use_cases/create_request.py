@@ -8,8 +8,10 @@ from datetime import datetime
 
 from ...domain.entities import Request, RequestStatusEnum
 from ...domain.repositories import RequestRepositoryPort
+from ...observability.tracing import trace_methods
 
 
+@trace_methods
 class CreateRequestUseCase:
     """
     Caso de uso para crear una nueva solicitud de asesoría.
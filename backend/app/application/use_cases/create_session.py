@@ -0,0 +1,76 @@
+"""
+Caso de uso: Crear Sesión.
+
+Programa una sesión de asesoría verificando conflictos de horario.
+"""
+
+from datetime import datetime
+
+from ...domain.entities import Session, MeetingPlatformEnum, SessionStatusEnum
+from ...domain.repositories import SessionRepositoryPort
+from ...observability.tracing import trace_methods
+from ...services.scheduling import SchedulingService
+
+
+@trace_methods
+class CreateSessionUseCase:
+    """
+    Caso de uso para programar una sesión de asesoría.
+    """
+
+    def __init__(
+        self,
+        session_repository: SessionRepositoryPort,
+        scheduling_service: SchedulingService,
+    ):
+        self.session_repository = session_repository
+        self.scheduling_service = scheduling_service
+
+    async def execute(
+        self,
+        request_id: str,
+        student_id: str,
+        advisor_id: str,
+        scheduled_at: datetime,
+        meeting_platform: MeetingPlatformEnum = MeetingPlatformEnum.TEAMS,
+    ) -> Session:
+        """
+        Ejecuta el caso de uso para crear una sesión.
+
+        Args:
+            request_id: ID de la solicitud que origina la sesión
+            student_id: ID del estudiante
+            advisor_id: ID del asesor
+            scheduled_at: Fecha/hora de inicio de la sesión
+            meeting_platform: Plataforma de la reunión
+
+        Returns:
+            La sesión creada
+
+        Raises:
+            ValueError: Si el estudiante o el asesor tienen otra sesión a esa hora
+        """
+        # El índice en memoria descarta rápido los conflictos conocidos; el
+        # índice único de franjas en el repositorio cubre lo que otro worker
+        # haya creado desde que se construyó
+        end = scheduled_at + self.scheduling_service.session_duration
+        conflicts = await self.scheduling_service.find_conflicts(
+            [advisor_id, student_id], scheduled_at, end
+        )
+        if conflicts:
+            raise ValueError("Schedule conflict")
+
+        session = Session(
+            request_id=request_id,
+            student_id=student_id,
+            advisor_id=advisor_id,
+            scheduled_at=scheduled_at,
+            meeting_platform=meeting_platform,
+            status=SessionStatusEnum.PENDING_APPROVAL,
+            created_at=datetime.now(),
+        )
+
+        created_session = await self.session_repository.create(session)
+        self.scheduling_service.add_session(created_session)
+
+        return created_session
@@ -9,8 +9,10 @@ from datetime import datetime
 
 from ...domain.entities import User, RoleEnum
 from ...domain.repositories import UserRepositoryPort
+from ...observability.tracing import trace_methods
 
 
+@trace_methods
 class CreateUserUseCase:
     """
     Caso de uso para crear un nuevo usuario.
@@ -8,8 +8,10 @@ from typing import Optional
 
 from ...domain.entities import User
 from ...domain.repositories import UserRepositoryPort
+from ...observability.tracing import trace_methods
 
 
+@trace_methods
 class GetUserUseCase:
     """
     Caso de uso para obtener un usuario.
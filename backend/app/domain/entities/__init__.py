@@ -102,6 +102,7 @@ class Message:
     attachment: Optional[Attachment] = None
     sent_at: datetime = field(default_factory=datetime.now)
     is_read: bool = False
+    id: Optional[str] = None
 
 
 @dataclass
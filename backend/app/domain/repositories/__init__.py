@@ -6,7 +6,8 @@ los adaptadores de infraestructura (repositorios).
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from ..entities import (
     User,
@@ -14,6 +15,7 @@ from ..entities import (
     Session,
     Subject,
     Chat,
+    Message,
     RoleEnum,
     RequestStatusEnum,
     SessionStatusEnum,
@@ -193,8 +195,25 @@ class SessionRepositoryPort(ABC):
         pass
 
     @abstractmethod
-    async def approve_session(self, session_id: str, approved_by: str) -> Session:
-        """Aprueba una sesión."""
+    def iter_sessions(
+        self,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        advisor_id: Optional[str] = None,
+        status: Optional[SessionStatusEnum] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Session]:
+        """
+        Recorre sesiones filtradas por fecha programada `[from, to)`, asesor y
+        estado, ordenadas por fecha, sin cargarlas todas en memoria.
+        """
+        pass
+
+    @abstractmethod
+    async def approve_session(
+        self, session_id: str, approved_by: str
+    ) -> Optional[Session]:
+        """Aprueba una sesión pendiente; None si no existe o ya no estaba pendiente."""
         pass
 
     @abstractmethod
@@ -288,3 +307,51 @@ class ChatRepositoryPort(ABC):
     async def list_by_user(self, user_id: str) -> List[Chat]:
         """Lista chats de un usuario."""
         pass
+
+    @abstractmethod
+    async def add_message(self, chat_id: str, message: Message) -> Message:
+        """Agrega un mensaje al final de un chat."""
+        pass
+
+    @abstractmethod
+    async def list_recent_messages(
+        self, chat_id: str, limit: int = 50
+    ) -> List[Message]:
+        """Lista los `limit` mensajes más recientes, en orden cronológico."""
+        pass
+
+    @abstractmethod
+    async def list_messages(
+        self,
+        chat_id: str,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, str]] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[Message]:
+        """
+        Página de mensajes antes o después de un cursor `(sent_at, message_id)`.
+
+        Sin cursor retorna los más recientes. El resultado va en orden
+        cronológico.
+        """
+        pass
+
+    @abstractmethod
+    async def mark_read(self, chat_id: str, user_id: str, up_to_message_id: str) -> int:
+        """
+        Marca como leídos los mensajes recibidos hasta `up_to_message_id` inclusive.
+
+        Returns:
+            Mensajes que siguen sin leer en el chat para el usuario
+        """
+        pass
+
+    @abstractmethod
+    async def get_unread_counts(self, user_id: str) -> Dict[str, int]:
+        """Mensajes sin leer por chat (solo chats con alguno pendiente)."""
+        pass
+
+    @abstractmethod
+    async def count_unread(self, user_id: str) -> int:
+        """Total de mensajes sin leer del usuario en todos sus chats."""
+        pass
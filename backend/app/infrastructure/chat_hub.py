@@ -0,0 +1,289 @@
+"""
+Hub de fan-out en tiempo real para el chat por WebSocket.
+
+Cada sesión de asesoría es una sala. Los mensajes se publican en un
+broker (en memoria dentro del proceso, o uno compartido entre workers)
+y el hub de cada worker los reparte a sus conexiones locales:
+
+- Cada conexión tiene una cola acotada; si un cliente lento la llena, o
+  un envío supera `send_timeout`, se le desconecta en lugar de acumular
+  memoria.
+- Los mensajes se agrupan por tick: un único frame (arreglo JSON) por
+  conexión con todo lo recibido en la ventana.
+- Las conexiones inactivas no tienen tarea propia; solo las que tienen
+  mensajes pendientes reciben una tarea de envío mientras dura el envío.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from ..observability.metrics import REGISTRY
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Código de cierre para clientes lentos ("Try Again Later")
+CLOSE_SLOW_CONSUMER = 1013
+CLOSE_GOING_AWAY = 1001
+
+Deliver = Callable[[str, bytes], None]
+
+chat_evictions = REGISTRY.counter(
+    "peerhive_chat_evictions_total",
+    "Conexiones de chat cerradas por ser consumidores lentos.",
+    ("reason",),
+)
+chat_frames_sent = REGISTRY.counter(
+    "peerhive_chat_frames_sent_total",
+    "Frames de WebSocket enviados por el hub de chat.",
+)
+
+
+# ── Broker ───────────────────────────────────────────────────────────
+
+
+class ChatBroker(ABC):
+    """
+    Puerto de publicación/suscripción entre workers.
+
+    Los payloads ya vienen serializados: el broker solo los transporta.
+    """
+
+    @abstractmethod
+    async def publish(self, channel: str, payload: bytes) -> None:
+        """Publica un payload en un canal."""
+        pass
+
+    @abstractmethod
+    async def subscribe(self, channel: str, deliver: Deliver) -> None:
+        """Registra `deliver(channel, payload)` para los mensajes del canal."""
+        pass
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str, deliver: Deliver) -> None:
+        """Cancela una suscripción."""
+        pass
+
+
+class InMemoryBroker(ChatBroker):
+    """
+    Broker dentro del proceso.
+
+    Varios ChatHub pueden compartir una instancia para simular workers.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Deliver]] = {}
+
+    async def publish(self, channel: str, payload: bytes) -> None:
+        for deliver in list(self._subscribers.get(channel, ())):
+            deliver(channel, payload)
+
+    async def subscribe(self, channel: str, deliver: Deliver) -> None:
+        self._subscribers.setdefault(channel, []).append(deliver)
+
+    async def unsubscribe(self, channel: str, deliver: Deliver) -> None:
+        subscribers = self._subscribers.get(channel, [])
+        if deliver in subscribers:
+            subscribers.remove(deliver)
+        if not subscribers:
+            self._subscribers.pop(channel, None)
+
+
+# ── Hub ──────────────────────────────────────────────────────────────
+
+
+class ChatConnection:
+    """Conexión local a una sala; solo guarda su cola de pendientes."""
+
+    __slots__ = ("room", "user_id", "send", "close", "pending", "sending", "closed")
+
+    def __init__(
+        self,
+        room: str,
+        user_id: str,
+        send: Callable[[str], Awaitable[None]],
+        close: Callable[[int], Awaitable[None]],
+    ):
+        self.room = room
+        self.user_id = user_id
+        self.send = send
+        self.close = close
+        self.pending: deque = deque()
+        self.sending = False
+        self.closed = False
+
+
+class ChatHub:
+    """
+    Reparte los mensajes de cada sala a las conexiones de este worker.
+
+    Args:
+        broker: Transporte entre workers
+        max_queue: Mensajes pendientes por conexión antes de desconectarla
+        tick: Ventana de agrupación en segundos
+        max_batch: Mensajes máximos por frame
+        send_timeout: Segundos máximos de un envío
+    """
+
+    def __init__(
+        self,
+        broker: ChatBroker,
+        max_queue: int = 256,
+        tick: float = 0.025,
+        max_batch: int = 64,
+        send_timeout: float = 5.0,
+    ):
+        self.broker = broker
+        self.max_queue = max_queue
+        self.tick = tick
+        self.max_batch = max_batch
+        self.send_timeout = send_timeout
+        self._rooms: Dict[str, Set[ChatConnection]] = {}
+        self._dirty: Set[ChatConnection] = set()
+        self._wakeup = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+        self._runner: Optional[asyncio.Task] = None
+        self._stats = {"published": 0, "delivered": 0, "frames": 0, "evicted": 0}
+
+    def start(self) -> None:
+        """Inicia el ciclo de envío por ticks."""
+        if self._runner is None:
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Detiene el hub y cierra todas las conexiones locales."""
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        for room in list(self._rooms):
+            for conn in list(self._rooms.get(room, ())):
+                await self._drop(conn, CLOSE_GOING_AWAY)
+
+    async def connect(
+        self,
+        room: str,
+        user_id: str,
+        send: Callable[[str], Awaitable[None]],
+        close: Callable[[int], Awaitable[None]],
+    ) -> ChatConnection:
+        """Registra una conexión aceptada en su sala (inicia el hub si hace falta)."""
+        self.start()
+        conn = ChatConnection(room, user_id, send, close)
+        members = self._rooms.get(room)
+        if members is None:
+            members = self._rooms[room] = set()
+            await self.broker.subscribe(room, self._deliver)
+        members.add(conn)
+        return conn
+
+    async def disconnect(self, conn: ChatConnection) -> None:
+        """Quita una conexión de su sala (sin cerrar el socket)."""
+        conn.closed = True
+        conn.pending.clear()
+        self._dirty.discard(conn)
+        members = self._rooms.get(conn.room)
+        if members is None:
+            return
+        members.discard(conn)
+        if not members:
+            del self._rooms[conn.room]
+            await self.broker.unsubscribe(conn.room, self._deliver)
+
+    async def publish(self, room: str, message: Dict[str, Any]) -> None:
+        """Serializa una vez y publica un mensaje en la sala."""
+        self._stats["published"] += 1
+        await self.broker.publish(room, dumps(message))
+
+    def _deliver(self, room: str, payload: bytes) -> None:
+        """Encola el payload en cada conexión local de la sala."""
+        for conn in list(self._rooms.get(room, ())):
+            if conn.closed:
+                continue
+            if len(conn.pending) >= self.max_queue:
+                self._evict(conn, "queue_full")
+                continue
+            conn.pending.append(payload)
+            self._dirty.add(conn)
+            self._stats["delivered"] += 1
+        if self._dirty:
+            self._wakeup.set()
+
+    def _evict(self, conn: ChatConnection, reason: str) -> None:
+        logger.warning(f"Evicting slow chat consumer in room {conn.room}: {reason}")
+        self._stats["evicted"] += 1
+        chat_evictions.inc(reason)
+        self._spawn(self._drop(conn, CLOSE_SLOW_CONSUMER))
+
+    async def _drop(self, conn: ChatConnection, code: int) -> None:
+        await self.disconnect(conn)
+        try:
+            await conn.close(code)
+        except Exception:
+            pass
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # Ventana de agrupación: lo que llegue durante el tick va junto
+            await asyncio.sleep(self.tick)
+            self._wakeup.clear()
+            dirty, self._dirty = self._dirty, set()
+            for conn in dirty:
+                if conn.closed:
+                    continue
+                if conn.sending:
+                    self._dirty.add(conn)
+                    continue
+                conn.sending = True
+                self._spawn(self._flush(conn))
+            if self._dirty:
+                self._wakeup.set()
+
+    async def _flush(self, conn: ChatConnection) -> None:
+        """Envía un frame con hasta `max_batch` mensajes pendientes."""
+        count = min(len(conn.pending), self.max_batch)
+        batch = [conn.pending.popleft() for _ in range(count)]
+        frame = b"[" + b",".join(batch) + b"]"
+        try:
+            await asyncio.wait_for(conn.send(frame.decode()), self.send_timeout)
+            self._stats["frames"] += 1
+            chat_frames_sent.inc()
+        except asyncio.TimeoutError:
+            conn.sending = False
+            self._evict(conn, "send_timeout")
+            return
+        except Exception:
+            # Socket cerrado por el cliente: el endpoint hará disconnect
+            await self.disconnect(conn)
+        conn.sending = False
+        if conn.pending and not conn.closed:
+            self._dirty.add(conn)
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Salas, conexiones y contadores del hub."""
+        return {
+            "rooms": len(self._rooms),
+            "connections": sum(len(m) for m in self._rooms.values()),
+            **self._stats,
+        }
+
+    def collect_metrics(self):
+        """Colector de /metrics con las conexiones abiertas."""
+        yield "# HELP peerhive_chat_connections Conexiones de chat abiertas."
+        yield "# TYPE peerhive_chat_connections gauge"
+        yield f"peerhive_chat_connections {self.stats()['connections']}"
@@ -5,24 +5,31 @@ Proporciona las instancias de repositorios y casos de uso
 para la aplicación.
 """
 
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from ..domain.repositories import (
     UserRepositoryPort,
     RequestRepositoryPort,
     SessionRepositoryPort,
+    ChatRepositoryPort,
 )
 from ..infrastructure.repositories import (
     UserRepository,
     RequestRepository,
     SessionRepository,
+    ChatRepository,
 )
 from ..application.use_cases import (
     CreateUserUseCase,
     GetUserUseCase,
     CreateRequestUseCase,
     AssignRequestUseCase,
+    CreateSessionUseCase,
 )
+from ..services.scheduling import SchedulingService
+from .stats_rollups import StatsRollups
 
 
 class Container:
@@ -33,11 +40,17 @@ class Container:
     de la aplicación.
     """
 
-    def __init__(self, database: AsyncIOMotorDatabase):
+    def __init__(
+        self, database: AsyncIOMotorDatabase, chat_options: Optional[dict] = None
+    ):
         self._database = database
+        self._chat_options = chat_options or {}
         self._user_repository = None
         self._request_repository = None
         self._session_repository = None
+        self._chat_repository = None
+        self._scheduling_service = None
+        self._stats_rollups = None
 
     @property
     def user_repository(self) -> UserRepositoryPort:
@@ -50,16 +63,41 @@ class Container:
     def request_repository(self) -> RequestRepositoryPort:
         """Obtiene el repositorio de solicitudes."""
         if self._request_repository is None:
-            self._request_repository = RequestRepository(self._database)
+            self._request_repository = RequestRepository(
+                self._database, rollups=self.stats_rollups
+            )
         return self._request_repository
 
     @property
     def session_repository(self) -> SessionRepositoryPort:
         """Obtiene el repositorio de sesiones."""
         if self._session_repository is None:
-            self._session_repository = SessionRepository(self._database)
+            self._session_repository = SessionRepository(
+                self._database, rollups=self.stats_rollups
+            )
         return self._session_repository
 
+    @property
+    def chat_repository(self) -> ChatRepositoryPort:
+        """Obtiene el repositorio de chats."""
+        if self._chat_repository is None:
+            self._chat_repository = ChatRepository(self._database, **self._chat_options)
+        return self._chat_repository
+
+    @property
+    def scheduling_service(self) -> SchedulingService:
+        """Obtiene el servicio de agenda (índices de horario en memoria)."""
+        if self._scheduling_service is None:
+            self._scheduling_service = SchedulingService(self.session_repository)
+        return self._scheduling_service
+
+    @property
+    def stats_rollups(self) -> StatsRollups:
+        """Obtiene las estadísticas materializadas de los dashboards."""
+        if self._stats_rollups is None:
+            self._stats_rollups = StatsRollups(self._database)
+        return self._stats_rollups
+
     @property
     def create_user_use_case(self) -> CreateUserUseCase:
         """Obtiene el caso de uso de crear usuario."""
@@ -80,6 +118,11 @@ class Container:
         """Obtiene el caso de uso de asignar solicitud."""
         return AssignRequestUseCase(self.request_repository)
 
+    @property
+    def create_session_use_case(self) -> CreateSessionUseCase:
+        """Obtiene el caso de uso de crear sesión."""
+        return CreateSessionUseCase(self.session_repository, self.scheduling_service)
+
 
 # Instancia global del contenedor (se inicializa en startup)
 _container: Container = None
@@ -90,7 +133,13 @@ def get_container() -> Container:
     return _container
 
 
-def init_container(database: AsyncIOMotorDatabase):
-    """Inicializa el contenedor con la base de datos."""
+def init_container(database: AsyncIOMotorDatabase, chat_options: Optional[dict] = None):
+    """
+    Inicializa el contenedor con la base de datos.
+
+    Args:
+        database: Base de datos de MongoDB
+        chat_options: Argumentos extra de ChatRepository (write-behind)
+    """
     global _container
-    _container = Container(database)
+    _container = Container(database, chat_options)
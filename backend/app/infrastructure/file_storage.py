@@ -0,0 +1,141 @@
+"""
+Almacenamiento de archivos por contenido (evidencias y adjuntos del chat).
+
+Cada archivo vive en un directorio local con su SHA-256 como nombre
+(`ab/cd/<sha256>`) y un `<sha256>.json` con el tipo de contenido y el
+nombre original de la primera subida. Las subidas se escriben por
+bloques a un archivo temporal mientras se calcula el hash, sin cargar
+el archivo completo en memoria; al terminar se mueven a su ruta final
+o, si ese contenido ya existía, se descartan (deduplicación). Las
+versiones derivadas (miniaturas) se guardan al lado como
+`<sha256>.<versión>.jpg`.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+_FILE_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Los chunks del body (a veces de pocos KB) se agrupan antes de ir al disco
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+class FileTooLargeError(ValueError):
+    """La subida supera el tamaño máximo permitido."""
+
+
+@dataclass
+class StoredFile:
+    """Metadatos de un archivo guardado."""
+
+    id: str
+    size: int
+    content_type: str
+    name: str
+    created_at: str
+    deduplicated: bool = False
+
+
+class FileStorage:
+    """
+    Directorio local direccionado por contenido.
+
+    Args:
+        directory: Directorio raíz
+        max_bytes: Tamaño máximo de un archivo
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 25 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    async def save_stream(
+        self, chunks: AsyncIterator[bytes], content_type: str, name: str = ""
+    ) -> StoredFile:
+        """
+        Guarda un archivo a partir de un flujo de bytes.
+
+        Raises:
+            FileTooLargeError: Si el flujo supera `max_bytes`
+            ValueError: Si el flujo está vacío
+        """
+        tmp_dir = os.path.join(self.directory, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise FileTooLargeError(f"File exceeds {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    buffer += chunk
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        await run_in_threadpool(f.write, buffer)
+                        buffer.clear()
+                if buffer:
+                    await run_in_threadpool(f.write, buffer)
+            if size == 0:
+                raise ValueError("Empty file")
+
+            stored = StoredFile(
+                id=digest.hexdigest(),
+                size=size,
+                content_type=content_type,
+                name=os.path.basename(name)[:255],
+                created_at=datetime.now().isoformat(),
+            )
+            return await run_in_threadpool(self._commit, tmp_path, stored)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _commit(self, tmp_path: str, stored: StoredFile) -> StoredFile:
+        """Mueve el temporal a su ruta final (bloqueante: llamar desde un hilo)."""
+        path = self.path(stored.id)
+        existing = self.metadata(stored.id)
+        if existing is not None and os.path.exists(path):
+            # El nombre de la primera subida no se expone a quien repite el contenido
+            return replace(existing, name=stored.name, deduplicated=True)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        with open(self._metadata_path(stored.id), "w", encoding="utf-8") as f:
+            json.dump(asdict(stored), f)
+        return stored
+
+    def metadata(self, file_id: str) -> Optional[StoredFile]:
+        """Metadatos de un archivo, o None si no existe."""
+        try:
+            with open(self._metadata_path(file_id), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        data["deduplicated"] = False
+        return StoredFile(**data)
+
+    def path(self, file_id: str) -> str:
+        """Ruta del contenido de un archivo."""
+        if not _FILE_ID_RE.match(file_id):
+            raise ValueError("Invalid file id")
+        return os.path.join(self.directory, file_id[:2], file_id[2:4], file_id)
+
+    def rendition_path(self, file_id: str, rendition: str) -> str:
+        """Ruta de una versión derivada (p. ej. miniatura) junto al original."""
+        if not rendition.isalnum():
+            raise ValueError("Invalid rendition")
+        return f"{self.path(file_id)}.{rendition}.jpg"
+
+    def _metadata_path(self, file_id: str) -> str:
+        return self.path(file_id) + ".json"
@@ -0,0 +1,257 @@
+"""
+Almacén de claves de idempotencia para MongoDB.
+
+Guarda la primera respuesta de cada petición con header
+`Idempotency-Key` en la colección `idempotency_keys` (con índice TTL)
+y la repite ante reintentos del cliente. Las peticiones duplicadas que
+llegan mientras la original sigue en curso esperan su resultado en
+lugar de volver a llamar a Microsoft Graph.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotentResponse(NamedTuple):
+    """Respuesta almacenada para una clave de idempotencia."""
+
+    status_code: int
+    body: Any
+    replayed: bool
+
+
+class IdempotencyConflictError(Exception):
+    """La clave sigue en uso por otra petición o se reusó con otro cuerpo."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Huella del cuerpo de la petición, para detectar claves reutilizadas."""
+    canonical = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Almacén de respuestas idempotentes.
+
+    La coalescencia de duplicados concurrentes es doble: dentro del
+    proceso se comparte un Future por clave, y entre workers el documento
+    `in_progress` (insertado con _id único) hace que el segundo espere.
+    El dueño renueva un lease mientras ejecuta; si el worker muere, el
+    lease expira y el siguiente reintento toma la clave y ejecuta él.
+    """
+
+    def __init__(
+        self,
+        database: AsyncIOMotorDatabase,
+        ttl_seconds: int = 86400,
+        wait_timeout: float = 30.0,
+        poll_interval: float = 0.25,
+        lease_seconds: float = 60.0,
+    ):
+        self.collection = database.idempotency_keys
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def ensure_indexes(self):
+        """Crea el índice TTL que expira las claves antiguas."""
+        await self.collection.create_index(
+            "createdAt", expireAfterSeconds=self.ttl_seconds
+        )
+
+    def _lease_until(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Awaitable[Any]],
+        status_code: int = 200,
+    ) -> IdempotentResponse:
+        """
+        Ejecuta `func` una sola vez por clave y retorna su respuesta.
+
+        Args:
+            key: Clave completa (ruta + usuario + Idempotency-Key)
+            fingerprint: Huella del cuerpo de la petición
+            func: Corrutina que produce el cuerpo de la respuesta
+            status_code: Código HTTP de la respuesta exitosa
+
+        Raises:
+            IdempotencyConflictError: Si la clave se reusó con otro cuerpo,
+                o la petición original no terminó a tiempo
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            stored_fingerprint, stored = await asyncio.shield(inflight)
+            return self._replay(stored_fingerprint, fingerprint, stored)
+
+        owner = uuid.uuid4().hex
+        try:
+            await self.collection.insert_one(
+                {
+                    "_id": key,
+                    "status": "in_progress",
+                    "fingerprint": fingerprint,
+                    "owner": owner,
+                    "leaseUntil": self._lease_until(),
+                    "createdAt": datetime.utcnow(),
+                }
+            )
+        except DuplicateKeyError:
+            doc = await self._wait_for_completion(key, fingerprint, owner)
+            if doc is not None:
+                return self._replay(
+                    doc["fingerprint"],
+                    fingerprint,
+                    IdempotentResponse(
+                        doc["statusCode"], json.loads(doc["body"]), True
+                    ),
+                )
+            # El lease del dueño anterior expiró y esta petición tomó la clave
+
+        return await self._execute(key, fingerprint, owner, func, status_code)
+
+    async def _execute(
+        self,
+        key: str,
+        fingerprint: str,
+        owner: str,
+        func: Callable[[], Awaitable[Any]],
+        status_code: int,
+    ) -> IdempotentResponse:
+        """Ejecuta `func` como dueño de la clave y guarda su respuesta."""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        heartbeat = asyncio.create_task(self._keep_lease(key, owner))
+        try:
+            body = await func()
+        except BaseException as e:
+            # Los duplicados del proceso se resuelven antes de tocar MongoDB
+            future.set_exception(e)
+            future.exception()  # evita "exception was never retrieved"
+            # Permitir que el cliente reintente con la misma clave
+            await self.collection.delete_one(
+                {"_id": key, "status": "in_progress", "owner": owner}
+            )
+            raise
+        else:
+            future.set_result(
+                (fingerprint, IdempotentResponse(status_code, body, replayed=True))
+            )
+            try:
+                await self.collection.update_one(
+                    {"_id": key, "owner": owner},
+                    {
+                        "$set": {
+                            "status": "completed",
+                            "statusCode": status_code,
+                            "body": json.dumps(body, default=str),
+                        }
+                    },
+                )
+            except Exception as e:
+                # El efecto ya ocurrió: se responde igual y la clave queda
+                # en curso hasta que expire su lease
+                logger.error(f"Could not store idempotent response {key}: {e}")
+            return IdempotentResponse(status_code, body, replayed=False)
+        finally:
+            heartbeat.cancel()
+            self._inflight.pop(key, None)
+
+    async def _keep_lease(self, key: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.collection.update_one(
+                    {"_id": key, "status": "in_progress", "owner": owner},
+                    {"$set": {"leaseUntil": self._lease_until()}},
+                )
+            except Exception as e:
+                logger.warning(f"Error extending idempotency lease {key}: {e}")
+
+    async def _wait_for_completion(
+        self, key: str, fingerprint: str, owner: str
+    ) -> Optional[dict]:
+        """
+        Espera a que otra petición (u otro worker) complete la clave.
+
+        Returns:
+            El documento completado, o None si el lease del dueño expiró y
+            la clave pasó a `owner`
+
+        Raises:
+            IdempotencyConflictError: Si la original falló, se reusó la
+                clave con otro cuerpo o no terminó a tiempo
+        """
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            doc = await self.collection.find_one({"_id": key})
+            if doc is None:
+                raise IdempotencyConflictError(
+                    "La petición original falló; reintente", status_code=409
+                )
+            if doc.get("status") == "completed":
+                return doc
+            # Claves anteriores a los leases: se cuenta desde su creación
+            lease_until = doc.get("leaseUntil") or doc["createdAt"] + timedelta(
+                seconds=self.lease_seconds
+            )
+            if lease_until <= datetime.utcnow():
+                if doc["fingerprint"] != fingerprint:
+                    raise IdempotencyConflictError(
+                        "Idempotency-Key reutilizada con un cuerpo distinto",
+                        status_code=422,
+                    )
+                taken = await self.collection.find_one_and_update(
+                    {
+                        "_id": key,
+                        "status": "in_progress",
+                        "owner": doc.get("owner"),
+                    },
+                    {"$set": {"owner": owner, "leaseUntil": self._lease_until()}},
+                )
+                if taken is not None:
+                    logger.warning(f"Took over expired idempotency key {key}")
+                    return None
+                continue
+            if asyncio.get_running_loop().time() >= deadline:
+                raise IdempotencyConflictError(
+                    "Una petición con la misma Idempotency-Key sigue en curso",
+                    status_code=409,
+                )
+            await asyncio.sleep(self.poll_interval)
+
+    @staticmethod
+    def _replay(
+        stored_fingerprint: str, fingerprint: str, stored: IdempotentResponse
+    ) -> IdempotentResponse:
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyConflictError(
+                "Idempotency-Key reutilizada con un cuerpo distinto", status_code=422
+            )
+        logger.info("Replaying stored idempotent response")
+        return stored._replace(replayed=True)
+
+
+def scoped_key(route: str, user_key: Optional[str], idempotency_key: str) -> str:
+    """Construye la clave completa; las claves nunca se comparten entre usuarios."""
+    return f"{route}:{user_key or 'anonymous'}:{idempotency_key}"
@@ -0,0 +1,326 @@
+"""
+Cola de trabajos en segundo plano para MongoDB.
+
+Persiste los efectos secundarios lentos (llamadas a Microsoft Graph)
+en la colección `jobs` y los ejecuta con un runner asyncio que
+reclama trabajos mediante leases, con reintentos y dead-lettering.
+"""
+
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+# Credenciales del payload que se borran cuando el trabajo termina
+SECRET_PAYLOAD_FIELDS = ("access_token",)
+
+
+class JobStatusEnum(str, Enum):
+    """Estados de un trabajo en la cola."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    DEAD = "dead"
+
+
+class JobQueue:
+    """
+    Cola persistente de trabajos sobre la colección `jobs`.
+
+    Un trabajo se reclama atómicamente con find_one_and_update, que le
+    asigna un lease. Si el worker muere, el lease expira y otro worker
+    puede reclamarlo de nuevo. Los trabajos terminados (exitosos o en
+    dead-letter) pierden sus credenciales y expiran tras
+    `retention_seconds`.
+    """
+
+    def __init__(
+        self, database: AsyncIOMotorDatabase, retention_seconds: int = 7 * 86400
+    ):
+        self.collection = database.jobs
+        self.retention_seconds = retention_seconds
+
+    async def ensure_indexes(self):
+        """Crea los índices usados para reclamar trabajos y el TTL de los terminados."""
+        await self.collection.create_index(
+            [("status", ASCENDING), ("runAt", ASCENDING)]
+        )
+        await self.collection.create_index(
+            [("status", ASCENDING), ("leaseUntil", ASCENDING)]
+        )
+        # Solo los trabajos terminados tienen completedAt
+        await self.collection.create_index(
+            "completedAt", expireAfterSeconds=self.retention_seconds
+        )
+
+    @staticmethod
+    def _unset_secrets() -> Dict[str, str]:
+        return {f"payload.{field}": "" for field in SECRET_PAYLOAD_FIELDS}
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        max_attempts: int = 5,
+        run_at: Optional[datetime] = None,
+        owner_id: Optional[str] = None,
+    ) -> str:
+        """
+        Encola un trabajo y retorna su ID.
+
+        `owner_id` es el usuario que lo originó; solo él (o un
+        administrador) puede consultar su estado y resultado.
+        """
+        now = datetime.utcnow()
+        result = await self.collection.insert_one(
+            {
+                "type": job_type,
+                "payload": payload,
+                "ownerId": owner_id,
+                "status": JobStatusEnum.PENDING.value,
+                "attempts": 0,
+                "maxAttempts": max_attempts,
+                "runAt": run_at or now,
+                "leaseUntil": None,
+                "workerId": None,
+                "lastError": None,
+                "result": None,
+                "createdAt": now,
+                "updatedAt": now,
+            }
+        )
+        return str(result.inserted_id)
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[dict]:
+        """
+        Reclama el siguiente trabajo listo para ejecutarse.
+
+        Toma trabajos pendientes cuyo runAt ya pasó, o trabajos en
+        ejecución cuyo lease expiró (worker caído).
+        """
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JobStatusEnum.PENDING.value, "runAt": {"$lte": now}},
+                    {"status": JobStatusEnum.RUNNING.value, "leaseUntil": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": JobStatusEnum.RUNNING.value,
+                    "leaseUntil": now + timedelta(seconds=lease_seconds),
+                    "workerId": worker_id,
+                    "updatedAt": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("runAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def extend_lease(
+        self, job_id: ObjectId, worker_id: str, lease_seconds: float
+    ) -> bool:
+        """Renueva el lease de un trabajo que sigue en ejecución."""
+        result = await self.collection.update_one(
+            {"_id": job_id, "workerId": worker_id},
+            {
+                "$set": {
+                    "leaseUntil": datetime.utcnow() + timedelta(seconds=lease_seconds)
+                }
+            },
+        )
+        return result.modified_count > 0
+
+    async def complete(
+        self, job_id: ObjectId, worker_id: str, result: Optional[Dict[str, Any]]
+    ) -> None:
+        """Marca un trabajo como exitoso."""
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": job_id, "workerId": worker_id},
+            {
+                "$set": {
+                    "status": JobStatusEnum.SUCCEEDED.value,
+                    "result": result,
+                    "leaseUntil": None,
+                    "updatedAt": now,
+                    "completedAt": now,
+                },
+                "$unset": self._unset_secrets(),
+            },
+        )
+
+    async def fail(
+        self,
+        job_id: ObjectId,
+        worker_id: str,
+        error: str,
+        retry_at: Optional[datetime],
+    ) -> None:
+        """Reprograma un trabajo fallido, o lo manda a dead-letter si retry_at es None."""
+        now = datetime.utcnow()
+        update = {"lastError": error, "leaseUntil": None, "updatedAt": now}
+        unset = {}
+        if retry_at is None:
+            update["status"] = JobStatusEnum.DEAD.value
+            update["completedAt"] = now
+            unset = self._unset_secrets()
+        else:
+            update["status"] = JobStatusEnum.PENDING.value
+            update["runAt"] = retry_at
+        await self.collection.update_one(
+            {"_id": job_id, "workerId": worker_id},
+            {"$set": update, **({"$unset": unset} if unset else {})},
+        )
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Obtiene un trabajo por su ID."""
+        try:
+            return await self.collection.find_one({"_id": ObjectId(job_id)})
+        except Exception:
+            return None
+
+
+def backoff_delay(
+    attempts: int, base_seconds: float = 2.0, max_seconds: float = 300.0
+) -> float:
+    """Backoff exponencial con jitter completo para el intento `attempts`."""
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** (attempts - 1))))
+
+
+class JobRunner:
+    """
+    Runner asyncio que ejecuta trabajos de la cola con concurrencia acotada.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 4,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        base_backoff_seconds: float = 2.0,
+        max_backoff_seconds: float = 300.0,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.worker_id = f"worker-{uuid.uuid4().hex[:12]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def register(self, job_type: str, handler: JobHandler) -> None:
+        """Registra el handler asíncrono de un tipo de trabajo."""
+        self._handlers[job_type] = handler
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any], **kwargs) -> str:
+        """Encola un trabajo y despierta al runner local."""
+        if job_type not in self._handlers:
+            raise ValueError(f"No handler registered for job type '{job_type}'")
+        job_id = await self.queue.enqueue(job_type, payload, **kwargs)
+        self._wakeup.set()
+        return job_id
+
+    def start(self) -> None:
+        """Inicia el ciclo de reclamo de trabajos."""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._claim_loop())
+            logger.info(
+                f"Job runner {self.worker_id} started (concurrency={self.concurrency})"
+            )
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Detiene el runner esperando a los trabajos en curso."""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        if self._running:
+            # Lo que no termine a tiempo se reintenta al expirar su lease
+            await asyncio.wait(self._running, timeout=timeout)
+        logger.info(f"Job runner {self.worker_id} stopped")
+
+    async def _claim_loop(self) -> None:
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await self.queue.claim(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Error claiming job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _keep_lease(self, job_id: ObjectId) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.queue.extend_lease(job_id, self.worker_id, self.lease_seconds)
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["_id"]
+        heartbeat = asyncio.create_task(self._keep_lease(job_id))
+        try:
+            handler = self._handlers.get(job["type"])
+            if handler is None:
+                raise LookupError(f"No handler registered for '{job['type']}'")
+            result = await handler(job.get("payload") or {})
+            await self.queue.complete(job_id, self.worker_id, result)
+            logger.info(f"Job {job_id} ({job['type']}) succeeded")
+        except Exception as e:
+            attempts = job.get("attempts", 1)
+            retry_at = None
+            if attempts < job.get("maxAttempts", 1):
+                delay = backoff_delay(
+                    attempts, self.base_backoff_seconds, self.max_backoff_seconds
+                )
+                retry_at = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning(
+                    f"Job {job_id} ({job['type']}) failed, attempt {attempts}: "
+                    f"{str(e)}; retrying in {delay:.1f}s"
+                )
+            else:
+                logger.error(
+                    f"Job {job_id} ({job['type']}) dead-lettered after "
+                    f"{attempts} attempts: {str(e)}"
+                )
+            try:
+                await self.queue.fail(job_id, self.worker_id, str(e), retry_at)
+            except Exception as update_error:
+                logger.error(f"Error updating job {job_id}: {str(update_error)}")
+        finally:
+            heartbeat.cancel()
+            self._slots.release()
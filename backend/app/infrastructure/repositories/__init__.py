@@ -7,5 +7,6 @@ Exporta todas las implementaciones de repositorios.
 from .user_repository import UserRepository
 from .request_repository import RequestRepository
 from .session_repository import SessionRepository
+from .chat_repository import ChatRepository
 
-__all__ = ["UserRepository", "RequestRepository", "SessionRepository"]
+__all__ = ["UserRepository", "RequestRepository", "SessionRepository", "ChatRepository"]
@@ -0,0 +1,743 @@
+"""
+Repositorio de Chats para MongoDB.
+
+Implementación del puerto ChatRepositoryPort usando el patrón bucket:
+el documento de `chats` guarda solo los metadatos y los mensajes viven
+en `chat_messages`, en buckets de tamaño fijo indexados por
+`(chatId, bucketSeq)`. Agregar un mensaje no reescribe el historial y
+leer los más recientes solo toca los últimos buckets.
+
+Los mensajes sin leer se cuentan en `chat_unread`, un documento por
+(usuario, chat) con el contador y la secuencia del último mensaje leído:
+enviar incrementa el contador del destinatario y marcar como leído lo
+descuenta, así que el total de un usuario es una consulta indexada que
+no depende del tamaño del historial. Una reconciliación periódica los
+recalcula desde los buckets por si alguno deriva.
+
+Opcionalmente, los mensajes y lecturas de cada chat se acumulan durante
+una ventana corta (write-behind) y se escriben juntos con `bulk_write`.
+"""
+
+import asyncio
+import logging
+import math
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from ...domain.entities import Chat, Message, Attachment
+from ...domain.repositories import ChatRepositoryPort
+from ...observability.tracing import trace_methods
+
+logger = logging.getLogger(__name__)
+
+# Mensajes por bucket: ~100 mensajes cortos quedan muy por debajo de 16 MB
+BUCKET_SIZE = 100
+DURABILITY_MODES = ("ack", "async")
+
+
+@trace_methods
+class ChatRepository(ChatRepositoryPort):
+    """
+    Implementación del repositorio de chats para MongoDB.
+
+    `Chat.messages` en las lecturas contiene solo los `recent_messages`
+    mensajes más recientes; `update` modifica los metadatos y los mensajes
+    se agregan con `add_message`.
+
+    Args:
+        database: Base de datos de MongoDB
+        bucket_size: Mensajes por bucket
+        recent_messages: Mensajes incluidos en las lecturas de `Chat`
+        flush_interval: Ventana en segundos del write-behind (0 = escribir
+            cada mensaje y lectura al momento)
+        flush_max_items: Escrituras de un chat que fuerzan el flush antes
+            de que termine la ventana
+        durability: "ack" espera al flush antes de retornar; "async"
+            retorna al encolar (se pierde lo pendiente si el proceso muere)
+    """
+
+    def __init__(
+        self,
+        database: AsyncIOMotorDatabase,
+        bucket_size: int = BUCKET_SIZE,
+        recent_messages: int = 50,
+        flush_interval: float = 0.0,
+        flush_max_items: int = 100,
+        durability: str = "ack",
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        self.collection = database.chats
+        self.buckets = database.chat_messages
+        self.unread = database.chat_unread
+        self.bucket_size = bucket_size
+        self.recent_messages = recent_messages
+        self.flush_interval = flush_interval
+        self.flush_max_items = flush_max_items
+        self.durability = durability
+        self._pending: Dict[str, _PendingWrites] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._reconciler: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        """Crea los índices de chats y buckets de mensajes."""
+        await self.buckets.create_index(
+            [("chatId", ASCENDING), ("bucketSeq", ASCENDING)], unique=True
+        )
+        # Rangos por fecha para la paginación del historial
+        await self.buckets.create_index(
+            [("chatId", ASCENDING), ("firstAt", DESCENDING)]
+        )
+        await self.buckets.create_index([("chatId", ASCENDING), ("lastAt", ASCENDING)])
+        await self.unread.create_index(
+            [("userId", ASCENDING), ("chatId", ASCENDING)], unique=True
+        )
+        await self.unread.create_index([("chatId", ASCENDING)])
+        await self.collection.create_index([("sessionId", ASCENDING)])
+        # Ventanas de la reconciliación de no leídos
+        await self.collection.create_index([("lastMessageAt", ASCENDING)])
+        await self.collection.create_index(
+            [("studentId", ASCENDING), ("lastMessageAt", DESCENDING)]
+        )
+        await self.collection.create_index(
+            [("advisorId", ASCENDING), ("lastMessageAt", DESCENDING)]
+        )
+
+    def _to_entity(
+        self, doc: dict, messages: Optional[List[Message]] = None
+    ) -> Optional[Chat]:
+        """Convierte un documento MongoDB a entidad de dominio."""
+        if not doc:
+            return None
+
+        return Chat(
+            id=str(doc.get("_id", "")),
+            session_id=str(doc.get("sessionId", "")),
+            student_id=str(doc.get("studentId", "")),
+            advisor_id=str(doc.get("advisorId", "")),
+            messages=messages or [],
+            last_message_at=doc.get("lastMessageAt"),
+            created_at=doc.get("createdAt", datetime.now()),
+        )
+
+    def _to_document(self, chat: Chat) -> dict:
+        """Convierte una entidad de dominio a documento MongoDB (sin mensajes)."""
+        doc = {
+            "sessionId": ObjectId(chat.session_id),
+            "studentId": ObjectId(chat.student_id),
+            "advisorId": ObjectId(chat.advisor_id),
+            "lastMessageAt": chat.last_message_at,
+        }
+
+        if chat.id:
+            doc["_id"] = ObjectId(chat.id)
+        else:
+            doc["createdAt"] = chat.created_at
+
+        return doc
+
+    def _message_to_entity(self, doc: dict) -> Message:
+        """Convierte un mensaje de un bucket a entidad de dominio."""
+        attachment = None
+        if doc.get("attachment"):
+            a = doc["attachment"]
+            attachment = Attachment(type=a["type"], url=a["url"], name=a["name"])
+
+        return Message(
+            id=str(doc["id"]),
+            from_user_id=str(doc.get("fromUserId", "")),
+            content=doc.get("content"),
+            attachment=attachment,
+            sent_at=doc.get("sentAt", datetime.now()),
+            is_read=doc.get("isRead", False),
+        )
+
+    def _message_to_document(self, message: Message, seq: int) -> dict:
+        """Convierte un mensaje a su forma dentro de un bucket."""
+        doc = {
+            "id": ObjectId(message.id),
+            "seq": seq,
+            "fromUserId": ObjectId(message.from_user_id),
+            "content": message.content,
+            "sentAt": message.sent_at,
+            "isRead": message.is_read,
+        }
+
+        if message.attachment:
+            a = message.attachment
+            doc["attachment"] = {"type": a.type, "url": a.url, "name": a.name}
+
+        return doc
+
+    async def create(self, chat: Chat) -> Chat:
+        """Crea un nuevo chat; los mensajes iniciales se guardan en buckets."""
+        doc = self._to_document(chat)
+        doc["createdAt"] = datetime.now()
+        doc["messageCount"] = 0
+
+        result = await self.collection.insert_one(doc)
+        chat.id = str(result.inserted_id)
+        for user_id in (chat.student_id, chat.advisor_id):
+            await self._ensure_counter(result.inserted_id, ObjectId(user_id))
+
+        for message in chat.messages:
+            await self.add_message(chat.id, message)
+        return chat
+
+    async def get_by_id(self, chat_id: str) -> Optional[Chat]:
+        """Obtiene un chat por su ID con sus mensajes más recientes."""
+        try:
+            doc = await self.collection.find_one({"_id": ObjectId(chat_id)})
+        except Exception:
+            return None
+        return await self._with_recent_messages(doc)
+
+    async def get_by_session_id(self, session_id: str) -> Optional[Chat]:
+        """Obtiene un chat por ID de sesión con sus mensajes más recientes."""
+        try:
+            doc = await self.collection.find_one({"sessionId": ObjectId(session_id)})
+        except Exception:
+            return None
+        return await self._with_recent_messages(doc)
+
+    async def _with_recent_messages(self, doc: Optional[dict]) -> Optional[Chat]:
+        if not doc:
+            return None
+        messages = await self.list_recent_messages(
+            str(doc["_id"]), self.recent_messages
+        )
+        return self._to_entity(doc, messages)
+
+    async def update(self, chat: Chat) -> Chat:
+        """Actualiza los metadatos de un chat existente."""
+        doc = self._to_document(chat)
+        doc.pop("_id")
+
+        await self.collection.update_one({"_id": ObjectId(chat.id)}, {"$set": doc})
+        return chat
+
+    async def delete(self, chat_id: str) -> bool:
+        """Elimina un chat y todos sus buckets de mensajes."""
+        result = await self.collection.delete_one({"_id": ObjectId(chat_id)})
+        await self.buckets.delete_many({"chatId": ObjectId(chat_id)})
+        await self.unread.delete_many({"chatId": ObjectId(chat_id)})
+        return result.deleted_count > 0
+
+    async def list_by_user(self, user_id: str) -> List[Chat]:
+        """Lista chats de un usuario (sin mensajes), más recientes primero."""
+        user = ObjectId(user_id)
+        cursor = self.collection.find(
+            {"$or": [{"studentId": user}, {"advisorId": user}]}
+        ).sort("lastMessageAt", DESCENDING)
+        return [self._to_entity(doc) async for doc in cursor]
+
+    async def add_message(self, chat_id: str, message: Message) -> Message:
+        """
+        Agrega un mensaje al bucket abierto del chat.
+
+        El contador atómico `messageCount` asigna la secuencia del mensaje y
+        con ella su bucket; el `$push` con upsert crea el bucket siguiente
+        cuando el anterior se llena. Después se incrementa el contador de
+        no leídos de cada participante distinto del remitente.
+
+        Con write-behind (`flush_interval > 0`) el mensaje se acumula con
+        los demás del chat y se escribe en el siguiente flush; con
+        durabilidad "ack" la llamada espera a ese flush.
+
+        `sent_at` se trunca a milisegundos, la precisión de las fechas BSON,
+        para que el cursor del mensaje retornado coincida con el guardado.
+
+        Raises:
+            ValueError: Si el chat no existe (sin buffer o con "ack")
+        """
+        if not message.id:
+            message.id = str(ObjectId())
+        message.sent_at = message.sent_at.replace(
+            microsecond=message.sent_at.microsecond // 1000 * 1000
+        )
+        if not self.buffered:
+            await self._write(chat_id, [message], {})
+            return message
+
+        pending = self._pending_for(chat_id)
+        pending.messages.append(message)
+        await self._after_enqueue(chat_id, pending)
+        return message
+
+    async def list_recent_messages(
+        self, chat_id: str, limit: int = 50
+    ) -> List[Message]:
+        """Lista los `limit` mensajes más recientes leyendo solo los últimos buckets."""
+        if limit <= 0:
+            return []
+        # El último bucket puede estar casi vacío: se lee uno extra
+        buckets = math.ceil(limit / self.bucket_size) + 1
+        cursor = (
+            self.buckets.find({"chatId": ObjectId(chat_id)}, {"messages": 1})
+            .sort("bucketSeq", DESCENDING)
+            .limit(buckets)
+        )
+        docs = [m async for bucket in cursor for m in bucket.get("messages", [])]
+        docs.sort(key=lambda m: m["seq"])
+        return [self._message_to_entity(doc) for doc in docs[-limit:]]
+
+    async def list_messages(
+        self,
+        chat_id: str,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, str]] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ) -> List[Message]:
+        """
+        Página del historial antes o después de un cursor `(sent_at, id)`.
+
+        Los buckets se recorren por el índice `(chatId, firstAt)` hacia atrás
+        o `(chatId, lastAt)` hacia adelante, empezando en el que contiene el
+        cursor: una página toca como mucho `ceil(limit / bucket_size) + 1`
+        buckets sin importar lo largo del historial.
+
+        Raises:
+            ValueError: Si se indican `before` y `after` a la vez
+        """
+        if before is not None and after is not None:
+            raise ValueError("Use either before or after, not both")
+        if limit <= 0:
+            return []
+
+        query = {"chatId": ObjectId(chat_id)}
+        buckets = math.ceil(limit / self.bucket_size) + 1
+        if after is not None:
+            key = (after[0], ObjectId(after[1]))
+            query["lastAt"] = {"$gte": key[0]}
+            cursor = self.buckets.find(query, {"messages": 1}).sort("lastAt", ASCENDING)
+        else:
+            key = (before[0], ObjectId(before[1])) if before else None
+            if key:
+                query["firstAt"] = {"$lte": key[0]}
+            cursor = self.buckets.find(query, {"messages": 1}).sort(
+                "firstAt", DESCENDING
+            )
+
+        docs = [
+            m
+            async for bucket in cursor.limit(buckets)
+            for m in bucket.get("messages", [])
+            if key is None
+            or ((m["sentAt"], m["id"]) > key if after else (m["sentAt"], m["id"]) < key)
+        ]
+        docs.sort(key=lambda m: (m["sentAt"], m["id"]))
+        page = docs[:limit] if after is not None else docs[-limit:]
+        return [self._message_to_entity(doc) for doc in page]
+
+    # ── Mensajes sin leer ─────────────────────────────────────────
+
+    async def _ensure_counter(self, chat_id: ObjectId, user_id: ObjectId):
+        await self.unread.update_one(
+            {"chatId": chat_id, "userId": user_id},
+            {"$setOnInsert": {"unread": 0, "lastReadSeq": -1}},
+            upsert=True,
+        )
+
+    async def _message_seq(self, chat_id: ObjectId, message_id: str) -> Optional[int]:
+        """Secuencia de un mensaje (None si no pertenece al chat)."""
+        try:
+            message_oid = ObjectId(message_id)
+        except Exception:
+            return None
+        bucket = await self.buckets.find_one(
+            {"chatId": chat_id, "messages.id": message_oid}, {"messages.$": 1}
+        )
+        for doc in (bucket or {}).get("messages", []):
+            if doc["id"] == message_oid:
+                return doc["seq"]
+        return None
+
+    async def mark_read(self, chat_id: str, user_id: str, up_to_message_id: str) -> int:
+        """
+        Marca como leídos los mensajes recibidos hasta `up_to_message_id`.
+
+        Con write-behind la lectura se combina con las demás del chat (se
+        guarda la secuencia más alta por usuario); en modo "async" el valor
+        retornado es el último contador escrito.
+
+        Raises:
+            ValueError: Si el mensaje no pertenece al chat
+        """
+        chat, user = ObjectId(chat_id), ObjectId(user_id)
+        pending = self._pending.get(chat_id)
+        if pending and any(m.id == up_to_message_id for m in pending.messages):
+            # El mensaje sigue en el buffer: se escribe antes de buscarlo
+            await self._flush_chat(chat_id)
+
+        seq = await self._message_seq(chat, up_to_message_id)
+        if seq is None:
+            raise ValueError(f"Message {up_to_message_id} not found in chat {chat_id}")
+        if not self.buffered:
+            return (await self._write(chat_id, [], {user: seq}))[user]
+
+        pending = self._pending_for(chat_id)
+        pending.reads[user] = max(seq, pending.reads.get(user, -1))
+        remaining = await self._after_enqueue(chat_id, pending)
+        if user in remaining:
+            return remaining[user]
+        counter = await self.unread.find_one({"chatId": chat, "userId": user})
+        return max((counter or {}).get("unread", 0), 0)
+
+    async def _advance_read(
+        self, chat: ObjectId, user: ObjectId, seq: int
+    ) -> Tuple[int, int]:
+        """
+        Avanza `lastReadSeq` del usuario hasta `seq` y descuenta lo leído.
+
+        Cuenta los mensajes de otros participantes entre el último leído y
+        `seq` (solo los buckets de ese rango). La actualización es
+        condicional sobre `lastReadSeq`, así que dos flushes concurrentes no
+        descuentan el mismo mensaje dos veces.
+
+        Returns:
+            (lastReadSeq anterior, mensajes que siguen sin leer)
+        """
+        await self._ensure_counter(chat, user)
+        while True:
+            counter = await self.unread.find_one({"chatId": chat, "userId": user})
+            last = counter.get("lastReadSeq", -1)
+            if seq <= last:
+                return last, max(counter.get("unread", 0), 0)
+
+            cursor = self.buckets.find(
+                {"chatId": chat, "bucketSeq": self._bucket_range(last, seq)},
+                {"messages.seq": 1, "messages.fromUserId": 1},
+            )
+            read = len(
+                [
+                    m
+                    async for bucket in cursor
+                    for m in bucket.get("messages", [])
+                    if last < m["seq"] <= seq and m.get("fromUserId") != user
+                ]
+            )
+            updated = await self.unread.find_one_and_update(
+                {"chatId": chat, "userId": user, "lastReadSeq": last},
+                {"$set": {"lastReadSeq": seq}, "$inc": {"unread": -read}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated is not None:
+                return last, max(updated.get("unread", 0), 0)
+
+    def _bucket_range(self, last: int, seq: int) -> dict:
+        """Buckets que contienen las secuencias (last, seq]."""
+        return {"$gte": (last + 1) // self.bucket_size, "$lte": seq // self.bucket_size}
+
+    async def get_unread_counts(self, user_id: str) -> Dict[str, int]:
+        """Mensajes sin leer por chat, desde el índice (userId, chatId)."""
+        cursor = self.unread.find(
+            {"userId": ObjectId(user_id), "unread": {"$gt": 0}},
+            {"chatId": 1, "unread": 1, "_id": 0},
+        )
+        return {str(doc["chatId"]): doc["unread"] async for doc in cursor}
+
+    async def count_unread(self, user_id: str) -> int:
+        """Total de mensajes sin leer del usuario."""
+        return sum((await self.get_unread_counts(user_id)).values())
+
+    async def reconcile_unread(
+        self, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> int:
+        """
+        Recalcula los contadores de no leídos desde los buckets.
+
+        Corrige la deriva que dejan un `bulk_write` de contadores fallido o
+        una lectura que avanzó sobre un mensaje de otro proceso que aún no
+        estaba en su bucket. Solo revisa los chats con `lastMessageAt` en
+        `[since, until)`; `until` debe quedar antes de los flushes en curso.
+        La corrección es condicional sobre el contador leído, así que no
+        pisa incrementos ni lecturas concurrentes.
+
+        Returns:
+            Contadores corregidos
+        """
+        window = {}
+        if since is not None:
+            window["$gte"] = since
+        if until is not None:
+            window["$lt"] = until
+        query = {"lastMessageAt": window} if window else {}
+        cursor = self.collection.find(query, {"studentId": 1, "advisorId": 1})
+        fixed = 0
+        async for doc in cursor:
+            fixed += await self._reconcile_chat(doc)
+        if fixed:
+            logger.warning(f"Chat unread counters reconciled: {fixed} corrected")
+        return fixed
+
+    async def _reconcile_chat(self, doc: dict) -> int:
+        chat = doc["_id"]
+        counters = {c["userId"]: c async for c in self.unread.find({"chatId": chat})}
+        cursor = self.buckets.find(
+            {"chatId": chat}, {"messages.seq": 1, "messages.fromUserId": 1}
+        )
+        messages = [m async for bucket in cursor for m in bucket.get("messages", [])]
+
+        fixed = 0
+        for user in (doc.get("studentId"), doc.get("advisorId")):
+            if user is None:
+                continue
+            counter = counters.get(user, {})
+            last = counter.get("lastReadSeq", -1)
+            expected = sum(
+                1 for m in messages if m["seq"] > last and m.get("fromUserId") != user
+            )
+            if counter and counter.get("unread") == expected:
+                continue
+            query = {"chatId": chat, "userId": user, "lastReadSeq": last}
+            if counter:
+                query["unread"] = counter.get("unread")
+            try:
+                result = await self.unread.update_one(
+                    query, {"$set": {"unread": expected}}, upsert=not counter
+                )
+            except DuplicateKeyError:
+                # Otro flush creó el contador mientras tanto
+                continue
+            fixed += result.modified_count + (1 if result.upserted_id else 0)
+        return fixed
+
+    def start_reconciler(self, interval: float, settle: float = 60.0) -> None:
+        """
+        Inicia la reconciliación periódica de no leídos.
+
+        Cada pasada revisa los chats con mensajes desde la anterior, dejando
+        fuera los últimos `settle` segundos para no tocar flushes en curso.
+        """
+        if self._reconciler is None:
+            self._reconciler = asyncio.create_task(
+                self._reconcile_loop(interval, settle)
+            )
+
+    async def _reconcile_loop(self, interval: float, settle: float):
+        since = datetime.now() - timedelta(seconds=settle + interval)
+        while True:
+            await asyncio.sleep(interval)
+            until = datetime.now() - timedelta(seconds=settle)
+            try:
+                await self.reconcile_unread(since, until)
+                since = until
+            except Exception as e:
+                logger.error(f"Chat unread reconciliation failed: {e}")
+
+    # ── Write-behind ──────────────────────────────────────────────
+
+    @property
+    def buffered(self) -> bool:
+        """Si las escrituras de mensajes y lecturas pasan por el buffer."""
+        return self.flush_interval > 0
+
+    def _pending_for(self, chat_id: str) -> "_PendingWrites":
+        """Buffer abierto del chat; el primero programa el flush por tiempo."""
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            pending = self._pending[chat_id] = _PendingWrites()
+            pending.timer = self._spawn(self._flush_later(chat_id, pending))
+        return pending
+
+    async def _after_enqueue(self, chat_id: str, pending: "_PendingWrites") -> dict:
+        """Dispara el flush por tamaño y, con "ack", espera su resultado."""
+        waiter = None
+        if self.durability == "ack":
+            waiter = asyncio.get_running_loop().create_future()
+            pending.waiters.append(waiter)
+        if len(pending.messages) + len(pending.reads) >= self.flush_max_items:
+            self._take(chat_id)
+            self._spawn(self._flush(chat_id, pending))
+        return await waiter if waiter else {}
+
+    def _take(self, chat_id: str) -> Optional["_PendingWrites"]:
+        """Saca el buffer del chat y cancela su flush programado."""
+        pending = self._pending.pop(chat_id, None)
+        if pending is not None and pending.timer is not asyncio.current_task():
+            pending.timer.cancel()
+        return pending
+
+    async def _flush_later(self, chat_id: str, pending: "_PendingWrites"):
+        await asyncio.sleep(self.flush_interval)
+        if self._pending.get(chat_id) is pending:
+            self._take(chat_id)
+            await self._flush(chat_id, pending)
+
+    async def _flush_chat(self, chat_id: str):
+        pending = self._take(chat_id)
+        if pending is not None:
+            await self._flush(chat_id, pending)
+
+    async def _flush(self, chat_id: str, pending: "_PendingWrites"):
+        """Escribe un buffer y resuelve a quienes esperan el ack."""
+        try:
+            result = await self._write(chat_id, pending.messages, pending.reads)
+        except Exception as e:
+            if not pending.waiters:
+                logger.error(
+                    f"Write-behind flush failed for chat {chat_id} "
+                    f"({len(pending.messages)} messages lost): {e}"
+                )
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        for waiter in pending.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def flush(self):
+        """Escribe de inmediato todos los buffers pendientes."""
+        for chat_id in list(self._pending):
+            pending = self._take(chat_id)
+            self._spawn(self._flush(chat_id, pending))
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def close(self):
+        """Vacía el buffer y detiene la reconciliación; se llama al apagar."""
+        if self._reconciler is not None:
+            self._reconciler.cancel()
+            try:
+                await self._reconciler
+            except asyncio.CancelledError:
+                pass
+            self._reconciler = None
+        await self.flush()
+
+    async def _write(
+        self, chat_id: str, messages: List[Message], reads: Dict[ObjectId, int]
+    ) -> Dict[ObjectId, int]:
+        """
+        Escribe un lote de mensajes y lecturas de un chat.
+
+        Los mensajes toman secuencias consecutivas con un solo `$inc` sobre
+        el chat; los `$push` por bucket van en un `bulk_write` sobre
+        `chat_messages`, los contadores de no leídos de los destinatarios en
+        otro sobre `chat_unread` y los `isRead` de las lecturas al final.
+
+        Returns:
+            Mensajes sin leer restantes por cada usuario de `reads`
+        """
+        chat = ObjectId(chat_id)
+        pushes: List[Tuple[dict, dict]] = []
+        counters = []
+        if messages:
+            doc = await self.collection.find_one_and_update(
+                {"_id": chat},
+                {
+                    "$inc": {"messageCount": len(messages)},
+                    "$max": {"lastMessageAt": max(m.sent_at for m in messages)},
+                },
+                projection={"messageCount": 1, "studentId": 1, "advisorId": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                raise ValueError(f"Chat {chat_id} not found")
+
+            by_bucket: Dict[int, List[dict]] = {}
+            first = doc["messageCount"] - len(messages)
+            for seq, message in enumerate(messages, first):
+                by_bucket.setdefault(seq // self.bucket_size, []).append(
+                    self._message_to_document(message, seq)
+                )
+            for bucket_seq, docs in by_bucket.items():
+                sent = [d["sentAt"] for d in docs]
+                pushes.append(
+                    (
+                        {"chatId": chat, "bucketSeq": bucket_seq},
+                        {
+                            "$push": {"messages": {"$each": docs}},
+                            "$inc": {"count": len(docs)},
+                            "$min": {"firstAt": min(sent)},
+                            "$max": {"lastAt": max(sent)},
+                        },
+                    )
+                )
+
+            for user in (doc.get("studentId"), doc.get("advisorId")):
+                received = sum(1 for m in messages if ObjectId(m.from_user_id) != user)
+                if user is not None and received:
+                    counters.append(
+                        UpdateOne(
+                            {"chatId": chat, "userId": user},
+                            {
+                                "$inc": {"unread": received},
+                                "$setOnInsert": {"lastReadSeq": -1},
+                            },
+                            upsert=True,
+                        )
+                    )
+
+        # Los `$push` van antes que los contadores: una lectura concurrente
+        # solo descuenta mensajes que ya están en los buckets, y un `$push`
+        # fallido no deja contadores incrementados. Los contadores van antes
+        # que las lecturas para que el restante incluya este mismo lote.
+        await self._write_buckets(pushes, [])
+        if counters:
+            await self.unread.bulk_write(counters, ordered=False)
+
+        remaining: Dict[ObjectId, int] = {}
+        flags = []
+        for user, seq in reads.items():
+            last, remaining[user] = await self._advance_read(chat, user, seq)
+            if last < seq:
+                flags.append(
+                    UpdateMany(
+                        {"chatId": chat, "bucketSeq": self._bucket_range(last, seq)},
+                        {"$set": {"messages.$[m].isRead": True}},
+                        array_filters=[
+                            {
+                                "m.seq": {"$gt": last, "$lte": seq},
+                                "m.fromUserId": {"$ne": user},
+                            }
+                        ],
+                    )
+                )
+
+        await self._write_buckets([], flags)
+        return remaining
+
+    async def _write_buckets(self, pushes: List[Tuple[dict, dict]], flags: list):
+        """`bulk_write` ordenado de los `$push` (con upsert) y los `isRead`."""
+        upsert_first = True
+        while pushes or flags:
+            ops = [
+                UpdateOne(key, update, upsert=upsert_first or i > 0)
+                for i, (key, update) in enumerate(pushes)
+            ]
+            try:
+                await self.buckets.bulk_write(ops + flags, ordered=True)
+                return
+            except BulkWriteError as e:
+                error = e.details["writeErrors"][0]
+                failed = error["index"]
+                if error.get("code") != 11000 or failed >= len(pushes):
+                    raise
+                # Otro flush creó el mismo bucket al mismo tiempo: las
+                # operaciones anteriores ya se aplicaron
+                pushes, upsert_first = pushes[failed:], False
+
+
+class _PendingWrites:
+    """Mensajes y lecturas de un chat en espera del próximo flush."""
+
+    __slots__ = ("messages", "reads", "waiters", "timer")
+
+    def __init__(self):
+        self.messages: List[Message] = []
+        # Secuencia más alta marcada como leída por usuario
+        self.reads: Dict[ObjectId, int] = {}
+        self.waiters: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.Task] = None
@@ -11,15 +11,28 @@ from bson import ObjectId
 
 from ...domain.entities import Request, RequestStatusEnum
 from ...domain.repositories import RequestRepositoryPort
+from ...observability.tracing import trace_methods
+from ..stats_rollups import StatsRollups
 
 
+@trace_methods
 class RequestRepository(RequestRepositoryPort):
     """
     Implementación del repositorio de solicitudes para MongoDB.
+
+    Si recibe `rollups`, mantiene al día las estadísticas de los
+    dashboards en cada alta, cambio o borrado.
     """
 
-    def __init__(self, database: AsyncIOMotorDatabase):
+    def __init__(
+        self, database: AsyncIOMotorDatabase, rollups: Optional[StatsRollups] = None
+    ):
         self.collection = database.requests
+        self.rollups = rollups
+
+    async def _record_stats(self, before: Optional[dict], after: Optional[dict]):
+        if self.rollups is not None:
+            await self.rollups.record("requests", before, after)
 
     def _to_entity(self, doc: dict) -> Optional[Request]:
         """Convierte un documento MongoDB a entidad de dominio."""
@@ -70,6 +83,7 @@ class RequestRepository(RequestRepositoryPort):
 
         result = await self.collection.insert_one(doc)
         request.id = str(result.inserted_id)
+        await self._record_stats(None, doc)
         return request
 
     async def get_by_id(self, request_id: str) -> Optional[Request]:
@@ -83,14 +97,25 @@ class RequestRepository(RequestRepositoryPort):
     async def update(self, request: Request) -> Request:
         """Actualiza una solicitud existente."""
         doc = self._to_document(request)
+        # _to_document omite createdAt en documentos existentes
+        doc["createdAt"] = request.created_at
 
-        await self.collection.replace_one({"_id": ObjectId(request.id)}, doc)
+        before = await self.collection.find_one_and_replace(
+            {"_id": ObjectId(request.id)}, doc
+        )
+        if before is not None:
+            await self._record_stats(before, doc)
         return request
 
     async def delete(self, request_id: str) -> bool:
         """Elimina una solicitud por su ID."""
-        result = await self.collection.delete_one({"_id": ObjectId(request_id)})
-        return result.deleted_count > 0
+        before = await self.collection.find_one_and_delete(
+            {"_id": ObjectId(request_id)}
+        )
+        if before is None:
+            return False
+        await self._record_stats(before, None)
+        return True
 
     async def list_all(self) -> List[Request]:
         """Lista todas las solicitudes."""
@@ -119,17 +144,16 @@ class RequestRepository(RequestRepositoryPort):
 
     async def assign_to_advisor(self, request_id: str, advisor_id: str) -> Request:
         """Asigna una solicitud a un asesor."""
-        now = datetime.now()
-        await self.collection.update_one(
-            {"_id": ObjectId(request_id)},
-            {
-                "$set": {
-                    "advisorId": ObjectId(advisor_id),
-                    "status": RequestStatusEnum.TAKEN.value,
-                    "takenAt": now,
-                }
-            },
+        changes = {
+            "advisorId": ObjectId(advisor_id),
+            "status": RequestStatusEnum.TAKEN.value,
+            "takenAt": datetime.now(),
+        }
+        before = await self.collection.find_one_and_update(
+            {"_id": ObjectId(request_id)}, {"$set": changes}
         )
+        if before is not None:
+            await self._record_stats(before, {**before, **changes})
 
         request = await self.get_by_id(request_id)
         return request
@@ -4,10 +4,13 @@ Repositorio de Sesiones para MongoDB.
 Implementación del puerto SessionRepositoryPort usando MongoDB.
 """
 
-from typing import List, Optional
-from datetime import datetime
+import calendar
+from typing import AsyncIterator, List, Optional
+from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
 
 from ...domain.entities import (
     Session,
@@ -15,17 +18,70 @@ from ...domain.entities import (
     MeetingPlatformEnum,
     Verification,
     EvidenceTypeEnum,
+    AttendanceRecord,
 )
 from ...domain.repositories import SessionRepositoryPort
+from ...observability.tracing import trace_methods
+from ...services.scheduling import DEFAULT_SESSION_DURATION
+from ..stats_rollups import StatsRollups
 
+# Granularidad en minutos de las franjas que ocupa cada sesión
+SLOT_MINUTES = 15
 
+
+@trace_methods
 class SessionRepository(SessionRepositoryPort):
     """
     Implementación del repositorio de sesiones para MongoDB.
+
+    Si recibe `rollups`, mantiene al día las estadísticas de los
+    dashboards en cada alta, cambio o borrado.
+
+    Cada sesión activa guarda en `slots` las franjas de `slot_minutes` que
+    ocupa para su asesor y su estudiante; el índice único sobre `slots`
+    hace que dos sesiones traslapadas de un mismo participante no puedan
+    coexistir, aunque las creen workers distintos al mismo tiempo.
     """
 
-    def __init__(self, database: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        database: AsyncIOMotorDatabase,
+        rollups: Optional[StatsRollups] = None,
+        session_duration: timedelta = DEFAULT_SESSION_DURATION,
+        slot_minutes: int = SLOT_MINUTES,
+    ):
         self.collection = database.sessions
+        self.rollups = rollups
+        self.session_duration = session_duration
+        self.slot_minutes = slot_minutes
+
+    async def _record_stats(self, before: Optional[dict], after: Optional[dict]):
+        if self.rollups is not None:
+            await self.rollups.record("sessions", before, after)
+
+    async def ensure_indexes(self):
+        """Crea los índices por fecha usados por las exportaciones."""
+        await self.collection.create_index([("scheduledAt", ASCENDING)])
+        await self.collection.create_index(
+            [("advisorId", ASCENDING), ("scheduledAt", ASCENDING)]
+        )
+        # Las sesiones canceladas no guardan `slots` y no ocupan horario
+        await self.collection.create_index(
+            [("slots", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"slots": {"$exists": True}},
+        )
+
+    def _slots(self, session: Session) -> List[str]:
+        """Franjas `participante:n` que ocupa [scheduled_at, fin) de la sesión."""
+        start = calendar.timegm(session.scheduled_at.utctimetuple()) // 60
+        end = start + int(self.session_duration.total_seconds()) // 60
+        first, last = start // self.slot_minutes, -(-end // self.slot_minutes)
+        return [
+            f"{participant}:{slot}"
+            for participant in (session.advisor_id, session.student_id)
+            for slot in range(first, last)
+        ]
 
     def _to_entity(self, doc: dict) -> Optional[Session]:
         """Convierte un documento MongoDB a entidad de dominio."""
@@ -46,6 +102,15 @@ class SessionRepository(SessionRepositoryPort):
                 verified_by=str(v.get("verifiedBy")) if v.get("verifiedBy") else None,
                 verified_at=v.get("verifiedAt"),
                 notes=v.get("notes"),
+                attendance=[
+                    AttendanceRecord(
+                        user_id=str(a.get("userId", "")),
+                        joined_at=a.get("joinedAt"),
+                        left_at=a.get("leftAt"),
+                        duration_minutes=a.get("durationMinutes", 0),
+                    )
+                    for a in v.get("attendance") or []
+                ],
             )
 
         return Session(
@@ -76,6 +141,9 @@ class SessionRepository(SessionRepositoryPort):
             "status": session.status.value,
         }
 
+        if session.status != SessionStatusEnum.CANCELLED:
+            doc["slots"] = self._slots(session)
+
         if session.approved_by:
             doc["approvedBy"] = ObjectId(session.approved_by)
 
@@ -97,6 +165,15 @@ class SessionRepository(SessionRepositoryPort):
                 "verifiedBy": ObjectId(v.verified_by) if v.verified_by else None,
                 "verifiedAt": v.verified_at,
                 "notes": v.notes,
+                "attendance": [
+                    {
+                        "userId": ObjectId(a.user_id),
+                        "joinedAt": a.joined_at,
+                        "leftAt": a.left_at,
+                        "durationMinutes": a.duration_minutes,
+                    }
+                    for a in v.attendance
+                ],
             }
 
         if session.id:
@@ -113,12 +190,22 @@ class SessionRepository(SessionRepositoryPort):
         return doc
 
     async def create(self, session: Session) -> Session:
-        """Crea una nueva sesión."""
+        """
+        Crea una nueva sesión.
+
+        Raises:
+            ValueError: Si el asesor o el estudiante ya tienen una sesión
+                activa que traslapa su horario
+        """
         doc = self._to_document(session)
         doc["createdAt"] = datetime.now()
 
-        result = await self.collection.insert_one(doc)
+        try:
+            result = await self.collection.insert_one(doc)
+        except DuplicateKeyError:
+            raise ValueError("Schedule conflict")
         session.id = str(result.inserted_id)
+        await self._record_stats(None, doc)
         return session
 
     async def get_by_id(self, session_id: str) -> Optional[Session]:
@@ -141,13 +228,22 @@ class SessionRepository(SessionRepositoryPort):
         """Actualiza una sesión existente."""
         doc = self._to_document(session)
 
-        await self.collection.replace_one({"_id": ObjectId(session.id)}, doc)
+        before = await self.collection.find_one_and_replace(
+            {"_id": ObjectId(session.id)}, doc
+        )
+        if before is not None:
+            await self._record_stats(before, doc)
         return session
 
     async def delete(self, session_id: str) -> bool:
         """Elimina una sesión por su ID."""
-        result = await self.collection.delete_one({"_id": ObjectId(session_id)})
-        return result.deleted_count > 0
+        before = await self.collection.find_one_and_delete(
+            {"_id": ObjectId(session_id)}
+        )
+        if before is None:
+            return False
+        await self._record_stats(before, None)
+        return True
 
     async def list_all(self) -> List[Session]:
         """Lista todas las sesiones."""
@@ -169,30 +265,80 @@ class SessionRepository(SessionRepositoryPort):
         cursor = self.collection.find({"status": status.value})
         return [self._to_entity(doc) async for doc in cursor]
 
-    async def approve_session(self, session_id: str, approved_by: str) -> Session:
-        """Aprueba una sesión."""
-        now = datetime.now()
-        await self.collection.update_one(
-            {"_id": ObjectId(session_id)},
+    async def iter_sessions(
+        self,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        advisor_id: Optional[str] = None,
+        status: Optional[SessionStatusEnum] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Session]:
+        """
+        Recorre sesiones filtradas, ordenadas por fecha, desde un cursor.
+
+        A diferencia de los `list_*`, no materializa el resultado: solo
+        mantiene en memoria el lote actual del cursor (`batch_size`).
+        """
+        query: dict = {}
+        if scheduled_from or scheduled_to:
+            query["scheduledAt"] = {}
+            if scheduled_from:
+                query["scheduledAt"]["$gte"] = scheduled_from
+            if scheduled_to:
+                query["scheduledAt"]["$lt"] = scheduled_to
+        if advisor_id:
+            query["advisorId"] = ObjectId(advisor_id)
+        if status:
+            query["status"] = status.value
+
+        cursor = (
+            self.collection.find(query).sort("scheduledAt", 1).batch_size(batch_size)
+        )
+        async for doc in cursor:
+            yield self._to_entity(doc)
+
+    async def approve_session(
+        self, session_id: str, approved_by: str
+    ) -> Optional[Session]:
+        """
+        Aprueba una sesión pendiente de aprobación.
+
+        La transición es condicional sobre el estado: de dos aprobaciones
+        concurrentes solo una la aplica.
+
+        Returns:
+            La sesión aprobada, o None si no existe o ya no estaba pendiente
+        """
+        changes = {
+            "approvedBy": ObjectId(approved_by),
+            "status": SessionStatusEnum.APPROVED.value,
+            "approvedAt": datetime.now(),
+        }
+        before = await self.collection.find_one_and_update(
             {
-                "$set": {
-                    "approvedBy": ObjectId(approved_by),
-                    "status": SessionStatusEnum.APPROVED.value,
-                    "approvedAt": now,
-                }
+                "_id": ObjectId(session_id),
+                "status": SessionStatusEnum.PENDING_APPROVAL.value,
             },
+            {"$set": changes},
         )
+        if before is None:
+            return None
+        await self._record_stats(before, {**before, **changes})
 
         session = await self.get_by_id(session_id)
         return session
 
     async def complete_session(self, session_id: str) -> Session:
         """Completa una sesión."""
-        now = datetime.now()
-        await self.collection.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$set": {"status": SessionStatusEnum.COMPLETED.value, "completedAt": now}},
+        changes = {
+            "status": SessionStatusEnum.COMPLETED.value,
+            "completedAt": datetime.now(),
+        }
+        before = await self.collection.find_one_and_update(
+            {"_id": ObjectId(session_id)}, {"$set": changes}
         )
+        if before is not None:
+            await self._record_stats(before, {**before, **changes})
 
         session = await self.get_by_id(session_id)
         return session
@@ -11,8 +11,10 @@ from bson import ObjectId
 
 from ...domain.entities import User, RoleEnum
 from ...domain.repositories import UserRepositoryPort
+from ...observability.tracing import trace_methods
 
 
+@trace_methods
 class UserRepository(UserRepositoryPort):
     """
     Implementación del repositorio de usuarios para MongoDB.
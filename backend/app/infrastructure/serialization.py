@@ -0,0 +1,53 @@
+"""
+Serialización JSON rápida con orjson.
+
+Codifica de forma nativa datetime, dataclasses, enums y UUID, y además
+ObjectId, modelos de Pydantic, sets y Decimal. Se usa como clase de
+respuesta por defecto de la API y para decodificar las respuestas de
+Microsoft Graph.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que orjson no conoce."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa `obj` a JSON (bytes UTF-8)."""
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def loads(data: Any) -> Any:
+    """Deserializa JSON desde bytes o str."""
+    return orjson.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada con orjson.
+
+    Las rutas que retornan esta clase directamente evitan además el paso
+    por `jsonable_encoder` de FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
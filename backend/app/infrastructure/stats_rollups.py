@@ -0,0 +1,286 @@
+"""
+Estadísticas materializadas de los dashboards (colección `stats_rollups`).
+
+Cada documento es un ámbito, `global` o `advisor:<id>`, con contadores de
+solicitudes y sesiones por dimensión:
+
+    {"_id": "global",
+     "requests": {"total": 120, "status": {"pending": 8, ...},
+                  "subject": {...}, "advisor": {...}, "week": {"2024-W10": 14}},
+     "sessions": {"total": 95, "status": {...}, "advisor": {...}, "week": {...}},
+     "updatedAt": ..., "reconciledAt": ...}
+
+Los repositorios aplican con `$inc` la diferencia entre el documento
+anterior y el nuevo en cada alta, cambio de estado o borrado, de modo que
+leer las estadísticas es un solo find_one sin importar el historial. La
+escritura del documento y la de sus contadores no son atómicas entre sí;
+`reconcile()` recalcula todo periódicamente con pipelines de agregación y
+corrige cualquier deriva.
+"""
+
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne, UpdateOne
+
+from ..observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+# Dimensiones por colección (además de `total` y `advisor`): nombre -> campo
+DIMENSIONS: Dict[str, Dict[str, str]] = {
+    "requests": {"status": "status", "subject": "subject", "week": "createdAt"},
+    "sessions": {"status": "status", "week": "scheduledAt"},
+}
+
+# Las llaves de MongoDB no admiten "." ni "$" (p. ej. "Cálculo 1.5")
+_KEY_ESCAPES = (("$", "＄"), (".", "．"))
+
+rollup_failures = REGISTRY.counter(
+    "peerhive_stats_rollup_failures_total",
+    "Actualizaciones incrementales de estadísticas fallidas (las corrige la reconciliación).",
+    ("kind",),
+)
+
+Contributions = Counter  # (ámbito, ruta) -> cantidad
+
+
+def advisor_scope(advisor_id: str) -> str:
+    """Ámbito de las estadísticas de un asesor."""
+    return f"advisor:{advisor_id}"
+
+
+def week_key(value: Any) -> Optional[str]:
+    """Semana ISO de una fecha (`2024-W09`), igual que `%G-W%V` en MongoDB."""
+    if not isinstance(value, datetime):
+        return None
+    year, week, _ = value.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _encode_key(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    key = str(value)
+    for char, escaped in _KEY_ESCAPES:
+        key = key.replace(char, escaped)
+    return key
+
+
+def _decode_key(key: str) -> str:
+    for char, escaped in _KEY_ESCAPES:
+        key = key.replace(escaped, char)
+    return key
+
+
+def contributions(kind: str, doc: Optional[dict]) -> Contributions:
+    """
+    Contadores que aporta un documento de `requests` o `sessions`.
+
+    Args:
+        kind: `requests` o `sessions`
+        doc: Documento de MongoDB (None si no existe)
+
+    Returns:
+        Counter de (ámbito, ruta con puntos) -> 1
+    """
+    counts: Contributions = Counter()
+    if not doc:
+        return counts
+
+    paths = [f"{kind}.total"]
+    for dimension, field in DIMENSIONS[kind].items():
+        value = doc.get(field)
+        key = week_key(value) if dimension == "week" else _encode_key(value)
+        if key:
+            paths.append(f"{kind}.{dimension}.{key}")
+
+    advisor = _encode_key(doc.get("advisorId"))
+    scopes = [GLOBAL_SCOPE] + ([advisor_scope(advisor)] if advisor else [])
+    for scope in scopes:
+        for path in paths:
+            counts[(scope, path)] += 1
+    if advisor:
+        counts[(GLOBAL_SCOPE, f"{kind}.advisor.{advisor}")] += 1
+    return counts
+
+
+def _nest(counts: Dict[str, int]) -> Dict[str, Any]:
+    """Convierte {"requests.status.pending": 3} en documentos anidados."""
+    nested: Dict[str, Any] = {}
+    for path, count in counts.items():
+        *parents, leaf = path.split(".")
+        node = nested
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = count
+    return nested
+
+
+def _decode_counts(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Decodifica llaves y omite contadores en cero."""
+    decoded: Dict[str, Any] = {}
+    for key, value in node.items():
+        if isinstance(value, dict):
+            decoded[_decode_key(key)] = _decode_counts(value)
+        elif value:
+            decoded[_decode_key(key)] = value
+    return decoded
+
+
+class StatsRollups:
+    """
+    Contadores materializados de solicitudes y sesiones.
+
+    Args:
+        database: Base de datos de MongoDB
+    """
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.collection = database.stats_rollups
+        self._sources = {"requests": database.requests, "sessions": database.sessions}
+        self._task: Optional[asyncio.Task] = None
+
+    async def record(self, kind: str, before: Optional[dict], after: Optional[dict]):
+        """
+        Aplica la diferencia entre dos versiones de un documento.
+
+        Un fallo solo se registra: la siguiente reconciliación corrige los
+        contadores y la escritura del usuario no se pierde por ello.
+
+        Args:
+            kind: `requests` o `sessions`
+            before: Documento antes del cambio (None en altas)
+            after: Documento después del cambio (None en borrados)
+        """
+        delta = contributions(kind, after)
+        delta.subtract(contributions(kind, before))
+
+        by_scope: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for (scope, path), count in delta.items():
+            if count:
+                by_scope[scope][path] = count
+        if not by_scope:
+            return
+
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": scope}, {"$inc": inc, "$set": {"updatedAt": now}}, upsert=True
+            )
+            for scope, inc in by_scope.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            rollup_failures.inc(kind)
+            logger.warning(f"Stats rollup update for {kind} failed: {e}")
+
+    async def get(self, scope: str = GLOBAL_SCOPE) -> Dict[str, Any]:
+        """
+        Estadísticas de un ámbito (un solo documento).
+
+        Returns:
+            Contadores de `requests` y `sessions` y fechas de actualización
+        """
+        doc = await self.collection.find_one({"_id": scope}) or {}
+        return {
+            "requests": _decode_counts(doc.get("requests", {})),
+            "sessions": _decode_counts(doc.get("sessions", {})),
+            "updated_at": doc.get("updatedAt"),
+            "reconciled_at": doc.get("reconciledAt"),
+        }
+
+    async def _aggregate(self, kind: str, counts: Dict[str, Counter]) -> None:
+        """Cuenta una colección completa, una agregación por dimensión."""
+        for dimension, field in DIMENSIONS[kind].items():
+            if dimension == "week":
+                key = {"$dateToString": {"format": "%G-W%V", "date": f"${field}"}}
+            else:
+                key = f"${field}"
+            pipeline = [
+                {
+                    "$group": {
+                        "_id": {"advisor": "$advisorId", "key": key},
+                        "count": {"$sum": 1},
+                    }
+                }
+            ]
+            cursor = self._sources[kind].aggregate(pipeline, allowDiskUse=True)
+            async for row in cursor:
+                advisor = _encode_key(row["_id"].get("advisor"))
+                value = _encode_key(row["_id"].get("key"))
+                count = row["count"]
+                scopes = [GLOBAL_SCOPE] + ([advisor_scope(advisor)] if advisor else [])
+                for scope in scopes:
+                    if value:
+                        counts[scope][f"{kind}.{dimension}.{value}"] += count
+                    # `total` y `advisor` salen de la dimensión de estado
+                    if dimension == "status":
+                        counts[scope][f"{kind}.total"] += count
+                if advisor and dimension == "status":
+                    counts[GLOBAL_SCOPE][f"{kind}.advisor.{advisor}"] += count
+
+    async def reconcile(self) -> Dict[str, int]:
+        """
+        Recalcula todos los ámbitos desde `requests` y `sessions`.
+
+        Reemplaza cada documento de ámbito y borra los de asesores que ya
+        no tienen solicitudes ni sesiones. Un incremento concurrente puede
+        perderse en la ventana entre la agregación y el reemplazo; la
+        siguiente reconciliación lo recupera.
+
+        Returns:
+            Ámbitos escritos y eliminados
+        """
+        counts: Dict[str, Counter] = defaultdict(Counter, {GLOBAL_SCOPE: Counter()})
+        for kind in DIMENSIONS:
+            await self._aggregate(kind, counts)
+
+        now = datetime.utcnow()
+        operations = [
+            ReplaceOne(
+                {"_id": scope},
+                {
+                    "_id": scope,
+                    **_nest(scope_counts),
+                    "updatedAt": now,
+                    "reconciledAt": now,
+                },
+                upsert=True,
+            )
+            for scope, scope_counts in counts.items()
+        ]
+        await self.collection.bulk_write(operations, ordered=False)
+        removed = await self.collection.delete_many({"_id": {"$nin": list(counts)}})
+        logger.info(f"Stats rollups reconciled: {len(counts)} scopes")
+        return {"scopes": len(counts), "removed": removed.deleted_count}
+
+    def start(self, interval: float) -> None:
+        """Inicia la reconciliación periódica (la primera corre de inmediato)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop(interval))
+
+    async def stop(self) -> None:
+        """Detiene la reconciliación periódica."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reconcile_loop(self, interval: float) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Stats rollup reconciliation failed: {e}")
+            await asyncio.sleep(interval)
@@ -3,25 +3,55 @@ from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from fastapi import WebSocket, WebSocketDisconnect
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic_settings import BaseSettings
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict
 from urllib.parse import quote
 import os
+import asyncio
 import logging
 import base64
 import hashlib
 import msal
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
 from cryptography.fernet import Fernet as _Fernet
 
+from .infrastructure.container import init_container, get_container
+from .infrastructure.jobs import JobQueue, JobRunner
+from .infrastructure.chat_hub import ChatHub, InMemoryBroker
+from .infrastructure.file_storage import FileStorage, FileTooLargeError
+from .services.graph import CircuitOpenError, token_user_key, track_staleness
+from .observability import (
+    REGISTRY,
+    LoopLagWatchdog,
+    MetricsMiddleware,
+    MongoCommandListener,
+)
+from .observability.profiler import ProfilerMiddleware, ProfileStore
+from .observability.tracing import (
+    TracingMiddleware,
+    configure_tracing,
+    shutdown_tracing,
+)
+from .observability.metrics import CONTENT_TYPE_LATEST
+from .infrastructure.serialization import FastJSONResponse, loads
+from .infrastructure.idempotency import (
+    IdempotencyStore,
+    IdempotencyConflictError,
+    request_fingerprint,
+    scoped_key,
+)
+
 
 # Configuration
 class Settings(BaseSettings):
@@ -34,12 +64,71 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = os.getenv("SECRET_KEY", "jwt-secret-change-in-production")
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Background jobs (efectos secundarios de Microsoft Graph)
+    JOB_RUNNER_CONCURRENCY: int = int(os.getenv("JOB_RUNNER_CONCURRENCY", "4"))
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    # Tiempo que se conservan los trabajos terminados (índice TTL)
+    JOB_RETENTION_SECONDS: int = int(os.getenv("JOB_RETENTION_SECONDS", "604800"))
+    # Tiempo que se conservan las respuestas con Idempotency-Key
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    # Lease de una petición en curso; al expirar, un reintento la retoma
+    IDEMPOTENCY_LEASE_SECONDS: int = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+    # Lag del event loop a partir del cual se captura el stack bloqueante
+    LOOP_LAG_THRESHOLD_MS: int = int(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+    # Duración a partir de la cual un comando va al log de consultas lentas
+    MONGO_SLOW_QUERY_MS: int = int(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+    # Perfiles por petición (X-Profile: 1, solo administradores)
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_MAX_FILES: int = int(os.getenv("PROFILE_MAX_FILES", "100"))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+    # Exportador de trazas: none, console o file
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    # Chat por WebSocket: cola por conexión, ventana de agrupación y envío
+    CHAT_WS_MAX_QUEUE: int = int(os.getenv("CHAT_WS_MAX_QUEUE", "256"))
+    CHAT_WS_TICK_MS: float = float(os.getenv("CHAT_WS_TICK_MS", "25"))
+    CHAT_WS_MAX_BATCH: int = int(os.getenv("CHAT_WS_MAX_BATCH", "64"))
+    CHAT_WS_SEND_TIMEOUT_SECONDS: float = float(
+        os.getenv("CHAT_WS_SEND_TIMEOUT_SECONDS", "5")
+    )
+    CHAT_MAX_MESSAGE_LENGTH: int = int(os.getenv("CHAT_MAX_MESSAGE_LENGTH", "4000"))
+    CHAT_PAGE_MAX_LIMIT: int = int(os.getenv("CHAT_PAGE_MAX_LIMIT", "100"))
+    # Write-behind de mensajes y lecturas (0 = escribir cada uno al momento);
+    # durabilidad "ack" (espera el flush) o "async"
+    CHAT_WRITE_BEHIND_MS: float = float(os.getenv("CHAT_WRITE_BEHIND_MS", "25"))
+    CHAT_WRITE_BEHIND_MAX_ITEMS: int = int(
+        os.getenv("CHAT_WRITE_BEHIND_MAX_ITEMS", "100")
+    )
+    CHAT_WRITE_DURABILITY: str = os.getenv("CHAT_WRITE_DURABILITY", "ack")
+    # Cada cuánto se recalculan los contadores de no leídos de chats activos
+    CHAT_UNREAD_RECONCILE_SECONDS: float = float(
+        os.getenv("CHAT_UNREAD_RECONCILE_SECONDS", "300")
+    )
+    # Evidencias y adjuntos subidos (almacenamiento por contenido)
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 2**20)))
+    UPLOAD_ALLOWED_TYPES: str = os.getenv(
+        "UPLOAD_ALLOWED_TYPES",
+        "image/png,image/jpeg,image/webp,image/gif,application/pdf",
+    )
+    # Procesos del pool de miniaturas de evidencias
+    THUMBNAIL_WORKERS: int = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+    # Filas por lote del cursor (y por row group de Parquet) en exportaciones
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+    # Cada cuánto se recalculan las estadísticas materializadas (/api/stats)
+    STATS_RECONCILE_SECONDS: float = float(os.getenv("STATS_RECONCILE_SECONDS", "900"))
 
 
 settings = Settings()
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+bcrypt_duration = REGISTRY.histogram(
+    "peerhive_bcrypt_duration_seconds",
+    "Tiempo de hash/verificación de contraseñas con bcrypt.",
+    ("operation",),
+)
 
 
 # ── JWT Functions ──────────────────────────────────────────────
@@ -70,18 +159,71 @@ def decode_access_token(token: str):
         return None
 
 
+def require_jwt_payload(authorization: Optional[str]) -> dict:
+    """Valida el header 'Authorization: Bearer <jwt>' y retorna sus claims."""
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="No autorizado")
+
+    payload = decode_access_token(authorization[7:])
+    if not payload:
+        raise HTTPException(status_code=401, detail="Token inválido o expirado")
+    return payload
+
+
+# Roles que un usuario puede elegir al registrarse
+SELF_REGISTER_ROLES = ("student", "advisor")
+
+
+async def load_user_role(user_id: Optional[str]) -> Optional[str]:
+    """Rol guardado de un usuario, o None si no existe."""
+    if not user_id:
+        return None
+    user = await get_container().user_repository.get_by_id(user_id)
+    return user.role.value if user else None
+
+
+async def is_admin_payload(payload: Optional[dict]) -> bool:
+    """
+    Indica si los claims de un JWT pertenecen a un administrador.
+
+    El claim `role` es solo una copia: el rol se confirma contra el
+    registro guardado del usuario.
+    """
+    if not payload or payload.get("role") != "admin":
+        return False
+    return await load_user_role(payload.get("user_id")) == "admin"
+
+
+async def require_admin(authorization: Optional[str]) -> dict:
+    """Como require_jwt_payload, pero exige que el usuario sea administrador."""
+    payload = require_jwt_payload(authorization)
+    if not await is_admin_payload(payload):
+        raise HTTPException(status_code=403, detail="Se requiere rol de administrador")
+    return payload
+
+
+async def is_admin_request(headers: Dict[str, str]) -> bool:
+    """Indica si los headers traen un JWT válido de un administrador."""
+    authorization = headers.get("authorization", "")
+    if not authorization.startswith("Bearer "):
+        return False
+    return await is_admin_payload(decode_access_token(authorization[7:]))
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash, truncating to 72 bytes."""
     # Bcrypt has a 72-byte limit
     truncated_password = plain_password[:72]
-    return pwd_context.verify(truncated_password, hashed_password)
+    with bcrypt_duration.time("verify"):
+        return pwd_context.verify(truncated_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password, truncating to 72 bytes for bcrypt compatibility."""
     # Bcrypt has a 72-byte limit
     truncated_password = password[:72]
-    return pwd_context.hash(truncated_password)
+    with bcrypt_duration.time("hash"):
+        return pwd_context.hash(truncated_password)
 
 
 # ── Pydantic Models for Authentication ───────────────────────────
@@ -216,6 +358,82 @@ def validate_token(token: str) -> bool:
     return True
 
 
+def graph_unavailable(error: CircuitOpenError) -> HTTPException:
+    """Respuesta rápida cuando el circuito de Graph está abierto."""
+    logger.warning(str(error))
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, int(error.retry_after)))},
+    )
+
+
+class GraphStalenessMiddleware:
+    """
+    Marca las respuestas servidas con datos obsoletos de Microsoft Graph.
+
+    Cuando el circuit breaker sirve la última respuesta buena, se agrega
+    'Warning: 110 - "Response is Stale"' y la antigüedad en segundos.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = track_staleness()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and marker:
+                headers = MutableHeaders(scope=message)
+                headers.append("Warning", '110 - "Response is Stale"')
+                headers.append("X-Graph-Stale-Age", str(int(marker["age"])))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def graph_user_key(request: Request, access_token: str) -> str:
+    """
+    Identifica al usuario de Microsoft Graph sin exponer su token.
+
+    Usa el oid de la sesión si existe; si no, el oid del token (o su hash).
+    """
+    user = request.session.get("user") or {}
+    if user.get("oid"):
+        return user["oid"]
+    return token_user_key(access_token)
+
+
+async def run_idempotent(
+    request: Request,
+    access_token: str,
+    idempotency_key: str,
+    payload: dict,
+    create,
+) -> FastJSONResponse:
+    """Ejecuta `create` a lo más una vez por Idempotency-Key y usuario."""
+    if len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key demasiado larga")
+
+    key = scoped_key(
+        request.url.path, graph_user_key(request, access_token), idempotency_key
+    )
+    try:
+        stored = await app.idempotency.run(key, request_fingerprint(payload), create)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    return FastJSONResponse(
+        status_code=stored.status_code,
+        content=stored.body,
+        headers={"Idempotent-Replayed": "true" if stored.replayed else "false"},
+    )
+
+
 # Pydantic Models for Calendar API
 class CalendarEventCreate(BaseModel):
     subject: str
@@ -251,8 +469,22 @@ class TeamsMeetingCreate(BaseModel):
     participants: Optional[List[Dict[str, str]]] = None
 
 
+class ChatReadRequest(BaseModel):
+    up_to_message_id: str
+
+
+class SessionCreate(BaseModel):
+    request_id: str
+    scheduled_at: datetime
+    meeting_platform: str = "teams"
+
+
 # App Initialization
-app = FastAPI(title="PeerHive API", version="1.0.0")
+app = FastAPI(
+    title="PeerHive API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+)
 
 # Rate Limiter Configuration
 limiter = Limiter(key_func=get_remote_address)
@@ -261,7 +493,7 @@ app.state.limiter = limiter
 
 def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
     """Manejador personalizado para errores de rate limiting."""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=429,
         content={
             "detail": "Demasiadas solicitudes. Por favor, intente más tarde.",
@@ -276,15 +508,73 @@ app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 # DBase Connection
 @app.on_event("startup")
 async def startup_db_client():
-    app.mongodb_client = AsyncIOMotorClient(settings.MONGO_URL)
+    configure_tracing(settings.TRACING_EXPORTER, settings.TRACING_FILE_PATH)
+    app.loop_watchdog = LoopLagWatchdog(threshold=settings.LOOP_LAG_THRESHOLD_MS / 1000)
+    app.loop_watchdog.start()
+
+    app.mongo_monitor = MongoCommandListener(
+        slow_threshold_ms=settings.MONGO_SLOW_QUERY_MS
+    )
+    app.mongodb_client = AsyncIOMotorClient(
+        settings.MONGO_URL, event_listeners=[app.mongo_monitor]
+    )
     app.mongodb = app.mongodb_client[settings.DB_NAME]
+    init_container(
+        app.mongodb,
+        chat_options={
+            "flush_interval": settings.CHAT_WRITE_BEHIND_MS / 1000,
+            "flush_max_items": settings.CHAT_WRITE_BEHIND_MAX_ITEMS,
+            "durability": settings.CHAT_WRITE_DURABILITY,
+        },
+    )
     print(f"Connected to MongoDB at {settings.MONGO_URL}")
+    await get_container().chat_repository.ensure_indexes()
+    get_container().chat_repository.start_reconciler(
+        settings.CHAT_UNREAD_RECONCILE_SECONDS
+    )
+    await get_container().session_repository.ensure_indexes()
+    get_container().stats_rollups.start(settings.STATS_RECONCILE_SECONDS)
+
+    app.idempotency = IdempotencyStore(
+        app.mongodb,
+        ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+        lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+    )
+    await app.idempotency.ensure_indexes()
+
+    app.job_queue = JobQueue(
+        app.mongodb, retention_seconds=settings.JOB_RETENTION_SECONDS
+    )
+    await app.job_queue.ensure_indexes()
+    app.job_runner = JobRunner(
+        app.job_queue,
+        concurrency=settings.JOB_RUNNER_CONCURRENCY,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+    )
+    app.job_runner.register("create_session_meeting", run_create_session_meeting)
+    app.job_runner.register("generate_renditions", run_generate_renditions)
+
+    # El pool debe existir antes de que el runner reclame trabajos de miniaturas
+    from .services.thumbnails import init_pool
+
+    init_pool(settings.THUMBNAIL_WORKERS)
+    app.job_runner.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await app.job_runner.stop()
+    from .services.thumbnails import shutdown_pool
+
+    await asyncio.to_thread(shutdown_pool)
+    await app.loop_watchdog.stop()
+    await chat_hub.close()
+    await get_container().stats_rollups.stop()
+    # Vacía el write-behind del chat antes de cerrar la conexión
+    await get_container().chat_repository.close()
     app.mongodb_client.close()
     print("MongoDB connection closed")
+    shutdown_tracing()
 
 
 # CORS
@@ -301,6 +591,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(GraphStalenessMiddleware)
+
 # Session middleware for Microsoft Graph authentication
 app.add_middleware(
     SessionMiddleware,
@@ -309,6 +601,21 @@ app.add_middleware(
     max_age=3600,  # 1 hour
 )
 
+# Profiler bajo demanda; sin el flag de perfilado solo revisa los headers
+profile_store = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_FILES)
+app.add_middleware(
+    ProfilerMiddleware,
+    store=profile_store,
+    authorize=is_admin_request,
+    interval=settings.PROFILE_INTERVAL_MS / 1000,
+)
+
+# Span SERVER por petición (rutas -> casos de uso -> repositorios -> Graph)
+app.add_middleware(TracingMiddleware)
+
+# Métricas de latencia por ruta; se agrega al final para medir toda la pila
+app.add_middleware(MetricsMiddleware)
+
 
 # Routes
 @app.get("/")
@@ -321,6 +628,333 @@ async def health():
     return {"status": "ok", "db": "connected" if app.mongodb else "disconnected"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Métricas en formato de exposición de Prometheus.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/api/graph/stats")
+async def graph_stats():
+    """
+    Estadísticas del cliente de Microsoft Graph (coalescencia de lecturas).
+    """
+    from .services.graph import graph_stats
+
+    return graph_stats()
+
+
+@app.get("/api/admin/event-loop")
+async def event_loop_stats(authorization: str = Header(None)):
+    """
+    Percentiles de lag del event loop y stacks de los últimos bloqueos.
+    """
+    await require_admin(authorization)
+    return app.loop_watchdog.stats()
+
+
+@app.get("/api/admin/mongo/queries")
+async def mongo_query_stats(authorization: str = Header(None)):
+    """
+    Formas de consulta de MongoDB (conteo, p50/p99, documentos) y las
+    consultas lentas más recientes.
+    """
+    await require_admin(authorization)
+    return {
+        "slow_threshold_ms": app.mongo_monitor.slow_threshold_ms,
+        "shapes": app.mongo_monitor.shape_table(),
+        "slow_queries": app.mongo_monitor.slow_queries(),
+    }
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(authorization: str = Header(None)):
+    """
+    Lista los perfiles de peticiones guardados (más recientes primero).
+    """
+    await require_admin(authorization)
+    return await run_in_threadpool(profile_store.list)
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, authorization: str = Header(None)):
+    """
+    Descarga un perfil en formato collapsed stacks (flamegraph.pl, speedscope).
+    """
+    await require_admin(authorization)
+    try:
+        path = profile_store.collapsed_path(profile_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(
+        path, media_type="text/plain", filename=f"{profile_id}.collapsed"
+    )
+
+
+# ── Archivos (evidencias y adjuntos) ──────────────────────────
+file_storage = FileStorage(settings.UPLOAD_DIR, settings.UPLOAD_MAX_BYTES)
+
+
+@app.post("/api/files", status_code=201)
+async def upload_file(
+    request: Request, name: str = "", authorization: str = Header(None)
+):
+    """
+    Sube un archivo (capturas de evidencia, adjuntos del chat).
+
+    El body es el contenido crudo del archivo con su `Content-Type`; se
+    escribe al disco por bloques mientras se calcula su SHA-256, sin
+    cargarlo completo en memoria. Contenidos repetidos se deduplican;
+    solo los administradores ven si la subida ya existía. La `url`
+    retornada es la que se guarda en `Attachment.url` o en
+    `Verification.manual_evidence`.
+    """
+    payload = require_jwt_payload(authorization)
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in settings.UPLOAD_ALLOWED_TYPES.split(","):
+        raise HTTPException(status_code=415, detail="Tipo de archivo no permitido")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > file_storage.max_bytes:
+        raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+
+    try:
+        stored = await file_storage.save_stream(request.stream(), content_type, name)
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Archivo vacío")
+
+    # Miniatura y vista previa en segundo plano (si no existen ya)
+    job_id = None
+    if stored.content_type.startswith("image/") and not os.path.exists(
+        file_storage.rendition_path(stored.id, "thumb")
+    ):
+        job_id = await app.job_runner.enqueue(
+            "generate_renditions",
+            {"file_id": stored.id},
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            owner_id=payload.get("user_id"),
+        )
+
+    response = {
+        "id": stored.id,
+        "url": f"/api/files/{stored.id}",
+        "size": stored.size,
+        "content_type": stored.content_type,
+        "name": stored.name,
+        "renditions_job_id": job_id,
+    }
+    if await is_admin_payload(payload):
+        response["deduplicated"] = stored.deduplicated
+    return response
+
+
+@app.get("/api/files/{file_id}")
+async def download_file(
+    file_id: str, rendition: Optional[str] = None, authorization: str = Header(None)
+):
+    """
+    Descarga un archivo subido, o su versión `?rendition=thumb|preview`.
+
+    Soporta `Range` (respuestas 206) y, si el servidor ASGI lo ofrece,
+    envío sin copia (`http.response.pathsend`). Como el ID es el hash del
+    contenido, la respuesta es cacheable indefinidamente.
+
+    El nombre guardado es el del primer usuario que subió el contenido:
+    solo los administradores lo reciben en `Content-Disposition`.
+    """
+    from .services.thumbnails import RENDITIONS
+
+    payload = require_jwt_payload(authorization)
+
+    stored = file_storage.metadata(file_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    headers = {
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "ETag": f'"{stored.id}"',
+    }
+    if rendition is None:
+        return FileResponse(
+            file_storage.path(file_id),
+            media_type=stored.content_type,
+            filename=(stored.name or None) if await is_admin_payload(payload) else None,
+            content_disposition_type="inline",
+            headers=headers,
+        )
+
+    if rendition not in RENDITIONS:
+        raise HTTPException(status_code=400, detail="Versión no válida")
+    path = file_storage.rendition_path(file_id, rendition)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Versión no disponible todavía")
+    headers["ETag"] = f'"{stored.id}.{rendition}"'
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+def _evidence_file_ids(evidence) -> List[str]:
+    """IDs de archivos subidos referenciados en `manual_evidence`."""
+    if isinstance(evidence, dict):
+        return [i for value in evidence.values() for i in _evidence_file_ids(value)]
+    if isinstance(evidence, list):
+        return [i for value in evidence for i in _evidence_file_ids(value)]
+    if isinstance(evidence, str) and evidence.startswith("/api/files/"):
+        file_id = evidence.split("?")[0].rsplit("/", 1)[-1]
+        return [file_id] if file_storage.metadata(file_id) else []
+    return []
+
+
+@app.get("/api/admin/evidence")
+async def list_evidence_for_review(authorization: str = Header(None)):
+    """
+    Sesiones pendientes de revisión con sus evidencias manuales.
+
+    Cada archivo se lista con la URL de su miniatura; el original y la
+    vista previa solo se piden al abrir el detalle.
+    """
+    from .domain.entities import SessionStatusEnum
+
+    await require_admin(authorization)
+
+    sessions = await get_container().session_repository.list_by_status(
+        SessionStatusEnum.REQUIRES_REVIEW
+    )
+    items = []
+    for session in sessions:
+        verification = session.verification
+        if not verification or not verification.manual_evidence:
+            continue
+        files = []
+        for file_id in _evidence_file_ids(verification.manual_evidence):
+            url = f"/api/files/{file_id}"
+            files.append(
+                {
+                    "id": file_id,
+                    "url": url,
+                    "thumbnail_url": f"{url}?rendition=thumb",
+                    "preview_url": f"{url}?rendition=preview",
+                    "thumbnail_ready": os.path.exists(
+                        file_storage.rendition_path(file_id, "thumb")
+                    ),
+                }
+            )
+        items.append(
+            {
+                "session_id": session.id,
+                "student_id": session.student_id,
+                "advisor_id": session.advisor_id,
+                "scheduled_at": session.scheduled_at,
+                "notes": verification.notes,
+                "files": files,
+            }
+        )
+    return FastJSONResponse({"sessions": items})
+
+
+@app.get("/api/stats")
+async def get_dashboard_stats(
+    advisor_id: Optional[str] = None, authorization: str = Header(None)
+):
+    """
+    Estadísticas de los dashboards desde los contadores materializados.
+
+    Un administrador recibe las globales (o las de `advisor_id`); un
+    asesor, siempre las suyas. Se responde con un solo documento, sin
+    recorrer el historial de solicitudes y sesiones.
+    """
+    from .infrastructure.stats_rollups import GLOBAL_SCOPE, advisor_scope
+
+    payload = require_jwt_payload(authorization)
+    if await is_admin_payload(payload):
+        scope = advisor_scope(advisor_id) if advisor_id else GLOBAL_SCOPE
+    elif payload.get("role") == "advisor" and payload.get("user_id"):
+        scope = advisor_scope(payload["user_id"])
+    else:
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+    stats = await get_container().stats_rollups.get(scope)
+    return FastJSONResponse({"scope": scope, **stats})
+
+
+@app.get("/api/admin/exports/sessions")
+async def export_sessions(
+    format: str = "csv",
+    scheduled_from: Optional[str] = None,
+    scheduled_to: Optional[str] = None,
+    advisor_id: Optional[str] = None,
+    status: Optional[str] = None,
+    authorization: str = Header(None),
+):
+    """
+    Exporta sesiones con su verificación y asistencia (CSV o Parquet).
+
+    Las filas se leen del cursor de MongoDB por lotes y se escriben en la
+    respuesta a medida que llegan; el reporte de un semestre no se arma
+    completo en memoria.
+
+    Args:
+        format: `csv` o `parquet`
+        scheduled_from: Fecha ISO inicial (inclusive) de `scheduledAt`
+        scheduled_to: Fecha ISO final (exclusiva) de `scheduledAt`
+        advisor_id: Filtra por asesor
+        status: Filtra por estado de la sesión
+    """
+    from bson import ObjectId
+
+    from .domain.entities import SessionStatusEnum
+    from .services.export import (
+        export_filename,
+        parquet_available,
+        stream_csv,
+        stream_parquet,
+    )
+
+    await require_admin(authorization)
+
+    if format not in ("csv", "parquet"):
+        raise HTTPException(status_code=400, detail="format must be csv or parquet")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export is not available")
+    try:
+        date_from = datetime.fromisoformat(scheduled_from) if scheduled_from else None
+        date_to = datetime.fromisoformat(scheduled_to) if scheduled_to else None
+        status_enum = SessionStatusEnum(status) if status else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if advisor_id and not ObjectId.is_valid(advisor_id):
+        raise HTTPException(status_code=400, detail="Invalid advisor_id")
+
+    sessions = get_container().session_repository.iter_sessions(
+        scheduled_from=date_from,
+        scheduled_to=date_to,
+        advisor_id=advisor_id,
+        status=status_enum,
+        batch_size=settings.EXPORT_BATCH_SIZE,
+    )
+    if format == "csv":
+        body = stream_csv(sessions, batch_rows=settings.EXPORT_BATCH_SIZE)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        body = stream_parquet(sessions, row_group_size=settings.EXPORT_BATCH_SIZE)
+        media_type = "application/vnd.apache.parquet"
+
+    filename = export_filename(format, date_from, date_to)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
 # Calendar API Routes
 @app.get("/api/calendar/events")
 @limiter.limit("30/minute")
@@ -344,10 +978,17 @@ async def get_calendar_events(
     try:
         from .services.calendar import get_calendar_events
 
-        events = get_calendar_events(
-            access_token=access_token, start_date=start_date, end_date=end_date
+        events = await run_in_threadpool(
+            get_calendar_events,
+            access_token=access_token,
+            start_date=start_date,
+            end_date=end_date,
+            user_key=graph_user_key(request, access_token),
         )
-        return {"events": events, "count": len(events)}
+        # Respuesta directa: evita jsonable_encoder sobre la lista completa
+        return FastJSONResponse({"events": events, "count": len(events)})
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching calendar events: {str(e)}")
         raise HTTPException(
@@ -357,11 +998,17 @@ async def get_calendar_events(
 
 @app.post("/api/calendar/events")
 @limiter.limit("20/minute")
-async def create_calendar_event(request: Request, event: CalendarEventCreate):
+async def create_calendar_event(
+    request: Request,
+    event: CalendarEventCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     """
     Crea un nuevo evento de asesoría en el calendario de Outlook.
 
     Requiere que el usuario esté autenticado con Microsoft Graph.
+    Con el header 'Idempotency-Key', los reintentos repiten la primera
+    respuesta y la clave se envía a Graph como transactionId.
     """
     # Obtener el token de acceso del header Authorization o sesión
     access_token = get_access_token(request)
@@ -372,26 +1019,37 @@ async def create_calendar_event(request: Request, event: CalendarEventCreate):
             detail="No autenticado con Microsoft Graph. Por favor, inicia sesión primero.",
         )
 
-    try:
-        from .services.calendar import create_calendar_event
-
-        new_event = create_calendar_event(
-            access_token=access_token,
-            subject=event.subject,
-            body=event.body,
-            start_datetime=event.start_datetime,
-            end_datetime=event.end_datetime,
-            location=event.location,
-            attendees=event.attendees,
-            is_online_meeting=event.is_online_meeting,
-            online_meeting_provider=event.online_meeting_provider,
-        )
-        return {"event": new_event, "message": "Evento creado exitosamente"}
-    except Exception as e:
-        logger.error(f"Error creating calendar event: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail=f"Error creating calendar event: {str(e)}"
-        )
+    async def create():
+        try:
+            from .services.calendar import create_calendar_event
+
+            new_event = await run_in_threadpool(
+                create_calendar_event,
+                access_token=access_token,
+                subject=event.subject,
+                body=event.body,
+                start_datetime=event.start_datetime,
+                end_datetime=event.end_datetime,
+                location=event.location,
+                attendees=event.attendees,
+                is_online_meeting=event.is_online_meeting,
+                online_meeting_provider=event.online_meeting_provider,
+                transaction_id=idempotency_key,
+            )
+            return {"event": new_event, "message": "Evento creado exitosamente"}
+        except CircuitOpenError as e:
+            raise graph_unavailable(e)
+        except Exception as e:
+            logger.error(f"Error creating calendar event: {str(e)}")
+            raise HTTPException(
+                status_code=500, detail=f"Error creating calendar event: {str(e)}"
+            )
+
+    if not idempotency_key:
+        return await create()
+    return await run_idempotent(
+        request, access_token, idempotency_key, event.model_dump(), create
+    )
 
 
 @app.get("/api/calendar/events/{event_id}")
@@ -411,8 +1069,15 @@ async def get_calendar_event(request: Request, event_id: str):
     try:
         from .services.calendar import get_event_by_id
 
-        event = get_event_by_id(access_token=access_token, event_id=event_id)
+        event = await run_in_threadpool(
+            get_event_by_id,
+            access_token=access_token,
+            event_id=event_id,
+            user_key=graph_user_key(request, access_token),
+        )
         return {"event": event}
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching calendar event: {str(e)}")
         raise HTTPException(
@@ -439,7 +1104,8 @@ async def update_calendar_event(
     try:
         from .services.calendar import update_calendar_event
 
-        updated_event = update_calendar_event(
+        updated_event = await run_in_threadpool(
+            update_calendar_event,
             access_token=access_token,
             event_id=event_id,
             subject=event.subject,
@@ -451,6 +1117,8 @@ async def update_calendar_event(
             is_online_meeting=event.is_online_meeting,
         )
         return {"event": updated_event, "message": "Evento actualizado exitosamente"}
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
         logger.error(f"Error updating calendar event: {str(e)}")
         raise HTTPException(
@@ -475,8 +1143,12 @@ async def delete_calendar_event(request: Request, event_id: str):
     try:
         from .services.calendar import delete_calendar_event
 
-        delete_calendar_event(access_token=access_token, event_id=event_id)
+        await run_in_threadpool(
+            delete_calendar_event, access_token=access_token, event_id=event_id
+        )
         return {"message": "Evento eliminado exitosamente"}
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
         logger.error(f"Error deleting calendar event: {str(e)}")
         raise HTTPException(
@@ -484,13 +1156,23 @@ async def delete_calendar_event(request: Request, event_id: str):
         )
 
 
-# Teams API Routes
-@app.post("/api/teams/meetings")
-async def create_teams_meeting(request: Request, meeting: TeamsMeetingCreate):
+# Availability API Routes
+@app.get("/api/availability")
+@limiter.limit("30/minute")
+async def get_availability(
+    request: Request,
+    subject: str,
+    start: str,
+    end: str,
+    duration_minutes: int = 60,
+):
     """
-    Crea una reunión de Microsoft Teams.
+    Obtiene los horarios libres de los asesores de una materia.
 
-    Requiere que el usuario esté autenticado con Microsoft Graph.
+    Consulta el free/busy de todos los asesores en una sola llamada a
+    getSchedule y lo cruza con el del usuario autenticado, si se conoce.
+    Un asesor cuyo buzón Graph no pudo consultar se marca con
+    `availability_unknown` y sin horarios libres.
     """
     # Obtener el token de acceso del header Authorization o sesión
     access_token = get_access_token(request)
@@ -501,26 +1183,137 @@ async def create_teams_meeting(request: Request, meeting: TeamsMeetingCreate):
             detail="No autenticado con Microsoft Graph. Por favor, inicia sesión primero.",
         )
 
+    from .services.calendar import SCHEDULE_TIMEZONE, get_schedule
+    from .services.scheduling import free_gaps, schedule_busy_blocks, to_schedule_time
+
     try:
-        from .services.teams import create_teams_meeting
+        window_start = to_schedule_time(
+            datetime.fromisoformat(start), SCHEDULE_TIMEZONE
+        )
+        window_end = to_schedule_time(datetime.fromisoformat(end), SCHEDULE_TIMEZONE)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Formato de fecha inválido (ISO 8601)"
+        )
+    if window_end <= window_start or duration_minutes <= 0:
+        raise HTTPException(status_code=400, detail="Ventana de tiempo inválida")
 
-        new_meeting = create_teams_meeting(
-            access_token=access_token,
-            subject=meeting.subject,
-            start_time=meeting.start_time,
-            end_time=meeting.end_time,
-            participants=meeting.participants,
+    advisors = await get_container().user_repository.list_advisors_by_subject(subject)
+    advisors = [a for a in advisors if a.email]
+    user_email = ((request.session.get("user") or {}).get("email") or "").lower()
+
+    try:
+        mailboxes = [a.email for a in advisors]
+        if user_email:
+            mailboxes.append(user_email)
+        schedules = (
+            await run_in_threadpool(
+                get_schedule,
+                access_token=access_token,
+                mailboxes=mailboxes,
+                start_datetime=window_start.isoformat(timespec="seconds"),
+                end_datetime=window_end.isoformat(timespec="seconds"),
+                timezone=SCHEDULE_TIMEZONE,
+            )
+            if advisors
+            else {}
         )
-        return {
-            "meeting": new_meeting,
-            "message": "Reunión de Teams creada exitosamente",
-        }
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
-        logger.error(f"Error creating Teams meeting: {str(e)}")
+        logger.error(f"Error fetching availability: {str(e)}")
         raise HTTPException(
-            status_code=500, detail=f"Error creating Teams meeting: {str(e)}"
+            status_code=500, detail=f"Error fetching availability: {str(e)}"
         )
 
+    own_busy = schedule_busy_blocks(schedules.get(user_email, []))
+    duration = timedelta(minutes=duration_minutes)
+    results = []
+    for advisor in advisors:
+        if advisor.email.lower() == user_email:
+            continue
+        items = schedules.get(advisor.email.lower())
+        # Sin free/busy (error de Graph en ese buzón) no se inventan huecos
+        slots = (
+            free_gaps(
+                schedule_busy_blocks(items) + own_busy,
+                window_start,
+                window_end,
+                duration,
+            )
+            if items is not None
+            else []
+        )
+        results.append(
+            {
+                "advisor_id": advisor.id,
+                "name": advisor.name,
+                "email": advisor.email,
+                "availability_unknown": items is None,
+                "free_slots": [
+                    {"start": s.isoformat(), "end": e.isoformat()} for s, e in slots
+                ],
+            }
+        )
+
+    return FastJSONResponse(
+        {"subject": subject, "advisors": results, "count": len(results)}
+    )
+
+
+# Teams API Routes
+@app.post("/api/teams/meetings")
+async def create_teams_meeting(
+    request: Request,
+    meeting: TeamsMeetingCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """
+    Crea una reunión de Microsoft Teams.
+
+    Requiere que el usuario esté autenticado con Microsoft Graph.
+    Con el header 'Idempotency-Key', los reintentos repiten la primera
+    respuesta en lugar de crear otra reunión.
+    """
+    # Obtener el token de acceso del header Authorization o sesión
+    access_token = get_access_token(request)
+
+    if not access_token:
+        raise HTTPException(
+            status_code=401,
+            detail="No autenticado con Microsoft Graph. Por favor, inicia sesión primero.",
+        )
+
+    async def create():
+        try:
+            from .services.teams import create_teams_meeting
+
+            new_meeting = await run_in_threadpool(
+                create_teams_meeting,
+                access_token=access_token,
+                subject=meeting.subject,
+                start_time=meeting.start_time,
+                end_time=meeting.end_time,
+                participants=meeting.participants,
+            )
+            return {
+                "meeting": new_meeting,
+                "message": "Reunión de Teams creada exitosamente",
+            }
+        except CircuitOpenError as e:
+            raise graph_unavailable(e)
+        except Exception as e:
+            logger.error(f"Error creating Teams meeting: {str(e)}")
+            raise HTTPException(
+                status_code=500, detail=f"Error creating Teams meeting: {str(e)}"
+            )
+
+    if not idempotency_key:
+        return await create()
+    return await run_idempotent(
+        request, access_token, idempotency_key, meeting.model_dump(), create
+    )
+
 
 @app.get("/api/teams/meetings/{meeting_id}")
 async def get_teams_meeting(request: Request, meeting_id: str):
@@ -539,8 +1332,15 @@ async def get_teams_meeting(request: Request, meeting_id: str):
     try:
         from .services.teams import get_meeting
 
-        meeting = get_meeting(access_token=access_token, meeting_id=meeting_id)
+        meeting = await run_in_threadpool(
+            get_meeting,
+            access_token=access_token,
+            meeting_id=meeting_id,
+            user_key=graph_user_key(request, access_token),
+        )
         return {"meeting": meeting}
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching Teams meeting: {str(e)}")
         raise HTTPException(
@@ -565,8 +1365,11 @@ async def get_meeting_attendance(request: Request, meeting_id: str):
     try:
         from .services.teams import get_meeting_attendance_report
 
-        reports = get_meeting_attendance_report(
-            access_token=access_token, meeting_id=meeting_id
+        reports = await run_in_threadpool(
+            get_meeting_attendance_report,
+            access_token=access_token,
+            meeting_id=meeting_id,
+            user_key=graph_user_key(request, access_token),
         )
 
         # Si hay reportes, obtener los detalles del primero
@@ -576,12 +1379,14 @@ async def get_meeting_attendance(request: Request, meeting_id: str):
             if report_id:
                 from .services.teams import get_attendance_report_details
 
-                details = get_attendance_report_details(
+                details = await run_in_threadpool(
+                    get_attendance_report_details,
                     access_token=access_token,
                     meeting_id=meeting_id,
                     report_id=report_id,
+                    user_key=graph_user_key(request, access_token),
                 )
-                return {"attendance": details}
+                return FastJSONResponse({"attendance": details})
 
         return {
             "attendance": {
@@ -589,6 +1394,8 @@ async def get_meeting_attendance(request: Request, meeting_id: str):
                 "message": "No hay reportes de asistencia disponibles",
             }
         }
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching attendance report: {str(e)}")
         raise HTTPException(
@@ -613,10 +1420,16 @@ async def get_attendance_report(request: Request, meeting_id: str, report_id: st
     try:
         from .services.teams import get_attendance_report_details
 
-        report = get_attendance_report_details(
-            access_token=access_token, meeting_id=meeting_id, report_id=report_id
+        report = await run_in_threadpool(
+            get_attendance_report_details,
+            access_token=access_token,
+            meeting_id=meeting_id,
+            report_id=report_id,
+            user_key=graph_user_key(request, access_token),
         )
-        return {"report": report}
+        return FastJSONResponse({"report": report})
+    except CircuitOpenError as e:
+        raise graph_unavailable(e)
     except Exception as e:
         logger.error(f"Error fetching attendance report details: {str(e)}")
         raise HTTPException(
@@ -625,13 +1438,439 @@ async def get_attendance_report(request: Request, meeting_id: str, report_id: st
         )
 
 
+# ── Sessions & Background Jobs ──────────────────────────────────
+async def run_generate_renditions(payload: dict) -> dict:
+    """
+    Job: genera la miniatura y la vista previa de una imagen subida.
+    """
+    from .services.thumbnails import generate_renditions
+
+    return await generate_renditions(file_storage, payload["file_id"])
+
+
+async def run_create_session_meeting(payload: dict) -> dict:
+    """
+    Job: crea la reunión de Teams de una sesión aprobada.
+
+    Se ejecuta en el job runner, fuera de la petición HTTP; la llamada
+    bloqueante a Graph corre en un hilo para no detener el event loop.
+    """
+    from .services.teams import create_teams_meeting
+    from .services.scheduling import DEFAULT_SESSION_DURATION
+
+    access_token = _decrypt_token(payload["access_token"])
+    if not access_token:
+        raise ValueError("No se pudo descifrar el token de Microsoft Graph")
+
+    session_repository = get_container().session_repository
+    session = await session_repository.get_by_id(payload["session_id"])
+    if not session:
+        raise LookupError(f"Session {payload['session_id']} not found")
+    if session.teams_meeting_id:
+        # Reintento de un trabajo que ya creó la reunión
+        return {"meeting_id": session.teams_meeting_id}
+
+    meeting = await asyncio.to_thread(
+        create_teams_meeting,
+        access_token=access_token,
+        subject=payload.get("subject") or "Asesoría PeerHive",
+        start_time=session.scheduled_at.isoformat(),
+        end_time=(session.scheduled_at + DEFAULT_SESSION_DURATION).isoformat(),
+        participants=payload.get("participants"),
+        # Un reintento del job obtiene la reunión ya creada, no una nueva
+        external_id=f"peerhive-session-{session.id}",
+    )
+
+    session.teams_meeting_id = meeting.get("meeting_id")
+    session.meeting_link = meeting.get("join_url")
+    await session_repository.update(session)
+    return {"meeting_id": session.teams_meeting_id, "join_url": session.meeting_link}
+
+
+@app.post("/api/sessions", status_code=201)
+async def create_session(body: SessionCreate, authorization: str = Header(None)):
+    """
+    Programa la sesión de una solicitud ya asignada a un asesor.
+
+    La pueden crear el estudiante o el asesor de la solicitud, o un
+    administrador. La sesión queda pendiente de aprobación.
+
+    Raises:
+        HTTPException 409: Si la solicitud no tiene asesor o ya tiene
+            sesión, o si alguno de los dos tiene otra sesión a esa hora
+    """
+    from .domain.entities import MeetingPlatformEnum
+    from .services.calendar import SCHEDULE_TIMEZONE
+    from .services.scheduling import to_schedule_time
+
+    payload = require_jwt_payload(authorization)
+    try:
+        platform = MeetingPlatformEnum(body.meeting_platform)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    container = get_container()
+    advisory_request = await container.request_repository.get_by_id(body.request_id)
+    if not advisory_request:
+        raise HTTPException(status_code=404, detail="Solicitud no encontrada")
+    if payload.get("user_id") not in (
+        advisory_request.student_id,
+        advisory_request.advisor_id,
+    ) and not await is_admin_payload(payload):
+        raise HTTPException(status_code=404, detail="Solicitud no encontrada")
+    if not advisory_request.advisor_id:
+        raise HTTPException(
+            status_code=409, detail="La solicitud no tiene asesor asignado"
+        )
+    if await container.session_repository.get_by_request_id(body.request_id):
+        raise HTTPException(status_code=409, detail="La solicitud ya tiene sesión")
+
+    try:
+        session = await container.create_session_use_case.execute(
+            request_id=body.request_id,
+            student_id=advisory_request.student_id,
+            advisor_id=advisory_request.advisor_id,
+            scheduled_at=to_schedule_time(body.scheduled_at, SCHEDULE_TIMEZONE),
+            meeting_platform=platform,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=409,
+            detail="El asesor o el estudiante ya tienen sesión a esa hora",
+        )
+
+    return FastJSONResponse(
+        {
+            "session_id": session.id,
+            "request_id": session.request_id,
+            "student_id": session.student_id,
+            "advisor_id": session.advisor_id,
+            "scheduled_at": session.scheduled_at,
+            "meeting_platform": session.meeting_platform.value,
+            "status": session.status.value,
+        },
+        status_code=201,
+    )
+
+
+async def _meeting_details(session) -> dict:
+    """Asunto y asistentes (estudiante y asesor) de la reunión de una sesión."""
+    container = get_container()
+    advisory_request = await container.request_repository.get_by_id(session.request_id)
+    subject = "Asesoría PeerHive"
+    if advisory_request and advisory_request.subject:
+        subject = f"{subject}: {advisory_request.subject}"
+
+    participants = []
+    for user_id, role in (
+        (session.advisor_id, "presenter"),
+        (session.student_id, "attendee"),
+    ):
+        user = await container.user_repository.get_by_id(user_id) if user_id else None
+        if user and user.email:
+            participants.append({"email": user.email, "role": role})
+    return {"subject": subject, "participants": participants}
+
+
+@app.post("/api/sessions/{session_id}/approve", status_code=202)
+async def approve_session(
+    request: Request, session_id: str, authorization: str = Header(None)
+):
+    """
+    Aprueba una sesión y encola la creación de su reunión de Teams.
+
+    La reunión se crea en segundo plano; el estado del trabajo se
+    consulta en /api/jobs/{job_id}.
+    """
+    from .domain.entities import SessionStatusEnum
+
+    payload = await require_admin(authorization)
+
+    session_repository = get_container().session_repository
+    session = await session_repository.get_by_id(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    if session.status != SessionStatusEnum.PENDING_APPROVAL:
+        raise HTTPException(
+            status_code=409, detail="La sesión no está pendiente de aprobación"
+        )
+
+    # Sin token de Graph no se aprueba: la reunión nunca llegaría a crearse
+    needs_meeting = (
+        session.meeting_platform.value == "teams" and not session.teams_meeting_id
+    )
+    encrypted_token = request.session.get("ms_graph_token")
+    if needs_meeting and not encrypted_token:
+        raise HTTPException(
+            status_code=401,
+            detail="No autenticado con Microsoft Graph. Por favor, inicia sesión primero.",
+        )
+
+    # Condicional sobre el estado: solo una aprobación concurrente encola
+    session = await session_repository.approve_session(
+        session_id, approved_by=payload.get("user_id")
+    )
+    if session is None:
+        raise HTTPException(
+            status_code=409, detail="La sesión no está pendiente de aprobación"
+        )
+
+    job_id = None
+    if needs_meeting:
+        job_id = await app.job_runner.enqueue(
+            "create_session_meeting",
+            {
+                "session_id": session_id,
+                "access_token": encrypted_token,
+                **await _meeting_details(session),
+            },
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            owner_id=payload.get("user_id"),
+        )
+
+    return {"session_id": session_id, "status": session.status.value, "job_id": job_id}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str, authorization: str = Header(None)):
+    """
+    Obtiene el estado de un trabajo en segundo plano.
+
+    Solo lo ve quien lo encoló o un administrador: el resultado puede
+    incluir el enlace de la reunión de Teams.
+    """
+    payload = require_jwt_payload(authorization)
+
+    job = await app.job_queue.get(job_id)
+    if (
+        not job
+        or (job.get("ownerId") is None or job["ownerId"] != payload.get("user_id"))
+        and not await is_admin_payload(payload)
+    ):
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    return {
+        "id": str(job["_id"]),
+        "type": job["type"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["maxAttempts"],
+        "last_error": job.get("lastError"),
+        "result": job.get("result"),
+        "created_at": job["createdAt"],
+        "completed_at": job.get("completedAt"),
+    }
+
+
+# ── Chat en tiempo real ───────────────────────────────────────
+# Un hub por worker; con varios workers se comparte el fan-out cambiando
+# InMemoryBroker por un broker común (ChatBroker)
+chat_hub = ChatHub(
+    InMemoryBroker(),
+    max_queue=settings.CHAT_WS_MAX_QUEUE,
+    tick=settings.CHAT_WS_TICK_MS / 1000,
+    max_batch=settings.CHAT_WS_MAX_BATCH,
+    send_timeout=settings.CHAT_WS_SEND_TIMEOUT_SECONDS,
+)
+REGISTRY.register_collector(chat_hub.collect_metrics)
+
+
+def _message_payload(message) -> dict:
+    """Mensaje de chat tal como lo reciben los clientes."""
+    return {
+        "id": message.id,
+        "from_user_id": message.from_user_id,
+        "content": message.content,
+        "sent_at": message.sent_at,
+        "cursor": _encode_message_cursor(message),
+    }
+
+
+def _encode_message_cursor(message) -> str:
+    """Cursor opaco `(sent_at, id)` de un mensaje."""
+    raw = f"{message.sent_at.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_message_cursor(cursor: str):
+    """
+    Inverso de _encode_message_cursor; 400 si el cursor no es válido.
+
+    MongoDB devuelve las fechas en UTC sin zona, así que una fecha con
+    zona se convierte a UTC naive para poder compararla.
+    """
+    from bson import ObjectId
+
+    try:
+        sent_at, message_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        sent_at = datetime.fromisoformat(sent_at)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not ObjectId.is_valid(message_id):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if sent_at.tzinfo is not None:
+        sent_at = sent_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return sent_at, message_id
+
+
+@app.websocket("/ws/chat/{session_id}")
+async def chat_websocket(
+    websocket: WebSocket, session_id: str, token: Optional[str] = None
+):
+    """
+    Chat en tiempo real de una sesión.
+
+    El JWT va en `?token=` porque los navegadores no permiten headers en el
+    handshake. Cada `{"content": "..."}` del cliente se guarda en el chat y
+    se reparte a los participantes conectados; cada frame del servidor es
+    un arreglo JSON de eventos `{"type": "message", "message": {...}}`.
+    """
+    from .domain.entities import Message
+
+    payload = decode_access_token(token) if token else None
+    user_id = (payload or {}).get("user_id")
+    chat = (
+        await get_container().chat_repository.get_by_session_id(session_id)
+        if user_id
+        else None
+    )
+    if chat is None or (
+        user_id not in (chat.student_id, chat.advisor_id)
+        and not await is_admin_payload(payload)
+    ):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    conn = await chat_hub.connect(
+        session_id,
+        user_id,
+        websocket.send_text,
+        lambda code: websocket.close(code=code),
+    )
+    try:
+        while True:
+            try:
+                data = loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            content = (data.get("content") or "") if isinstance(data, dict) else ""
+            content = content.strip()
+            if not content or len(content) > settings.CHAT_MAX_MESSAGE_LENGTH:
+                continue
+
+            message = await get_container().chat_repository.add_message(
+                chat.id, Message(from_user_id=user_id, content=content)
+            )
+            await chat_hub.publish(
+                session_id,
+                {"type": "message", "message": _message_payload(message)},
+            )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await chat_hub.disconnect(conn)
+
+
+@app.get("/api/chats/{session_id}/messages")
+async def get_chat_messages(
+    session_id: str,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 50,
+    authorization: str = Header(None),
+):
+    """
+    Historial del chat paginado por cursor.
+
+    Sin cursor retorna los mensajes más recientes. `before` pagina hacia
+    mensajes más antiguos (scroll infinito) y `after` hacia los más nuevos;
+    cada mensaje trae su `cursor`.
+    """
+    payload = require_jwt_payload(authorization)
+    if before and after:
+        raise HTTPException(status_code=400, detail="Usa before o after, no ambos")
+    limit = max(1, min(limit, settings.CHAT_PAGE_MAX_LIMIT))
+
+    chat_repository = get_container().chat_repository
+    chat = await chat_repository.get_by_session_id(session_id)
+    if not chat or (
+        payload.get("user_id") not in (chat.student_id, chat.advisor_id)
+        and not await is_admin_payload(payload)
+    ):
+        raise HTTPException(status_code=404, detail="Chat no encontrado")
+
+    # Un mensaje extra indica si hay otra página en esa dirección
+    messages = await chat_repository.list_messages(
+        chat.id,
+        limit=limit + 1,
+        before=_decode_message_cursor(before) if before else None,
+        after=_decode_message_cursor(after) if after else None,
+    )
+    has_more = len(messages) > limit
+    if has_more:
+        messages = messages[:limit] if after else messages[1:]
+
+    return FastJSONResponse(
+        {
+            "chat_id": chat.id,
+            "messages": [_message_payload(m) for m in messages],
+            "has_more": has_more,
+        }
+    )
+
+
+@app.get("/api/chats/unread")
+async def get_unread_chats(authorization: str = Header(None)):
+    """
+    Mensajes sin leer del usuario autenticado (badge de la bandeja).
+
+    Lee los contadores por chat; no recorre el historial de mensajes.
+    """
+    payload = require_jwt_payload(authorization)
+    counts = await get_container().chat_repository.get_unread_counts(
+        payload.get("user_id")
+    )
+    return {"total": sum(counts.values()), "chats": counts}
+
+
+@app.post("/api/chats/{session_id}/read")
+async def mark_chat_read(
+    session_id: str, body: ChatReadRequest, authorization: str = Header(None)
+):
+    """
+    Marca como leídos los mensajes del chat hasta `up_to_message_id`.
+    """
+    payload = require_jwt_payload(authorization)
+    user_id = payload.get("user_id")
+
+    chat_repository = get_container().chat_repository
+    chat = await chat_repository.get_by_session_id(session_id)
+    if not chat or user_id not in (chat.student_id, chat.advisor_id):
+        raise HTTPException(status_code=404, detail="Chat no encontrado")
+
+    try:
+        unread = await chat_repository.mark_read(
+            chat.id, user_id, body.up_to_message_id
+        )
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Mensaje no encontrado")
+    return {"chat_id": chat.id, "unread": unread}
+
+
 # ── JWT Authentication Endpoints ───────────────────────────────
 @app.post("/api/auth/register", response_model=Token)
 @limiter.limit("5/minute")
 async def register(request: Request, user: UserCreate):
     """
     Registra un nuevo usuario en el sistema.
+
+    Solo se puede elegir rol de estudiante o asesor; los administradores
+    se asignan directamente en la base de datos.
     """
+    if user.role not in SELF_REGISTER_ROLES:
+        raise HTTPException(status_code=403, detail="Rol no permitido en el registro")
+
     # Verificar si el usuario ya existe
     user_data = await app.mongodb.users.find_one({"email": user.email})
     if user_data:
@@ -653,7 +1892,11 @@ async def register(request: Request, user: UserCreate):
 
     # Crear token JWT
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": str(result.inserted_id)}
+        data={
+            "sub": user.email,
+            "user_id": str(result.inserted_id),
+            "role": user.role,
+        }
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -676,7 +1919,11 @@ async def login(request: Request, user_login: UserLogin):
 
     # Crear token JWT
     access_token = create_access_token(
-        data={"sub": user_login.email, "user_id": str(user_data.get("_id"))}
+        data={
+            "sub": user_login.email,
+            "user_id": str(user_data.get("_id")),
+            "role": user_data.get("role", "student"),
+        }
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
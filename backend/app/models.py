@@ -1,36 +1,54 @@
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import Optional, List, Any, Dict
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, GetJsonSchemaHandler
+from pydantic_core import core_schema
+from typing import Annotated, Optional, List, Any, Dict
 from datetime import datetime
 from enum import Enum
 from bson import ObjectId
 
 
-# Helper functions for ObjectId handling
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+# ObjectId nativo de pydantic v2
+class _ObjectIdPydanticAnnotation:
+    """
+    Schema de pydantic_core para ObjectId.
+
+    Valida desde ObjectId o str hexadecimal de 24 caracteres (patrón
+    compilado en el core de Rust) y se serializa como str en JSON; en
+    modo python conserva el ObjectId para escribirlo en MongoDB.
+    """
 
     @classmethod
-    def validate(cls, v, handler):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        from_str = core_schema.chain_schema(
+            [
+                core_schema.str_schema(pattern=r"^[0-9a-fA-F]{24}$"),
+                core_schema.no_info_plain_validator_function(ObjectId),
+            ]
+        )
+        return core_schema.json_or_python_schema(
+            json_schema=from_str,
+            python_schema=core_schema.union_schema(
+                [core_schema.is_instance_schema(ObjectId), from_str],
+                custom_error_type="object_id",
+                custom_error_message="Invalid ObjectId",
+            ),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                str, when_used="json"
+            ),
+        )
 
     @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema, handler):
-        field_schema.update(type="string")
+    def __get_pydantic_json_schema__(cls, schema, handler: GetJsonSchemaHandler):
+        return {"type": "string", "pattern": "^[0-9a-fA-F]{24}$"}
+
+
+PyObjectId = Annotated[ObjectId, _ObjectIdPydanticAnnotation]
 
 
 # Base model for common config
 class MongoBaseModel(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
 
-    model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str},
-    )
+    model_config = ConfigDict(populate_by_name=True)
 
 
 # Enums
@@ -0,0 +1,19 @@
+"""
+Observabilidad de PeerHive.
+
+Métricas en formato Prometheus, monitoreo de MongoDB y watchdog del
+event loop.
+"""
+
+from .metrics import REGISTRY, Counter, Histogram, MetricsMiddleware
+from .mongo import MongoCommandListener
+from .watchdog import LoopLagWatchdog
+
+__all__ = [
+    "REGISTRY",
+    "Counter",
+    "Histogram",
+    "LoopLagWatchdog",
+    "MetricsMiddleware",
+    "MongoCommandListener",
+]
@@ -0,0 +1,283 @@
+"""
+Métricas en formato de exposición de Prometheus.
+
+Contadores e histogramas sin locks en el camino caliente: cada hilo
+escribe en su propio shard y solo la lectura (/metrics) suma los shards.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Buckets por defecto (segundos), similares a los de prometheus_client
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """Base de métricas con un shard (dict etiquetas -> valores) por hilo."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _snapshot(self) -> List[Tuple[tuple, list]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # list(dict.items()) es atómico bajo el GIL
+        return [item for shard in shards for item in list(shard.items())]
+
+    def _check_labels(self, labelvalues: tuple) -> None:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {labelvalues}"
+            )
+
+
+class Counter(_Sharded):
+    """Contador monotónico con etiquetas."""
+
+    type = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shard()
+        cell = shard.get(labelvalues)
+        if cell is None:
+            self._check_labels(labelvalues)
+            shard[labelvalues] = [amount]
+        else:
+            cell[0] += amount
+
+    def values(self) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        for labels, cell in self._snapshot():
+            totals[labels] = totals.get(labels, 0) + cell[0]
+        return totals
+
+    def collect(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_Sharded):
+    """Histograma acumulativo con etiquetas."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shard()
+        cell = shard.get(labelvalues)
+        if cell is None:
+            self._check_labels(labelvalues)
+            # [conteo por bucket..., +Inf, suma]
+            cell = shard[labelvalues] = [0] * (len(self.buckets) + 2)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        """Context manager que observa la duración del bloque."""
+        return _Timer(self, labelvalues)
+
+    def values(self) -> Dict[tuple, list]:
+        totals: Dict[tuple, list] = {}
+        for labels, cell in self._snapshot():
+            total = totals.get(labels)
+            if total is None:
+                totals[labels] = list(cell)
+            else:
+                for i, v in enumerate(cell):
+                    total[i] += v
+        return totals
+
+    def collect(self) -> Iterable[str]:
+        for labels, cell in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), cell):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_format_value(float(cell[-1]))}"
+            yield f"{self.name}_count{label_str} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Registry:
+    """Registro de métricas y de colectores calculados al exponer."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Sharded] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(
+                    name, documentation, labelnames, **kwargs
+                )
+            return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """
+        Registra una función que produce líneas de exposición al vuelo
+        (p. ej. gauges derivados de otros componentes).
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Genera el texto en formato de exposición de Prometheus 0.0.4."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ── Métricas HTTP ────────────────────────────────────────────────────
+
+http_request_duration = REGISTRY.histogram(
+    "peerhive_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por plantilla de ruta.",
+    ("method", "route", "status"),
+)
+http_rate_limited = REGISTRY.counter(
+    "peerhive_http_rate_limited_total",
+    "Peticiones rechazadas por el rate limiter (429).",
+    ("route",),
+)
+
+
+def route_template(scope: dict) -> str:
+    """Plantilla de la ruta (p. ej. /api/jobs/{job_id}), no la URL concreta."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia de cada petición HTTP.
+
+    Se usa la plantilla de la ruta como etiqueta para acotar la cardinalidad.
+    """
+
+    def __init__(self, app, excluded_paths: Optional[Sequence[str]] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = set(excluded_paths or ())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            http_request_duration.observe(
+                time.perf_counter() - start, scope["method"], route, status[0]
+            )
+            if status[0] == "429":
+                http_rate_limited.inc(route)
@@ -0,0 +1,253 @@
+"""
+Monitoreo de comandos de MongoDB.
+
+CommandListener de pymongo (usado también por Motor) que registra la
+duración de cada comando por colección y operación, agrupa los comandos
+por forma de consulta (p. ej. `requests.find{status}`) y lleva un log de
+consultas lentas.
+"""
+
+import logging
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from .metrics import REGISTRY
+from .watchdog import percentile
+
+logger = logging.getLogger(__name__)
+
+mongo_command_duration = REGISTRY.histogram(
+    "peerhive_mongo_command_duration_seconds",
+    "Duración de los comandos de MongoDB por colección y operación.",
+    ("collection", "command", "outcome"),
+)
+
+# Comandos cuyo valor es el nombre de la colección
+_COLLECTION_COMMANDS = {
+    "find",
+    "insert",
+    "update",
+    "delete",
+    "aggregate",
+    "count",
+    "distinct",
+    "findAndModify",
+    "createIndexes",
+    "listIndexes",
+    "drop",
+}
+
+# Comandos internos del driver que no aportan a la latencia de la app
+_IGNORED_COMMANDS = {"hello", "isMaster", "ismaster", "ping", "saslStart"}
+
+
+def command_collection(command_name: str, command: dict) -> str:
+    """Extrae la colección a la que apunta un comando."""
+    if command_name in _COLLECTION_COMMANDS:
+        value = command.get(command_name)
+        return value if isinstance(value, str) else "-"
+    if command_name == "getMore":
+        return command.get("collection", "-")
+    return "-"
+
+
+# Dónde está el filtro de cada comando
+_FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+
+
+def filter_shape(query: Any) -> str:
+    """
+    Normaliza un filtro a su forma: solo los campos, sin valores.
+
+    Ejemplo: {"status": "open", "$or": [{"a": 1}, {"b": {"$gt": 2}}]}
+    -> "{$or[{a}|{b}],status}"
+    """
+    if not isinstance(query, dict):
+        return "{}"
+    parts = []
+    for key in sorted(query):
+        value = query[key]
+        if key in ("$and", "$or", "$nor") and isinstance(value, list):
+            parts.append(key + "[" + "|".join(filter_shape(v) for v in value) + "]")
+        else:
+            parts.append(key)
+    return "{" + ",".join(parts) + "}"
+
+
+def command_filter(command_name: str, command: dict) -> Optional[dict]:
+    """Extrae el filtro de un comando, si tiene uno."""
+    field = _FILTER_FIELDS.get(command_name)
+    if field:
+        return command.get(field) or {}
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        if pipeline and "$match" in pipeline[0]:
+            return pipeline[0]["$match"]
+        return {}
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s") or []
+        return statements[0].get("q", {}) if statements else {}
+    return None
+
+
+def query_shape(command_name: str, command: dict) -> str:
+    """Forma de la consulta: `<colección>.<comando><filtro normalizado>`."""
+    shape = f"{command_collection(command_name, command)}.{command_name}"
+    query = command_filter(command_name, command)
+    if query is not None:
+        shape += filter_shape(query)
+    return shape
+
+
+def docs_returned(command_name: str, reply: dict) -> int:
+    """Documentos devueltos o afectados según la respuesta del servidor."""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    if command_name == "distinct":
+        return len(reply.get("values") or [])
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class ShapeStats:
+    """Estadísticas acumuladas de una forma de consulta."""
+
+    __slots__ = ("count", "failures", "total_ms", "docs", "max_docs", "_samples")
+
+    # Tamaño del reservorio de latencias usado para los percentiles
+    RESERVOIR_SIZE = 512
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.docs = 0
+        self.max_docs = 0
+        self._samples: List[float] = []
+
+    def record(self, duration_ms: float, docs: int, failed: bool) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.docs += docs
+        self.max_docs = max(self.max_docs, docs)
+        if failed:
+            self.failures += 1
+        # Muestreo por reservorio (algoritmo R): memoria acotada por forma
+        if len(self._samples) < self.RESERVOIR_SIZE:
+            self._samples.append(duration_ms)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.RESERVOIR_SIZE:
+                self._samples[slot] = duration_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        samples = list(self._samples)
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "total_ms": round(self.total_ms, 2),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "avg_docs": round(self.docs / self.count, 2) if self.count else 0,
+            "max_docs": self.max_docs,
+        }
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Listener de comandos que alimenta las métricas de MongoDB, la tabla
+    de formas de consulta y el log de consultas lentas.
+
+    pymongo invoca los eventos desde el hilo que ejecuta el comando (Motor
+    usa un pool de hilos); el estado pendiente se guarda por
+    (request_id, connection_id) y la tabla se protege con un lock.
+    """
+
+    def __init__(self, slow_threshold_ms: float = 100.0, max_slow_entries: int = 200):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._pending: Dict[Tuple[int, object], Tuple[str, str, str]] = {}
+        self._shapes: Dict[str, ShapeStats] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=max_slow_entries)
+        self._lock = threading.Lock()
+
+    def _key(self, event) -> Tuple[int, object]:
+        return (event.request_id, event.connection_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        self._pending[self._key(event)] = (
+            command_collection(event.command_name, event.command),
+            event.command_name,
+            query_shape(event.command_name, event.command),
+        )
+
+    def _finish(self, event, outcome: str, docs: int = 0) -> None:
+        info = self._pending.pop(self._key(event), None)
+        if info is None:
+            return
+        collection, command_name, shape = info
+        mongo_command_duration.observe(
+            event.duration_micros / 1e6, collection, command_name, outcome
+        )
+
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            stats = self._shapes.get(shape)
+            if stats is None:
+                stats = self._shapes[shape] = ShapeStats()
+            stats.record(duration_ms, docs, failed=outcome == "failure")
+
+        if duration_ms >= self.slow_threshold_ms:
+            entry = {
+                "at": datetime.utcnow().isoformat(),
+                "shape": shape,
+                "duration_ms": round(duration_ms, 2),
+                "docs": docs,
+                "outcome": outcome,
+                "database": event.database_name,
+            }
+            self._slow.append(entry)
+            logger.warning(
+                f"Slow Mongo query {shape}: {entry['duration_ms']}ms, {docs} docs"
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(
+            event, "success", docs_returned(event.command_name, event.reply or {})
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "failure")
+
+    def shape_table(self) -> List[Dict[str, Any]]:
+        """Formas de consulta ordenadas por tiempo total acumulado."""
+        with self._lock:
+            rows = [
+                {"shape": shape, **stats.to_dict()}
+                for shape, stats in self._shapes.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Consultas lentas más recientes primero."""
+        return list(reversed(self._slow))
+
+    def reset(self) -> None:
+        """Vacía la tabla de formas y el log de consultas lentas."""
+        with self._lock:
+            self._shapes.clear()
+            self._slow.clear()
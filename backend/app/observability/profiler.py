@@ -0,0 +1,246 @@
+"""
+Profiler por petición bajo demanda.
+
+Un administrador puede pedir el perfil de una sola petición con el
+header `X-Profile: 1` o el parámetro `?__profile=1`. Mientras la petición
+se atiende, un hilo muestrea el stack del event loop y conserva solo las
+muestras en las que esa petición está ejecutándose. El resultado se
+guarda en formato "collapsed stacks" (flamegraph.pl, speedscope) en un
+directorio local con un máximo de archivos.
+
+Sin el header ni el parámetro el middleware solo revisa su presencia:
+no se crea ningún hilo ni se toca el stack.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "__profile"
+
+_PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Rutas relativas al paquete para etiquetas legibles
+    for marker in ("site-packages" + os.sep, "backend" + os.sep):
+        index = filename.rfind(marker)
+        if index != -1:
+            start = index + len(marker)
+            filename = filename[start:]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class RequestSampler:
+    """
+    Muestrea el hilo del event loop cada `interval` segundos.
+
+    Solo cuenta las muestras cuyo stack contiene un frame con la variable
+    local `scope` idéntica al scope ASGI de la petición perfilada; el stack
+    guardado empieza en ese frame, sin los internos del event loop.
+    """
+
+    def __init__(self, scope: dict, interval: float = 0.001):
+        self.scope = scope
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            self.samples += 1
+            stack = self._request_stack(frame)
+            if stack:
+                self.stacks[";".join(stack)] += 1
+            else:
+                # La petición está esperando E/S (o el loop atiende otra)
+                self.idle_samples += 1
+
+    def _request_stack(self, frame) -> Optional[List[str]]:
+        labels: List[str] = []
+        found = False
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if frame.f_locals.get("scope") is self.scope:
+                found = True
+                # Seguir subiendo hasta el frame más externo de la petición
+                outermost = len(labels)
+            frame = frame.f_back
+        if not found:
+            return None
+        labels = labels[:outermost]
+        labels.reverse()
+        return labels
+
+    def collapsed(self) -> str:
+        """Stacks en formato collapsed: `frame;frame;frame conteo`."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class ProfileStore:
+    """
+    Directorio local de perfiles, con un máximo de `max_profiles`.
+
+    Cada perfil son dos archivos: `<id>.collapsed` y `<id>.json` con los
+    metadatos. Al superar el máximo se borran los más antiguos.
+    """
+
+    def __init__(self, directory: str, max_profiles: int = 100):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, metadata: Dict[str, Any], collapsed: str) -> None:
+        """Guarda un perfil (bloqueante: llamar desde un hilo)."""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = metadata["id"]
+        with open(self.collapsed_path(profile_id), "w", encoding="utf-8") as f:
+            f.write(collapsed)
+        with open(self._metadata_path(profile_id), "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        self._prune()
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadatos de los perfiles guardados, más recientes primero."""
+        profiles = []
+        for path in self._metadata_files():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+    def collapsed_path(self, profile_id: str) -> str:
+        if not _PROFILE_ID_RE.match(profile_id):
+            raise ValueError("Invalid profile id")
+        return os.path.join(self.directory, f"{profile_id}.collapsed")
+
+    def _metadata_path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def _metadata_files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+
+    def _prune(self) -> None:
+        files = sorted(self._metadata_files(), key=os.path.getmtime)
+        for path in files[: max(0, len(files) - self.max_profiles)]:
+            profile_id = os.path.basename(path)[: -len(".json")]
+            for stale in (
+                path,
+                os.path.join(self.directory, f"{profile_id}.collapsed"),
+            ):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+
+def profile_requested(scope: dict) -> bool:
+    """Indica si la petición pide ser perfilada (header o query string)."""
+    for name, value in scope.get("headers") or []:
+        if name == PROFILE_HEADER:
+            return value in (b"1", b"true")
+    query = scope.get("query_string") or b""
+    if PROFILE_QUERY_PARAM.encode() not in query:
+        return False
+    values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM, [])
+    return any(v in ("1", "true") for v in values)
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI que perfila peticiones marcadas por un administrador.
+
+    `authorize` (asíncrona) recibe los headers (dict en minúsculas) y
+    decide si quien pide el perfil tiene permiso; si no, la petición se
+    atiende normal.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        authorize: Callable[[Dict[str, str]], Awaitable[bool]],
+        interval: float = 0.001,
+    ):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope.get("headers") or []
+        }
+        if not await self.authorize(headers):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers") or []) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        sampler = RequestSampler(scope, self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            metadata = {
+                "id": profile_id,
+                "created_at": datetime.utcnow().isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status[0],
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                "interval_ms": self.interval * 1000,
+                "samples": sampler.samples,
+                "active_samples": sampler.samples - sampler.idle_samples,
+            }
+            await asyncio.to_thread(self.store.save, metadata, sampler.collapsed())
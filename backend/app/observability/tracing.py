@@ -0,0 +1,458 @@
+"""
+Trazas distribuidas compatibles con OpenTelemetry.
+
+Tracer mínimo, sin dependencias, que sigue el modelo de OpenTelemetry:
+IDs W3C (trace de 128 bits, span de 64 bits), propagación con el header
+`traceparent`, contexto en un contextvar (válido en corrutinas y en el
+threadpool) y exportadores a consola o a un archivo JSON Lines con el
+mismo formato que el ConsoleSpanExporter del SDK oficial.
+
+Las capas instrumentadas son: rutas (TracingMiddleware), casos de uso y
+repositorios (trace_methods) y llamadas salientes a Microsoft Graph.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "peerhive-backend"
+
+# Tipos de span (SpanKind de OpenTelemetry)
+INTERNAL = "INTERNAL"
+SERVER = "SERVER"
+CLIENT = "CLIENT"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def _new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _iso(ns: int) -> str:
+    return (
+        datetime.fromtimestamp(ns / 1e9, tz=timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
+
+
+class Span:
+    """Operación con nombre y duración dentro de una traza."""
+
+    __slots__ = (
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "events",
+        "status",
+        "status_description",
+        "start_ns",
+        "end_ns",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status = "UNSET"
+        self.status_description: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Registra la excepción como evento y marca el span con error."""
+        self.events.append(
+            {
+                "name": "exception",
+                "timestamp": _iso(time.time_ns()),
+                "attributes": {
+                    "exception.type": type(exc).__name__,
+                    "exception.message": str(exc),
+                },
+            }
+        )
+        self.status = "ERROR"
+        self.status_description = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        """Header W3C `traceparent` para propagar este span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación JSON en el formato del SDK de OpenTelemetry."""
+        status = {"status_code": self.status}
+        if self.status_description:
+            status["description"] = self.status_description
+        return {
+            "name": self.name,
+            "context": {
+                "trace_id": f"0x{self.trace_id}",
+                "span_id": f"0x{self.span_id}",
+                "trace_state": "[]",
+            },
+            "kind": f"SpanKind.{self.kind}",
+            "parent_id": f"0x{self.parent_id}" if self.parent_id else None,
+            "start_time": _iso(self.start_ns),
+            "end_time": _iso(self.end_ns) if self.end_ns else None,
+            "status": status,
+            "attributes": self.attributes,
+            "events": self.events,
+            "links": [],
+            "resource": {
+                "attributes": {"service.name": SERVICE_NAME},
+                "schema_url": "",
+            },
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    """Span activo en el contexto actual, si hay uno."""
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """Extrae (trace_id, parent_span_id) de un header `traceparent` válido."""
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+
+def client_request_id(span: Optional[Span] = None) -> Optional[str]:
+    """
+    ID de traza con formato GUID, para el header `client-request-id` de Graph.
+
+    Todas las llamadas a Graph de una misma traza comparten el ID, lo que
+    permite correlacionarlas con los logs de Microsoft.
+    """
+    span = span or current_span()
+    if span is None:
+        return None
+    t = span.trace_id
+    return f"{t[:8]}-{t[8:12]}-{t[12:16]}-{t[16:20]}-{t[20:]}"
+
+
+# ── Exportadores ─────────────────────────────────────────────────────
+
+
+class SpanExporter:
+    """Destino de los spans finalizados."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Escribe cada span como JSON en stdout."""
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+
+    def export(self, spans: Sequence[Span]) -> None:
+        for span in spans:
+            self.out.write(json.dumps(span.to_dict(), indent=4, default=str) + "\n")
+        self.out.flush()
+
+
+class FileSpanExporter(SpanExporter):
+    """Agrega los spans a un archivo JSON Lines (un span por línea)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: Sequence[Span]) -> None:
+        for span in spans:
+            self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+        self._file.flush()
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Conserva los spans en memoria (útil en pruebas)."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class BatchSpanProcessor:
+    """
+    Exporta los spans en lotes desde un hilo propio.
+
+    Finalizar un span solo lo encola, así la escritura a disco o consola
+    nunca ocurre en el event loop. Si la cola se llena, se descartan spans.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 256,
+        schedule_delay: float = 1.0,
+    ):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue_size)
+        self._thread = threading.Thread(
+            target=self._worker, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _worker(self) -> None:
+        while True:
+            batch: List[Span] = []
+            try:
+                item = self._queue.get(timeout=self.schedule_delay)
+            except queue.Empty:
+                continue
+            stop = item is None
+            if not stop:
+                batch.append(item)
+            while not stop and len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.error(f"Error exporting spans: {str(e)}")
+            if stop:
+                return
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Exporta los spans pendientes y cierra el exportador."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.exporter.shutdown()
+
+
+# ── Tracer ───────────────────────────────────────────────────────────
+
+
+class Tracer:
+    """Crea spans enlazados por el contexto actual."""
+
+    def __init__(self):
+        self.processor: Optional[BatchSpanProcessor] = None
+
+    @contextmanager
+    def start_as_current_span(
+        self,
+        name: str,
+        kind: str = INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[tuple] = None,
+    ) -> Iterator[Span]:
+        """
+        Abre un span hijo del span actual (o de `parent`, un par
+        (trace_id, span_id) recibido por `traceparent`) y lo activa.
+        """
+        if parent is not None:
+            trace_id, parent_id = parent
+        else:
+            active = _current_span.get()
+            trace_id = active.trace_id if active else _new_trace_id()
+            parent_id = active.span_id if active else None
+
+        span = Span(name, kind, trace_id, parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if span.status == "UNSET":
+                span.status = "OK"
+            if self.processor is not None:
+                self.processor.on_end(span)
+
+
+tracer = Tracer()
+
+
+def configure_tracing(exporter: Optional[str], file_path: str = "traces.jsonl"):
+    """
+    Configura el exportador de spans.
+
+    Args:
+        exporter: "console", "file" o None/"none" para no exportar
+        file_path: Archivo JSON Lines usado por el exportador "file"
+    """
+    shutdown_tracing()
+    if exporter == "console":
+        tracer.processor = BatchSpanProcessor(ConsoleSpanExporter())
+    elif exporter == "file":
+        tracer.processor = BatchSpanProcessor(FileSpanExporter(file_path))
+    elif exporter not in (None, "", "none"):
+        raise ValueError(f"Unknown tracing exporter '{exporter}'")
+
+
+def shutdown_tracing() -> None:
+    """Vacía la cola de spans y detiene el exportador actual."""
+    processor = tracer.processor
+    tracer.processor = None
+    if processor is not None:
+        processor.shutdown()
+
+
+def traced(name: str, kind: str = INTERNAL):
+    """Decorador que envuelve una función (sync o async) en un span."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(name, kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name, kind):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls):
+    """
+    Decorador de clase: traza cada método público async definido en ella.
+
+    Los spans se llaman `<Clase>.<método>`, p. ej. `UserRepository.get_by_id`.
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.iscoroutinefunction(value):
+            continue
+        setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+class TracingMiddleware:
+    """
+    Middleware ASGI que abre el span SERVER de cada petición HTTP.
+
+    Continúa la traza del cliente si llega un `traceparent` válido y
+    devuelve el `traceparent` del span en la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(
+            headers.get(b"traceparent", b"").decode("latin-1") or None
+        )
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            kind=SERVER,
+            attributes={"http.method": method, "url.path": scope["path"]},
+            parent=parent,
+        ) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"traceparent", span.traceparent.encode())
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                if route != "unmatched":
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
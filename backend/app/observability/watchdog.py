@@ -0,0 +1,187 @@
+"""
+Watchdog del event loop.
+
+Mide continuamente el lag del event loop (cuánto tarda en despertar un
+`asyncio.sleep` respecto a lo esperado). Un hilo auxiliar detecta cuando
+el loop deja de avanzar y captura el stack del hilo principal en ese
+momento, junto con la ruta HTTP activa, para encontrar llamadas
+bloqueantes (requests, bcrypt, msal) dentro de handlers async.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import REGISTRY, route_template
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag = REGISTRY.histogram(
+    "peerhive_event_loop_lag_seconds",
+    "Lag del event loop medido por el watchdog.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_stalls = REGISTRY.counter(
+    "peerhive_event_loop_stalls_total",
+    "Bloqueos del event loop por encima del umbral, por ruta activa.",
+    ("route",),
+)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Percentil `q` (0-100) por rango más cercano; 0.0 si no hay muestras."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def active_route(frame) -> Optional[str]:
+    """
+    Busca en el stack la petición HTTP que se está atendiendo.
+
+    Los frames de los middlewares y handlers ASGI tienen una variable
+    local `scope`; se prefiere la plantilla de la ruta si ya se resolvió.
+    """
+    path = None
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            if scope.get("route") is not None:
+                return route_template(scope)
+            path = path or scope.get("path")
+        frame = frame.f_back
+    return path
+
+
+class LoopLagWatchdog:
+    """
+    Watchdog de lag del event loop.
+
+    Una tarea asyncio registra un latido cada `interval` segundos y mide
+    su retraso. Un hilo daemon revisa el último latido; si el loop lleva
+    más de `threshold` segundos sin avanzar, captura el stack del hilo
+    del loop (una sola vez por bloqueo).
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        threshold: float = 0.1,
+        max_events: int = 50,
+        window: int = 2048,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._stall_count = 0
+        self._beat = time.monotonic()
+        self._stalled = False
+        self._open_event: Optional[Dict[str, Any]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Inicia el latido en el loop actual y el hilo de vigilancia."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Event loop watchdog started (threshold={self.threshold * 1000:.0f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Detiene el latido y el hilo de vigilancia."""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            self._samples.append(lag)
+            event_loop_lag.observe(lag)
+
+            event = self._open_event
+            if event is not None:
+                # El bloqueo terminó: registrar su duración total
+                event["lag_ms"] = round(lag * 1000, 1)
+                self._open_event = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            stalled_for = time.monotonic() - self._beat - self.interval
+            if stalled_for < self.threshold:
+                self._stalled = False
+                continue
+            if not self._stalled:
+                self._stalled = True
+                self._capture(stalled_for)
+
+    def _capture(self, stalled_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        route = active_route(frame) or "-"
+        stack = traceback.format_stack(frame)
+        event = {
+            "detected_at": datetime.utcnow().isoformat(),
+            "route": route,
+            "blocked_ms": round(stalled_for * 1000, 1),
+            "lag_ms": None,
+            "stack": stack,
+        }
+        self._events.append(event)
+        self._open_event = event
+        self._stall_count += 1
+        event_loop_stalls.inc(route)
+        logger.warning(
+            f"Event loop blocked for {event['blocked_ms']}ms in {route}:\n"
+            + "".join(stack[-8:])
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Percentiles de lag (ms) y los bloqueos capturados más recientes."""
+        samples = list(self._samples)
+        return {
+            "running": self._task is not None,
+            "threshold_ms": self.threshold * 1000,
+            "samples": len(samples),
+            "lag_ms": {
+                "p50": round(percentile(samples, 50) * 1000, 2),
+                "p90": round(percentile(samples, 90) * 1000, 2),
+                "p99": round(percentile(samples, 99) * 1000, 2),
+                "max": round(max(samples, default=0.0) * 1000, 2),
+            },
+            "stalls": self._stall_count,
+            "events": list(reversed(self._events)),
+        }
@@ -0,0 +1,62 @@
+"""
+Cache Service - Caché en memoria con expiración (TTL)
+Usado para respuestas de Microsoft Graph de corta vida
+"""
+
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por entrada.
+
+    Es seguro entre hilos: las funciones de servicio se ejecutan tanto
+    en el event loop como en el threadpool de Starlette.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor si existe y no ha expirado."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Guarda un valor con el TTL por defecto o uno específico."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                self._evict_expired()
+                if len(self._data) >= self.max_entries:
+                    # Descarta la entrada más antigua (orden de inserción)
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (exp, _) in self._data.items() if exp < now]:
+            del self._data[key]
@@ -3,26 +3,28 @@ Calendar Service - Microsoft Graph API Integration
 Sincronización de eventos del calendario con Outlook Calendar
 """
 
+import os
 import requests
 import logging
 from typing import Optional, List, Dict, Any
 
+from ..infrastructure.serialization import loads
+from .cache import TTLCache
+from .graph import GRAPH_API_BASE_URL, graph_get, graph_get_all, graph_request
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Microsoft Graph API Base URL
-GRAPH_API_BASE_URL = "https://graph.microsoft.com/v1.0"
+# getSchedule acepta como máximo 20 buzones por petición
+GET_SCHEDULE_MAX_MAILBOXES = 20
 
+# Zona de la ventana de getSchedule; Graph responde las horas en ella, sin zona
+SCHEDULE_TIMEZONE = "America/Mexico_City"
 
-# Headers for Graph API requests
-def get_headers(access_token: str, timezone: str = "UTC") -> Dict[str, str]:
-    """Get headers for Microsoft Graph API requests."""
-    return {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-        "Prefer": f'outlook.timezone="{timezone}"',
-    }
+# Caché de free/busy por buzón y ventana de tiempo
+FREE_BUSY_CACHE_TTL_SECONDS = float(os.getenv("FREE_BUSY_CACHE_TTL_SECONDS", "120"))
+_free_busy_cache = TTLCache(ttl_seconds=FREE_BUSY_CACHE_TTL_SECONDS)
 
 
 def get_calendar_events(
@@ -30,6 +32,7 @@ def get_calendar_events(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     filter_query: Optional[str] = None,
+    user_key: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Obtiene eventos del calendario de Outlook.
@@ -39,6 +42,7 @@ def get_calendar_events(
         start_date: Fecha de inicio (formato ISO 8601: YYYY-MM-DD)
         end_date: Fecha de fin (formato ISO 8601: YYYY-MM-DD)
         filter_query: Query filter adicional (ej: "subject eq 'Asesoría'")
+        user_key: Usuario para la caché de lecturas (por defecto, el del token)
 
     Returns:
         Lista de eventos del calendario
@@ -66,13 +70,7 @@ def get_calendar_events(
     logger.info(f"Fetching calendar events from {start_date} to {end_date}")
 
     try:
-        response = requests.get(
-            url, headers=get_headers(access_token), params=params, timeout=30
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        events = data.get("value", [])
+        events = graph_get_all(access_token, url, params=params, user_key=user_key)
 
         logger.info(f"Retrieved {len(events)} calendar events")
         return events
@@ -97,6 +95,7 @@ def create_calendar_event(
     attendees: Optional[List[Dict[str, str]]] = None,
     is_online_meeting: bool = True,
     online_meeting_provider: str = "teamsForBusiness",
+    transaction_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Crea un evento de asesoría en el calendario de Outlook.
@@ -111,6 +110,7 @@ def create_calendar_event(
         attendees: Lista de asistentes [{'email': 'email@example.com', 'type': 'required|optional'}]
         is_online_meeting: Si es reunión online (Teams)
         online_meeting_provider: Proveedor de reunión online (teamsForBusiness, skypeForBusiness)
+        transaction_id: ID de transacción; Graph no duplica eventos con el mismo ID
 
     Returns:
         Dict con los datos del evento creado
@@ -134,6 +134,10 @@ def create_calendar_event(
     if location:
         event_data["location"] = {"displayName": location}
 
+    # Idempotencia del lado de Graph ante reintentos
+    if transaction_id:
+        event_data["transactionId"] = transaction_id
+
     # Agregar asistentes si se proporcionan
     if attendees:
         event_data["attendees"] = [
@@ -147,12 +151,9 @@ def create_calendar_event(
     logger.info(f"Creating calendar event: {subject}")
 
     try:
-        response = requests.post(
-            url, headers=get_headers(access_token), json=event_data, timeout=30
-        )
-        response.raise_for_status()
+        response = graph_request("POST", access_token, url, json=event_data)
 
-        event = response.json()
+        event = loads(response.content)
         logger.info(f"Event created successfully: {event.get('id')}")
         return event
 
@@ -238,12 +239,9 @@ def update_calendar_event(
     logger.info(f"Updating calendar event: {event_id}")
 
     try:
-        response = requests.patch(
-            url, headers=get_headers(access_token), json=update_data, timeout=30
-        )
-        response.raise_for_status()
+        response = graph_request("PATCH", access_token, url, json=update_data)
 
-        event = response.json()
+        event = loads(response.content)
         logger.info(f"Event updated successfully: {event_id}")
         return event
 
@@ -276,8 +274,7 @@ def delete_calendar_event(access_token: str, event_id: str) -> bool:
     logger.info(f"Deleting calendar event: {event_id}")
 
     try:
-        response = requests.delete(url, headers=get_headers(access_token), timeout=30)
-        response.raise_for_status()
+        graph_request("DELETE", access_token, url)
 
         logger.info(f"Event deleted successfully: {event_id}")
         return True
@@ -292,13 +289,16 @@ def delete_calendar_event(access_token: str, event_id: str) -> bool:
         raise
 
 
-def get_event_by_id(access_token: str, event_id: str) -> Dict[str, Any]:
+def get_event_by_id(
+    access_token: str, event_id: str, user_key: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Obtiene un evento específico del calendario por su ID.
 
     Args:
         access_token: Token de acceso de Microsoft Graph
         event_id: ID del evento a obtener
+        user_key: Usuario para la caché de lecturas (por defecto, el del token)
 
     Returns:
         Dict con los datos del evento
@@ -311,10 +311,7 @@ def get_event_by_id(access_token: str, event_id: str) -> Dict[str, Any]:
     logger.info(f"Fetching calendar event: {event_id}")
 
     try:
-        response = requests.get(url, headers=get_headers(access_token), timeout=30)
-        response.raise_for_status()
-
-        event = response.json()
+        event = graph_get(access_token, url, user_key=user_key)
         logger.info(f"Retrieved event: {event_id}")
         return event
 
@@ -326,3 +323,103 @@ def get_event_by_id(access_token: str, event_id: str) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Unexpected error fetching calendar event: {str(e)}")
         raise
+
+
+def get_schedule(
+    access_token: str,
+    mailboxes: List[str],
+    start_datetime: str,
+    end_datetime: str,
+    interval_minutes: int = 30,
+    timezone: str = SCHEDULE_TIMEZONE,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Obtiene la disponibilidad (free/busy) de varios buzones con getSchedule.
+
+    Los buzones se consultan en lotes de GET_SCHEDULE_MAX_MAILBOXES y el
+    resultado de cada uno se guarda en caché por ventana de tiempo.
+
+    Args:
+        access_token: Token de acceso de Microsoft Graph
+        mailboxes: Correos de los buzones a consultar
+        start_datetime: Inicio de la ventana (formato ISO 8601: YYYY-MM-DDTHH:MM:SS)
+        end_datetime: Fin de la ventana (formato ISO 8601: YYYY-MM-DDTHH:MM:SS)
+        interval_minutes: Granularidad de availabilityView
+        timezone: Zona horaria de la ventana y de los resultados
+
+    Returns:
+        Dict buzón -> lista de bloques ocupados [{'status', 'start', 'end'}].
+        Los buzones que Graph no pudo consultar no aparecen.
+
+    Raises:
+        requests.HTTPError: Si la API retorna un error
+    """
+    url = f"{GRAPH_API_BASE_URL}/me/calendar/getSchedule"
+
+    schedules: Dict[str, List[Dict[str, Any]]] = {}
+    pending = []
+    for mailbox in dict.fromkeys(m.lower() for m in mailboxes):
+        cached = _free_busy_cache.get(
+            (mailbox, start_datetime, end_datetime, interval_minutes, timezone)
+        )
+        if cached is not None:
+            schedules[mailbox] = cached
+        else:
+            pending.append(mailbox)
+
+    logger.info(
+        f"Fetching free/busy for {len(pending)} mailboxes "
+        f"({len(schedules)} cached) from {start_datetime} to {end_datetime}"
+    )
+
+    for offset in range(0, len(pending), GET_SCHEDULE_MAX_MAILBOXES):
+        chunk_end = offset + GET_SCHEDULE_MAX_MAILBOXES
+        chunk = pending[offset:chunk_end]
+        schedule_data = {
+            "schedules": chunk,
+            "startTime": {"dateTime": start_datetime, "timeZone": timezone},
+            "endTime": {"dateTime": end_datetime, "timeZone": timezone},
+            "availabilityViewInterval": interval_minutes,
+        }
+
+        try:
+            response = graph_request(
+                "POST", access_token, url, json=schedule_data, timezone=timezone
+            )
+
+        except requests.HTTPError as e:
+            logger.error(
+                f"Error fetching schedules: {e.response.status_code} - {e.response.text}"
+            )
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error fetching schedules: {str(e)}")
+            raise
+
+        for item in loads(response.content).get("value", []):
+            mailbox = (item.get("scheduleId") or "").lower()
+            if item.get("error"):
+                # Buzón inexistente o sin permisos: disponibilidad desconocida,
+                # no se reporta (ni se cachea) como libre
+                logger.warning(
+                    f"getSchedule error for {mailbox}: {item['error'].get('message')}"
+                )
+                continue
+
+            busy = [
+                {
+                    "status": slot.get("status"),
+                    "start": slot.get("start", {}).get("dateTime"),
+                    "end": slot.get("end", {}).get("dateTime"),
+                }
+                for slot in item.get("scheduleItems", [])
+                if slot.get("status") != "free"
+            ]
+            schedules[mailbox] = busy
+            _free_busy_cache.set(
+                (mailbox, start_datetime, end_datetime, interval_minutes, timezone),
+                busy,
+            )
+
+    logger.info(f"Retrieved free/busy for {len(schedules)} mailboxes")
+    return schedules
@@ -0,0 +1,231 @@
+"""
+Export Service - Reportes de sesiones en CSV y Parquet
+
+Aplana cada sesión (con su verificación y la asistencia de estudiante y
+asesor) en una fila de columnas fijas y la serializa por lotes a medida
+que llega del cursor de MongoDB, de modo que la memoria usada depende
+del tamaño del lote y no del semestre exportado.
+
+Parquet requiere pyarrow (opcional); cada lote es un row group.
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from ..domain.entities import Session
+
+# (columna, tipo) en el orden del archivo
+EXPORT_COLUMNS = [
+    ("session_id", "string"),
+    ("request_id", "string"),
+    ("student_id", "string"),
+    ("advisor_id", "string"),
+    ("status", "string"),
+    ("meeting_platform", "string"),
+    ("scheduled_at", "timestamp"),
+    ("approved_by", "string"),
+    ("approved_at", "timestamp"),
+    ("completed_at", "timestamp"),
+    ("was_held", "bool"),
+    ("duration_minutes", "int"),
+    ("actual_start_time", "timestamp"),
+    ("actual_end_time", "timestamp"),
+    ("evidence_type", "string"),
+    ("has_manual_evidence", "bool"),
+    ("verified_by", "string"),
+    ("verified_at", "timestamp"),
+    ("verification_notes", "string"),
+    ("student_joined_at", "timestamp"),
+    ("student_left_at", "timestamp"),
+    ("student_minutes", "int"),
+    ("advisor_joined_at", "timestamp"),
+    ("advisor_left_at", "timestamp"),
+    ("advisor_minutes", "int"),
+    ("attendance_records", "int"),
+]
+COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+
+
+def flatten_session(session: Session) -> Dict[str, Any]:
+    """
+    Convierte una sesión en una fila del reporte.
+
+    La asistencia se resume por participante (primer ingreso, última
+    salida y minutos totales); `attendance_records` indica cuántos
+    registros había en total.
+    """
+    row: Dict[str, Any] = dict.fromkeys(COLUMN_NAMES)
+    row.update(
+        session_id=session.id,
+        request_id=session.request_id,
+        student_id=session.student_id,
+        advisor_id=session.advisor_id,
+        status=session.status.value,
+        meeting_platform=session.meeting_platform.value,
+        scheduled_at=session.scheduled_at,
+        approved_by=session.approved_by,
+        approved_at=session.approved_at,
+        completed_at=session.completed_at,
+    )
+
+    v = session.verification
+    if v is None:
+        return row
+
+    row.update(
+        was_held=v.was_held,
+        duration_minutes=v.duration_minutes,
+        actual_start_time=v.actual_start_time,
+        actual_end_time=v.actual_end_time,
+        evidence_type=v.evidence_type.value,
+        has_manual_evidence=bool(v.manual_evidence),
+        verified_by=v.verified_by,
+        verified_at=v.verified_at,
+        verification_notes=v.notes,
+        attendance_records=len(v.attendance),
+    )
+    for role, user_id in (
+        ("student", session.student_id),
+        ("advisor", session.advisor_id),
+    ):
+        records = [a for a in v.attendance if a.user_id == user_id]
+        if records:
+            row[f"{role}_joined_at"] = min(a.joined_at for a in records)
+            row[f"{role}_left_at"] = max(a.left_at for a in records)
+            row[f"{role}_minutes"] = sum(a.duration_minutes for a in records)
+    return row
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_csv(
+    sessions: AsyncIterator[Session], batch_rows: int = 1000
+) -> AsyncIterator[bytes]:
+    """
+    Genera el CSV por bloques de `batch_rows` filas.
+
+    El primer bloque lleva el BOM de UTF-8 para que Excel respete los
+    acentos.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("﻿")
+    writer.writerow(COLUMN_NAMES)
+    rows = 0
+    async for session in sessions:
+        row = flatten_session(session)
+        writer.writerow([_csv_value(row[name]) for name in COLUMN_NAMES])
+        rows += 1
+        if rows % batch_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que se drenan."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    """Si pyarrow está instalado."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "timestamp": pa.timestamp("ms"),
+        "bool": pa.bool_(),
+        "int": pa.int32(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+
+
+async def stream_parquet(
+    sessions: AsyncIterator[Session],
+    row_group_size: int = 10_000,
+    compression: str = "zstd",
+) -> AsyncIterator[bytes]:
+    """
+    Genera un archivo Parquet con un row group por cada lote de filas.
+
+    Cada row group se codifica en un hilo y sus bytes se emiten en
+    cuanto se escriben; el footer sale al final.
+
+    Raises:
+        RuntimeError: Si pyarrow no está instalado
+    """
+    if not parquet_available():
+        raise RuntimeError("pyarrow is required for Parquet exports")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+
+    def write_batch(batch: List[Dict[str, Any]]):
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+    batch: List[Dict[str, Any]] = []
+    async for session in sessions:
+        batch.append(flatten_session(session))
+        if len(batch) >= row_group_size:
+            await run_in_threadpool(write_batch, batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        await run_in_threadpool(write_batch, batch)
+    writer.close()
+    yield sink.drain()
+
+
+def export_filename(
+    extension: str,
+    scheduled_from: Optional[datetime] = None,
+    scheduled_to: Optional[datetime] = None,
+) -> str:
+    """Nombre de archivo del reporte según el rango exportado."""
+    parts = ["sesiones"]
+    if scheduled_from:
+        parts.append(scheduled_from.strftime("%Y%m%d"))
+    if scheduled_to:
+        parts.append(scheduled_to.strftime("%Y%m%d"))
+    return "_".join(parts) + f".{extension}"
@@ -0,0 +1,567 @@
+"""
+Graph Client - Acceso compartido a Microsoft Graph API
+Lecturas con coalescencia (single-flight), circuit breaker por familia
+de endpoints, reintentos ante throttling (429 + Retry-After), paginación
+y respaldo con datos obsoletos para calendar y teams
+"""
+
+import base64
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import requests
+
+from ..infrastructure.serialization import loads
+from ..observability.metrics import REGISTRY
+from ..observability.tracing import CLIENT, client_request_id, tracer
+from .cache import TTLCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Microsoft Graph API Base URL (configurable para apuntar a un stand-in local)
+GRAPH_API_BASE_URL = os.getenv(
+    "GRAPH_API_BASE_URL", "https://graph.microsoft.com/v1.0"
+).rstrip("/")
+
+
+# Headers for Graph API requests
+def get_headers(access_token: str, timezone: str = "UTC") -> Dict[str, str]:
+    """Get headers for Microsoft Graph API requests."""
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json",
+        "Prefer": f'outlook.timezone="{timezone}"',
+    }
+
+
+# ── Circuit breaker ──────────────────────────────────────────────────
+
+
+class CircuitOpenError(Exception):
+    """El circuito de la familia está abierto y no hay datos en caché."""
+
+    def __init__(self, family: str, retry_after: float):
+        super().__init__(
+            f"Microsoft Graph ({family}) no disponible; reintente en {retry_after:.0f}s"
+        )
+        self.family = family
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico: closed -> open -> half_open -> closed.
+
+    Tras `failure_threshold` fallos consecutivos el circuito se abre y las
+    llamadas fallan de inmediato durante `reset_timeout` segundos. Después
+    se permiten `half_open_max_calls` llamadas de prueba: si tienen éxito
+    el circuito se cierra, si fallan se vuelve a abrir.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def acquire(self) -> None:
+        """Pide permiso para llamar; lanza CircuitOpenError si no se permite."""
+        with self._lock:
+            if self._state == self.OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+                self._state = self.HALF_OPEN
+                self._probes = 0
+            if self._state == self.HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._probes += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"Circuit '{self.name}' opened after {self._failures} failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+        }
+
+
+# Familias de endpoints con breaker propio
+ENDPOINT_FAMILIES = ("calendar", "onlineMeetings", "attendanceReports")
+
+
+def endpoint_family(url: str) -> str:
+    """Clasifica una URL de Graph en su familia de endpoints."""
+    if "/attendanceReports" in url:
+        return "attendanceReports"
+    if "/onlineMeetings" in url:
+        return "onlineMeetings"
+    return "calendar"
+
+
+def _family_setting(family: str, name: str, default: str) -> str:
+    """Lee GRAPH_<FAMILIA>_<NOMBRE>, con GRAPH_<NOMBRE> como valor general."""
+    return os.getenv(
+        f"GRAPH_{family.upper()}_{name}", os.getenv(f"GRAPH_{name}", default)
+    )
+
+
+_breakers: Dict[str, CircuitBreaker] = {
+    family: CircuitBreaker(
+        family,
+        failure_threshold=int(_family_setting(family, "BREAKER_FAILURES", "5")),
+        reset_timeout=float(_family_setting(family, "BREAKER_RESET_SECONDS", "30")),
+    )
+    for family in ENDPOINT_FAMILIES
+}
+
+_timeouts: Dict[str, float] = {
+    family: float(_family_setting(family, "TIMEOUT_SECONDS", "30"))
+    for family in ENDPOINT_FAMILIES
+}
+
+# Tiempo máximo para establecer la conexión (la lectura usa el de la familia)
+GRAPH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("GRAPH_CONNECT_TIMEOUT_SECONDS", "5"))
+
+
+# Reintentos ante 429/503 respetando Retry-After (si no supera el máximo)
+GRAPH_MAX_RETRIES = int(os.getenv("GRAPH_MAX_RETRIES", "2"))
+GRAPH_MAX_RETRY_AFTER_SECONDS = float(os.getenv("GRAPH_MAX_RETRY_AFTER_SECONDS", "10"))
+# Límite de páginas al seguir @odata.nextLink
+GRAPH_MAX_PAGES = int(os.getenv("GRAPH_MAX_PAGES", "20"))
+
+_RETRYABLE_STATUS = (429, 503)
+# Un 503 puede llegar después de que Graph aplicó la escritura (p. ej. creó
+# la reunión): los métodos no idempotentes solo se reintentan ante 429
+_NON_IDEMPOTENT_METHODS = ("POST", "PATCH")
+_NON_IDEMPOTENT_RETRYABLE_STATUS = (429,)
+
+graph_request_duration = REGISTRY.histogram(
+    "peerhive_graph_request_duration_seconds",
+    "Duración de las llamadas a Microsoft Graph por familia y código HTTP.",
+    ("family", "method", "status"),
+)
+
+
+def retry_after_seconds(response: requests.Response, attempt: int) -> float:
+    """
+    Espera indicada por Graph en Retry-After (segundos o fecha HTTP).
+
+    Sin el header se usa un backoff exponencial: 1, 2, 4... segundos.
+    """
+    value = response.headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return float(2**attempt)
+
+
+def _is_breaker_failure(error: Exception) -> bool:
+    """Solo los errores del servicio (no los del cliente) abren el circuito."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def graph_request(
+    method: str,
+    access_token: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    json: Optional[Dict[str, Any]] = None,
+    timezone: str = "UTC",
+) -> requests.Response:
+    """
+    Llamada a Microsoft Graph protegida por el circuit breaker de su familia.
+
+    Reintenta 429 y 503 respetando Retry-After; POST y PATCH solo ante 429.
+
+    Raises:
+        CircuitOpenError: Si el circuito de la familia está abierto
+        requests.HTTPError: Si la API retorna un error
+    """
+    family = endpoint_family(url)
+    with tracer.start_as_current_span(
+        f"Graph {method} {family}",
+        kind=CLIENT,
+        attributes={"http.method": method, "http.url": url, "graph.family": family},
+    ) as span:
+        headers = get_headers(access_token, timezone)
+        # Correlaciona la llamada con la traza en los logs de Microsoft
+        headers["client-request-id"] = client_request_id(span)
+        headers["return-client-request-id"] = "true"
+
+        retryable = (
+            _NON_IDEMPOTENT_RETRYABLE_STATUS
+            if method.upper() in _NON_IDEMPOTENT_METHODS
+            else _RETRYABLE_STATUS
+        )
+        breaker = _breakers[family]
+        breaker.acquire()
+        try:
+            attempt = 0
+            while True:
+                response = _send(method, url, headers, params, json, family)
+                span.set_attribute("http.status_code", response.status_code)
+                span.set_attribute(
+                    "graph.request_id", response.headers.get("request-id")
+                )
+                if (
+                    response.status_code not in retryable
+                    or attempt >= GRAPH_MAX_RETRIES
+                ):
+                    break
+                wait = retry_after_seconds(response, attempt)
+                if wait > GRAPH_MAX_RETRY_AFTER_SECONDS:
+                    break
+                attempt += 1
+                span.set_attribute("graph.retries", attempt)
+                logger.warning(
+                    f"Graph {response.status_code} on {family}; "
+                    f"retry {attempt} in {wait:.1f}s"
+                )
+                time.sleep(wait)
+            response.raise_for_status()
+        except Exception as e:
+            if _is_breaker_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return response
+
+
+def _send(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    params: Optional[Dict[str, Any]],
+    json: Optional[Dict[str, Any]],
+    family: str,
+) -> requests.Response:
+    """Un intento HTTP contra Graph, medido por familia y código."""
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = requests.request(
+            method,
+            url,
+            headers=headers,
+            params=params,
+            json=json,
+            timeout=(GRAPH_CONNECT_TIMEOUT_SECONDS, _timeouts[family]),
+        )
+        status = str(response.status_code)
+        return response
+    finally:
+        graph_request_duration.observe(
+            time.perf_counter() - start, family, method, status
+        )
+
+
+# ── Datos obsoletos (stale-while-revalidate) ─────────────────────────
+
+# Última respuesta buena de cada lectura, servida mientras Graph falla
+GRAPH_STALE_TTL_SECONDS = float(os.getenv("GRAPH_STALE_TTL_SECONDS", "86400"))
+_last_good = TTLCache(ttl_seconds=GRAPH_STALE_TTL_SECONDS, max_entries=5_000)
+
+# Marcador por petición HTTP; el middleware lo crea y lo convierte en header
+_stale_marker: contextvars.ContextVar[Optional[Dict[str, float]]] = (
+    contextvars.ContextVar("graph_stale_marker", default=None)
+)
+
+
+def track_staleness() -> Dict[str, float]:
+    """
+    Crea el marcador de datos obsoletos para la petición actual.
+
+    Es un dict mutable: las lecturas que corren en el threadpool reciben
+    una copia del contexto, pero comparten el mismo objeto.
+    """
+    marker: Dict[str, float] = {}
+    _stale_marker.set(marker)
+    return marker
+
+
+def _mark_stale(age_seconds: float) -> None:
+    marker = _stale_marker.get()
+    if marker is not None:
+        marker["age"] = max(marker.get("age", 0.0), age_seconds)
+
+
+# ── Single-flight ────────────────────────────────────────────────────
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas idénticas concurrentes.
+
+    Mientras una llamada con cierta clave está en curso, las demás
+    llamadas con la misma clave esperan y reciben su mismo resultado
+    (o excepción). No es una caché: al terminar, la clave se libera.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.executions = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Ejecuta `fn` o se une a la ejecución en curso con la misma clave."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de coalescencia."""
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "coalesce_rate": coalesced / self.calls if self.calls else 0.0,
+            "in_flight": len(self._calls),
+        }
+
+
+_read_flight = SingleFlight()
+
+
+def token_user_key(access_token: str) -> str:
+    """
+    Identifica al usuario del token sin guardarlo en claro.
+
+    Usa el claim `oid` del token (se mantiene al renovarlo); si el token no
+    es un JWT legible, un hash del token.
+    """
+    try:
+        payload = access_token.split(".")[1]
+        claims = loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        if isinstance(claims.get("oid"), str) and claims["oid"]:
+            return claims["oid"]
+    except Exception:
+        pass
+    return hashlib.sha256(access_token.encode()).hexdigest()[:32]
+
+
+def graph_get(
+    access_token: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timezone: str = "UTC",
+    user_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    GET a Microsoft Graph con single-flight por (usuario, método, URL, params).
+
+    El resultado se comparte entre llamadas coalescidas: tratarlo como
+    de solo lectura. Si el circuito está abierto o Graph falla, se sirve
+    la última respuesta buena y se marca la petición como obsoleta.
+
+    El usuario es `user_key` (el id de la app) o, si no se indica, el de
+    token_user_key: la clave no cambia cuando se renueva el token.
+
+    Raises:
+        CircuitOpenError: Si el circuito está abierto y no hay caché
+        requests.HTTPError: Si la API retorna un error
+    """
+    key = (
+        user_key or token_user_key(access_token),
+        "GET",
+        url,
+        tuple(sorted((params or {}).items())),
+        timezone,
+    )
+
+    def fetch():
+        response = graph_request(
+            "GET", access_token, url, params=params, timezone=timezone
+        )
+        data = loads(response.content)
+        _last_good.set(key, (time.time(), data))
+        return data
+
+    try:
+        return _read_flight.do(key, fetch)
+    except Exception as e:
+        if not isinstance(e, CircuitOpenError) and not _is_breaker_failure(e):
+            raise
+        cached = _last_good.get(key)
+        if cached is None:
+            raise
+        fetched_at, data = cached
+        logger.warning(f"Serving stale Graph data for {url}: {str(e)}")
+        _mark_stale(time.time() - fetched_at)
+        return data
+
+
+def graph_get_all(
+    access_token: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timezone: str = "UTC",
+    max_pages: Optional[int] = None,
+    user_key: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Lee una colección de Graph siguiendo `@odata.nextLink`.
+
+    Cada página pasa por graph_get (single-flight y respaldo obsoleto).
+    El nextLink ya incluye los parámetros de la consulta.
+
+    Returns:
+        Los elementos de `value` de todas las páginas, hasta `max_pages`
+    """
+    max_pages = max_pages or GRAPH_MAX_PAGES
+    items: List[Dict[str, Any]] = []
+    next_url: Optional[str] = url
+    page_params = params
+    for _ in range(max_pages):
+        data = graph_get(
+            access_token,
+            next_url,
+            params=page_params,
+            timezone=timezone,
+            user_key=user_key,
+        )
+        items.extend(data.get("value", []))
+        next_url = data.get("@odata.nextLink")
+        page_params = None
+        if not next_url:
+            break
+    else:
+        if next_url:
+            logger.warning(f"Stopped paging {url} after {max_pages} pages")
+    return items
+
+
+def graph_stats() -> Dict[str, Any]:
+    """Estadísticas del cliente de Graph."""
+    return {
+        "singleflight": _read_flight.stats(),
+        "circuit_breakers": {
+            family: breaker.stats() for family, breaker in _breakers.items()
+        },
+        "stale_cache_entries": len(_last_good),
+    }
+
+
+_BREAKER_STATE_VALUES = {
+    CircuitBreaker.CLOSED: 0,
+    CircuitBreaker.HALF_OPEN: 1,
+    CircuitBreaker.OPEN: 2,
+}
+
+
+def _collect_graph_metrics():
+    """Colector de /metrics para single-flight y circuit breakers."""
+    flight = _read_flight.stats()
+    yield "# HELP peerhive_graph_singleflight_calls_total Lecturas de Graph solicitadas."
+    yield "# TYPE peerhive_graph_singleflight_calls_total counter"
+    yield f"peerhive_graph_singleflight_calls_total {flight['calls']}"
+    yield "# HELP peerhive_graph_singleflight_coalesced_total Lecturas coalescidas en otra en curso."
+    yield "# TYPE peerhive_graph_singleflight_coalesced_total counter"
+    yield f"peerhive_graph_singleflight_coalesced_total {flight['coalesced']}"
+    yield "# HELP peerhive_graph_circuit_state Estado del circuito (0=closed, 1=half_open, 2=open)."
+    yield "# TYPE peerhive_graph_circuit_state gauge"
+    for family, breaker in _breakers.items():
+        state = _BREAKER_STATE_VALUES[breaker.state]
+        yield f'peerhive_graph_circuit_state{{family="{family}"}} {state}'
+
+
+REGISTRY.register_collector(_collect_graph_metrics)
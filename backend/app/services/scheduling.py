@@ -0,0 +1,484 @@
+"""
+Scheduling Service - Detección de conflictos de horario
+Índice de intervalos por participante para sesiones de asesoría
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from ..domain.entities import Session, SessionStatusEnum
+from ..domain.repositories import SessionRepositoryPort
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Duración asumida de una sesión (Session no guarda hora de fin)
+DEFAULT_SESSION_DURATION = timedelta(minutes=60)
+
+# Vigencia del índice de un participante: acota cuánto tarda en verse una
+# sesión creada o cancelada por otro worker
+SCHEDULE_INDEX_TTL_SECONDS = float(os.getenv("SCHEDULE_INDEX_TTL_SECONDS", "60"))
+
+# Sesiones que no ocupan el horario del participante
+_INACTIVE_STATUSES = {SessionStatusEnum.CANCELLED}
+
+
+class Interval(NamedTuple):
+    """Intervalo semiabierto [start, end) ocupado en la agenda."""
+
+    start: datetime
+    end: datetime
+    source: str  # "session" | "calendar"
+    ref: Optional[str] = None  # ID de la sesión o del evento de Outlook
+
+
+# ── Árbol de intervalos ──────────────────────────────────────────────
+
+
+class _Node:
+    __slots__ = ("interval", "max_end", "height", "left", "right")
+
+    def __init__(self, interval: Interval):
+        self.interval = interval
+        self.max_end = interval.end
+        self.height = 1
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+
+def _key(interval: Interval) -> tuple:
+    return (interval.start, interval.end, interval.source, interval.ref or "")
+
+
+def _height(node: Optional[_Node]) -> int:
+    return node.height if node else 0
+
+
+def _update(node: _Node) -> None:
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_end = node.interval.end
+    if node.left and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node: _Node) -> _Node:
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node: _Node) -> _Node:
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rebalance(node: _Node) -> _Node:
+    _update(node)
+    balance = _height(node.left) - _height(node.right)
+    if balance > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+class IntervalTree:
+    """
+    Árbol de intervalos aumentado sobre un AVL.
+
+    Cada nodo guarda el fin máximo de su subárbol, lo que permite
+    responder consultas de traslape en O(log n + k).
+    """
+
+    def __init__(self, intervals: Optional[List[Interval]] = None):
+        self._root: Optional[_Node] = None
+        self._size = 0
+        if intervals:
+            # Construcción balanceada en O(n log n) a partir de la lista ordenada
+            ordered = sorted(intervals, key=_key)
+            for interval in ordered:
+                if interval.end <= interval.start:
+                    raise ValueError("El intervalo debe terminar después de iniciar")
+            self._root = self._build(ordered, 0, len(ordered))
+            self._size = len(ordered)
+
+    def _build(self, ordered: List[Interval], lo: int, hi: int) -> Optional[_Node]:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = _Node(ordered[mid])
+        node.left = self._build(ordered, lo, mid)
+        node.right = self._build(ordered, mid + 1, hi)
+        _update(node)
+        return node
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Interval]:
+        """Recorre los intervalos ordenados por inicio."""
+        stack: List[_Node] = []
+        node = self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.interval
+            node = node.right
+
+    def insert(self, interval: Interval) -> None:
+        """Inserta un intervalo."""
+        if interval.end <= interval.start:
+            raise ValueError("El intervalo debe terminar después de iniciar")
+        self._root = self._insert(self._root, interval)
+        self._size += 1
+
+    def _insert(self, node: Optional[_Node], interval: Interval) -> _Node:
+        if node is None:
+            return _Node(interval)
+        if _key(interval) < _key(node.interval):
+            node.left = self._insert(node.left, interval)
+        else:
+            node.right = self._insert(node.right, interval)
+        return _rebalance(node)
+
+    def remove(self, interval: Interval) -> bool:
+        """Elimina un intervalo. Retorna False si no existe."""
+        self._root, removed = self._remove(self._root, interval)
+        if removed:
+            self._size -= 1
+        return removed
+
+    def _remove(
+        self, node: Optional[_Node], interval: Interval
+    ) -> Tuple[Optional[_Node], bool]:
+        if node is None:
+            return None, False
+        if interval == node.interval:
+            if node.left is None:
+                return node.right, True
+            if node.right is None:
+                return node.left, True
+            successor = node.right
+            while successor.left:
+                successor = successor.left
+            node.interval = successor.interval
+            node.right, _ = self._remove(node.right, successor.interval)
+            return _rebalance(node), True
+        if _key(interval) < _key(node.interval):
+            node.left, removed = self._remove(node.left, interval)
+        else:
+            node.right, removed = self._remove(node.right, interval)
+        return _rebalance(node), removed
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Retorna los intervalos que traslapan [start, end), ordenados por inicio."""
+        result: List[Interval] = []
+        stack: List[_Node] = []
+        node = self._root
+        while stack or node:
+            # Descender por la izquierda mientras el subárbol pueda traslapar
+            while node and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.interval.start >= end:
+                # Todo lo que queda a la derecha inicia después de la ventana
+                break
+            if node.interval.end > start:
+                result.append(node.interval)
+            node = node.right
+        return result
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """Indica si algún intervalo traslapa [start, end)."""
+        node = self._root
+        while node:
+            if node.interval.start < end and node.interval.end > start:
+                return True
+            if node.left and node.left.max_end > start:
+                node = node.left
+            else:
+                if node.interval.start >= end:
+                    return False
+                node = node.right
+        return False
+
+
+# ── Utilidades de huecos libres ──────────────────────────────────────
+
+
+def merge_busy(
+    intervals: List[Tuple[datetime, datetime]],
+) -> List[Tuple[datetime, datetime]]:
+    """Fusiona intervalos ocupados (ordenados o no) en bloques disjuntos."""
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_gaps(
+    busy: List[Tuple[datetime, datetime]],
+    window_start: datetime,
+    window_end: datetime,
+    min_duration: timedelta = timedelta(0),
+) -> List[Tuple[datetime, datetime]]:
+    """Calcula los huecos libres de la ventana dados bloques ocupados."""
+    gaps: List[Tuple[datetime, datetime]] = []
+    cursor = window_start
+    for start, end in merge_busy(busy):
+        if end <= window_start:
+            continue
+        if start >= window_end:
+            break
+        if start - cursor >= min_duration and start > cursor:
+            gaps.append((cursor, start))
+        if end > cursor:
+            cursor = end
+    if window_end - cursor >= min_duration and window_end > cursor:
+        gaps.append((cursor, window_end))
+    return gaps
+
+
+def _parse_graph_datetime(value: Dict[str, Any]) -> Optional[datetime]:
+    """Convierte un dateTimeTimeZone de Graph a datetime (sin zona)."""
+    raw = (value or {}).get("dateTime")
+    if not raw:
+        return None
+    # Graph retorna fracciones de 7 dígitos: "2024-05-01T10:00:00.0000000"
+    return datetime.fromisoformat(raw.split(".")[0])
+
+
+def to_schedule_time(value: datetime, timezone: str) -> datetime:
+    """
+    Lleva una fecha a la hora local sin zona de `timezone`.
+
+    Los bloques de getSchedule llegan sin zona en la de la petición; una
+    fecha con zona (p. ej. `...+00:00`) se convierte para poder
+    compararlas. Las fechas sin zona se asumen ya en `timezone`.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(ZoneInfo(timezone)).replace(tzinfo=None)
+
+
+def schedule_busy_blocks(
+    items: List[Dict[str, Any]],
+) -> List[Tuple[datetime, datetime]]:
+    """Convierte los bloques ocupados de services.calendar.get_schedule."""
+    blocks = []
+    for item in items:
+        start = _parse_graph_datetime({"dateTime": item.get("start")})
+        end = _parse_graph_datetime({"dateTime": item.get("end")})
+        if start and end and end > start:
+            blocks.append((start, end))
+    return blocks
+
+
+# ── Servicio de agenda ───────────────────────────────────────────────
+
+
+class SchedulingService:
+    """
+    Servicio de agenda para detectar conflictos entre sesiones.
+
+    Mantiene un árbol de intervalos por participante (asesor o estudiante),
+    construido a partir del repositorio de sesiones y, opcionalmente,
+    de los eventos del calendario de Outlook. Cada árbol se reconstruye
+    al cumplir `index_ttl` segundos, porque otros workers también
+    escriben sesiones.
+    """
+
+    def __init__(
+        self,
+        session_repository: SessionRepositoryPort,
+        session_duration: timedelta = DEFAULT_SESSION_DURATION,
+        index_ttl: float = SCHEDULE_INDEX_TTL_SECONDS,
+    ):
+        self.session_repository = session_repository
+        self.session_duration = session_duration
+        self.index_ttl = index_ttl
+        self._trees: Dict[str, Tuple[float, IntervalTree]] = {}
+
+    def _session_interval(self, session: Session) -> Interval:
+        return Interval(
+            session.scheduled_at,
+            session.scheduled_at + self.session_duration,
+            "session",
+            session.id,
+        )
+
+    async def _tree_for(self, participant_id: str) -> IntervalTree:
+        """Obtiene (o construye) el índice de un participante."""
+        tree = self._cached(participant_id)
+        if tree is not None:
+            return tree
+
+        sessions = await self.session_repository.list_by_advisor(participant_id)
+        sessions += await self.session_repository.list_by_student(participant_id)
+
+        intervals = {
+            session.id: self._session_interval(session)
+            for session in sessions
+            if session.status not in _INACTIVE_STATUSES
+        }
+        tree = IntervalTree(list(intervals.values()))
+
+        logger.info(f"Built schedule index for {participant_id}: {len(tree)} intervals")
+        self._trees[participant_id] = (time.monotonic() + self.index_ttl, tree)
+        return tree
+
+    def _cached(self, participant_id: str) -> Optional[IntervalTree]:
+        """Índice vigente de un participante, o None si hay que construirlo."""
+        entry = self._trees.get(participant_id)
+        if entry is None:
+            return None
+        expires_at, tree = entry
+        if time.monotonic() >= expires_at:
+            del self._trees[participant_id]
+            return None
+        return tree
+
+    def invalidate(self, participant_id: str) -> None:
+        """Descarta el índice de un participante para reconstruirlo."""
+        self._trees.pop(participant_id, None)
+
+    def add_session(self, session: Session) -> None:
+        """Registra una sesión nueva en los índices ya construidos."""
+        if session.status in _INACTIVE_STATUSES:
+            return
+        interval = self._session_interval(session)
+        for participant_id in (session.advisor_id, session.student_id):
+            tree = self._cached(participant_id)
+            if tree is not None:
+                tree.insert(interval)
+
+    def remove_session(self, session: Session) -> None:
+        """Quita una sesión (cancelada o eliminada) de los índices."""
+        interval = self._session_interval(session)
+        for participant_id in (session.advisor_id, session.student_id):
+            tree = self._cached(participant_id)
+            if tree is not None:
+                tree.remove(interval)
+
+    async def add_calendar_events(
+        self, participant_id: str, events: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Refleja eventos de Outlook (formato de Graph) en el índice.
+
+        Args:
+            participant_id: ID del participante dueño del calendario
+            events: Eventos retornados por services.calendar.get_calendar_events
+
+        Returns:
+            Número de eventos agregados
+        """
+        tree = await self._tree_for(participant_id)
+        added = 0
+        for event in events:
+            if event.get("isCancelled") or event.get("showAs") == "free":
+                continue
+            start = _parse_graph_datetime(event.get("start"))
+            end = _parse_graph_datetime(event.get("end"))
+            if start and end and end > start:
+                tree.insert(Interval(start, end, "calendar", event.get("id")))
+                added += 1
+        return added
+
+    async def find_conflicts(
+        self, participant_ids: List[str], start: datetime, end: datetime
+    ) -> Dict[str, List[Interval]]:
+        """
+        Busca los intervalos que traslapan [start, end) para cada participante.
+
+        Returns:
+            Dict participante -> intervalos en conflicto (solo los que tienen)
+        """
+        conflicts = {}
+        for participant_id in participant_ids:
+            tree = await self._tree_for(participant_id)
+            found = tree.overlapping(start, end)
+            if found:
+                conflicts[participant_id] = found
+        return conflicts
+
+    async def is_available(
+        self, participant_id: str, start: datetime, end: datetime
+    ) -> bool:
+        """Indica si el participante está libre en [start, end)."""
+        tree = await self._tree_for(participant_id)
+        return not tree.overlaps(start, end)
+
+    async def free_slots(
+        self,
+        participant_id: str,
+        window_start: datetime,
+        window_end: datetime,
+        min_duration: Optional[timedelta] = None,
+    ) -> List[Tuple[datetime, datetime]]:
+        """Retorna los huecos libres del participante dentro de la ventana."""
+        tree = await self._tree_for(participant_id)
+        busy = [(i.start, i.end) for i in tree.overlapping(window_start, window_end)]
+        return free_gaps(
+            busy, window_start, window_end, min_duration or self.session_duration
+        )
+
+    async def suggest_slots(
+        self,
+        student_id: str,
+        advisor_id: str,
+        window_start: datetime,
+        window_end: datetime,
+        duration: Optional[timedelta] = None,
+        limit: int = 5,
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Sugiere los primeros horarios libres en común para estudiante y asesor.
+
+        Returns:
+            Lista de hasta `limit` pares (inicio, fin) de la duración pedida
+        """
+        duration = duration or self.session_duration
+        busy = []
+        for participant_id in (student_id, advisor_id):
+            tree = await self._tree_for(participant_id)
+            busy += [
+                (i.start, i.end) for i in tree.overlapping(window_start, window_end)
+            ]
+
+        slots = []
+        for gap_start, gap_end in free_gaps(busy, window_start, window_end, duration):
+            slot_start = gap_start
+            while slot_start + duration <= gap_end:
+                slots.append((slot_start, slot_start + duration))
+                if len(slots) >= limit:
+                    return slots
+                slot_start += duration
+        return slots
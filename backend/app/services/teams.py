@@ -9,23 +9,13 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from pydantic import BaseModel
 
+from ..infrastructure.serialization import loads
+from .graph import GRAPH_API_BASE_URL, graph_get, graph_get_all, graph_request
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Microsoft Graph API Base URL
-GRAPH_API_BASE_URL = "https://graph.microsoft.com/v1.0"
-
-
-# Headers for Graph API requests
-def get_headers(access_token: str, timezone: str = "UTC") -> Dict[str, str]:
-    """Get headers for Microsoft Graph API requests."""
-    return {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-        "Prefer": f'outlook.timezone="{timezone}"',
-    }
-
 
 # Pydantic Models for Teams API
 class AttendanceRecord(BaseModel):
@@ -55,16 +45,22 @@ def create_teams_meeting(
     start_time: str,
     end_time: str,
     participants: Optional[List[Dict[str, str]]] = None,
+    external_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Crea una reunión de Microsoft Teams.
 
+    Con `external_id` usa `createOrGet`: repetir la llamada (un reintento
+    del job tras un error ambiguo) retorna la misma reunión en lugar de
+    crear otra.
+
     Args:
         access_token: Token de acceso de Microsoft Graph
         subject: Título de la reunión
         start_time: Fecha/hora de inicio (formato ISO 8601: YYYY-MM-DDTHH:MM:SS)
         end_time: Fecha/hora de fin (formato ISO 8601: YYYY-MM-DDTHH:MM:SS)
         participants: Lista de participantes [{'email': 'email@example.com', 'role': 'attendee|presenter'}]
+        external_id: ID propio de la reunión (p. ej. el de la sesión)
 
     Returns:
         Dict con los datos de la reunión creada (joinUrl, meetingId, audioConferencing info)
@@ -82,6 +78,10 @@ def create_teams_meeting(
         "lobbyBypassSettings": {"scope": "organization", "isDialInBypassEnabled": True},
     }
 
+    if external_id:
+        url = f"{url}/createOrGet"
+        meeting_data["externalId"] = external_id
+
     # Agregar participantes si se proporcionan
     if participants:
         attendee_list = []
@@ -97,12 +97,9 @@ def create_teams_meeting(
     logger.info(f"Creating Teams meeting: {subject}")
 
     try:
-        response = requests.post(
-            url, headers=get_headers(access_token), json=meeting_data, timeout=30
-        )
-        response.raise_for_status()
+        response = graph_request("POST", access_token, url, json=meeting_data)
 
-        meeting = response.json()
+        meeting = loads(response.content)
         logger.info(f"Teams meeting created successfully: {meeting.get('id')}")
 
         # Extraer información relevante
@@ -128,13 +125,16 @@ def create_teams_meeting(
         raise
 
 
-def get_meeting(access_token: str, meeting_id: str) -> Dict[str, Any]:
+def get_meeting(
+    access_token: str, meeting_id: str, user_key: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Obtiene los detalles de una reunión de Teams específica.
 
     Args:
         access_token: Token de acceso de Microsoft Graph
         meeting_id: ID de la reunión de Teams
+        user_key: Usuario para la caché de lecturas (por defecto, el del token)
 
     Returns:
         Dict con los datos de la reunión
@@ -147,10 +147,7 @@ def get_meeting(access_token: str, meeting_id: str) -> Dict[str, Any]:
     logger.info(f"Fetching Teams meeting: {meeting_id}")
 
     try:
-        response = requests.get(url, headers=get_headers(access_token), timeout=30)
-        response.raise_for_status()
-
-        meeting = response.json()
+        meeting = graph_get(access_token, url, user_key=user_key)
         logger.info(f"Retrieved Teams meeting: {meeting_id}")
 
         return {
@@ -176,7 +173,7 @@ def get_meeting(access_token: str, meeting_id: str) -> Dict[str, Any]:
 
 
 def get_meeting_attendance_report(
-    access_token: str, meeting_id: str
+    access_token: str, meeting_id: str, user_key: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Obtiene los reportes de asistencia de una reunión de Teams.
@@ -184,6 +181,7 @@ def get_meeting_attendance_report(
     Args:
         access_token: Token de acceso de Microsoft Graph
         meeting_id: ID de la reunión de Teams
+        user_key: Usuario para la caché de lecturas (por defecto, el del token)
 
     Returns:
         Lista de reportes de asistencia
@@ -196,11 +194,7 @@ def get_meeting_attendance_report(
     logger.info(f"Fetching attendance reports for meeting: {meeting_id}")
 
     try:
-        response = requests.get(url, headers=get_headers(access_token), timeout=30)
-        response.raise_for_status()
-
-        data = response.json()
-        reports = data.get("value", [])
+        reports = graph_get_all(access_token, url, user_key=user_key)
 
         logger.info(f"Retrieved {len(reports)} attendance reports")
 
@@ -225,8 +219,70 @@ def get_meeting_attendance_report(
         raise
 
 
+def parse_attendance_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normaliza un reporte de asistencia de Graph (función pura, sin E/S).
+
+    Args:
+        report: Reporte tal como lo retorna Graph (con attendanceRecords)
+
+    Returns:
+        Dict con los datos del reporte y un registro por participante
+    """
+    attendance_records = []
+    for record in report.get("attendanceRecords", []):
+        # Extraer información del participante
+        identity = record.get("identity", {})
+        email = ""
+        display_name = ""
+
+        if identity.get("user"):
+            email = (
+                identity.get("user", {}).get("mail")
+                or identity.get("user", {}).get("userPrincipalName")
+                or identity.get("user", {}).get("id", "")
+            )
+            display_name = identity.get("user", {}).get("displayName", "")
+
+        # Obtener tiempos de entrada y salida
+        attendance_intervals = record.get("attendanceIntervalRecords", [])
+        join_time = None
+        leave_time = None
+
+        if attendance_intervals:
+            first_interval = attendance_intervals[0]
+            join_time = first_interval.get("joinDateTime")
+            leave_time = (
+                attendance_intervals[-1].get("leaveDateTime")
+                if len(attendance_intervals) > 1
+                else first_interval.get("leaveDateTime")
+            )
+
+        attendance_records.append(
+            {
+                "participant_id": record.get("id", ""),
+                "display_name": display_name,
+                "email": email,
+                "join_time": join_time,
+                "leave_time": leave_time,
+                "attendance_time": join_time,  # Primer tiempo de entrada
+                "role": record.get("role", "attendee"),
+            }
+        )
+
+    return {
+        "report_id": report.get("id"),
+        "meeting_id": report.get("meetingId"),
+        "total_participant_count": report.get("totalParticipantCount"),
+        "attendance_records": attendance_records,
+    }
+
+
 def get_attendance_report_details(
-    access_token: str, meeting_id: str, report_id: str
+    access_token: str,
+    meeting_id: str,
+    report_id: str,
+    user_key: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Obtiene los detalles del reporte de asistencia de una reunión de Teams.
@@ -235,6 +291,7 @@ def get_attendance_report_details(
         access_token: Token de acceso de Microsoft Graph
         meeting_id: ID de la reunión de Teams
         report_id: ID del reporte de asistencia
+        user_key: Usuario para la caché de lecturas (por defecto, el del token)
 
     Returns:
         Dict con los detalles del reporte de asistencia
@@ -249,60 +306,10 @@ def get_attendance_report_details(
     )
 
     try:
-        response = requests.get(url, headers=get_headers(access_token), timeout=30)
-        response.raise_for_status()
-
-        report = response.json()
+        report = graph_get(access_token, url, user_key=user_key)
         logger.info(f"Retrieved attendance report details: {report_id}")
 
-        # Procesar los registros de asistencia
-        attendance_records = []
-        for record in report.get("attendanceRecords", []):
-            # Extraer información del participante
-            identity = record.get("identity", {})
-            email = ""
-            display_name = ""
-
-            if identity.get("user"):
-                email = (
-                    identity.get("user", {}).get("mail")
-                    or identity.get("user", {}).get("userPrincipalName")
-                    or identity.get("user", {}).get("id", "")
-                )
-                display_name = identity.get("user", {}).get("displayName", "")
-
-            # Obtener tiempos de entrada y salida
-            attendance_intervals = record.get("attendanceIntervalRecords", [])
-            join_time = None
-            leave_time = None
-
-            if attendance_intervals:
-                first_interval = attendance_intervals[0]
-                join_time = first_interval.get("joinDateTime")
-                leave_time = (
-                    attendance_intervals[-1].get("leaveDateTime")
-                    if len(attendance_intervals) > 1
-                    else first_interval.get("leaveDateTime")
-                )
-
-            attendance_records.append(
-                {
-                    "participant_id": record.get("id", ""),
-                    "display_name": display_name,
-                    "email": email,
-                    "join_time": join_time,
-                    "leave_time": leave_time,
-                    "attendance_time": join_time,  # Primer tiempo de entrada
-                    "role": record.get("role", "attendee"),
-                }
-            )
-
-        return {
-            "report_id": report.get("id"),
-            "meeting_id": report.get("meetingId"),
-            "total_participant_count": report.get("totalParticipantCount"),
-            "attendance_records": attendance_records,
-        }
+        return parse_attendance_report(report)
 
     except requests.HTTPError as e:
         logger.error(
@@ -315,7 +322,9 @@ def get_attendance_report_details(
 
 
 def list_teams_meetings(
-    access_token: str, filter_query: Optional[str] = None
+    access_token: str,
+    filter_query: Optional[str] = None,
+    user_key: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Lista las reuniones de Teams del usuario.
@@ -323,6 +332,7 @@ def list_teams_meetings(
     Args:
         access_token: Token de acceso de Microsoft Graph
         filter_query: Query filter adicional (opcional)
+        user_key: Usuario para la caché de lecturas (por defecto, el del token)
 
     Returns:
         Lista de reuniones de Teams
@@ -340,13 +350,7 @@ def list_teams_meetings(
     logger.info("Fetching Teams meetings")
 
     try:
-        response = requests.get(
-            url, headers=get_headers(access_token), params=params, timeout=30
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        meetings = data.get("value", [])
+        meetings = graph_get_all(access_token, url, params=params, user_key=user_key)
 
         logger.info(f"Retrieved {len(meetings)} Teams meetings")
         return meetings
@@ -0,0 +1,144 @@
+"""
+Thumbnails Service - Miniaturas y vistas previas de evidencias
+
+Las imágenes subidas (kardex, credenciales, capturas de `manualEvidence`)
+se reducen en un pool de procesos a dos versiones JPEG que se guardan
+junto al original: `thumb` para las listas de revisión y `preview` para
+el detalle. La generación corre como trabajo de la cola (`jobs`), fuera
+de la petición de subida.
+
+Requiere Pillow; se importa solo dentro de los procesos del pool.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from ..infrastructure.file_storage import FileStorage
+from ..observability.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor en píxeles y calidad JPEG de cada versión
+RENDITIONS: Dict[str, Dict[str, int]] = {
+    "thumb": {"max_side": 320, "quality": 70},
+    "preview": {"max_side": 1600, "quality": 82},
+}
+
+rendition_duration = REGISTRY.histogram(
+    "peerhive_rendition_duration_seconds",
+    "Tiempo de generación de cada versión reducida de una imagen.",
+    ("rendition",),
+)
+renditions_generated = REGISTRY.counter(
+    "peerhive_renditions_generated_total",
+    "Versiones reducidas generadas por resultado.",
+    ("rendition", "outcome"),
+)
+rendition_bytes = REGISTRY.counter(
+    "peerhive_rendition_bytes_total",
+    "Bytes leídos de originales y escritos en versiones reducidas.",
+    ("kind",),
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def init_pool(workers: int) -> None:
+    """Crea el pool de procesos de redimensionado."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+
+
+def shutdown_pool() -> None:
+    """Cierra el pool de procesos (al apagar la aplicación)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def render_rendition(
+    source_path: str, dest_path: str, max_side: int, quality: int
+) -> Dict[str, int]:
+    """
+    Genera una versión JPEG reducida de una imagen.
+
+    Corre en un proceso del pool. Para JPEG usa `draft` para decodificar
+    directamente a una escala menor, lo que evita expandir el original
+    completo en memoria.
+
+    Args:
+        source_path: Imagen original
+        dest_path: Ruta de la versión reducida
+        max_side: Lado mayor en píxeles
+        quality: Calidad JPEG
+
+    Returns:
+        Ancho, alto y bytes de la versión generada
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+        tmp_path = f"{dest_path}.tmp-{os.getpid()}"
+        image.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+        width, height = image.size
+    os.replace(tmp_path, dest_path)
+    return {"width": width, "height": height, "bytes": os.path.getsize(dest_path)}
+
+
+async def generate_renditions(
+    storage: FileStorage, file_id: str, renderer=render_rendition
+) -> Dict[str, Any]:
+    """
+    Genera las versiones que falten de una imagen guardada.
+
+    Args:
+        storage: Almacenamiento de archivos
+        file_id: SHA-256 del original
+        renderer: Función ejecutada en el pool (reemplazable en pruebas)
+
+    Returns:
+        Resultado por versión (`skipped` si ya existía)
+
+    Raises:
+        LookupError: Si el archivo no existe
+    """
+    stored = storage.metadata(file_id)
+    if stored is None:
+        raise LookupError(f"File {file_id} not found")
+
+    loop = asyncio.get_running_loop()
+    source = storage.path(file_id)
+    results: Dict[str, Any] = {}
+    for name, options in RENDITIONS.items():
+        dest = storage.rendition_path(file_id, name)
+        if os.path.exists(dest):
+            results[name] = "skipped"
+            continue
+
+        start = time.perf_counter()
+        try:
+            results[name] = await loop.run_in_executor(
+                _pool, renderer, source, dest, options["max_side"], options["quality"]
+            )
+        except Exception:
+            renditions_generated.inc(name, "error")
+            raise
+        rendition_duration.observe(time.perf_counter() - start, name)
+        renditions_generated.inc(name, "ok")
+        rendition_bytes.inc("source", amount=stored.size)
+        rendition_bytes.inc("rendition", amount=results[name]["bytes"])
+
+    logger.info(f"Renditions for {file_id}: {results}")
+    return results
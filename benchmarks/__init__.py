@@ -0,0 +1,22 @@
+"""
+Benchmarks de PeerHive.
+
+Se ejecutan bajo demanda desde la raíz del repositorio:
+
+    python -m benchmarks                    # todas las suites
+    python -m benchmarks micro macro        # suites específicas
+    python -m benchmarks micro --compare benchmarks/results/micro-<fecha>.json
+
+Cada suite guarda sus resultados como JSON en benchmarks/results/; con
+--compare se marcan las regresiones respecto a una corrida anterior y el
+proceso termina con código 1 si hay alguna.
+
+graph_standin.py es un servidor local que imita Microsoft Graph (latencia,
+paginación, $batch, delta, 429 y fallas inyectadas) para pruebas de carga:
+
+    uvicorn benchmarks.graph_standin:app --port 8900
+
+dataset.py genera y siembra en MongoDB un dataset sintético grande y
+sesgado (1M solicitudes, 200k sesiones, 50k usuarios) que la suite
+`repositories` usa para medir los repositorios a escala.
+"""
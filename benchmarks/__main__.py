@@ -0,0 +1,75 @@
+"""
+Punto de entrada de los benchmarks: `python -m benchmarks [suite ...]`.
+
+`repositories` siembra y mide un MongoDB real, así que solo corre si se
+nombra explícitamente.
+"""
+
+import argparse
+import importlib
+import sys
+
+from .harness import compare, load_results, save_results
+
+SUITES = {
+    "micro": "benchmarks.bench_micro",
+    "macro": "benchmarks.bench_macro",
+    "scheduling": "benchmarks.bench_scheduling",
+    "repositories": "benchmarks.bench_repositories",
+}
+# Sin argumentos no corren las suites que necesitan un MongoDB dedicado
+DEFAULT_SUITES = ("micro", "macro", "scheduling")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de PeerHive")
+    parser.add_argument(
+        "suites",
+        nargs="*",
+        help=f"Suites a ejecutar ({', '.join(SUITES)}); "
+        f"por defecto {', '.join(DEFAULT_SUITES)}",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        help="JSON de una corrida anterior de la misma suite",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Empeoramiento relativo considerado regresión (default 0.10)",
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help="No guardar los resultados"
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Suite desconocida: {', '.join(sorted(unknown))}")
+
+    regressions = 0
+    for suite in args.suites or DEFAULT_SUITES:
+        results = importlib.import_module(SUITES[suite]).run()
+        print(f"\n== {suite} ==")
+        for row in results:
+            print(
+                f"  {row.get('name', '?'):<55} {row.get('value')} {row.get('unit', '')}"
+            )
+        if not args.no_save:
+            print(f"  -> {save_results(suite, results)}")
+
+        if args.compare:
+            for row in compare(load_results(args.compare), results, args.threshold):
+                flag = "REGRESSION" if row["regression"] else ""
+                print(
+                    f"  {row['name']:<55} {row['baseline']} -> {row['current']} "
+                    f"{row['unit']} ({row['change']:+.1%}) {flag}"
+                )
+                regressions += row["regression"]
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+Microbenchmarks de los caminos calientes del backend.
+
+Cubre la conversión documento <-> entidad de cada repositorio, JWT,
+cifrado Fernet de tokens de Graph, bcrypt, el parseo de reportes de
+asistencia, la serialización JSON (stdlib frente a orjson), la
+validación de los modelos de Pydantic con ObjectId y el hub de chat
+por WebSocket (memoria por conexión y fan-out).
+
+    python -m benchmarks micro
+"""
+
+import json
+from dataclasses import asdict
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from bson import ObjectId
+
+from backend.app.domain.entities import (
+    MeetingPlatformEnum,
+    Request,
+    RoleEnum,
+    Session,
+    SessionStatusEnum,
+    User,
+    Verification,
+)
+from backend.app.infrastructure.repositories import (
+    RequestRepository,
+    SessionRepository,
+    UserRepository,
+)
+from backend.app.services.teams import parse_attendance_report
+from backend.app.infrastructure.serialization import FastJSONResponse, loads
+
+from .fakes import attendance_report, calendar_events
+from .harness import measure
+
+
+def _repository_benchmarks() -> list:
+    database = MagicMock()
+    now = datetime(2026, 3, 2, 10, 0)
+    user = User(
+        id=str(ObjectId()),
+        name="Ana Pérez",
+        email="ana@example.edu",
+        microsoft_id="ms-1",
+        role=RoleEnum.ADVISOR,
+        advisor_subjects=["Cálculo", "Álgebra", "Física"],
+        password_hash="$2b$12$" + "x" * 53,
+    )
+    request = Request(
+        id=str(ObjectId()),
+        student_id=str(ObjectId()),
+        advisor_id=str(ObjectId()),
+        subject="Cálculo",
+        topic="Integrales por partes",
+        description="Dudas del examen",
+    )
+    session = Session(
+        id=str(ObjectId()),
+        request_id=str(ObjectId()),
+        student_id=str(ObjectId()),
+        advisor_id=str(ObjectId()),
+        scheduled_at=now,
+        meeting_platform=MeetingPlatformEnum.TEAMS,
+        status=SessionStatusEnum.COMPLETED,
+        verification=Verification(was_held=True, duration_minutes=55),
+    )
+
+    results = []
+    for label, repository, entity in (
+        ("user", UserRepository(database), user),
+        ("request", RequestRepository(database), request),
+        ("session", SessionRepository(database), session),
+    ):
+        doc = repository._to_document(entity)
+        results.append(
+            measure(
+                f"repository.{label}._to_document",
+                lambda r=repository, e=entity: r._to_document(e),
+            )
+        )
+        results.append(
+            measure(
+                f"repository.{label}._to_entity",
+                lambda r=repository, d=doc: r._to_entity(d),
+            )
+        )
+    return results
+
+
+def _auth_benchmarks() -> list:
+    from backend.app import main
+
+    token = main.create_access_token(
+        {"sub": "ana@example.edu", "user_id": "u1", "role": "student"}
+    )
+    graph_token = "eyJ0eXAiOiJKV1QiLCJhbGciOiJSUzI1NiJ9." + "a" * 1400 + ".sig"
+    encrypted = main._encrypt_token(graph_token)
+    password_hash = main.get_password_hash("correct horse battery staple")
+
+    return [
+        measure(
+            "jwt.create_access_token",
+            lambda: main.create_access_token({"sub": "ana@example.edu"}),
+        ),
+        measure("jwt.decode_access_token", lambda: main.decode_access_token(token)),
+        measure("fernet._encrypt_token", lambda: main._encrypt_token(graph_token)),
+        measure("fernet._decrypt_token", lambda: main._decrypt_token(encrypted)),
+        # bcrypt tarda cientos de ms por llamada: pocas repeticiones
+        measure(
+            "bcrypt.get_password_hash",
+            lambda: main.get_password_hash("correct horse battery staple"),
+            number=1,
+            repeat=3,
+        ),
+        measure(
+            "bcrypt.verify_password",
+            lambda: main.verify_password("correct horse battery staple", password_hash),
+            number=1,
+            repeat=3,
+        ),
+    ]
+
+
+def _attendance_benchmarks() -> list:
+    results = []
+    for participants in (10, 300):
+        report = attendance_report(participants)
+        results.append(
+            measure(
+                f"teams.parse_attendance_report[{participants}]",
+                lambda r=report: parse_attendance_report(r),
+            )
+        )
+    return results
+
+
+def _stdlib_render(content) -> bytes:
+    """Camino anterior: jsonable_encoder (con json_encoders) + JSONResponse."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    return JSONResponse(jsonable_encoder(content, custom_encoder={ObjectId: str})).body
+
+
+def _serialization_benchmarks() -> list:
+    events = {"events": calendar_events(500)["value"], "count": 500}
+    created_at = datetime(2026, 3, 2, 10, 0)
+    requests = [
+        {
+            **asdict(
+                Request(
+                    id=str(ObjectId()),
+                    student_id=str(ObjectId()),
+                    subject="Cálculo",
+                    topic=f"Tema {i}",
+                    created_at=created_at,
+                )
+            ),
+            "_id": ObjectId(),
+        }
+        for i in range(2_000)
+    ]
+    payloads = {
+        "calendar_events[500]": json.dumps(calendar_events(500)).encode(),
+        "attendance_report[300]": json.dumps(attendance_report(300)).encode(),
+    }
+
+    results = []
+    for label, content in (
+        ("calendar_events[500]", events),
+        ("request_list[2000]", requests),
+    ):
+        results.append(
+            measure(
+                f"response.stdlib.{label}",
+                lambda c=content: _stdlib_render(c),
+            )
+        )
+        results.append(
+            measure(
+                f"response.orjson.{label}",
+                lambda c=content: FastJSONResponse(c).body,
+            )
+        )
+    for label, payload in payloads.items():
+        results.append(
+            measure(f"graph.decode.stdlib.{label}", lambda p=payload: json.loads(p))
+        )
+        results.append(
+            measure(f"graph.decode.orjson.{label}", lambda p=payload: loads(p))
+        )
+    return results
+
+
+def _model_benchmarks() -> list:
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    from backend.app import models
+
+    oid = ObjectId()
+    session = {
+        "_id": str(ObjectId()),
+        "requestId": str(oid),
+        "studentId": str(oid),
+        "advisorId": str(oid),
+        "approvedBy": str(oid),
+        "scheduledAt": datetime(2026, 3, 2, 10, 0),
+        "meetingPlatform": "teams",
+        "status": "completed",
+        "verification": {
+            "wasHeld": True,
+            "evidenceType": "teams_api",
+            "verifiedBy": str(oid),
+            "attendance": [
+                {
+                    "userId": str(oid),
+                    "joinedAt": datetime(2026, 3, 2, 10, 0),
+                    "leftAt": datetime(2026, 3, 2, 10, 55),
+                    "durationMinutes": 55,
+                }
+            ]
+            * 2,
+        },
+    }
+    # Documento tal como lo retorna MongoDB (ObjectId nativos)
+    session_doc = {
+        **session,
+        "_id": ObjectId(session["_id"]),
+        "requestId": oid,
+        "studentId": oid,
+        "advisorId": oid,
+        "approvedBy": oid,
+    }
+    model = models.Session.model_validate(session)
+    session_json = model.model_dump_json(by_alias=True)
+    requests = [
+        {"_id": ObjectId(), "studentId": oid, "subject": "Cálculo", "topic": "t"}
+    ] * 1_000
+    request_list = TypeAdapter(List[models.Request])
+
+    return [
+        measure(
+            "models.Session.model_validate[str ids]",
+            lambda: models.Session.model_validate(session),
+        ),
+        measure(
+            "models.Session.model_validate[ObjectId]",
+            lambda: models.Session.model_validate(session_doc),
+        ),
+        measure(
+            "models.Session.model_validate_json",
+            lambda: models.Session.model_validate_json(session_json),
+        ),
+        measure("models.Session.model_dump_json", lambda: model.model_dump_json()),
+        measure(
+            "models.Request.validate_list[1000]",
+            lambda: request_list.validate_python(requests),
+        ),
+    ]
+
+
+def _chat_hub_benchmarks(connections: int = 10_000) -> list:
+    import asyncio
+    import time
+    import tracemalloc
+
+    from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+    async def bench():
+        hub = ChatHub(InMemoryBroker(), tick=0.005)
+        sent = 0
+
+        async def send(text):
+            nonlocal sent
+            sent += 1
+
+        async def close(code):
+            pass
+
+        # Salas de dos participantes (estudiante y asesor)
+        rooms = [f"room-{i}" for i in range(connections // 2)]
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        for room in rooms:
+            await hub.connect(room, "student", send, close)
+            await hub.connect(room, "advisor", send, close)
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        message = {"type": "message", "message": {"content": "hola" * 20}}
+        start = time.perf_counter()
+        for room in rooms:
+            await hub.publish(room, message)
+        while sent < connections:
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        await hub.close()
+        return (after - before) / connections, elapsed
+
+    per_connection, elapsed = asyncio.run(bench())
+    return [
+        {
+            "name": f"chat_hub.memory_per_connection[{connections}]",
+            "value": round(per_connection),
+            "unit": "B",
+        },
+        {
+            "name": f"chat_hub.fan_out[{connections}]",
+            "value": round(elapsed * 1000, 2),
+            "unit": "ms",
+            "messages_per_s": round(connections / elapsed),
+        },
+    ]
+
+
+def run() -> list:
+    """Ejecuta todos los microbenchmarks y retorna los resultados."""
+    return (
+        _repository_benchmarks()
+        + _auth_benchmarks()
+        + _attendance_benchmarks()
+        + _serialization_benchmarks()
+        + _model_benchmarks()
+        + _chat_hub_benchmarks()
+    )
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(row)
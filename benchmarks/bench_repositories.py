@@ -0,0 +1,334 @@
+"""
+Benchmark de los repositorios de MongoDB a escala.
+
+Siembra (o reutiliza) un dataset sintético de benchmarks/dataset.py y mide
+cada método de UserRepository, RequestRepository y SessionRepository:
+latencia p50/p95/p99, documentos retornados y memoria pico (tracemalloc)
+de una llamada.
+
+Requiere un MongoDB dedicado, por eso no corre sin nombrarla. La base
+indicada se borra al sembrar, salvo que tenga datos que no vengan de
+benchmarks/dataset.py (entonces hace falta BENCH_FORCE=1).
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks repositories
+    BENCH_SCALE=0.1 BENCH_INDEXES=1 python -m benchmarks repositories
+"""
+
+import asyncio
+import os
+import time
+import tracemalloc
+from dataclasses import replace
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+from backend.app.domain.entities import (
+    Request,
+    RequestStatusEnum,
+    RoleEnum,
+    Session,
+    SessionStatusEnum,
+    User,
+)
+from backend.app.infrastructure.repositories import (
+    RequestRepository,
+    SessionRepository,
+    UserRepository,
+)
+
+from .dataset import DatasetSpec, dataset_matches, seed_database
+from .harness import latency_summary
+
+MONGO_URL = os.getenv("BENCH_MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.getenv("BENCH_DB_NAME", "peerhive_scale")
+# Fracción del tamaño por defecto (1M solicitudes, 200k sesiones, 50k usuarios)
+SCALE = float(os.getenv("BENCH_SCALE", "1"))
+CREATE_INDEXES = os.getenv("BENCH_INDEXES", "0") == "1"
+# Permite borrar una base que no fue sembrada por los benchmarks
+FORCE_SEED = os.getenv("BENCH_FORCE", "0") == "1"
+SAMPLES = int(os.getenv("BENCH_SAMPLES", "50"))
+# Los list_all sobre la colección completa se miden pocas veces
+FULL_SCAN_SAMPLES = 2
+
+
+def _spec() -> DatasetSpec:
+    defaults = DatasetSpec()
+    return DatasetSpec(
+        users=int(defaults.users * SCALE),
+        requests=int(defaults.requests * SCALE),
+        sessions=int(defaults.sessions * SCALE),
+    )
+
+
+async def _measure(
+    name: str,
+    call: Callable[[Any], Awaitable[Any]],
+    args: Sequence[Any],
+) -> Dict[str, Any]:
+    """Latencia de `call(arg)` por cada argumento y memoria pico de una llamada."""
+    latencies: List[float] = []
+    rows = 0
+    for arg in args:
+        start = time.perf_counter()
+        result = await call(arg)
+        latencies.append((time.perf_counter() - start) * 1000)
+        rows = len(result) if isinstance(result, list) else int(result is not None)
+
+    tracemalloc.start()
+    try:
+        await call(args[0])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    summary = latency_summary(latencies)
+    return {
+        "name": name,
+        "value": summary["p50_ms"],
+        "unit": "ms",
+        **summary,
+        "calls": len(args),
+        "rows": rows,
+        "peak_mib": round(peak / 2**20, 2),
+    }
+
+
+async def _ids(collection, query: dict, limit: int) -> List[str]:
+    cursor = collection.find(query, {"_id": 1}).limit(limit)
+    return [str(doc["_id"]) async for doc in cursor]
+
+
+async def _by_load(collection, field: str, unwind: bool = False) -> List[str]:
+    """Valores del campo ordenados de mayor a menor número de documentos."""
+    pipeline = [{"$match": {field: {"$exists": True}}}]
+    if unwind:
+        pipeline.append({"$unwind": f"${field}"})
+    pipeline += [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+    cursor = collection.aggregate(pipeline, allowDiskUse=True)
+    return [str(doc["_id"]) async for doc in cursor]
+
+
+async def _user_benchmarks(db, repo: UserRepository) -> list:
+    ids = await _ids(db.users, {}, SAMPLES)
+    docs = [doc async for doc in db.users.find({}).limit(SAMPLES)]
+    # Materias ordenadas por número de asesores
+    subjects = await _by_load(db.users, "advisorSubjects", unwind=True)
+    created: List[User] = []
+
+    async def create(i):
+        user = await repo.create(
+            User(name=f"Bench {i}", email=f"bench{i}@example.edu", microsoft_id="")
+        )
+        created.append(user)
+        return user
+
+    async def update(user):
+        return await repo.update(replace(user, name=user.name + "!"))
+
+    return [
+        await _measure("repository.user.get_by_id", repo.get_by_id, ids),
+        await _measure(
+            "repository.user.get_by_email",
+            repo.get_by_email,
+            [d["email"] for d in docs],
+        ),
+        await _measure(
+            "repository.user.get_by_microsoft_id",
+            repo.get_by_microsoft_id,
+            [d["microsoftId"] for d in docs],
+        ),
+        await _measure(
+            "repository.user.list_by_role[advisor]",
+            repo.list_by_role,
+            [RoleEnum.ADVISOR] * FULL_SCAN_SAMPLES,
+        ),
+        await _measure(
+            "repository.user.list_advisors_by_subject[popular]",
+            repo.list_advisors_by_subject,
+            subjects[:SAMPLES],
+        ),
+        await _measure(
+            "repository.user.list_advisors_by_subject[tail]",
+            repo.list_advisors_by_subject,
+            subjects[-SAMPLES:],
+        ),
+        await _measure(
+            "repository.user.list_all",
+            lambda _: repo.list_all(),
+            [None] * FULL_SCAN_SAMPLES,
+        ),
+        await _measure("repository.user.create", create, range(SAMPLES)),
+        await _measure("repository.user.update", update, list(created)),
+        await _measure("repository.user.delete", repo.delete, [u.id for u in created]),
+    ]
+
+
+async def _request_benchmarks(db, repo: RequestRepository) -> list:
+    ids = await _ids(db.requests, {}, SAMPLES)
+    advisors = await _by_load(db.requests, "advisorId")
+    students = await _ids(db.users, {"role": "student"}, SAMPLES)
+    created: List[Request] = []
+
+    async def create(i):
+        request = await repo.create(
+            Request(student_id=students[i % len(students)], subject="Cálculo")
+        )
+        created.append(request)
+        return request
+
+    async def update(request):
+        return await repo.update(replace(request, topic="Actualizado"))
+
+    return [
+        await _measure("repository.request.get_by_id", repo.get_by_id, ids),
+        await _measure(
+            "repository.request.list_by_student", repo.list_by_student, students
+        ),
+        await _measure(
+            "repository.request.list_by_advisor[hot]",
+            repo.list_by_advisor,
+            advisors[: max(1, SAMPLES // 10)],
+        ),
+        await _measure(
+            "repository.request.list_by_advisor[tail]",
+            repo.list_by_advisor,
+            advisors[-SAMPLES:],
+        ),
+        await _measure(
+            "repository.request.list_pending",
+            lambda _: repo.list_pending(),
+            [None] * FULL_SCAN_SAMPLES,
+        ),
+        await _measure(
+            "repository.request.list_by_status[cancelled]",
+            repo.list_by_status,
+            [RequestStatusEnum.CANCELLED] * FULL_SCAN_SAMPLES,
+        ),
+        await _measure(
+            "repository.request.list_all",
+            lambda _: repo.list_all(),
+            [None] * FULL_SCAN_SAMPLES,
+        ),
+        await _measure("repository.request.create", create, range(SAMPLES)),
+        await _measure("repository.request.update", update, list(created)),
+        await _measure(
+            "repository.request.assign_to_advisor",
+            lambda r: repo.assign_to_advisor(r.id, advisors[0]),
+            list(created),
+        ),
+        await _measure(
+            "repository.request.delete", repo.delete, [r.id for r in created]
+        ),
+    ]
+
+
+async def _session_benchmarks(db, repo: SessionRepository) -> list:
+    ids = await _ids(db.sessions, {}, SAMPLES)
+    request_ids = [
+        str(doc["requestId"])
+        async for doc in db.sessions.find({}, {"requestId": 1}).limit(SAMPLES)
+    ]
+    advisors = await _by_load(db.sessions, "advisorId")
+    students = await _by_load(db.sessions, "studentId")
+    admin = (await _ids(db.users, {"role": "admin"}, 1) or advisors)[0]
+    template = await repo.get_by_id(ids[0])
+    created: List[Session] = []
+
+    async def create(i):
+        session = await repo.create(
+            replace(template, id=None, status=SessionStatusEnum.PENDING_APPROVAL)
+        )
+        created.append(session)
+        return session
+
+    async def update(session):
+        return await repo.update(replace(session, meeting_link="https://bench"))
+
+    return [
+        await _measure("repository.session.get_by_id", repo.get_by_id, ids),
+        await _measure(
+            "repository.session.get_by_request_id",
+            repo.get_by_request_id,
+            request_ids,
+        ),
+        await _measure(
+            "repository.session.list_by_student",
+            repo.list_by_student,
+            students[:SAMPLES],
+        ),
+        await _measure(
+            "repository.session.list_by_advisor[hot]",
+            repo.list_by_advisor,
+            advisors[: max(1, SAMPLES // 10)],
+        ),
+        await _measure(
+            "repository.session.list_by_advisor[tail]",
+            repo.list_by_advisor,
+            advisors[-SAMPLES:],
+        ),
+        await _measure(
+            "repository.session.list_by_status[requires_review]",
+            repo.list_by_status,
+            [SessionStatusEnum.REQUIRES_REVIEW] * FULL_SCAN_SAMPLES,
+        ),
+        await _measure(
+            "repository.session.list_all",
+            lambda _: repo.list_all(),
+            [None] * FULL_SCAN_SAMPLES,
+        ),
+        await _measure("repository.session.create", create, range(SAMPLES)),
+        await _measure("repository.session.update", update, list(created)),
+        await _measure(
+            "repository.session.approve_session",
+            lambda s: repo.approve_session(s.id, admin),
+            list(created),
+        ),
+        await _measure(
+            "repository.session.complete_session",
+            lambda s: repo.complete_session(s.id),
+            list(created),
+        ),
+        await _measure(
+            "repository.session.delete", repo.delete, [s.id for s in created]
+        ),
+    ]
+
+
+async def _bench() -> list:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    spec = _spec()
+    results = []
+    try:
+        if not await dataset_matches(db, spec, CREATE_INDEXES):
+            seeded = await seed_database(
+                db, spec, create_indexes=CREATE_INDEXES, force=FORCE_SEED
+            )
+            results.append(
+                {
+                    "name": "dataset.seed",
+                    "value": seeded["seconds"],
+                    "unit": "s",
+                    **seeded["counts"],
+                }
+            )
+        results += await _user_benchmarks(db, UserRepository(db))
+        results += await _request_benchmarks(db, RequestRepository(db))
+        results += await _session_benchmarks(db, SessionRepository(db))
+    finally:
+        client.close()
+    return results
+
+
+def run() -> list:
+    """Siembra si hace falta y mide cada método de los repositorios."""
+    return asyncio.run(_bench())
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(row)
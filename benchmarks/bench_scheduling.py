@@ -0,0 +1,103 @@
+"""
+Benchmark del servicio de agenda.
+
+Mide la construcción del índice y las consultas de traslape / huecos libres
+para asesores con miles de sesiones históricas.
+
+    python -m benchmarks.bench_scheduling
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+from backend.app.domain.entities import Session, SessionStatusEnum
+from backend.app.services.scheduling import SchedulingService
+
+START = datetime(2022, 1, 3, 7, 0)
+SIZES = [1_000, 5_000, 20_000]
+QUERIES = 2_000
+
+
+def _sessions(advisor_id: str, count: int, rng: random.Random):
+    """Genera sesiones en días hábiles durante varios semestres."""
+    sessions = []
+    for i in range(count):
+        day = rng.randrange(0, 900)
+        hour = rng.randrange(0, 12)
+        sessions.append(
+            Session(
+                id=f"{advisor_id}-{i}",
+                advisor_id=advisor_id,
+                student_id=f"stu-{rng.randrange(0, 400)}",
+                scheduled_at=START + timedelta(days=day, hours=hour),
+                status=rng.choice(list(SessionStatusEnum)),
+            )
+        )
+    return sessions
+
+
+def _service(sessions):
+    repo = AsyncMock()
+    repo.list_by_advisor.side_effect = lambda pid: [
+        s for s in sessions if s.advisor_id == pid
+    ]
+    repo.list_by_student.side_effect = lambda pid: [
+        s for s in sessions if s.student_id == pid
+    ]
+    return SchedulingService(repo)
+
+
+async def _bench(size: int) -> dict:
+    rng = random.Random(size)
+    sessions = _sessions("adv", size, rng)
+    service = _service(sessions)
+
+    t0 = time.perf_counter()
+    await service.is_available("adv", START, START + timedelta(hours=1))
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    windows = [
+        START + timedelta(days=rng.randrange(0, 900), hours=rng.randrange(0, 12))
+        for _ in range(QUERIES)
+    ]
+
+    t0 = time.perf_counter()
+    for start in windows:
+        await service.find_conflicts(["adv"], start, start + timedelta(hours=1))
+    conflict_us = (time.perf_counter() - t0) / QUERIES * 1e6
+
+    t0 = time.perf_counter()
+    for start in windows:
+        await service.free_slots("adv", start, start + timedelta(days=7))
+    free_us = (time.perf_counter() - t0) / QUERIES * 1e6
+
+    t0 = time.perf_counter()
+    for start in windows[: QUERIES // 10]:
+        await service.suggest_slots(
+            "stu-1", "adv", start, start + timedelta(days=7), limit=3
+        )
+    suggest_us = (time.perf_counter() - t0) / (QUERIES // 10) * 1e6
+
+    return {
+        "name": f"scheduling.find_conflicts[{size}]",
+        "value": round(conflict_us, 2),
+        "unit": "us",
+        "sessions": size,
+        "build_ms": round(build_ms, 2),
+        "find_conflicts_us": round(conflict_us, 2),
+        "free_slots_week_us": round(free_us, 2),
+        "suggest_slots_us": round(suggest_us, 2),
+    }
+
+
+def run() -> list:
+    """Ejecuta el benchmark para cada tamaño y retorna los resultados."""
+    return [asyncio.run(_bench(size)) for size in SIZES]
+
+
+if __name__ == "__main__":
+    for row in run():
+        print(row)
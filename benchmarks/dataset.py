@@ -0,0 +1,444 @@
+"""
+Generador de datasets sintéticos grandes para pruebas de escala.
+
+Produce documentos con el mismo formato que escriben los repositorios de
+MongoDB (users, requests, sessions), con distribuciones sesgadas como las
+de producción:
+
+- Popularidad de materias con cola larga (Zipf): unas pocas materias
+  concentran la mayoría de las solicitudes.
+- Carga desbalanceada entre asesores (Pareto): pocos asesores atienden
+  gran parte de las solicitudes de su materia.
+- Sesiones con verificación y registros de asistencia de Teams.
+
+Todo es determinista por semilla (ids incluidos) y se genera en streaming
+para cargarse por lotes con `insert_many`.
+
+    python -m benchmarks.dataset --mongo-url mongodb://localhost:27017 \\
+        --db peerhive_scale --users 50000 --requests 1000000 --sessions 200000
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import struct
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from bson import ObjectId
+
+START = datetime(2023, 1, 9, 7, 0)
+SEMESTER_DAYS = 1_000
+
+BASE_SUBJECTS = [
+    "Cálculo",
+    "Álgebra Lineal",
+    "Física",
+    "Programación",
+    "Estadística",
+    "Química",
+    "Ecuaciones Diferenciales",
+    "Estructuras de Datos",
+    "Contabilidad",
+    "Economía",
+]
+
+TOPICS = [
+    "Dudas del examen",
+    "Repaso de la unidad",
+    "Ejercicios de la tarea",
+    "Proyecto final",
+    "Conceptos básicos",
+]
+
+
+@dataclass
+class DatasetSpec:
+    """Tamaño y forma del dataset."""
+
+    users: int = 50_000
+    requests: int = 1_000_000
+    sessions: int = 200_000
+    subjects: int = 150
+    # Fracción de usuarios que son asesores (el resto, estudiantes y 10 admins)
+    advisor_ratio: float = 0.05
+    # Exponente de Zipf de la popularidad de materias
+    subject_skew: float = 1.1
+    # Índice de Pareto de la carga de asesores (1.16 ≈ regla 80/20)
+    advisor_skew: float = 1.16
+    seed: int = 42
+
+
+def subject_names(count: int) -> List[str]:
+    """Nombres de materias: las conocidas primero y luego optativas."""
+    names = BASE_SUBJECTS[:count]
+    names += [f"Optativa {i}" for i in range(count - len(names))]
+    return names
+
+
+def zipf_weights(count: int, skew: float) -> List[float]:
+    """Pesos acumulados de una distribución de Zipf sobre `count` rangos."""
+    return list(itertools.accumulate(1 / (rank**skew) for rank in range(1, count + 1)))
+
+
+def _object_id(rng: random.Random, created_at: datetime) -> ObjectId:
+    """ObjectId determinista con la marca de tiempo de creación."""
+    return ObjectId(struct.pack(">I", int(created_at.timestamp())) + rng.randbytes(8))
+
+
+def _timestamp(rng: random.Random, days: int = SEMESTER_DAYS) -> datetime:
+    return START + timedelta(days=rng.randrange(days), minutes=rng.randrange(720))
+
+
+class DatasetGenerator:
+    """
+    Genera los documentos de un dataset a partir de un `DatasetSpec`.
+
+    Los usuarios se generan primero porque las solicitudes y sesiones los
+    referencian; se conservan en memoria solo los ids necesarios.
+    """
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        self.subjects = subject_names(spec.subjects)
+        self.subject_weights = zipf_weights(len(self.subjects), spec.subject_skew)
+        self.student_ids: List[ObjectId] = []
+        self.admin_ids: List[ObjectId] = []
+        # Asesores por materia con su carga relativa (pesos acumulados)
+        self.advisors_by_subject: Dict[str, List[ObjectId]] = {}
+        self.advisor_weights: Dict[str, List[float]] = {}
+
+    def _rng(self, stream: str) -> random.Random:
+        # Un generador por colección: cambiar un tamaño no altera las demás
+        return random.Random(f"{self.spec.seed}:{stream}")
+
+    def _pick_subject(self, rng: random.Random) -> str:
+        return self.subjects[
+            bisect.bisect(self.subject_weights, rng.random() * self.subject_weights[-1])
+        ]
+
+    def users(self) -> Iterator[dict]:
+        """Documentos de usuarios: admins, asesores y estudiantes."""
+        rng = self._rng("users")
+        spec = self.spec
+        advisors = max(1, int(spec.users * spec.advisor_ratio))
+        admins = min(10, max(0, spec.users - advisors))
+        load: Dict[str, List[float]] = {}
+
+        for i in range(spec.users):
+            created_at = _timestamp(rng, days=SEMESTER_DAYS // 4)
+            _id = _object_id(rng, created_at)
+            doc = {
+                "_id": _id,
+                "name": f"Usuario {i}",
+                "email": f"user{i}@example.edu",
+                "microsoftId": f"ms-{i:08d}",
+                "advisorSubjects": [],
+                "createdAt": created_at,
+                "updatedAt": created_at,
+            }
+            if i < admins:
+                doc["role"] = "admin"
+                self.admin_ids.append(_id)
+            elif i < admins + advisors:
+                doc["role"] = "advisor"
+                # Una materia por turno (toda materia tiene asesor si hay
+                # suficientes) más 0-3 sesgadas hacia las populares
+                subjects = {self.subjects[(i - admins) % len(self.subjects)]}
+                subjects.update(
+                    self._pick_subject(rng) for _ in range(rng.randint(0, 3))
+                )
+                doc["advisorSubjects"] = sorted(subjects)
+                weight = rng.paretovariate(spec.advisor_skew)
+                for subject in doc["advisorSubjects"]:
+                    self.advisors_by_subject.setdefault(subject, []).append(_id)
+                    load.setdefault(subject, []).append(weight)
+            else:
+                doc["role"] = "student"
+                self.student_ids.append(_id)
+            yield doc
+
+        self.advisor_weights = {
+            subject: list(itertools.accumulate(weights))
+            for subject, weights in load.items()
+        }
+
+    def _pick_advisor(self, rng: random.Random, subject: str) -> Optional[ObjectId]:
+        advisors = self.advisors_by_subject.get(subject)
+        if not advisors:
+            return None
+        weights = self.advisor_weights[subject]
+        return advisors[bisect.bisect(weights, rng.random() * weights[-1])]
+
+    def requests_and_sessions(self) -> Iterator[tuple]:
+        """
+        Pares (`"requests"` | `"sessions"`, documento).
+
+        Las solicitudes con sesión quedan tomadas o completadas; el resto se
+        reparte entre pendientes, tomadas sin sesión y canceladas.
+        """
+        if not self.student_ids:
+            raise ValueError("Generate users before requests")
+        rng = self._rng("requests")
+        spec = self.spec
+        with_session = set(
+            rng.sample(range(spec.requests), min(spec.sessions, spec.requests))
+        )
+
+        for i in range(spec.requests):
+            created_at = _timestamp(rng)
+            subject = self._pick_subject(rng)
+            advisor_id = self._pick_advisor(rng, subject)
+            request = {
+                "_id": _object_id(rng, created_at),
+                "studentId": rng.choice(self.student_ids),
+                "subject": subject,
+                "topic": rng.choice(TOPICS),
+                "createdAt": created_at,
+            }
+            if rng.random() < 0.4:
+                request["description"] = f"Solicitud {i} sobre {subject}"
+
+            if i in with_session and advisor_id is not None:
+                request["status"] = "completed" if rng.random() < 0.7 else "taken"
+            else:
+                request["status"] = rng.choices(
+                    ["pending", "taken", "cancelled"], weights=[55, 25, 20]
+                )[0]
+                if request["status"] == "taken" and advisor_id is None:
+                    request["status"] = "pending"
+            if request["status"] != "pending" and advisor_id is not None:
+                request["advisorId"] = advisor_id
+                request["takenAt"] = created_at + timedelta(
+                    minutes=rng.randrange(5, 2_880)
+                )
+            yield "requests", request
+
+            if i in with_session and "advisorId" in request:
+                yield "sessions", self._session(rng, request)
+
+    def _session(self, rng: random.Random, request: dict) -> dict:
+        scheduled_at = request["takenAt"] + timedelta(hours=rng.randrange(2, 240))
+        scheduled_at = scheduled_at.replace(minute=0 if rng.random() < 0.7 else 30)
+        status = (
+            rng.choices(
+                ["completed", "requires_review", "cancelled"], weights=[85, 10, 5]
+            )[0]
+            if request["status"] == "completed"
+            else rng.choice(["pending_approval", "approved", "in_progress"])
+        )
+        created_at = request["takenAt"]
+        session = {
+            "_id": _object_id(rng, created_at),
+            "requestId": request["_id"],
+            "studentId": request["studentId"],
+            "advisorId": request["advisorId"],
+            "scheduledAt": scheduled_at,
+            "meetingPlatform": rng.choices(
+                ["teams", "zoom", "presencial"], weights=[80, 10, 10]
+            )[0],
+            "status": status,
+            "createdAt": created_at,
+        }
+        if session["meetingPlatform"] == "teams":
+            session["teamsMeetingId"] = f"MSo{session['_id']}"
+            session["meetingLink"] = (
+                f"https://teams.microsoft.com/l/meetup-join/{session['_id']}"
+            )
+        if status != "pending_approval" and self.admin_ids:
+            session["approvedBy"] = rng.choice(self.admin_ids)
+            session["approvedAt"] = created_at + timedelta(hours=1)
+        if status in ("completed", "requires_review"):
+            session["completedAt"] = scheduled_at + timedelta(hours=1)
+            session["verification"] = self._verification(rng, session, status)
+        return session
+
+    def _verification(self, rng: random.Random, session: dict, status: str) -> dict:
+        was_held = status == "completed"
+        start = session["scheduledAt"] + timedelta(minutes=rng.randrange(0, 10))
+        duration = rng.randrange(20, 60) if was_held else rng.randrange(0, 10)
+        attendance = [
+            {
+                "userId": user_id,
+                "joinedAt": start,
+                "leftAt": start + timedelta(minutes=duration),
+                "durationMinutes": duration,
+            }
+            for user_id in (session["advisorId"], session["studentId"])
+        ]
+        manual = session["meetingPlatform"] != "teams"
+        return {
+            "wasHeld": was_held,
+            "durationMinutes": duration,
+            "actualStartTime": start,
+            "actualEndTime": start + timedelta(minutes=duration),
+            "evidenceType": "manual_upload" if manual else "teams_api",
+            "manualEvidence": {"fileName": "evidencia.png"} if manual else None,
+            "verifiedBy": session.get("approvedBy"),
+            "verifiedAt": session["completedAt"],
+            "notes": None if was_held else "Asistencia menor a la esperada",
+            "attendance": attendance,
+        }
+
+
+def batched(documents: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Agrupa un iterable en listas de hasta `size` elementos."""
+    iterator = iter(documents)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+# Índices que usan las consultas de los repositorios
+INDEXES = {
+    "users": [
+        [("email", 1)],
+        [("microsoftId", 1)],
+        [("role", 1), ("advisorSubjects", 1)],
+    ],
+    "requests": [[("studentId", 1)], [("advisorId", 1)], [("status", 1)]],
+    "sessions": [
+        [("requestId", 1)],
+        [("studentId", 1)],
+        [("advisorId", 1)],
+        [("status", 1)],
+    ],
+}
+
+
+SEEDED_COLLECTIONS = ("users", "requests", "sessions", "_dataset")
+
+
+async def seed_database(
+    database,
+    spec: DatasetSpec,
+    batch_size: int = 5_000,
+    drop: bool = True,
+    create_indexes: bool = False,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Carga el dataset en `database` con `insert_many` por lotes.
+
+    Guarda el spec en la colección `_dataset` para que los benchmarks puedan
+    reutilizar una base ya sembrada con los mismos parámetros. Esa marca
+    también protege otras bases: sin ella, solo se borran colecciones con
+    datos si `force` es verdadero.
+
+    Returns:
+        Conteo de documentos por colección y segundos de carga
+
+    Raises:
+        RuntimeError: Si la base tiene colecciones y no fue sembrada aquí
+    """
+    if drop:
+        existing = set(await database.list_collection_names())
+        if (
+            not force
+            and existing.intersection(SEEDED_COLLECTIONS)
+            and not await database["_dataset"].find_one({})
+        ):
+            raise RuntimeError(
+                f"'{database.name}' no es una base sembrada por benchmarks.dataset; "
+                "usa --force (o BENCH_FORCE=1) para borrarla"
+            )
+        for name in SEEDED_COLLECTIONS:
+            await database[name].drop()
+
+    generator = DatasetGenerator(spec)
+    counts = {"users": 0, "requests": 0, "sessions": 0}
+    started = time.perf_counter()
+
+    for batch in batched(generator.users(), batch_size):
+        await database.users.insert_many(batch, ordered=False)
+        counts["users"] += len(batch)
+
+    pending: Dict[str, List[dict]] = {"requests": [], "sessions": []}
+    for collection, doc in generator.requests_and_sessions():
+        pending[collection].append(doc)
+        if len(pending[collection]) >= batch_size:
+            await database[collection].insert_many(pending[collection], ordered=False)
+            counts[collection] += len(pending[collection])
+            pending[collection] = []
+    for collection, docs in pending.items():
+        if docs:
+            await database[collection].insert_many(docs, ordered=False)
+            counts[collection] += len(docs)
+
+    if create_indexes:
+        for collection, indexes in INDEXES.items():
+            for keys in indexes:
+                await database[collection].create_index(keys)
+
+    elapsed = time.perf_counter() - started
+    await database["_dataset"].insert_one(
+        {"spec": asdict(spec), "counts": counts, "indexes": create_indexes}
+    )
+    return {"counts": counts, "seconds": round(elapsed, 1)}
+
+
+async def dataset_matches(
+    database, spec: DatasetSpec, create_indexes: bool = False
+) -> bool:
+    """Indica si `database` ya fue sembrada con el mismo spec e índices."""
+    meta = await database["_dataset"].find_one({})
+    return (
+        bool(meta)
+        and meta["spec"] == asdict(spec)
+        and meta["indexes"] == create_indexes
+    )
+
+
+def main(argv=None) -> None:
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(description="Siembra un dataset sintético")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="peerhive_scale")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--requests", type=int, default=defaults.requests)
+    parser.add_argument("--sessions", type=int, default=defaults.sessions)
+    parser.add_argument("--subjects", type=int, default=defaults.subjects)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument(
+        "--indexes", action="store_true", help="Crear los índices de las consultas"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Borrar la base aunque no haya sido sembrada por este script",
+    )
+    args = parser.parse_args(argv)
+
+    spec = DatasetSpec(
+        users=args.users,
+        requests=args.requests,
+        sessions=args.sessions,
+        subjects=args.subjects,
+        seed=args.seed,
+    )
+
+    async def run():
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongo_url)
+        try:
+            return await seed_database(
+                client[args.db],
+                spec,
+                batch_size=args.batch_size,
+                create_indexes=args.indexes,
+                force=args.force,
+            )
+        finally:
+            client.close()
+
+    result = asyncio.run(run())
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
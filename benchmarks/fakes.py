@@ -0,0 +1,355 @@
+"""
+Dobles en memoria para los macrobenchmarks.
+
+Repositorios que implementan los puertos del dominio sobre diccionarios,
+una colección mínima compatible con Motor para las rutas de autenticación
+(que usan `app.mongodb.users` directamente) y un stand-in de Microsoft
+Graph que reemplaza a `requests.request` en services/graph.py.
+"""
+
+import json
+import re
+import time
+import uuid
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import requests
+from bson import ObjectId
+
+from backend.app.domain.entities import (
+    Request,
+    RequestStatusEnum,
+    RoleEnum,
+    Session,
+    SessionStatusEnum,
+    User,
+)
+from backend.app.domain.repositories import (
+    RequestRepositoryPort,
+    SessionRepositoryPort,
+    UserRepositoryPort,
+)
+
+# ── Repositorios en memoria ──────────────────────────────────────────
+
+
+class _InMemoryStore:
+    def __init__(self):
+        self.items: Dict[str, Any] = {}
+
+    def _save(self, entity):
+        if not entity.id:
+            entity.id = str(ObjectId())
+        self.items[entity.id] = replace(entity)
+        return entity
+
+    def _get(self, entity_id: str):
+        entity = self.items.get(entity_id)
+        return replace(entity) if entity else None
+
+    def _where(self, predicate: Callable[[Any], bool]) -> list:
+        return [replace(e) for e in self.items.values() if predicate(e)]
+
+    async def delete(self, entity_id: str) -> bool:
+        return self.items.pop(entity_id, None) is not None
+
+    async def list_all(self) -> list:
+        return self._where(lambda e: True)
+
+
+class InMemoryUserRepository(_InMemoryStore, UserRepositoryPort):
+    """UserRepositoryPort sobre un diccionario."""
+
+    async def create(self, user: User) -> User:
+        return self._save(user)
+
+    async def get_by_id(self, user_id: str) -> Optional[User]:
+        return self._get(user_id)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        found = self._where(lambda u: u.email == email)
+        return found[0] if found else None
+
+    async def get_by_microsoft_id(self, microsoft_id: str) -> Optional[User]:
+        found = self._where(lambda u: u.microsoft_id == microsoft_id)
+        return found[0] if found else None
+
+    async def update(self, user: User) -> User:
+        return self._save(user)
+
+    async def list_by_role(self, role: RoleEnum) -> List[User]:
+        return self._where(lambda u: u.role == role)
+
+    async def list_advisors_by_subject(self, subject: str) -> List[User]:
+        return self._where(
+            lambda u: u.role == RoleEnum.ADVISOR and subject in u.advisor_subjects
+        )
+
+
+class InMemoryRequestRepository(_InMemoryStore, RequestRepositoryPort):
+    """RequestRepositoryPort sobre un diccionario."""
+
+    async def create(self, request: Request) -> Request:
+        return self._save(request)
+
+    async def get_by_id(self, request_id: str) -> Optional[Request]:
+        return self._get(request_id)
+
+    async def update(self, request: Request) -> Request:
+        return self._save(request)
+
+    async def list_pending(self) -> List[Request]:
+        return await self.list_by_status(RequestStatusEnum.PENDING)
+
+    async def list_by_student(self, student_id: str) -> List[Request]:
+        return self._where(lambda r: r.student_id == student_id)
+
+    async def list_by_advisor(self, advisor_id: str) -> List[Request]:
+        return self._where(lambda r: r.advisor_id == advisor_id)
+
+    async def list_by_status(self, status: RequestStatusEnum) -> List[Request]:
+        return self._where(lambda r: r.status == status)
+
+    async def assign_to_advisor(self, request_id: str, advisor_id: str) -> Request:
+        request = self.items[request_id]
+        request.advisor_id = advisor_id
+        request.status = RequestStatusEnum.TAKEN
+        request.taken_at = datetime.now()
+        return replace(request)
+
+
+class InMemorySessionRepository(_InMemoryStore, SessionRepositoryPort):
+    """SessionRepositoryPort sobre un diccionario."""
+
+    async def create(self, session: Session) -> Session:
+        return self._save(session)
+
+    async def get_by_id(self, session_id: str) -> Optional[Session]:
+        return self._get(session_id)
+
+    async def get_by_request_id(self, request_id: str) -> Optional[Session]:
+        found = self._where(lambda s: s.request_id == request_id)
+        return found[0] if found else None
+
+    async def update(self, session: Session) -> Session:
+        return self._save(session)
+
+    async def list_by_student(self, student_id: str) -> List[Session]:
+        return self._where(lambda s: s.student_id == student_id)
+
+    async def list_by_advisor(self, advisor_id: str) -> List[Session]:
+        return self._where(lambda s: s.advisor_id == advisor_id)
+
+    async def list_by_status(self, status: SessionStatusEnum) -> List[Session]:
+        return self._where(lambda s: s.status == status)
+
+    async def iter_sessions(
+        self,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        advisor_id: Optional[str] = None,
+        status: Optional[SessionStatusEnum] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Session]:
+        found = self._where(
+            lambda s: (scheduled_from is None or s.scheduled_at >= scheduled_from)
+            and (scheduled_to is None or s.scheduled_at < scheduled_to)
+            and (advisor_id is None or s.advisor_id == advisor_id)
+            and (status is None or s.status == status)
+        )
+        for session in sorted(found, key=lambda s: s.scheduled_at):
+            yield session
+
+    async def approve_session(
+        self, session_id: str, approved_by: str
+    ) -> Optional[Session]:
+        session = self.items.get(session_id)
+        if session is None or session.status != SessionStatusEnum.PENDING_APPROVAL:
+            return None
+        session.status = SessionStatusEnum.APPROVED
+        session.approved_by = approved_by
+        session.approved_at = datetime.now()
+        return replace(session)
+
+    async def complete_session(self, session_id: str) -> Session:
+        session = self.items[session_id]
+        session.status = SessionStatusEnum.COMPLETED
+        session.completed_at = datetime.now()
+        return replace(session)
+
+
+# ── Colección mínima compatible con Motor ────────────────────────────
+
+
+class _InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InMemoryCollection:
+    """Subconjunto de AsyncIOMotorCollection: find_one/insert_one por igualdad."""
+
+    def __init__(self):
+        self.documents: List[dict] = []
+
+    async def find_one(self, query: dict) -> Optional[dict]:
+        for doc in self.documents:
+            if all(doc.get(k) == v for k, v in query.items()):
+                return dict(doc)
+        return None
+
+    async def insert_one(self, document: dict) -> _InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        self.documents.append(dict(document))
+        return _InsertOneResult(document["_id"])
+
+
+class InMemoryDatabase:
+    """Base de datos cuyas colecciones se crean al primer acceso."""
+
+    def __init__(self):
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, InMemoryCollection())
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        return getattr(self, name)
+
+
+# ── Stand-in de Microsoft Graph ──────────────────────────────────────
+
+
+def attendance_report(participants: int, meeting_id: str = "m1") -> dict:
+    """Reporte de asistencia de Graph con `participants` registros."""
+    start = datetime(2026, 3, 2, 10, 0)
+    records = []
+    for i in range(participants):
+        joined = start + timedelta(minutes=i % 10)
+        records.append(
+            {
+                "id": f"p{i}",
+                "role": "attendee" if i else "organizer",
+                "identity": {
+                    "user": {
+                        "id": f"u{i}",
+                        "displayName": f"Participante {i}",
+                        "userPrincipalName": f"user{i}@example.edu",
+                    }
+                },
+                "attendanceIntervalRecords": [
+                    {
+                        "joinDateTime": joined.isoformat() + "Z",
+                        "leaveDateTime": (joined + timedelta(minutes=25)).isoformat()
+                        + "Z",
+                    },
+                    {
+                        "joinDateTime": (joined + timedelta(minutes=30)).isoformat()
+                        + "Z",
+                        "leaveDateTime": (joined + timedelta(minutes=55)).isoformat()
+                        + "Z",
+                    },
+                ],
+            }
+        )
+    return {
+        "id": "r1",
+        "meetingId": meeting_id,
+        "totalParticipantCount": participants,
+        "attendanceRecords": records,
+    }
+
+
+def calendar_events(count: int) -> dict:
+    """Página de eventos de calendario de Graph."""
+    start = datetime(2026, 3, 2, 8, 0)
+    return {
+        "value": [
+            {
+                "id": f"e{i}",
+                "subject": f"Asesoría {i}",
+                "start": {
+                    "dateTime": (start + timedelta(hours=i)).isoformat(),
+                    "timeZone": "UTC",
+                },
+                "end": {
+                    "dateTime": (start + timedelta(hours=i, minutes=50)).isoformat(),
+                    "timeZone": "UTC",
+                },
+                "location": {"displayName": "Teams"},
+                "attendees": [],
+                "isOnlineMeeting": True,
+                "onlineMeeting": {"joinUrl": f"https://teams.example/{i}"},
+            }
+            for i in range(count)
+        ]
+    }
+
+
+class GraphStub:
+    """
+    Reemplazo de `requests.request` que responde como Graph en memoria.
+
+    `latency_ms` simula el tiempo de red (bloqueante, como requests).
+    """
+
+    def __init__(self, latency_ms: float = 0.0, events: int = 50, participants=200):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._events = calendar_events(events)
+        self._report = attendance_report(participants)
+        self._routes = [
+            (re.compile(r"/me/calendar/getSchedule$"), self._schedule),
+            (re.compile(r"/me/calendar/events$"), lambda *_: self._events),
+            (re.compile(r"/attendanceReports/[^/]+$"), lambda *_: self._report),
+            (re.compile(r"/attendanceReports$"), lambda *_: {"value": [self._report]}),
+            (re.compile(r"/me/onlineMeetings/([^/]+)$"), self._meeting),
+            (re.compile(r"/me/onlineMeetings$"), self._meeting),
+        ]
+
+    def _meeting(self, match, body):
+        meeting_id = match.groups()[0] if match.groups() else uuid.uuid4().hex
+        return {
+            "id": meeting_id,
+            "joinUrl": f"https://teams.example/{meeting_id}",
+            "subject": (body or {}).get("subject", "Asesoría"),
+        }
+
+    def _schedule(self, match, body):
+        # Un bloque ocupado de una hora al inicio de la ventana por buzón
+        start = datetime.fromisoformat(body["startTime"]["dateTime"])
+        busy = {
+            "status": "busy",
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + timedelta(hours=1)).isoformat()},
+        }
+        return {
+            "value": [
+                {"scheduleId": mailbox, "scheduleItems": [busy]}
+                for mailbox in body["schedules"]
+            ]
+        }
+
+    def __call__(self, method, url, headers=None, params=None, json=None, **kwargs):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        path = url.split("?")[0]
+        for pattern, handler in self._routes:
+            match = pattern.search(path)
+            if match:
+                return _response(200, handler(match, json), url)
+        return _response(404, {"error": {"code": "NotFound"}}, url)
+
+
+def _response(status: int, body: Any, url: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.headers["Content-Type"] = "application/json"
+    response.url = url
+    return response
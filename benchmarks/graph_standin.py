@@ -0,0 +1,452 @@
+"""
+Stand-in local de Microsoft Graph para pruebas de carga y latencia.
+
+Aplicación ASGI que imita los endpoints de Graph que usa PeerHive, con
+latencia configurable, paginación (@odata.nextLink), delta queries,
+$batch, throttling (429 + Retry-After) e inyección de fallas.
+
+    uvicorn benchmarks.graph_standin:app --port 8900
+    GRAPH_API_BASE_URL=http://localhost:8900/v1.0 uvicorn backend.app.main:app
+
+Configuración inicial por variables de entorno (GRAPH_STANDIN_*) y en
+caliente con `PUT /_standin/config`; contadores en `GET /_standin/stats`.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from .fakes import attendance_report, calendar_events
+
+BATCH_HEADER = "x-standin-batch"
+BATCH_MAX_REQUESTS = 20
+
+
+# ── Configuración ────────────────────────────────────────────────────
+
+
+def _env(name: str, default: str) -> str:
+    return os.getenv(f"GRAPH_STANDIN_{name}", default)
+
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    # fixed:<ms> | uniform:<min>,<max> | normal:<media>,<desv> | lognormal:<mediana>,<sigma>
+    "latency": _env("LATENCY", "lognormal:40,0.5"),
+    "page_size": int(_env("PAGE_SIZE", "50")),
+    "events": int(_env("EVENTS", "200")),
+    "participants": int(_env("PARTICIPANTS", "100")),
+    # Token bucket por token de acceso: peticiones por segundo y ráfaga
+    "rate_limit_per_second": float(_env("RATE_LIMIT_PER_SECOND", "0")),
+    "rate_limit_burst": int(_env("RATE_LIMIT_BURST", "20")),
+    # Fracción de peticiones con 429 aleatorio (además del token bucket)
+    "throttle_rate": float(_env("THROTTLE_RATE", "0")),
+    "retry_after_seconds": float(_env("RETRY_AFTER_SECONDS", "1")),
+    # Fracción de peticiones que fallan con `fault_status`
+    "fault_rate": float(_env("FAULT_RATE", "0")),
+    "fault_status": int(_env("FAULT_STATUS", "503")),
+    # Fracción de peticiones que se cuelgan `hang_seconds` (timeouts)
+    "hang_rate": float(_env("HANG_RATE", "0")),
+    "hang_seconds": float(_env("HANG_SECONDS", "60")),
+    "seed": int(_env("SEED", "42")),
+}
+
+
+def parse_latency(spec: str) -> Tuple[str, List[float]]:
+    """Valida una especificación de latencia `<distribución>:<parámetros>`."""
+    kind, _, raw = spec.partition(":")
+    args = [float(v) for v in raw.split(",") if v.strip()]
+    expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+    if kind not in expected or len(args) != expected[kind]:
+        raise ValueError(f"Invalid latency spec '{spec}'")
+    return kind, args
+
+
+def sample_latency_ms(spec: Tuple[str, List[float]], rng: random.Random) -> float:
+    """Muestra una latencia (ms) de la distribución configurada."""
+    kind, args = spec
+    if kind == "fixed":
+        return args[0]
+    if kind == "uniform":
+        return rng.uniform(args[0], args[1])
+    if kind == "normal":
+        return max(0.0, rng.gauss(args[0], args[1]))
+    # lognormal parametrizada por su mediana (ms) y sigma
+    return rng.lognormvariate(math.log(args[0]), args[1])
+
+
+class TokenBucket:
+    """Token bucket simple; `take` retorna la espera sugerida si no hay cupo."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> Optional[float]:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.rate
+
+
+# ── Estado ───────────────────────────────────────────────────────────
+
+
+class StandInState:
+    """Datos y configuración del stand-in."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.stats: Counter = Counter()
+        self.configure({**DEFAULT_CONFIG, **(config or {})}, reset_data=True)
+
+    def configure(self, config: Dict[str, Any], reset_data: bool = False) -> None:
+        latency = parse_latency(config["latency"])
+        self.config = config
+        self.latency = latency
+        self.rng = random.Random(config["seed"])
+        self.buckets: Dict[str, TokenBucket] = {}
+        if reset_data:
+            self._seed_data()
+
+    def _seed_data(self) -> None:
+        self.events: Dict[str, Dict[str, Any]] = {
+            event["id"]: event
+            for event in calendar_events(self.config["events"])["value"]
+        }
+        self.meetings: Dict[str, Dict[str, Any]] = {}
+        # Registro de cambios para delta: (secuencia, id, eliminado)
+        self.changes: List[Tuple[int, str, bool]] = []
+        self.sequence = 0
+
+    def record_change(self, event_id: str, deleted: bool = False) -> None:
+        self.sequence += 1
+        self.changes.append((self.sequence, event_id, deleted))
+
+    def bucket_for(self, authorization: str) -> Optional[TokenBucket]:
+        rate = self.config["rate_limit_per_second"]
+        if rate <= 0:
+            return None
+        key = hashlib.sha256(authorization.encode()).hexdigest()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(
+                rate, self.config["rate_limit_burst"]
+            )
+        return bucket
+
+
+def _graph_error(status: int, code: str, message: str, headers=None) -> JSONResponse:
+    return JSONResponse(
+        {"error": {"code": code, "message": message}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def _page(
+    request: Request, items: List[Dict[str, Any]], extra: Optional[dict] = None
+) -> Dict[str, Any]:
+    """Página de una colección con @odata.nextLink al estilo de Graph."""
+    state: StandInState = request.app.state.standin
+    prefer = request.headers.get("prefer", "")
+    page_size = state.config["page_size"]
+    if "odata.maxpagesize=" in prefer:
+        page_size = int(prefer.split("odata.maxpagesize=")[1].split(",")[0])
+    top = int(request.query_params.get("$top", page_size))
+    skip = int(request.query_params.get("$skip", 0))
+
+    body: Dict[str, Any] = {"value": items[skip : skip + top]}  # noqa: E203
+    if skip + top < len(items):
+        query = dict(request.query_params)
+        query.update({"$skip": skip + top, "$top": top})
+        body["@odata.nextLink"] = (
+            f"{request.url.remove_query_params(list(query))}?{urlencode(query)}"
+        )
+    body.update(extra or {})
+    return body
+
+
+# ── Aplicación ───────────────────────────────────────────────────────
+
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> FastAPI:
+    """Crea una instancia del stand-in con su propio estado."""
+    app = FastAPI(title="Microsoft Graph stand-in")
+    app.state.standin = StandInState(config)
+
+    @app.middleware("http")
+    async def graph_behaviour(request: Request, call_next):
+        state: StandInState = request.app.state.standin
+        if request.url.path.startswith("/_standin"):
+            return await call_next(request)
+
+        headers = {
+            "request-id": str(uuid.uuid4()),
+            "client-request-id": request.headers.get("client-request-id", ""),
+        }
+        batched = request.headers.get(BATCH_HEADER) == "1"
+        authorization = request.headers.get("authorization", "")
+        if not authorization.startswith("Bearer "):
+            return _graph_error(
+                401, "InvalidAuthenticationToken", "Access token is empty.", headers
+            )
+
+        if not batched:
+            state.stats["requests"] += 1
+            config = state.config
+            bucket = state.bucket_for(authorization)
+            wait = bucket.take() if bucket else None
+            if wait is None and state.rng.random() < config["throttle_rate"]:
+                wait = config["retry_after_seconds"]
+            if wait is not None:
+                state.stats["throttled"] += 1
+                headers["Retry-After"] = str(max(1, math.ceil(wait)))
+                return _graph_error(
+                    429, "TooManyRequests", "Too many requests", headers
+                )
+            if state.rng.random() < config["fault_rate"]:
+                state.stats["faults"] += 1
+                return _graph_error(
+                    config["fault_status"],
+                    "ServiceNotAvailable",
+                    "Injected fault",
+                    headers,
+                )
+            if state.rng.random() < config["hang_rate"]:
+                state.stats["hangs"] += 1
+                await asyncio.sleep(config["hang_seconds"])
+            await asyncio.sleep(sample_latency_ms(state.latency, state.rng) / 1000)
+
+        response = await call_next(request)
+        for name, value in headers.items():
+            response.headers[name] = value
+        return response
+
+    # ── Control ──
+
+    @app.get("/_standin/config")
+    async def get_config(request: Request):
+        return request.app.state.standin.config
+
+    @app.put("/_standin/config")
+    async def update_config(request: Request, changes: Dict[str, Any] = Body(...)):
+        state: StandInState = request.app.state.standin
+        config = {**state.config, **changes}
+        try:
+            state.configure(config, reset_data="events" in changes)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return config
+
+    @app.get("/_standin/stats")
+    async def get_stats(request: Request):
+        return dict(request.app.state.standin.stats)
+
+    # ── Calendario ──
+
+    @app.get("/v1.0/me/calendar/events")
+    async def list_events(request: Request):
+        events = sorted(
+            request.app.state.standin.events.values(),
+            key=lambda e: e["start"]["dateTime"],
+        )
+        return _page(request, events)
+
+    @app.post("/v1.0/me/calendar/events", status_code=201)
+    async def create_event(request: Request, body: Dict[str, Any] = Body(...)):
+        state: StandInState = request.app.state.standin
+        event = {"id": uuid.uuid4().hex, "createdDateTime": _now(), **body}
+        if body.get("isOnlineMeeting"):
+            event["onlineMeeting"] = {"joinUrl": f"https://teams.example/{event['id']}"}
+        state.events[event["id"]] = event
+        state.record_change(event["id"])
+        return event
+
+    @app.get("/v1.0/me/calendar/events/{event_id}")
+    async def get_event(request: Request, event_id: str):
+        event = request.app.state.standin.events.get(event_id)
+        if event is None:
+            return _graph_error(404, "ErrorItemNotFound", "Event not found")
+        return event
+
+    @app.patch("/v1.0/me/calendar/events/{event_id}")
+    async def update_event(
+        request: Request, event_id: str, body: Dict[str, Any] = Body(...)
+    ):
+        state: StandInState = request.app.state.standin
+        event = state.events.get(event_id)
+        if event is None:
+            return _graph_error(404, "ErrorItemNotFound", "Event not found")
+        event.update(body)
+        state.record_change(event_id)
+        return event
+
+    @app.delete("/v1.0/me/calendar/events/{event_id}", status_code=204)
+    async def delete_event(request: Request, event_id: str):
+        state: StandInState = request.app.state.standin
+        if state.events.pop(event_id, None) is None:
+            return _graph_error(404, "ErrorItemNotFound", "Event not found")
+        state.record_change(event_id, deleted=True)
+
+    @app.get("/v1.0/me/calendarView/delta")
+    async def events_delta(request: Request):
+        """
+        Delta query: la primera ronda pagina todos los eventos y termina con
+        un @odata.deltaLink; con $deltatoken solo se retornan los cambios.
+        """
+        state: StandInState = request.app.state.standin
+        token = request.query_params.get("$deltatoken")
+        if token is None:
+            items = sorted(state.events.values(), key=lambda e: e["id"])
+        else:
+            since = int(token)
+            latest: Dict[str, bool] = {}
+            for sequence, event_id, deleted in state.changes:
+                if sequence > since:
+                    latest[event_id] = deleted
+            items = [
+                (
+                    {"id": event_id, "@removed": {"reason": "deleted"}}
+                    if deleted
+                    else state.events[event_id]
+                )
+                for event_id, deleted in latest.items()
+                if deleted or event_id in state.events
+            ]
+
+        page = _page(request, items)
+        if "@odata.nextLink" not in page:
+            base = str(request.url.remove_query_params(list(request.query_params)))
+            page["@odata.deltaLink"] = (
+                f"{base}?{urlencode({'$deltatoken': state.sequence})}"
+            )
+        return page
+
+    @app.post("/v1.0/me/calendar/getSchedule")
+    async def get_schedule(request: Request, body: Dict[str, Any] = Body(...)):
+        state: StandInState = request.app.state.standin
+        start = datetime.fromisoformat(body["startTime"]["dateTime"])
+        end = datetime.fromisoformat(body["endTime"]["dateTime"])
+        hours = max(1, int((end - start).total_seconds() // 3600))
+        value = []
+        for mailbox in body.get("schedules", []):
+            # Ocupación determinista por buzón: ~1 de cada 3 horas
+            rng = random.Random(f"{mailbox}{start.date()}")
+            items = [
+                {
+                    "status": "busy",
+                    "start": {"dateTime": (start + timedelta(hours=h)).isoformat()},
+                    "end": {"dateTime": (start + timedelta(hours=h + 1)).isoformat()},
+                }
+                for h in range(hours)
+                if rng.random() < 0.33
+            ]
+            value.append({"scheduleId": mailbox, "scheduleItems": items})
+        state.stats["schedules"] += len(value)
+        return {"value": value}
+
+    # ── Teams ──
+
+    @app.post("/v1.0/me/onlineMeetings", status_code=201)
+    async def create_meeting(request: Request, body: Dict[str, Any] = Body(...)):
+        meeting_id = uuid.uuid4().hex
+        meeting = {
+            "id": meeting_id,
+            "joinUrl": f"https://teams.example/l/meetup-join/{meeting_id}",
+            "createdDateTime": _now(),
+            **body,
+        }
+        request.app.state.standin.meetings[meeting_id] = meeting
+        return meeting
+
+    @app.get("/v1.0/me/onlineMeetings")
+    async def list_meetings(request: Request):
+        return _page(request, list(request.app.state.standin.meetings.values()))
+
+    @app.get("/v1.0/me/onlineMeetings/{meeting_id}")
+    async def get_meeting(request: Request, meeting_id: str):
+        meetings = request.app.state.standin.meetings
+        return meetings.get(meeting_id) or {
+            "id": meeting_id,
+            "subject": "Asesoría",
+            "joinUrl": f"https://teams.example/l/meetup-join/{meeting_id}",
+        }
+
+    @app.get("/v1.0/me/onlineMeetings/{meeting_id}/attendanceReports")
+    async def list_attendance_reports(request: Request, meeting_id: str):
+        report = attendance_report(0, meeting_id)
+        report["totalParticipantCount"] = request.app.state.standin.config[
+            "participants"
+        ]
+        del report["attendanceRecords"]
+        return _page(request, [report])
+
+    @app.get("/v1.0/me/onlineMeetings/{meeting_id}/attendanceReports/{report_id}")
+    async def get_attendance_report(request: Request, meeting_id: str, report_id: str):
+        participants = request.app.state.standin.config["participants"]
+        report = attendance_report(participants, meeting_id)
+        report["id"] = report_id
+        return report
+
+    # ── $batch ──
+
+    @app.post("/v1.0/$batch")
+    async def batch(request: Request, body: Dict[str, Any] = Body(...)):
+        requests = body.get("requests", [])
+        if len(requests) > BATCH_MAX_REQUESTS:
+            return _graph_error(
+                400,
+                "BadRequest",
+                f"Number of batch requests exceeds {BATCH_MAX_REQUESTS}",
+            )
+        transport = httpx.ASGITransport(app=request.app)
+        headers = {
+            "authorization": request.headers.get("authorization", ""),
+            BATCH_HEADER: "1",
+        }
+        responses = []
+        async with httpx.AsyncClient(
+            transport=transport, base_url=str(request.base_url).rstrip("/") + "/v1.0"
+        ) as client:
+            for item in requests:
+                url = "/" + item["url"].lstrip("/")
+                sub = await client.request(
+                    item.get("method", "GET"),
+                    url,
+                    json=item.get("body"),
+                    headers={**headers, **(item.get("headers") or {})},
+                )
+                responses.append(
+                    {
+                        "id": item.get("id"),
+                        "status": sub.status_code,
+                        "headers": {"Content-Type": "application/json"},
+                        "body": sub.json() if sub.content else None,
+                    }
+                )
+        return {"responses": responses}
+
+    return app
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+app = create_app()
@@ -0,0 +1,184 @@
+"""
+Utilidades comunes de los benchmarks.
+
+Cada resultado es un dict con al menos `name`, `value` (métrica principal,
+menor es mejor) y `unit`. Los resultados de una corrida se guardan como
+JSON en benchmarks/results/ para compararlos con una corrida anterior.
+"""
+
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import timeit
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    number: Optional[int] = None,
+    repeat: int = 5,
+) -> Dict[str, Any]:
+    """
+    Microbenchmark de una función sin argumentos.
+
+    Con `number=None` se calibra como `timeit` (al menos 0.2 s por repetición).
+    El valor principal es la mediana por llamada en microsegundos.
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    per_call = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    median = statistics.median(per_call)
+    return {
+        "name": name,
+        "value": round(median, 3),
+        "unit": "us",
+        "min_us": round(min(per_call), 3),
+        "mean_us": round(statistics.fmean(per_call), 3),
+        "number": number,
+        "repeat": repeat,
+        "ops_per_sec": round(1e6 / median, 1) if median else None,
+    }
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    """Percentiles p50/p95/p99 y máximo de una lista de latencias."""
+    ordered = sorted(latencies_ms)
+
+    def pct(q: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(round(q * len(ordered))) - 1))
+        return round(ordered[index], 3)
+
+    return {
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+async def measure_async(
+    name: str,
+    call: Callable[[], Awaitable[Any]],
+    requests: int = 200,
+    concurrency: int = 10,
+    warmup: int = 5,
+) -> Dict[str, Any]:
+    """
+    Macrobenchmark: ejecuta `call` `requests` veces con `concurrency`
+    llamadas simultáneas. El valor principal es la latencia p50 en ms.
+    """
+    for _ in range(warmup):
+        await call()
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    summary = latency_summary(latencies)
+    return {
+        "name": name,
+        "value": summary["p50_ms"],
+        "unit": "ms",
+        **summary,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return None
+
+
+def save_results(
+    suite: str, results: List[Dict[str, Any]], path: Optional[str] = None
+) -> str:
+    """Guarda los resultados de una corrida como JSON y retorna la ruta."""
+    created_at = datetime.utcnow()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(
+            RESULTS_DIR, f"{suite}-{created_at.strftime('%Y%m%dT%H%M%S')}.json"
+        )
+    document = {
+        "suite": suite,
+        "created_at": created_at.isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    """Carga los resultados de una corrida guardada."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(
+    baseline: List[Dict[str, Any]],
+    current: List[Dict[str, Any]],
+    threshold: float = 0.10,
+) -> List[Dict[str, Any]]:
+    """
+    Compara dos corridas por nombre de benchmark.
+
+    Returns:
+        Una fila por benchmark presente en ambas, con el cambio relativo y
+        `regression=True` si empeoró más que `threshold` (0.10 = 10 %)
+    """
+    previous = {r["name"]: r for r in baseline if "name" in r and "value" in r}
+    rows = []
+    for result in current:
+        before = previous.get(result.get("name"))
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / before["value"]
+        rows.append(
+            {
+                "name": result["name"],
+                "unit": result["unit"],
+                "baseline": before["value"],
+                "current": result["value"],
+                "change": round(change, 4),
+                "regression": change > threshold,
+            }
+        )
+    return rows
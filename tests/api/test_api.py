@@ -157,3 +157,288 @@ class TestJWTTokens:
             assert payload is None
         except ImportError:
             pytest.skip("Cannot import JWT utilities")
+
+
+class TestAdminChecks:
+    """Tests that admin rights come from the stored user, not the token."""
+
+    def test_register_rejects_admin_role(self):
+        """Test that self-registration cannot pick the admin role."""
+        from backend.app import main
+
+        response = TestClient(main.app).post(
+            "/api/auth/register",
+            json={"name": "X", "email": "x@example.com", "password": "pw", "role": "admin"},
+        )
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_forged_admin_claim_is_rejected(self, monkeypatch):
+        """Test that a token claiming admin needs an admin user record."""
+        from types import SimpleNamespace
+        from fastapi import HTTPException
+        from backend.app import main
+        from backend.app.domain.entities import RoleEnum, User
+
+        users = {
+            "u-admin": User(id="u-admin", role=RoleEnum.ADMIN),
+            "u-student": User(id="u-student", role=RoleEnum.STUDENT),
+        }
+        repository = SimpleNamespace(get_by_id=AsyncMock(side_effect=users.get))
+        container = SimpleNamespace(user_repository=repository)
+        monkeypatch.setattr(main, "get_container", lambda: container)
+
+        def bearer(user_id):
+            token = main.create_access_token({"sub": "a", "user_id": user_id, "role": "admin"})
+            return f"Bearer {token}"
+
+        assert (await main.require_admin(bearer("u-admin")))["user_id"] == "u-admin"
+        for user_id in ("u-student", "u-missing"):
+            with pytest.raises(HTTPException) as exc:
+                await main.require_admin(bearer(user_id))
+            assert exc.value.status_code == 403
+        assert not await main.is_admin_request({"authorization": bearer("u-student")})
+
+
+class TestApproveSession:
+    """Tests for POST /api/sessions/{id}/approve."""
+
+    def _client(self, monkeypatch, stored_roles, graph_session=None, status=None):
+        import base64
+        import json
+        from dataclasses import replace
+        from types import SimpleNamespace
+        from itsdangerous import TimestampSigner
+        from backend.app import main
+        from backend.app.domain.entities import (
+            Request,
+            Session,
+            SessionStatusEnum,
+            User,
+        )
+
+        pending = Session(id="s1", request_id="r1", student_id="u1", advisor_id="u2")
+        if status:
+            pending.status = SessionStatusEnum(status)
+        approved = replace(pending, status=SessionStatusEnum.APPROVED)
+        repository = SimpleNamespace(
+            get_by_id=AsyncMock(return_value=pending),
+            approve_session=AsyncMock(return_value=approved),
+        )
+        users = {
+            "u1": User(id="u1", name="Ana", email="ana@uni.mx"),
+            "u2": User(id="u2", name="Luis", email="luis@uni.mx"),
+        }
+        runner = SimpleNamespace(enqueue=AsyncMock(return_value="job-1"))
+        container = SimpleNamespace(
+            session_repository=repository,
+            request_repository=SimpleNamespace(
+                get_by_id=AsyncMock(return_value=Request(id="r1", subject="Física"))
+            ),
+            user_repository=SimpleNamespace(
+                get_by_id=AsyncMock(side_effect=lambda user_id: users.get(user_id))
+            ),
+        )
+        monkeypatch.setattr(main, "get_container", lambda: container)
+        monkeypatch.setattr(main.app, "job_runner", runner, raising=False)
+
+        client = TestClient(main.app)
+        if graph_session:
+            data = base64.b64encode(json.dumps(graph_session).encode())
+            signed = TimestampSigner(str(main.settings.SECRET_KEY)).sign(data)
+            client.cookies.set("session", signed.decode())
+        token = main.create_access_token({"sub": "a", "user_id": "admin-1", "role": "admin"})
+        return client, {"Authorization": f"Bearer {token}"}, repository, runner
+
+    def test_requires_graph_token_before_approving(self, monkeypatch, stored_roles):
+        """Test that a missing Graph session leaves the session unapproved."""
+        client, auth, repository, runner = self._client(monkeypatch, stored_roles)
+
+        response = client.post("/api/sessions/s1/approve", headers=auth)
+
+        assert response.status_code == 401
+        repository.approve_session.assert_not_awaited()
+        runner.enqueue.assert_not_awaited()
+
+    def test_approves_and_enqueues_meeting(self, monkeypatch, stored_roles):
+        """Test that approval and the meeting job happen together."""
+        client, auth, repository, runner = self._client(
+            monkeypatch, stored_roles, graph_session={"ms_graph_token": "enc"}
+        )
+
+        response = client.post("/api/sessions/s1/approve", headers=auth)
+
+        assert response.status_code == 202
+        assert response.json()["job_id"] == "job-1"
+        repository.approve_session.assert_awaited_once()
+        job = runner.enqueue.await_args.args[1]
+        assert job["access_token"] == "enc"
+        assert job["subject"] == "Asesoría PeerHive: Física"
+        assert job["participants"] == [
+            {"email": "luis@uni.mx", "role": "presenter"},
+            {"email": "ana@uni.mx", "role": "attendee"},
+        ]
+
+    def test_only_pending_sessions_are_approved(self, monkeypatch, stored_roles):
+        """Test that finished sessions and lost races don't enqueue meetings."""
+        client, auth, repository, runner = self._client(
+            monkeypatch,
+            stored_roles,
+            graph_session={"ms_graph_token": "enc"},
+            status="cancelled",
+        )
+        assert client.post("/api/sessions/s1/approve", headers=auth).status_code == 409
+        repository.approve_session.assert_not_awaited()
+
+        client, auth, repository, runner = self._client(
+            monkeypatch, stored_roles, graph_session={"ms_graph_token": "enc"}
+        )
+        # Otra aprobación ganó la transición condicional
+        repository.approve_session.return_value = None
+        assert client.post("/api/sessions/s1/approve", headers=auth).status_code == 409
+        runner.enqueue.assert_not_awaited()
+
+
+class TestCreateSession:
+    """Tests for POST /api/sessions."""
+
+    def _client(self, monkeypatch, user_id, execute=None):
+        from datetime import datetime
+        from types import SimpleNamespace
+        from backend.app import main
+        from backend.app.domain.entities import Request, Session
+
+        advisory_request = Request(id="r1", student_id="u1", advisor_id="u2", subject="Física")
+        created = Session(
+            id="s1",
+            request_id="r1",
+            student_id="u1",
+            advisor_id="u2",
+            scheduled_at=datetime(2025, 3, 3, 10, 0),
+        )
+        use_case = SimpleNamespace(execute=execute or AsyncMock(return_value=created))
+        container = SimpleNamespace(
+            request_repository=SimpleNamespace(get_by_id=AsyncMock(return_value=advisory_request)),
+            session_repository=SimpleNamespace(get_by_request_id=AsyncMock(return_value=None)),
+            create_session_use_case=use_case,
+        )
+        monkeypatch.setattr(main, "get_container", lambda: container)
+        token = main.create_access_token({"sub": "a", "user_id": user_id, "role": "student"})
+        return TestClient(main.app), {"Authorization": f"Bearer {token}"}, use_case
+
+    def test_student_schedules_session(self, monkeypatch):
+        """Test that the request's student creates a session in schedule time."""
+        from datetime import datetime
+
+        client, auth, use_case = self._client(monkeypatch, "u1")
+
+        response = client.post(
+            "/api/sessions",
+            json={"request_id": "r1", "scheduled_at": "2025-03-03T16:00:00Z"},
+            headers=auth,
+        )
+
+        assert response.status_code == 201
+        assert response.json()["session_id"] == "s1"
+        assert response.json()["status"] == "pending_approval"
+        kwargs = use_case.execute.await_args.kwargs
+        assert kwargs["advisor_id"] == "u2"
+        assert kwargs["scheduled_at"] == datetime(2025, 3, 3, 10, 0)
+
+    def test_conflict_returns_409(self, monkeypatch):
+        """Test that a schedule conflict is reported as 409."""
+        execute = AsyncMock(side_effect=ValueError("Schedule conflict"))
+        client, auth, _ = self._client(monkeypatch, "u2", execute=execute)
+
+        response = client.post(
+            "/api/sessions",
+            json={"request_id": "r1", "scheduled_at": "2025-03-03T10:00:00"},
+            headers=auth,
+        )
+
+        assert response.status_code == 409
+
+    def test_other_users_get_404(self, monkeypatch, stored_roles):
+        """Test that users outside the request can't schedule it."""
+        client, auth, use_case = self._client(monkeypatch, "u3")
+
+        response = client.post(
+            "/api/sessions",
+            json={"request_id": "r1", "scheduled_at": "2025-03-03T10:00:00"},
+            headers=auth,
+        )
+
+        assert response.status_code == 404
+        use_case.execute.assert_not_awaited()
+
+
+class TestChatHistoryCursor:
+    """Tests for the cursors of GET /api/chats/{session_id}/messages."""
+
+    def _get(self, monkeypatch, cursor):
+        import base64
+        from types import SimpleNamespace
+        from backend.app import main
+
+        chat = SimpleNamespace(id="c1", student_id="u1", advisor_id="u2")
+        repository = SimpleNamespace(
+            get_by_session_id=AsyncMock(return_value=chat),
+            list_messages=AsyncMock(return_value=[]),
+        )
+        container = SimpleNamespace(chat_repository=repository)
+        monkeypatch.setattr(main, "get_container", lambda: container)
+        token = main.create_access_token({"sub": "a", "user_id": "u1", "role": "student"})
+        response = TestClient(main.app).get(
+            "/api/chats/s1/messages",
+            params={"before": base64.urlsafe_b64encode(cursor.encode()).decode()},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        return response, repository
+
+    def test_invalid_cursors_return_400(self, monkeypatch):
+        """Test that a malformed id or date is a client error, not a 500."""
+        for cursor in ("2024-03-01T10:00:00|not-an-id", "ayer|65f000000000000000000001", "sin-separador"):
+            response, repository = self._get(monkeypatch, cursor)
+            assert response.status_code == 400
+            repository.list_messages.assert_not_awaited()
+
+    def test_aware_cursor_is_normalized_to_utc(self, monkeypatch):
+        """Test that an offset in the cursor date is converted to naive UTC."""
+        from datetime import datetime
+
+        response, repository = self._get(
+            monkeypatch, "2024-03-01T04:00:00-06:00|65f000000000000000000001"
+        )
+
+        assert response.status_code == 200
+        before = repository.list_messages.await_args.kwargs["before"]
+        assert before == (datetime(2024, 3, 1, 10, 0), "65f000000000000000000001")
+
+
+class TestGraphWritesOffLoop:
+    """Tests that Graph write routes don't run blocking calls on the event loop."""
+
+    def test_delete_event_runs_in_threadpool(self, monkeypatch):
+        """Test that a throttled (sleeping) Graph call happens off the loop thread."""
+        import asyncio
+        from backend.app import main
+        from backend.app.services import calendar
+
+        on_loop = []
+
+        def delete_calendar_event(access_token, event_id):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+
+        monkeypatch.setattr(calendar, "delete_calendar_event", delete_calendar_event)
+        token = main.create_access_token({"sub": "a"})
+
+        response = TestClient(main.app).delete(
+            "/api/calendar/events/e1", headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        assert on_loop == [False]
@@ -0,0 +1,87 @@
+"""Tests for GET /api/availability with a stubbed getSchedule."""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+
+def _busy(start, end):
+    return {"status": "busy", "start": start, "end": end}
+
+
+class TestAvailabilityRoute:
+    """Tests for GET /api/availability."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        from fastapi.testclient import TestClient
+        from backend.app import main
+        from backend.app.domain.entities import RoleEnum, User
+        from backend.app.services import calendar
+
+        advisors = [
+            User(id="a1", name="Ana", email="ana@example.com", role=RoleEnum.ADVISOR),
+            User(id="a2", name="Beto", email="beto@example.com", role=RoleEnum.ADVISOR),
+        ]
+        repository = SimpleNamespace(
+            list_advisors_by_subject=AsyncMock(return_value=advisors)
+        )
+        container = SimpleNamespace(user_repository=repository)
+        monkeypatch.setattr(main, "get_container", lambda: container)
+
+        self.calls = []
+
+        def get_schedule(**kwargs):
+            self.calls.append(kwargs)
+            return {
+                "ana@example.com": [
+                    _busy("2025-03-03T10:00:00.0000000", "2025-03-03T11:00:00.0000000")
+                ],
+            }
+
+        monkeypatch.setattr(calendar, "get_schedule", get_schedule)
+        token = main.create_access_token({"sub": "s"})
+        return TestClient(main.app), {"Authorization": f"Bearer {token}"}
+
+    def test_aware_window_is_converted_to_schedule_time(self, client):
+        """Test that an offset window is compared in the getSchedule timezone."""
+        http, auth = client
+
+        # 15:00-19:00 UTC son 09:00-13:00 en Ciudad de México (UTC-6)
+        response = http.get(
+            "/api/availability",
+            params={
+                "subject": "Cálculo",
+                "start": "2025-03-03T15:00:00+00:00",
+                "end": "2025-03-03T19:00:00+00:00",
+            },
+            headers=auth,
+        )
+
+        assert response.status_code == 200
+        assert self.calls[0]["start_datetime"] == "2025-03-03T09:00:00"
+        ana = response.json()["advisors"][0]
+        assert ana["free_slots"] == [
+            {"start": "2025-03-03T09:00:00", "end": "2025-03-03T10:00:00"},
+            {"start": "2025-03-03T11:00:00", "end": "2025-03-03T13:00:00"},
+        ]
+
+    def test_mailbox_errors_are_reported_as_unknown(self, client):
+        """Test that an advisor missing from getSchedule is not shown as free."""
+        http, auth = client
+
+        response = http.get(
+            "/api/availability",
+            params={
+                "subject": "Cálculo",
+                "start": "2025-03-03T09:00:00",
+                "end": "2025-03-03T13:00:00",
+            },
+            headers=auth,
+        )
+
+        ana, beto = response.json()["advisors"]
+        assert ana["availability_unknown"] is False
+        assert len(ana["free_slots"]) == 2
+        assert beto["availability_unknown"] is True
+        assert beto["free_slots"] == []
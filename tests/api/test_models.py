@@ -0,0 +1,91 @@
+"""Tests for the Pydantic API models and their ObjectId type."""
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from pydantic import ValidationError
+
+
+class TestPyObjectId:
+    """Tests for the pydantic v2 ObjectId annotation."""
+
+    def test_validates_from_str_and_object_id(self):
+        """Test that both input forms produce ObjectId values."""
+        from backend.app.models import Request
+
+        oid = ObjectId()
+        from_str = Request(studentId=str(oid), subject="Cálculo", topic="Límites")
+        from_oid = Request(studentId=oid, subject="Cálculo", topic="Límites")
+
+        assert from_str.studentId == oid
+        assert isinstance(from_str.studentId, ObjectId)
+        assert from_oid.studentId is oid
+
+    def test_rejects_invalid_values(self):
+        """Test invalid ObjectIds in python and JSON input."""
+        from backend.app.models import Request
+
+        with pytest.raises(ValidationError) as exc:
+            Request(studentId="not-an-id", subject="Cálculo", topic="Límites")
+        assert exc.value.errors()[0]["type"] == "object_id"
+
+        with pytest.raises(ValidationError):
+            Request(studentId=123, subject="Cálculo", topic="Límites")
+        with pytest.raises(ValidationError):
+            Request.model_validate_json(
+                '{"studentId": "zz", "subject": "Cálculo", "topic": "Límites"}'
+            )
+
+    def test_serializes_to_str_in_json_only(self):
+        """Test JSON output as str while python dumps keep ObjectId for Mongo."""
+        from backend.app.models import Chat
+
+        oid = ObjectId()
+        chat = Chat(
+            _id=oid,
+            sessionId=oid,
+            studentId=oid,
+            advisorId=oid,
+            messages=[{"fromUserId": str(oid), "content": "Hola"}],
+        )
+
+        data = chat.model_dump(mode="json", by_alias=True)
+        assert data["_id"] == str(oid)
+        assert data["messages"][0]["fromUserId"] == str(oid)
+        assert chat.model_dump(by_alias=True)["sessionId"] is oid
+        assert Chat.model_validate_json(chat.model_dump_json(by_alias=True)) == chat
+
+    def test_nested_session_models(self):
+        """Test Session, Verification and AttendanceRecord round-trip."""
+        from backend.app.models import Session
+
+        oid = ObjectId()
+        session = Session(
+            requestId=str(oid),
+            studentId=str(oid),
+            advisorId=str(oid),
+            scheduledAt=datetime(2026, 3, 2, 10, 0),
+            meetingPlatform="teams",
+            verification={
+                "wasHeld": True,
+                "evidenceType": "teams_api",
+                "verifiedBy": str(oid),
+                "attendance": [
+                    {
+                        "userId": str(oid),
+                        "joinedAt": "2026-03-02T10:00:00",
+                        "leftAt": "2026-03-02T10:55:00",
+                        "durationMinutes": 55,
+                    }
+                ],
+            },
+        )
+
+        assert session.verification.verifiedBy == oid
+        assert session.verification.attendance[0].userId == oid
+
+    def test_json_schema_is_string(self):
+        """Test the OpenAPI schema of ObjectId fields."""
+        from backend.app.models import User
+
+        schema = User.model_json_schema(by_alias=True)
+        assert schema["properties"]["_id"]["anyOf"][0]["type"] == "string"
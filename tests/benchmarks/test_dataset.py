@@ -0,0 +1,151 @@
+"""Tests for the synthetic scale-testing dataset generator."""
+from collections import Counter
+
+import pytest
+
+
+def _generate(**overrides):
+    from benchmarks.dataset import DatasetGenerator, DatasetSpec
+
+    spec = DatasetSpec(users=2_000, requests=20_000, sessions=4_000, subjects=60)
+    for key, value in overrides.items():
+        setattr(spec, key, value)
+    generator = DatasetGenerator(spec)
+    users = list(generator.users())
+    requests, sessions = [], []
+    for collection, doc in generator.requests_and_sessions():
+        (requests if collection == "requests" else sessions).append(doc)
+    return users, requests, sessions
+
+
+class TestDatasetGenerator:
+    """Tests for DatasetGenerator."""
+
+    def test_is_deterministic_by_seed(self):
+        """Test that the same seed yields identical documents and ids."""
+        first = _generate()
+        second = _generate()
+        assert first == second
+
+        other_users, _, _ = _generate(seed=7)
+        assert other_users[0]["_id"] != first[0][0]["_id"]
+
+    def test_produces_requested_sizes(self):
+        """Test exact document counts per collection."""
+        users, requests, sessions = _generate()
+
+        assert len(users) == 2_000
+        assert len(requests) == 20_000
+        assert len(sessions) == 4_000
+
+    def test_subject_popularity_has_long_tail(self):
+        """Test that a few subjects concentrate most requests."""
+        _, requests, _ = _generate()
+        counts = Counter(r["subject"] for r in requests).most_common()
+
+        top_five = sum(count for _, count in counts[:5])
+        assert top_five / len(requests) > 0.4
+        assert counts[-1][1] < counts[0][1] / 20
+
+    def test_advisor_load_is_imbalanced(self):
+        """Test that the busiest advisors take a disproportionate share."""
+        _, requests, _ = _generate()
+        load = Counter(r["advisorId"] for r in requests if "advisorId" in r)
+        ordered = [count for _, count in load.most_common()]
+
+        top_fifth = sum(ordered[: len(ordered) // 5])
+        assert top_fifth / sum(ordered) > 0.4
+
+    def test_sessions_reference_taken_requests(self):
+        """Test referential integrity and verification of sessions."""
+        users, requests, sessions = _generate()
+        by_id = {r["_id"]: r for r in requests}
+        user_ids = {u["_id"] for u in users}
+
+        for session in sessions:
+            request = by_id[session["requestId"]]
+            assert request["status"] in ("taken", "completed")
+            assert session["advisorId"] == request["advisorId"]
+            assert session["studentId"] in user_ids
+            assert session["scheduledAt"] > request["createdAt"]
+
+        verified = [s for s in sessions if "verification" in s]
+        assert verified
+        for session in verified:
+            attendance = session["verification"]["attendance"]
+            assert {a["userId"] for a in attendance} == {
+                session["advisorId"],
+                session["studentId"],
+            }
+
+    def test_documents_load_through_repositories(self):
+        """Test that generated documents map to domain entities."""
+        from unittest.mock import MagicMock
+        from backend.app.infrastructure.repositories import (
+            RequestRepository,
+            SessionRepository,
+            UserRepository,
+        )
+
+        users, requests, sessions = _generate()
+        db = MagicMock()
+
+        assert UserRepository(db)._to_entity(users[-1]).is_student()
+        assert RequestRepository(db)._to_entity(requests[0]).subject
+        session = SessionRepository(db)._to_entity(sessions[0])
+        assert session.request_id == str(sessions[0]["requestId"])
+
+
+class TestBatched:
+    """Tests for batched."""
+
+    def test_splits_into_fixed_size_batches(self):
+        """Test batch sizes including the remainder."""
+        from benchmarks.dataset import batched
+
+        assert [len(b) for b in batched(range(12), 5)] == [5, 5, 2]
+
+
+class TestSeedDatabase:
+    """Tests for seed_database."""
+
+    @pytest.mark.asyncio
+    async def test_refuses_to_drop_an_unmarked_database(self, fake_mongo):
+        """Test that existing data without the dataset marker is kept."""
+        from benchmarks.dataset import DatasetSpec, seed_database
+
+        database = fake_mongo
+        await database.users.insert_one({"email": "real@uni.mx"})
+        spec = DatasetSpec(users=20, requests=50, sessions=10, subjects=5)
+
+        with pytest.raises(RuntimeError, match="--force"):
+            await seed_database(database, spec)
+        assert await database.users.count_documents({}) == 1
+
+        result = await seed_database(database, spec, force=True)
+        assert result["counts"]["users"] == 20
+
+    @pytest.mark.asyncio
+    async def test_reseeds_empty_or_marked_databases(self, fake_mongo):
+        """Test that new databases and earlier seeds are dropped freely."""
+        from benchmarks.dataset import DatasetSpec, seed_database
+
+        spec = DatasetSpec(users=20, requests=50, sessions=10, subjects=5)
+
+        await seed_database(fake_mongo, spec)
+        result = await seed_database(fake_mongo, spec)
+
+        assert result["counts"]["users"] == 20
+        assert await fake_mongo.users.count_documents({}) == 20
+
+
+class TestSuites:
+    """Tests for the benchmark entry point."""
+
+    def test_repositories_suite_is_opt_in(self):
+        """Test that a bare run skips the suite that needs a live MongoDB."""
+        from benchmarks.__main__ import DEFAULT_SUITES, SUITES
+
+        assert "repositories" in SUITES
+        assert "repositories" not in DEFAULT_SUITES
+        assert set(DEFAULT_SUITES) <= set(SUITES)
@@ -0,0 +1,32 @@
+"""Tests for the in-memory doubles used by the macrobenchmarks."""
+from datetime import datetime
+
+import pytest
+
+
+class TestInMemorySessionRepository:
+    """Tests for InMemorySessionRepository."""
+
+    @pytest.mark.asyncio
+    async def test_iter_sessions_filters_and_orders(self):
+        """Test that it implements the port with the cursor's filters and order."""
+        from benchmarks.fakes import InMemorySessionRepository
+        from backend.app.domain.entities import Session, SessionStatusEnum
+
+        repository = InMemorySessionRepository()
+        for day, advisor in ((5, "a1"), (1, "a1"), (3, "a2"), (9, "a1")):
+            await repository.create(
+                Session(advisor_id=advisor, scheduled_at=datetime(2024, 3, day))
+            )
+
+        found = [
+            s
+            async for s in repository.iter_sessions(
+                scheduled_from=datetime(2024, 3, 1),
+                scheduled_to=datetime(2024, 3, 9),
+                advisor_id="a1",
+                status=SessionStatusEnum.PENDING_APPROVAL,
+            )
+        ]
+
+        assert [s.scheduled_at.day for s in found] == [1, 5]
@@ -7,10 +7,15 @@ from pathlib import Path
 backend_path = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_path))
 
+import copy
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 from datetime import datetime, timedelta
 
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
 
 @pytest.fixture
 def mock_db():
@@ -62,3 +67,440 @@ def sample_session_data():
         "meeting_platform": "teams",
         "meeting_link": "https://teams.example.com/meet123",
     }
+
+
+@pytest.fixture
+def stored_roles(monkeypatch):
+    """Roles stored per user_id, as the admin checks read them from the DB."""
+    from backend.app import main
+
+    roles = {"admin-1": "admin"}
+
+    async def load_user_role(user_id):
+        return roles.get(user_id)
+
+    monkeypatch.setattr(main, "load_user_role", load_user_role)
+    return roles
+
+
+# ── Fake MongoDB ────────────────────────────────────────────────
+# In-memory collections shared by the infrastructure tests. They implement
+# the subset of the Motor API the repositories use, with MongoDB semantics:
+# dotted paths into arrays, upserts, unique indexes, ReturnDocument and
+# ordered bulk writes.
+
+
+class FakeResult:
+    """Write result (InsertOneResult, UpdateResult, ...)."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeCursor:
+    """Async cursor with sort/skip/limit that counts the documents read."""
+
+    def __init__(self, docs, collection):
+        self.docs = docs
+        self.collection = collection
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        self.docs = FakeCollection.sorted(self.docs, keys)
+        return self
+
+    def skip(self, n):
+        self.docs = self.docs[n:]
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            self.collection.docs_read += 1
+            yield copy.deepcopy(doc)
+
+    async def to_list(self, length=None):
+        return [doc async for doc in self][:length]
+
+
+_MISSING = object()
+
+
+class FakeCollection:
+    """In-memory collection with the MongoDB semantics the backend relies on."""
+
+    OPERATORS = {
+        "$eq": lambda a, b: a == b,
+        "$gt": lambda a, b: a is not None and b is not None and a > b,
+        "$gte": lambda a, b: a is not None and b is not None and a >= b,
+        "$lt": lambda a, b: a is not None and b is not None and a < b,
+        "$lte": lambda a, b: a is not None and b is not None and a <= b,
+        "$in": lambda a, b: a in b,
+    }
+
+    def __init__(self, name=""):
+        self.name = name
+        self.docs = []
+        self.docs_read = 0
+        self.bulk_writes = []
+        self.indexes = []
+
+    # Queries
+
+    @staticmethod
+    def _values(doc, key):
+        """Values at a dotted path, descending into arrays."""
+        values = [doc]
+        for part in key.split("."):
+            found = []
+            for value in values:
+                items = value if isinstance(value, list) else [value]
+                found += [i[part] for i in items if isinstance(i, dict) and part in i]
+            values = found
+        return values
+
+    @classmethod
+    def matches(cls, doc, query):
+        for key, condition in (query or {}).items():
+            if key == "$or":
+                if not any(cls.matches(doc, q) for q in condition):
+                    return False
+                continue
+            if key == "$and":
+                if not all(cls.matches(doc, q) for q in condition):
+                    return False
+                continue
+            values = cls._values(doc, key)
+            # A missing field compares as null
+            candidates = values + [
+                item for v in values if isinstance(v, list) for item in v
+            ] or [None]
+            if isinstance(condition, dict) and any(
+                k.startswith("$") for k in condition
+            ):
+                for op, arg in condition.items():
+                    if op == "$exists":
+                        ok = bool(values) == bool(arg)
+                    elif op == "$ne":
+                        ok = all(v != arg for v in candidates)
+                    elif op == "$nin":
+                        ok = all(v not in arg for v in candidates)
+                    else:
+                        ok = any(cls.OPERATORS[op](v, arg) for v in candidates)
+                    if not ok:
+                        return False
+            elif condition not in candidates:
+                return False
+        return True
+
+    @staticmethod
+    def sorted(docs, keys):
+        docs = list(docs)
+        for key, direction in reversed(keys):
+            docs.sort(
+                key=lambda d: (d.get(key) is not None, d.get(key)),
+                reverse=direction < 0,
+            )
+        return docs
+
+    def _find(self, query, sort=None):
+        docs = [d for d in self.docs if self.matches(d, query)]
+        return self.sorted(docs, sort) if sort else docs
+
+    # Updates
+
+    @staticmethod
+    def _targets(doc, path, array_filters):
+        """Parent nodes and leaf key of a path, including `$[x]` filters."""
+        *parents, leaf = path.split(".")
+        nodes = [doc]
+        for part in parents:
+            found = []
+            for node in nodes:
+                if part.startswith("$[") and isinstance(node, list):
+                    name = part[2:-1]
+                    conditions = {
+                        k.split(".", 1)[1]: v
+                        for f in array_filters or ()
+                        for k, v in f.items()
+                        if k.split(".", 1)[0] == name
+                    }
+                    found += [i for i in node if FakeCollection.matches(i, conditions)]
+                elif isinstance(node, dict):
+                    found.append(node.setdefault(part, {}))
+            nodes = found
+        return [(node, leaf) for node in nodes if isinstance(node, dict)]
+
+    def _apply(self, doc, update, inserted=False, array_filters=None):
+        def each(operator):
+            for path, value in update.get(operator, {}).items():
+                for node, leaf in self._targets(doc, path, array_filters):
+                    yield node, leaf, value
+
+        if inserted:
+            for node, leaf, value in each("$setOnInsert"):
+                node[leaf] = copy.deepcopy(value)
+        for node, leaf, value in each("$set"):
+            node[leaf] = copy.deepcopy(value)
+        for node, leaf, _ in each("$unset"):
+            node.pop(leaf, None)
+        for node, leaf, value in each("$inc"):
+            node[leaf] = node.get(leaf, 0) + value
+        for node, leaf, value in each("$push"):
+            items = (
+                value["$each"]
+                if isinstance(value, dict) and "$each" in value
+                else [value]
+            )
+            node.setdefault(leaf, []).extend(copy.deepcopy(items))
+        for node, leaf, value in each("$addToSet"):
+            if value not in node.setdefault(leaf, []):
+                node[leaf].append(copy.deepcopy(value))
+        for node, leaf, value in each("$min"):
+            if node.get(leaf) is None or value < node[leaf]:
+                node[leaf] = value
+        for node, leaf, value in each("$max"):
+            if node.get(leaf) is None or value > node[leaf]:
+                node[leaf] = value
+
+    @classmethod
+    def _index_keys(cls, doc, fields, options):
+        """Index entries of a document; arrays are multikey, None = not indexed."""
+        partial = options.get("partialFilterExpression")
+        if partial is not None and not cls.matches(doc, partial):
+            return None
+        values = [doc.get(f, _MISSING) for f in fields]
+        if options.get("sparse") and all(v is _MISSING for v in values):
+            return None
+        keys = [()]
+        for value in values:
+            items = value if isinstance(value, list) and value else [value]
+            keys = [key + (item,) for key in keys for item in items]
+        return keys
+
+    def _check_unique(self, doc, ignore=None):
+        for keys, options in self.indexes:
+            if not options.get("unique"):
+                continue
+            fields = [k for k, _ in keys] if isinstance(keys, list) else [keys]
+            entries = self._index_keys(doc, fields, options)
+            if entries is None:
+                continue
+            for other in self.docs:
+                if other is ignore:
+                    continue
+                taken = self._index_keys(other, fields, options) or []
+                if any(entry in taken for entry in entries):
+                    raise DuplicateKeyError(f"E11000 duplicate key: {fields}")
+        for other in self.docs:
+            if other is not ignore and other["_id"] == doc["_id"]:
+                raise DuplicateKeyError("E11000 duplicate key: _id")
+
+    def _upsert(self, query, update, array_filters=None):
+        doc = {
+            k: copy.deepcopy(v)
+            for k, v in query.items()
+            if not k.startswith("$")
+            and "." not in k
+            and not (isinstance(v, dict) and any(o.startswith("$") for o in v))
+        }
+        self._apply(doc, update, inserted=True, array_filters=array_filters)
+        doc.setdefault("_id", ObjectId())
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return doc
+
+    def _update(self, doc, update, array_filters=None):
+        before = copy.deepcopy(doc)
+        self._apply(doc, update, array_filters=array_filters)
+        try:
+            self._check_unique(doc, ignore=doc)
+        except DuplicateKeyError:
+            doc.clear()
+            doc.update(before)
+            raise
+        return before
+
+    # Motor API
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return keys if isinstance(keys, str) else "_".join(f"{k}_{d}" for k, d in keys)
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self._check_unique(doc)
+        self.docs.append(copy.deepcopy(doc))
+        return FakeResult(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        ids = [(await self.insert_one(doc)).inserted_id for doc in docs]
+        return FakeResult(inserted_ids=ids)
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        found = self._find(query, sort)
+        return copy.deepcopy(found[0]) if found else None
+
+    def find(self, query=None, projection=None, sort=None):
+        return FakeCursor(self._find(query, sort), self)
+
+    async def count_documents(self, query):
+        return len(self._find(query))
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    async def find_one_and_update(
+        self,
+        query,
+        update,
+        projection=None,
+        sort=None,
+        upsert=False,
+        return_document=ReturnDocument.BEFORE,
+        array_filters=None,
+    ):
+        found = self._find(query, sort)
+        if found:
+            before = self._update(found[0], update, array_filters)
+            after = found[0]
+        elif upsert:
+            before, after = None, self._upsert(query, update, array_filters)
+        else:
+            return None
+        result = after if return_document == ReturnDocument.AFTER else before
+        return copy.deepcopy(result)
+
+    async def find_one_and_replace(
+        self, query, replacement, return_document=ReturnDocument.BEFORE
+    ):
+        found = self._find(query)
+        if not found:
+            return None
+        before = copy.deepcopy(found[0])
+        found[0].clear()
+        found[0].update(copy.deepcopy(replacement), _id=before["_id"])
+        try:
+            self._check_unique(found[0], ignore=found[0])
+        except DuplicateKeyError:
+            found[0].clear()
+            found[0].update(before)
+            raise
+        return (
+            before
+            if return_document == ReturnDocument.BEFORE
+            else copy.deepcopy(found[0])
+        )
+
+    async def find_one_and_delete(self, query):
+        found = self._find(query)
+        if not found:
+            return None
+        self.docs.remove(found[0])
+        return found[0]
+
+    async def update_one(self, query, update, upsert=False, array_filters=None):
+        found = self._find(query)
+        if found:
+            self._update(found[0], update, array_filters)
+            return FakeResult(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            doc = self._upsert(query, update, array_filters)
+            return FakeResult(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return FakeResult(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query, update, upsert=False, array_filters=None):
+        found = self._find(query)
+        for doc in found:
+            self._update(doc, update, array_filters)
+        if not found and upsert:
+            self._upsert(query, update, array_filters)
+        return FakeResult(matched_count=len(found), modified_count=len(found))
+
+    async def replace_one(self, query, replacement, upsert=False):
+        found = await self.find_one_and_replace(query, replacement)
+        if found is None and upsert:
+            await self.insert_one(copy.deepcopy(replacement))
+        return FakeResult(matched_count=int(found is not None))
+
+    async def delete_one(self, query):
+        found = self._find(query)
+        if found:
+            self.docs.remove(found[0])
+        return FakeResult(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query):
+        found = self._find(query)
+        self.docs = [d for d in self.docs if d not in found]
+        return FakeResult(deleted_count=len(found))
+
+    async def bulk_write(self, ops, ordered=True):
+        """Applies UpdateOne/UpdateMany/InsertOne/ReplaceOne/DeleteOne in order."""
+        from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+        from pymongo.errors import BulkWriteError
+
+        self.bulk_writes.append(len(ops))
+        errors = []
+        for index, op in enumerate(ops):
+            try:
+                if isinstance(op, UpdateOne):
+                    await self.update_one(
+                        op._filter, op._doc, op._upsert, op._array_filters
+                    )
+                elif isinstance(op, UpdateMany):
+                    await self.update_many(
+                        op._filter, op._doc, op._upsert, op._array_filters
+                    )
+                elif isinstance(op, InsertOne):
+                    await self.insert_one(op._doc)
+                elif isinstance(op, ReplaceOne):
+                    await self.replace_one(op._filter, op._doc, op._upsert)
+                elif isinstance(op, DeleteOne):
+                    await self.delete_one(op._filter)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": 0})
+
+    async def drop(self):
+        self.docs = []
+        self.indexes = []
+
+
+class FakeDatabase:
+    """In-memory database; every attribute or key is a collection."""
+
+    def __init__(self, name="peerhive_test"):
+        self.name = name
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self):
+        return [n for n, c in self.collections.items() if c.docs or c.indexes]
+
+    async def drop_collection(self, name):
+        self.collections.pop(name, None)
+
+
+@pytest.fixture
+def fake_mongo():
+    """Fixture for an in-memory MongoDB database."""
+    return FakeDatabase()
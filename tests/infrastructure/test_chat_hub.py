@@ -0,0 +1,210 @@
+"""Tests for the WebSocket chat fan-out hub and endpoint."""
+import asyncio
+import json
+import pytest
+
+
+class FakeSocket:
+    """Records frames and close codes; can be made slow."""
+
+    def __init__(self, delay=0.0):
+        self.frames = []
+        self.closed_with = None
+        self.delay = delay
+
+    async def send(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append(json.loads(text))
+
+    async def close(self, code):
+        self.closed_with = code
+
+
+async def _settle(hub, rounds=5):
+    for _ in range(rounds):
+        await asyncio.sleep(hub.tick * 2)
+
+
+class TestChatHub:
+    """Tests for ChatHub batching, fan-out and eviction."""
+
+    @pytest.mark.asyncio
+    async def test_messages_in_one_tick_share_a_frame(self):
+        """Test that messages published within a tick go out as one frame."""
+        from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+        hub = ChatHub(InMemoryBroker(), tick=0.01)
+        socket = FakeSocket()
+        await hub.connect("room", "u1", socket.send, socket.close)
+
+        for i in range(3):
+            await hub.publish("room", {"type": "message", "n": i})
+        await _settle(hub)
+
+        assert socket.frames == [[{"type": "message", "n": i} for i in range(3)]]
+        await hub.close()
+        assert socket.closed_with == 1001
+
+    @pytest.mark.asyncio
+    async def test_frames_respect_max_batch(self):
+        """Test that a backlog is split into frames of at most max_batch."""
+        from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+        hub = ChatHub(InMemoryBroker(), tick=0.01, max_batch=2)
+        socket = FakeSocket()
+        await hub.connect("room", "u1", socket.send, socket.close)
+
+        for i in range(5):
+            await hub.publish("room", {"n": i})
+        await _settle(hub)
+
+        assert [len(frame) for frame in socket.frames] == [2, 2, 1]
+        assert [m["n"] for frame in socket.frames for m in frame] == list(range(5))
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_evicts_slow_consumer(self):
+        """Test that a client whose queue overflows is closed with 1013."""
+        from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+        hub = ChatHub(InMemoryBroker(), tick=0.01, max_queue=3, max_batch=1)
+        slow = FakeSocket(delay=0.5)
+        fast = FakeSocket()
+        await hub.connect("room", "slow", slow.send, slow.close)
+        await hub.connect("room", "fast", fast.send, fast.close)
+
+        for i in range(10):
+            await hub.publish("room", {"n": i})
+            await asyncio.sleep(hub.tick * 2)
+        await _settle(hub)
+
+        assert slow.closed_with == 1013
+        assert fast.closed_with is None
+        assert hub.stats()["connections"] == 1
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_send_timeout_evicts(self):
+        """Test that a send exceeding send_timeout closes the connection."""
+        from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+        hub = ChatHub(InMemoryBroker(), tick=0.01, send_timeout=0.02)
+        stuck = FakeSocket(delay=1.0)
+        await hub.connect("room", "u1", stuck.send, stuck.close)
+
+        await hub.publish("room", {"n": 1})
+        await _settle(hub)
+
+        assert stuck.closed_with == 1013
+        assert hub.stats() == {
+            "rooms": 0,
+            "connections": 0,
+            "published": 1,
+            "delivered": 1,
+            "frames": 0,
+            "evicted": 1,
+        }
+        await hub.close()
+
+    @pytest.mark.asyncio
+    async def test_shared_broker_fans_out_across_hubs(self):
+        """Test that hubs sharing a broker deliver to each other's clients."""
+        from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+        broker = InMemoryBroker()
+        worker_a, worker_b = ChatHub(broker, tick=0.01), ChatHub(broker, tick=0.01)
+        student, advisor, other = FakeSocket(), FakeSocket(), FakeSocket()
+        await worker_a.connect("room", "s", student.send, student.close)
+        await worker_b.connect("room", "a", advisor.send, advisor.close)
+        await worker_b.connect("other", "x", other.send, other.close)
+
+        await worker_a.publish("room", {"content": "hola"})
+        await _settle(worker_a)
+
+        assert student.frames == [[{"content": "hola"}]]
+        assert advisor.frames == [[{"content": "hola"}]]
+        assert other.frames == []
+        await worker_a.close()
+        await worker_b.close()
+
+    @pytest.mark.asyncio
+    async def test_last_disconnect_unsubscribes(self):
+        """Test that a room with no local connections leaves the broker."""
+        from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+        broker = InMemoryBroker()
+        hub = ChatHub(broker, tick=0.01)
+        socket = FakeSocket()
+        conn = await hub.connect("room", "u1", socket.send, socket.close)
+        assert "room" in broker._subscribers
+
+        await hub.disconnect(conn)
+
+        assert "room" not in broker._subscribers
+        assert hub.stats()["rooms"] == 0
+        await hub.close()
+
+
+class FakeChatRepository:
+    """Chat repository stand-in that records added messages."""
+
+    def __init__(self, chat):
+        self.chat = chat
+        self.added = []
+
+    async def get_by_session_id(self, session_id):
+        return self.chat if session_id == self.chat.session_id else None
+
+    async def add_message(self, chat_id, message):
+        message.id = f"m{len(self.added)}"
+        self.added.append((chat_id, message))
+        return message
+
+
+class TestChatWebSocket:
+    """Tests for the /ws/chat/{session_id} endpoint."""
+
+    def _setup(self, monkeypatch):
+        from types import SimpleNamespace
+        from backend.app import main
+        from backend.app.domain.entities import Chat
+        from backend.app.infrastructure.chat_hub import ChatHub, InMemoryBroker
+
+        chat = Chat(id="c1", session_id="s1", student_id="u1", advisor_id="u2")
+        repository = FakeChatRepository(chat)
+        container = SimpleNamespace(chat_repository=repository)
+        monkeypatch.setattr(main, "get_container", lambda: container)
+        monkeypatch.setattr(main, "chat_hub", ChatHub(InMemoryBroker(), tick=0.01))
+        return main, repository
+
+    def test_participant_message_is_saved_and_broadcast(self, monkeypatch):
+        """Test that a participant's message is persisted and echoed as a frame."""
+        from fastapi.testclient import TestClient
+
+        main, repository = self._setup(monkeypatch)
+        token = main.create_access_token({"sub": "a", "user_id": "u1"})
+
+        with TestClient(main.app).websocket_connect(f"/ws/chat/s1?token={token}") as ws:
+            ws.send_text(json.dumps({"content": "  hola  "}))
+            frame = ws.receive_json()
+
+        assert frame[0]["type"] == "message"
+        assert frame[0]["message"]["content"] == "hola"
+        assert frame[0]["message"]["from_user_id"] == "u1"
+        assert [(c, m.content) for c, m in repository.added] == [("c1", "hola")]
+
+    def test_non_participant_is_rejected(self, monkeypatch):
+        """Test that users outside the chat cannot open the socket."""
+        from fastapi.testclient import TestClient
+        from starlette.websockets import WebSocketDisconnect
+
+        main, _ = self._setup(monkeypatch)
+        token = main.create_access_token({"sub": "x", "user_id": "u9"})
+        client = TestClient(main.app)
+
+        for url in (f"/ws/chat/s1?token={token}", "/ws/chat/s1"):
+            with pytest.raises(WebSocketDisconnect) as exc:
+                with client.websocket_connect(url):
+                    pass
+            assert exc.value.code == 1008
@@ -0,0 +1,492 @@
+"""Tests for the bucketed chat repository using the in-memory MongoDB fake."""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+
+def _chat():
+    from backend.app.domain.entities import Chat
+
+    return Chat(
+        session_id=str(ObjectId()),
+        student_id=str(ObjectId()),
+        advisor_id=str(ObjectId()),
+    )
+
+
+def _message(chat, i, start=datetime(2026, 3, 2, 10, 0)):
+    from backend.app.domain.entities import Message
+
+    return Message(
+        from_user_id=chat.student_id if i % 2 else chat.advisor_id,
+        content=f"mensaje {i}",
+        sent_at=start + timedelta(seconds=i),
+    )
+
+
+class TestChatRepository:
+    """Tests for ChatRepository."""
+
+    @pytest.mark.asyncio
+    async def test_appends_into_fixed_size_buckets(self, fake_mongo):
+        """Test that messages fill buckets of bucket_size in order."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        db = fake_mongo
+        repo = ChatRepository(db, bucket_size=10)
+        chat = await repo.create(_chat())
+
+        for i in range(25):
+            message = await repo.add_message(chat.id, _message(chat, i))
+            assert message.id
+
+        buckets = sorted(db.chat_messages.docs, key=lambda b: b["bucketSeq"])
+        assert [b["bucketSeq"] for b in buckets] == [0, 1, 2]
+        assert [b["count"] for b in buckets] == [10, 10, 5]
+        assert buckets[1]["messages"][0]["content"] == "mensaje 10"
+        assert "messages" not in db.chats.docs[0]
+        assert db.chats.docs[0]["messageCount"] == 25
+        assert db.chats.docs[0]["lastMessageAt"] == _message(chat, 24).sent_at
+
+    @pytest.mark.asyncio
+    async def test_recent_messages_read_only_last_buckets(self, fake_mongo):
+        """Test reading the newest N messages without loading history."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        db = fake_mongo
+        repo = ChatRepository(db, bucket_size=10)
+        chat = await repo.create(_chat())
+        for i in range(95):
+            await repo.add_message(chat.id, _message(chat, i))
+
+        db.chat_messages.docs_read = 0
+        recent = await repo.list_recent_messages(chat.id, limit=12)
+
+        assert [m.content for m in recent] == [f"mensaje {i}" for i in range(83, 95)]
+        assert db.chat_messages.docs_read == 3
+        assert await repo.list_recent_messages(chat.id, limit=0) == []
+
+    @pytest.mark.asyncio
+    async def test_get_by_session_includes_recent_messages(self, fake_mongo):
+        """Test that chat reads embed only the most recent messages."""
+        from backend.app.domain.entities import Attachment
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        db = fake_mongo
+        repo = ChatRepository(db, bucket_size=5, recent_messages=3)
+        chat = _chat()
+        chat.messages = [_message(chat, i) for i in range(7)]
+        chat.messages[-1].attachment = Attachment(
+            type="image", url="/files/abc", name="pizarra.png"
+        )
+        await repo.create(chat)
+
+        found = await repo.get_by_session_id(chat.session_id)
+
+        assert found.id == chat.id
+        assert [m.content for m in found.messages] == [
+            "mensaje 4",
+            "mensaje 5",
+            "mensaje 6",
+        ]
+        assert found.messages[-1].attachment.name == "pizarra.png"
+        assert found.messages[-1].from_user_id == chat.advisor_id
+
+    @pytest.mark.asyncio
+    async def test_delete_removes_buckets(self, fake_mongo):
+        """Test that deleting a chat deletes its message buckets."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        db = fake_mongo
+        repo = ChatRepository(db, bucket_size=2)
+        chat = await repo.create(_chat())
+        for i in range(5):
+            await repo.add_message(chat.id, _message(chat, i))
+
+        assert await repo.delete(chat.id) is True
+        assert db.chat_messages.docs == []
+        assert await repo.get_by_id(chat.id) is None
+
+    @pytest.mark.asyncio
+    async def test_add_message_to_missing_chat_raises(self, fake_mongo):
+        """Test appending to an unknown chat."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo)
+        with pytest.raises(ValueError):
+            await repo.add_message(str(ObjectId()), _message(_chat(), 0))
+
+    @pytest.mark.asyncio
+    async def test_ensure_indexes(self, fake_mongo):
+        """Test the unique (chatId, bucketSeq) index."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        db = fake_mongo
+        await ChatRepository(db).ensure_indexes()
+
+        keys, options = db.chat_messages.indexes[0]
+        assert keys == [("chatId", 1), ("bucketSeq", 1)]
+        assert options == {"unique": True}
+
+
+class TestUnreadCounters:
+    """Tests for per-(user, chat) unread counters."""
+
+    async def _chat_with_messages(self, repo, count):
+        chat = await repo.create(_chat())
+        messages = [
+            await repo.add_message(chat.id, _message(chat, i)) for i in range(count)
+        ]
+        return chat, messages
+
+    @pytest.mark.asyncio
+    async def test_send_increments_only_the_recipient(self, fake_mongo):
+        """Test that each message counts as unread for the other participant."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo, bucket_size=4)
+        chat, _ = await self._chat_with_messages(repo, 7)
+
+        # Impares del estudiante, pares del asesor
+        assert await repo.get_unread_counts(chat.advisor_id) == {chat.id: 3}
+        assert await repo.get_unread_counts(chat.student_id) == {chat.id: 4}
+
+    @pytest.mark.asyncio
+    async def test_mark_read_up_to_message(self, fake_mongo):
+        """Test batched mark-read across buckets updates counter and flags."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo, bucket_size=4)
+        chat, messages = await self._chat_with_messages(repo, 10)
+
+        remaining = await repo.mark_read(chat.id, chat.student_id, messages[6].id)
+
+        # Del asesor: 0, 2, 4, 6 leídos; 8 pendiente
+        assert remaining == 1
+        assert await repo.count_unread(chat.student_id) == 1
+        recent = await repo.list_recent_messages(chat.id, limit=10)
+        assert [m.is_read for m in recent] == [i % 2 == 0 and i <= 6 for i in range(10)]
+
+        assert await repo.mark_read(chat.id, chat.student_id, messages[9].id) == 0
+        assert await repo.get_unread_counts(chat.student_id) == {}
+        assert await repo.count_unread(chat.advisor_id) == 5
+
+    @pytest.mark.asyncio
+    async def test_mark_read_is_idempotent_and_monotonic(self, fake_mongo):
+        """Test that re-reading or reading backwards changes nothing."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo, bucket_size=4)
+        chat, messages = await self._chat_with_messages(repo, 6)
+
+        assert await repo.mark_read(chat.id, chat.advisor_id, messages[3].id) == 1
+        assert await repo.mark_read(chat.id, chat.advisor_id, messages[3].id) == 1
+        assert await repo.mark_read(chat.id, chat.advisor_id, messages[1].id) == 1
+
+    @pytest.mark.asyncio
+    async def test_inbox_badge_sums_across_chats(self, fake_mongo):
+        """Test the total over every chat of a user."""
+        from backend.app.domain.entities import Message
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo)
+        first, _ = await self._chat_with_messages(repo, 3)
+        second = _chat()
+        second.student_id = first.student_id
+        second = await repo.create(second)
+        await repo.add_message(
+            second.id, Message(from_user_id=second.advisor_id, content="hola")
+        )
+
+        assert await repo.count_unread(first.student_id) == 3
+        assert await repo.count_unread(str(ObjectId())) == 0
+
+    @pytest.mark.asyncio
+    async def test_mark_read_unknown_message_raises(self, fake_mongo):
+        """Test marking read with a message from another chat."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo)
+        chat, _ = await self._chat_with_messages(repo, 2)
+        _, other_messages = await self._chat_with_messages(repo, 1)
+
+        with pytest.raises(ValueError):
+            await repo.mark_read(chat.id, chat.student_id, other_messages[0].id)
+        with pytest.raises(ValueError):
+            await repo.mark_read(chat.id, chat.student_id, "not-an-id")
+
+
+class TestMessagePagination:
+    """Tests for cursor-paginated chat history."""
+
+    async def _chat_with_messages(self, db, count, bucket_size=10):
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(db, bucket_size=bucket_size)
+        chat = await repo.create(_chat())
+        for i in range(count):
+            await repo.add_message(chat.id, _message(chat, i))
+        return repo, chat
+
+    @pytest.mark.asyncio
+    async def test_scrolls_back_through_history(self, fake_mongo):
+        """Test walking the whole thread with before cursors."""
+        db = fake_mongo
+        repo, chat = await self._chat_with_messages(db, 95)
+
+        seen = []
+        page = await repo.list_messages(chat.id, limit=20)
+        while page:
+            seen = [m.content for m in page] + seen
+            oldest = page[0]
+            page = await repo.list_messages(
+                chat.id, limit=20, before=(oldest.sent_at, oldest.id)
+            )
+
+        assert seen == [f"mensaje {i}" for i in range(95)]
+
+    @pytest.mark.asyncio
+    async def test_page_reads_only_nearby_buckets(self, fake_mongo):
+        """Test that a deep page touches a bounded number of buckets."""
+        db = fake_mongo
+        repo, chat = await self._chat_with_messages(db, 200)
+        anchor = (await repo.list_messages(chat.id, limit=200))[105]
+
+        db.chat_messages.docs_read = 0
+        page = await repo.list_messages(
+            chat.id, limit=15, before=(anchor.sent_at, anchor.id)
+        )
+
+        assert [m.content for m in page] == [f"mensaje {i}" for i in range(90, 105)]
+        assert db.chat_messages.docs_read == 3
+
+    @pytest.mark.asyncio
+    async def test_after_cursor_returns_newer_messages(self, fake_mongo):
+        """Test paging forward from a cursor, ties broken by message id."""
+        from backend.app.domain.entities import Message
+
+        db = fake_mongo
+        repo, chat = await self._chat_with_messages(db, 30)
+        same_time = _message(chat, 29).sent_at
+        for text in ("a", "b"):
+            await repo.add_message(
+                chat.id,
+                Message(from_user_id=chat.student_id, content=text, sent_at=same_time),
+            )
+        messages = await repo.list_messages(chat.id, limit=40)
+        anchor = messages[29]
+
+        page = await repo.list_messages(
+            chat.id, limit=5, after=(anchor.sent_at, anchor.id)
+        )
+
+        assert [m.content for m in page] == ["a", "b"]
+        assert await repo.list_messages(chat.id, limit=0) == []
+        with pytest.raises(ValueError):
+            await repo.list_messages(
+                chat.id,
+                before=(anchor.sent_at, anchor.id),
+                after=(anchor.sent_at, anchor.id),
+            )
+
+    @pytest.mark.asyncio
+    async def test_sent_at_is_stored_at_millisecond_precision(self, fake_mongo):
+        """Test that the returned message carries the timestamp BSON keeps."""
+        from backend.app.domain.entities import Message
+
+        repo, chat = await self._chat_with_messages(fake_mongo, 1)
+        message = await repo.add_message(
+            chat.id,
+            Message(
+                from_user_id=chat.student_id,
+                content="precisión",
+                sent_at=datetime(2026, 3, 2, 11, 0, 0, 123456),
+            ),
+        )
+
+        assert message.sent_at == datetime(2026, 3, 2, 11, 0, 0, 123000)
+        stored = await repo.list_recent_messages(chat.id, limit=1)
+        assert stored[0].sent_at == message.sent_at
+        page = await repo.list_messages(chat.id, before=(message.sent_at, message.id))
+        assert [m.content for m in page] == ["mensaje 0"]
+
+
+class TestWriteBehind:
+    """Tests for the chat write-behind buffer."""
+
+    async def _repo(self, db, **options):
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(db, bucket_size=10, flush_interval=0.02, **options)
+        chat = await ChatRepository(db).create(_chat())
+        return db, repo, chat
+
+    @pytest.mark.asyncio
+    async def test_concurrent_sends_share_one_bulk_write(self, fake_mongo):
+        """Test that a window of sends becomes one ordered bulk write."""
+        db, repo, chat = await self._repo(fake_mongo)
+
+        await asyncio.gather(
+            *(repo.add_message(chat.id, _message(chat, i)) for i in range(25))
+        )
+
+        # Tres buckets tocados en una sola escritura
+        assert db.chat_messages.bulk_writes == [3]
+        assert db.chat_unread.bulk_writes == [2]
+        messages = await repo.list_recent_messages(chat.id, limit=25)
+        assert [m.content for m in messages] == [f"mensaje {i}" for i in range(25)]
+        assert db.chats.docs[0]["messageCount"] == 25
+        assert await repo.count_unread(chat.advisor_id) == 12
+
+    @pytest.mark.asyncio
+    async def test_flushes_early_at_max_items(self, fake_mongo):
+        """Test that flush_max_items triggers a flush before the window ends."""
+        db, repo, chat = await self._repo(fake_mongo, flush_max_items=4)
+
+        await asyncio.gather(
+            *(repo.add_message(chat.id, _message(chat, i)) for i in range(10))
+        )
+
+        assert len(db.chat_messages.bulk_writes) == 3
+        assert db.chats.docs[0]["messageCount"] == 10
+
+    @pytest.mark.asyncio
+    async def test_reads_are_coalesced_with_sends(self, fake_mongo):
+        """Test that receipts keep the highest message and ride the same flush."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        db, repo, chat = await self._repo(fake_mongo)
+        direct = ChatRepository(db, bucket_size=10)
+        messages = [
+            await direct.add_message(chat.id, _message(chat, i)) for i in range(8)
+        ]
+        db.chat_messages.bulk_writes.clear()
+
+        results = await asyncio.gather(
+            repo.mark_read(chat.id, chat.student_id, messages[6].id),
+            repo.mark_read(chat.id, chat.student_id, messages[2].id),
+            repo.add_message(chat.id, _message(chat, 8)),
+        )
+
+        assert results[:2] == [1, 1]
+        # El $push primero y las marcas de leído después
+        assert db.chat_messages.bulk_writes == [1, 1]
+        recent = await repo.list_recent_messages(chat.id, limit=9)
+        assert [m.is_read for m in recent] == [i % 2 == 0 and i <= 6 for i in range(9)]
+
+    @pytest.mark.asyncio
+    async def test_async_durability_defers_until_close(self, fake_mongo):
+        """Test that async mode returns before writing and close flushes."""
+        db, repo, chat = await self._repo(fake_mongo, durability="async")
+        repo.flush_interval = 60
+
+        message = await repo.add_message(chat.id, _message(chat, 0))
+        assert message.id
+        assert db.chat_messages.docs == []
+
+        await repo.close()
+
+        assert [m.id for m in await repo.list_recent_messages(chat.id)] == [message.id]
+
+    @pytest.mark.asyncio
+    async def test_mark_read_flushes_buffered_message_first(self, fake_mongo):
+        """Test reading a message that is still in the buffer."""
+        db, repo, chat = await self._repo(fake_mongo, durability="async")
+        repo.flush_interval = 60
+        message = await repo.add_message(chat.id, _message(chat, 0))
+
+        await repo.mark_read(chat.id, chat.student_id, message.id)
+        await repo.close()
+
+        assert await repo.count_unread(chat.student_id) == 0
+
+    @pytest.mark.asyncio
+    async def test_ack_surfaces_errors_and_validates_mode(self, fake_mongo):
+        """Test that ack callers see flush errors and modes are validated."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        _, repo, _ = await self._repo(fake_mongo)
+        with pytest.raises(ValueError):
+            await repo.add_message(str(ObjectId()), _message(_chat(), 0))
+        with pytest.raises(ValueError):
+            ChatRepository(fake_mongo, durability="eventually")
+
+
+class TestUnreadConsistency:
+    """Tests for keeping unread counters in step with the buckets."""
+
+    @pytest.mark.asyncio
+    async def test_failed_push_leaves_counters_untouched(self, fake_mongo, monkeypatch):
+        """Test that counters only move after the messages are stored."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo, bucket_size=10)
+        chat = await repo.create(_chat())
+
+        async def failing_bulk_write(*args, **kwargs):
+            raise RuntimeError("primary stepped down")
+
+        monkeypatch.setattr(repo.buckets, "bulk_write", failing_bulk_write)
+        with pytest.raises(RuntimeError):
+            await repo.add_message(chat.id, _message(chat, 1))
+
+        assert await repo.count_unread(chat.advisor_id) == 0
+
+    @pytest.mark.asyncio
+    async def test_read_racing_a_push_does_not_drift(self, fake_mongo, monkeypatch):
+        """Test a read that lands between a push and its counter increment."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo, bucket_size=10)
+        chat = await repo.create(_chat())
+        original = repo.unread.bulk_write
+        message = _message(chat, 1)
+
+        async def read_before_counters(*args, **kwargs):
+            # Otro proceso marca como leído antes de que llegue el +1
+            await repo._write(chat.id, [], {ObjectId(chat.advisor_id): 0})
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(repo.unread, "bulk_write", read_before_counters)
+        await repo.add_message(chat.id, message)
+
+        assert await repo.count_unread(chat.advisor_id) == 0
+
+    @pytest.mark.asyncio
+    async def test_reconcile_recounts_from_buckets(self, fake_mongo):
+        """Test that drifted or missing counters are recomputed."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo, bucket_size=10)
+        chat = await repo.create(_chat())
+        messages = [
+            await repo.add_message(chat.id, _message(chat, i)) for i in range(6)
+        ]
+        await repo.mark_read(chat.id, chat.advisor_id, messages[2].id)
+        await fake_mongo.chat_unread.update_one(
+            {"userId": ObjectId(chat.advisor_id)}, {"$inc": {"unread": 4}}
+        )
+        await fake_mongo.chat_unread.delete_one({"userId": ObjectId(chat.student_id)})
+
+        assert await repo.reconcile_unread() == 2
+        assert await repo.get_unread_counts(chat.advisor_id) == {chat.id: 2}
+        assert await repo.get_unread_counts(chat.student_id) == {chat.id: 3}
+        assert await repo.reconcile_unread() == 0
+
+    @pytest.mark.asyncio
+    async def test_reconcile_only_checks_the_window(self, fake_mongo):
+        """Test that chats outside [since, until) are left alone."""
+        from backend.app.infrastructure.repositories import ChatRepository
+
+        repo = ChatRepository(fake_mongo, bucket_size=10)
+        chat = await repo.create(_chat())
+        await repo.add_message(chat.id, _message(chat, 1))
+        await fake_mongo.chat_unread.update_one(
+            {"userId": ObjectId(chat.advisor_id)}, {"$set": {"unread": 9}}
+        )
+
+        sent = datetime(2026, 3, 2, 10, 0, 1)
+        assert await repo.reconcile_unread(until=sent) == 0
+        assert await repo.reconcile_unread(since=sent) == 1
+        assert await repo.count_unread(chat.advisor_id) == 1
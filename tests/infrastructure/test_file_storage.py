@@ -0,0 +1,198 @@
+"""Tests for content-addressed file storage and the upload/download routes."""
+import hashlib
+import os
+import pytest
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+class TestFileStorage:
+    """Tests for FileStorage."""
+
+    @pytest.mark.asyncio
+    async def test_streams_to_hash_named_file(self, tmp_path):
+        """Test that chunks are written under their SHA-256."""
+        from backend.app.infrastructure.file_storage import FileStorage
+
+        storage = FileStorage(str(tmp_path))
+        data = [os.urandom(700_000), os.urandom(700_000), b"fin"]
+
+        stored = await storage.save_stream(_chunks(*data), "image/png", "../kardex.png")
+
+        assert stored.id == hashlib.sha256(b"".join(data)).hexdigest()
+        assert stored.size == sum(len(d) for d in data)
+        assert stored.name == "kardex.png"
+        assert not stored.deduplicated
+        with open(storage.path(stored.id), "rb") as f:
+            assert f.read() == b"".join(data)
+        assert storage.metadata(stored.id).content_type == "image/png"
+        assert os.listdir(tmp_path / "tmp") == []
+
+    @pytest.mark.asyncio
+    async def test_deduplicates_identical_content(self, tmp_path):
+        """Test that a repeated upload keeps the first copy but not its name."""
+        from backend.app.infrastructure.file_storage import FileStorage
+
+        storage = FileStorage(str(tmp_path))
+        first = await storage.save_stream(_chunks(b"ab", b"c"), "image/png", "a.png")
+        second = await storage.save_stream(_chunks(b"abc"), "image/jpeg", "b.jpg")
+
+        assert second.id == first.id
+        assert second.deduplicated
+        assert second.name == "b.jpg"
+        assert storage.metadata(first.id).name == "a.png"
+        assert os.listdir(tmp_path / "tmp") == []
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_and_empty_streams(self, tmp_path):
+        """Test size limits and empty bodies leave no temporary files."""
+        from backend.app.infrastructure.file_storage import (
+            FileStorage,
+            FileTooLargeError,
+        )
+
+        storage = FileStorage(str(tmp_path), max_bytes=10)
+        with pytest.raises(FileTooLargeError):
+            await storage.save_stream(_chunks(b"123456", b"789012"), "image/png")
+        with pytest.raises(ValueError):
+            await storage.save_stream(_chunks(), "image/png")
+
+        assert os.listdir(tmp_path / "tmp") == []
+
+    def test_rejects_invalid_ids(self, tmp_path):
+        """Test that file ids are validated."""
+        from backend.app.infrastructure.file_storage import FileStorage
+
+        storage = FileStorage(str(tmp_path))
+        with pytest.raises(ValueError):
+            storage.path("../../etc/passwd")
+        assert storage.metadata("../../etc/passwd") is None
+
+
+class FakeJobRunner:
+    """Records enqueued jobs."""
+
+    def __init__(self):
+        self.jobs = []
+
+    async def enqueue(self, job_type, payload, **kwargs):
+        self.jobs.append((job_type, payload))
+        return f"job-{len(self.jobs)}"
+
+
+class TestFileRoutes:
+    """Tests for /api/files upload and download."""
+
+    def _client(self, tmp_path, monkeypatch, max_bytes=1_000_000):
+        from fastapi.testclient import TestClient
+        from backend.app import main
+        from backend.app.infrastructure.file_storage import FileStorage
+
+        monkeypatch.setattr(main, "file_storage", FileStorage(str(tmp_path), max_bytes))
+        monkeypatch.setattr(main.app, "job_runner", FakeJobRunner(), raising=False)
+        token = main.create_access_token({"sub": "a", "user_id": "u1"})
+        return TestClient(main.app), {"Authorization": f"Bearer {token}"}
+
+    def test_upload_then_range_download(self, tmp_path, monkeypatch):
+        """Test a streamed upload and a partial download."""
+        client, auth = self._client(tmp_path, monkeypatch)
+        data = os.urandom(200_000)
+
+        response = client.post(
+            "/api/files?name=captura.png",
+            content=iter([data[:65536], data[65536:]]),
+            headers={**auth, "Content-Type": "image/png"},
+        )
+        assert response.status_code == 201
+        body = response.json()
+        file_id = hashlib.sha256(data).hexdigest()
+        assert body["url"] == f"/api/files/{file_id}"
+        assert body["renditions_job_id"] == "job-1"
+
+        full = client.get(body["url"], headers=auth)
+        assert full.content == data
+        assert full.headers["content-type"] == "image/png"
+        assert full.headers["accept-ranges"] == "bytes"
+        assert "immutable" in full.headers["cache-control"]
+
+        partial = client.get(body["url"], headers={**auth, "Range": "bytes=100-199"})
+        assert partial.status_code == 206
+        assert partial.content == data[100:200]
+        assert partial.headers["content-range"] == f"bytes 100-199/{len(data)}"
+
+    def test_repeated_upload_hides_first_uploader(
+        self, tmp_path, monkeypatch, stored_roles
+    ):
+        """Test that only admins see the first uploader's name, on upload or download."""
+        from backend.app import main
+
+        client, auth = self._client(tmp_path, monkeypatch)
+        headers = {**auth, "Content-Type": "image/png"}
+        client.post("/api/files?name=kardex-ana.png", content=b"png", headers=headers)
+
+        body = client.post(
+            "/api/files?name=mio.png", content=b"png", headers=headers
+        ).json()
+        assert body["name"] == "mio.png"
+        assert "deduplicated" not in body
+
+        admin = main.create_access_token(
+            {"sub": "a", "user_id": "admin-1", "role": "admin"}
+        )
+        body = client.post(
+            "/api/files",
+            content=b"png",
+            headers={"Authorization": f"Bearer {admin}", "Content-Type": "image/png"},
+        ).json()
+        assert body["deduplicated"] is True
+
+        download = client.get(body["url"], headers=auth)
+        assert "content-disposition" not in download.headers
+        download = client.get(body["url"], headers={"Authorization": f"Bearer {admin}"})
+        assert "kardex-ana.png" in download.headers["content-disposition"]
+
+    def test_upload_validation(self, tmp_path, monkeypatch):
+        """Test auth, content type and size checks."""
+        client, auth = self._client(tmp_path, monkeypatch, max_bytes=10)
+
+        assert client.post("/api/files", content=b"x").status_code == 401
+        response = client.post(
+            "/api/files", content=b"x", headers={**auth, "Content-Type": "text/html"}
+        )
+        assert response.status_code == 415
+        response = client.post(
+            "/api/files",
+            content=iter([b"x" * 8, b"x" * 8]),
+            headers={**auth, "Content-Type": "image/png"},
+        )
+        assert response.status_code == 413
+        assert client.get("/api/files/" + "0" * 64, headers=auth).status_code == 404
+
+    def test_renditions_are_served_when_ready(self, tmp_path, monkeypatch):
+        """Test ?rendition= serves the stored thumbnail or 404s until ready."""
+        from backend.app import main
+
+        client, auth = self._client(tmp_path, monkeypatch)
+        response = client.post(
+            "/api/files", content=b"png", headers={**auth, "Content-Type": "image/png"}
+        )
+        url = response.json()["url"]
+
+        assert client.get(f"{url}?rendition=thumb", headers=auth).status_code == 404
+        assert client.get(f"{url}?rendition=huge", headers=auth).status_code == 400
+
+        file_id = response.json()["id"]
+        with open(main.file_storage.rendition_path(file_id, "thumb"), "wb") as f:
+            f.write(b"jpeg")
+        thumb = client.get(f"{url}?rendition=thumb", headers=auth)
+        assert thumb.content == b"jpeg"
+        assert thumb.headers["content-type"] == "image/jpeg"
+
+        # Con la miniatura lista, una subida repetida no encola otro trabajo
+        response = client.post(
+            "/api/files", content=b"png", headers={**auth, "Content-Type": "image/png"}
+        )
+        assert response.json()["renditions_job_id"] is None
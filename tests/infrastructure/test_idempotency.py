@@ -0,0 +1,142 @@
+"""Tests for the idempotency key store using the in-memory MongoDB fake."""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+
+def _store(database, **kwargs):
+    from backend.app.infrastructure.idempotency import IdempotencyStore
+
+    return IdempotencyStore(database, wait_timeout=0.5, poll_interval=0.01, **kwargs)
+
+
+async def _orphan(store, lease_until):
+    """Stores an in-progress key left by another worker."""
+    await store.collection.insert_one(
+        {
+            "_id": "k1",
+            "status": "in_progress",
+            "fingerprint": "fp",
+            "owner": "dead-worker",
+            "leaseUntil": lease_until,
+            "createdAt": datetime.utcnow(),
+        }
+    )
+
+
+class TestIdempotencyStore:
+    """Tests for IdempotencyStore."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_call(self, fake_mongo):
+        """Test that in-flight duplicates are coalesced and replayed."""
+        store = _store(fake_mongo)
+        calls = []
+
+        async def create():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"event": {"id": "evt1"}}
+
+        results = await asyncio.gather(
+            *[store.run("k1", "fp", create) for _ in range(5)]
+        )
+
+        assert len(calls) == 1
+        assert all(r.body == {"event": {"id": "evt1"}} for r in results)
+        assert sorted(r.replayed for r in results) == [False, True, True, True, True]
+
+        again = await store.run("k1", "fp", create)
+        assert again.replayed is True
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_key_reused_with_different_body(self, fake_mongo):
+        """Test that reusing a key with another payload is rejected."""
+        from backend.app.infrastructure.idempotency import IdempotencyConflictError
+
+        store = _store(fake_mongo)
+
+        async def create():
+            return {"ok": True}
+
+        await store.run("k1", "fp-a", create)
+        with pytest.raises(IdempotencyConflictError) as exc:
+            await store.run("k1", "fp-b", create)
+        assert exc.value.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_failure_releases_key(self, fake_mongo):
+        """Test that a failed call can be retried with the same key."""
+        store = _store(fake_mongo)
+
+        async def failing():
+            raise RuntimeError("Graph timeout")
+
+        async def create():
+            return {"ok": True}
+
+        with pytest.raises(RuntimeError):
+            await store.run("k1", "fp", failing)
+
+        result = await store.run("k1", "fp", create)
+        assert result.body == {"ok": True}
+        assert result.replayed is False
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_taken_over(self, fake_mongo):
+        """Test that a key left by a dead worker runs again once its lease expires."""
+        store = _store(fake_mongo)
+        await _orphan(store, datetime.utcnow() - timedelta(seconds=1))
+
+        async def create():
+            return {"ok": True}
+
+        result = await store.run("k1", "fp", create)
+
+        assert result.replayed is False
+        doc = await store.collection.find_one({"_id": "k1"})
+        assert doc["status"] == "completed"
+        assert doc["owner"] != "dead-worker"
+
+    @pytest.mark.asyncio
+    async def test_live_lease_is_not_taken_over(self, fake_mongo):
+        """Test that a key whose owner keeps its lease is not run twice."""
+        from backend.app.infrastructure.idempotency import IdempotencyConflictError
+
+        store = _store(fake_mongo)
+        await _orphan(store, datetime.utcnow() + timedelta(seconds=60))
+        calls = []
+
+        async def create():
+            calls.append(1)
+            return {"ok": True}
+
+        with pytest.raises(IdempotencyConflictError) as exc:
+            await store.run("k1", "fp", create)
+        assert exc.value.status_code == 409
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_storage_failure_still_resolves_duplicates(
+        self, fake_mongo, monkeypatch
+    ):
+        """Test that waiters get the response even if it can't be stored."""
+        store = _store(fake_mongo)
+
+        async def failing_update(*args, **kwargs):
+            raise RuntimeError("primary stepped down")
+
+        monkeypatch.setattr(store.collection, "update_one", failing_update)
+
+        async def create():
+            await asyncio.sleep(0.02)
+            return {"ok": True}
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*[store.run("k1", "fp", create) for _ in range(3)]),
+            timeout=1,
+        )
+
+        assert all(r.body == {"ok": True} for r in results)
+        assert sorted(r.replayed for r in results) == [False, True, True]
@@ -0,0 +1,208 @@
+"""Tests for the background job runner using an in-memory queue."""
+import asyncio
+import pytest
+from datetime import datetime
+
+
+class FakeJobQueue:
+    """Minimal in-memory stand-in for JobQueue."""
+
+    def __init__(self):
+        self.jobs = {}
+        self._next_id = 0
+
+    async def enqueue(
+        self, job_type, payload, max_attempts=5, run_at=None, owner_id=None
+    ):
+        self._next_id += 1
+        job_id = str(self._next_id)
+        self.jobs[job_id] = {
+            "_id": job_id,
+            "type": job_type,
+            "payload": payload,
+            "ownerId": owner_id,
+            "status": "pending",
+            "attempts": 0,
+            "maxAttempts": max_attempts,
+            "runAt": run_at or datetime.utcnow(),
+        }
+        return job_id
+
+    async def claim(self, worker_id, lease_seconds):
+        now = datetime.utcnow()
+        for job in self.jobs.values():
+            if job["status"] == "pending" and job["runAt"] <= now:
+                job["status"] = "running"
+                job["attempts"] += 1
+                return dict(job)
+        return None
+
+    async def extend_lease(self, job_id, worker_id, lease_seconds):
+        return True
+
+    async def complete(self, job_id, worker_id, result):
+        self.jobs[job_id].update(status="succeeded", result=result)
+
+    async def fail(self, job_id, worker_id, error, retry_at):
+        job = self.jobs[job_id]
+        job["lastError"] = error
+        if retry_at is None:
+            job["status"] = "dead"
+        else:
+            job["status"] = "pending"
+            job["runAt"] = retry_at
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class TestJobRunner:
+    """Tests for JobRunner."""
+
+    @pytest.mark.asyncio
+    async def test_runs_job_and_stores_result(self):
+        """Test a successful job."""
+        from backend.app.infrastructure.jobs import JobRunner
+
+        queue = FakeJobQueue()
+        runner = JobRunner(queue, poll_interval=0.05)
+
+        async def handler(payload):
+            return {"echo": payload["value"]}
+
+        runner.register("echo", handler)
+        runner.start()
+        job_id = await runner.enqueue("echo", {"value": 42})
+
+        await _wait_for(lambda: queue.jobs[job_id]["status"] == "succeeded")
+        await runner.stop()
+        assert queue.jobs[job_id]["result"] == {"echo": 42}
+
+    @pytest.mark.asyncio
+    async def test_retries_then_dead_letters(self):
+        """Test that failing jobs are retried and then dead-lettered."""
+        from backend.app.infrastructure.jobs import JobRunner
+
+        queue = FakeJobQueue()
+        runner = JobRunner(queue, poll_interval=0.01, base_backoff_seconds=0.01)
+        calls = []
+
+        async def handler(payload):
+            calls.append(payload)
+            raise RuntimeError("Graph unavailable")
+
+        runner.register("flaky", handler)
+        runner.start()
+        job_id = await runner.enqueue("flaky", {}, max_attempts=3)
+
+        await _wait_for(lambda: queue.jobs[job_id]["status"] == "dead")
+        await runner.stop()
+        assert len(calls) == 3
+        assert queue.jobs[job_id]["lastError"] == "Graph unavailable"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test that no more than `concurrency` jobs run at once."""
+        from backend.app.infrastructure.jobs import JobRunner
+
+        queue = FakeJobQueue()
+        runner = JobRunner(queue, concurrency=2, poll_interval=0.01)
+        active = {"now": 0, "max": 0}
+
+        async def handler(payload):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.02)
+            active["now"] -= 1
+
+        runner.register("slow", handler)
+        runner.start()
+        ids = [await runner.enqueue("slow", {}) for _ in range(6)]
+
+        await _wait_for(
+            lambda: all(queue.jobs[i]["status"] == "succeeded" for i in ids)
+        )
+        await runner.stop()
+        assert active["max"] == 2
+
+    @pytest.mark.asyncio
+    async def test_enqueue_unknown_type(self):
+        """Test that unknown job types are rejected."""
+        from backend.app.infrastructure.jobs import JobRunner
+
+        runner = JobRunner(FakeJobQueue())
+        with pytest.raises(ValueError):
+            await runner.enqueue("missing", {})
+
+
+class TestJobQueue:
+    """Tests for JobQueue on the in-memory MongoDB fake."""
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_drop_credentials(self, fake_mongo):
+        """Test that the Graph token is removed once a job completes or dies."""
+        from datetime import timedelta
+        from backend.app.infrastructure.jobs import JobQueue
+
+        queue = JobQueue(fake_mongo)
+        payload = {"session_id": "s1", "access_token": "enc"}
+        done = await queue.enqueue("meeting", dict(payload))
+        retried = await queue.enqueue("meeting", dict(payload))
+
+        job = await queue.claim("w1", 60)
+        await queue.complete(job["_id"], "w1", {"meeting_id": "m1"})
+        job = await queue.claim("w1", 60)
+        await queue.fail(job["_id"], "w1", "503", datetime.utcnow() - timedelta(1))
+
+        assert (await queue.get(done))["payload"] == {"session_id": "s1"}
+        assert (await queue.get(retried))["payload"]["access_token"] == "enc"
+
+        job = await queue.claim("w1", 60)
+        await queue.fail(job["_id"], "w1", "503", None)
+        dead = await queue.get(retried)
+        assert dead["status"] == "dead"
+        assert "access_token" not in dead["payload"]
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(self, fake_mongo):
+        """Test the TTL index on completedAt."""
+        from backend.app.infrastructure.jobs import JobQueue
+
+        await JobQueue(fake_mongo, retention_seconds=3600).ensure_indexes()
+
+        assert ("completedAt", {"expireAfterSeconds": 3600}) in fake_mongo.jobs.indexes
+
+
+class TestJobStatusRoute:
+    """Tests for GET /api/jobs/{job_id}."""
+
+    @pytest.mark.asyncio
+    async def test_only_owner_or_admin_can_read_a_job(
+        self, fake_mongo, monkeypatch, stored_roles
+    ):
+        """Test that other users get 404 instead of the meeting link."""
+        from fastapi.testclient import TestClient
+        from backend.app import main
+        from backend.app.infrastructure.jobs import JobQueue
+
+        queue = JobQueue(fake_mongo)
+        monkeypatch.setattr(main.app, "job_queue", queue, raising=False)
+        job_id = await queue.enqueue("create_session_meeting", {}, owner_id="u1")
+        client = TestClient(main.app)
+
+        def get(user_id, role="advisor"):
+            token = main.create_access_token(
+                {"sub": "a", "user_id": user_id, "role": role}
+            )
+            return client.get(
+                f"/api/jobs/{job_id}", headers={"Authorization": f"Bearer {token}"}
+            )
+
+        assert get("u1").status_code == 200
+        assert get("admin-1", role="admin").json()["id"] == job_id
+        assert get("u2").status_code == 404
+        assert get("u2", role="admin").status_code == 404
@@ -0,0 +1,77 @@
+"""Tests for the orjson serialization layer."""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+
+class TestDumps:
+    """Tests for dumps/loads."""
+
+    def test_encodes_mongo_and_domain_types(self):
+        """Test ObjectId, datetime, enums, dataclasses and sets."""
+        from bson import ObjectId
+        from backend.app.domain.entities import Request, RequestStatusEnum
+        from backend.app.infrastructure.serialization import dumps, loads
+
+        oid = ObjectId()
+        created_at = datetime(2026, 3, 2, 10, 30)
+        request = Request(id="r1", student_id="s1", created_at=created_at)
+        data = loads(
+            dumps(
+                {
+                    "_id": oid,
+                    "at": created_at,
+                    "utc": created_at.replace(tzinfo=timezone.utc),
+                    "status": RequestStatusEnum.TAKEN,
+                    "request": request,
+                    "tags": {"a"},
+                    "price": Decimal("1.5"),
+                    1: "non-str key",
+                }
+            )
+        )
+
+        assert data["_id"] == str(oid)
+        assert data["at"] == created_at.isoformat()
+        assert data["utc"] == "2026-03-02T10:30:00+00:00"
+        assert data["status"] == "taken"
+        assert data["request"]["status"] == "pending"
+        assert data["request"]["created_at"] == created_at.isoformat()
+        assert data["tags"] == ["a"]
+        assert data["price"] == 1.5
+        assert data["1"] == "non-str key"
+
+    def test_encodes_pydantic_models_with_object_ids(self):
+        """Test that Mongo models serialize without json_encoders."""
+        from bson import ObjectId
+        from backend.app.models import Subject
+        from backend.app.infrastructure.serialization import dumps, loads
+
+        creator = ObjectId()
+        subject = Subject(name="Cálculo", createdBy=creator)
+
+        data = loads(dumps(subject))
+        assert data["createdBy"] == str(creator)
+        assert data["name"] == "Cálculo"
+
+    def test_unknown_types_raise(self):
+        """Test that unsupported objects raise TypeError."""
+        import pytest
+        from backend.app.infrastructure.serialization import dumps
+
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+
+class TestFastJSONResponse:
+    """Tests for the default response class."""
+
+    def test_app_uses_fast_json_response(self):
+        """Test that routes render through orjson."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.infrastructure.serialization import FastJSONResponse
+
+        assert app.router.default_response_class is FastJSONResponse
+        response = TestClient(app).get("/")
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == b'{"message":"Welcome to PeerHive API"}'
@@ -0,0 +1,84 @@
+"""Tests for the MongoDB session repository using the in-memory MongoDB fake."""
+from datetime import datetime
+
+import pytest
+
+STUDENT = "65f000000000000000000001"
+ADVISOR = "65f000000000000000000002"
+ADMIN = "65f000000000000000000003"
+
+
+def _session(hour=10, minute=0, student_id=STUDENT):
+    from backend.app.domain.entities import Session
+
+    return Session(
+        request_id="65f0000000000000000000aa",
+        student_id=student_id,
+        advisor_id=ADVISOR,
+        scheduled_at=datetime(2025, 3, 3, hour, minute),
+    )
+
+
+class TestApproveSession:
+    """Tests for SessionRepository.approve_session."""
+
+    @pytest.mark.asyncio
+    async def test_only_pending_sessions_are_approved_once(self, fake_mongo):
+        """Test that the transition is conditional on the pending status."""
+        from backend.app.domain.entities import SessionStatusEnum
+        from backend.app.infrastructure.repositories import SessionRepository
+
+        repository = SessionRepository(fake_mongo)
+        session = await repository.create(_session())
+
+        approved = await repository.approve_session(session.id, ADMIN)
+
+        assert approved.status == SessionStatusEnum.APPROVED
+        assert approved.approved_by == ADMIN
+        assert await repository.approve_session(session.id, ADMIN) is None
+
+        cancelled = await repository.create(_session(hour=12))
+        cancelled.status = SessionStatusEnum.CANCELLED
+        await repository.update(cancelled)
+        assert await repository.approve_session(cancelled.id, ADMIN) is None
+
+
+class TestScheduleGuard:
+    """Tests for the unique slot index that backs conflict detection."""
+
+    async def _repository(self, database):
+        from backend.app.infrastructure.repositories import SessionRepository
+
+        repository = SessionRepository(database)
+        await repository.ensure_indexes()
+        return repository
+
+    @pytest.mark.asyncio
+    async def test_overlapping_sessions_are_rejected(self, fake_mongo):
+        """Test that a second overlapping session for a participant fails."""
+        repository = await self._repository(fake_mongo)
+        await repository.create(_session(10))
+
+        other = "65f000000000000000000009"
+        with pytest.raises(ValueError, match="Schedule conflict"):
+            await repository.create(_session(10, 30, student_id=other))
+        with pytest.raises(ValueError, match="Schedule conflict"):
+            await repository.create(_session(9, 15, student_id=other))
+
+        # Sesiones contiguas no se traslapan
+        await repository.create(_session(11))
+        await repository.create(_session(9))
+        assert len(fake_mongo.sessions.docs) == 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_sessions_free_their_slots(self, fake_mongo):
+        """Test that cancelling a session releases its slots."""
+        from backend.app.domain.entities import SessionStatusEnum
+
+        repository = await self._repository(fake_mongo)
+        session = await repository.create(_session(10))
+        session.status = SessionStatusEnum.CANCELLED
+        await repository.update(session)
+
+        await repository.create(_session(10, 30))
+        assert "slots" not in fake_mongo.sessions.docs[0]
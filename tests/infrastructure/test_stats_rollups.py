@@ -0,0 +1,275 @@
+"""Tests for the incremental dashboard rollups using in-memory collections."""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+STUDENT = "65f000000000000000000001"
+ADVISOR = "65f000000000000000000002"
+OTHER_ADVISOR = "65f000000000000000000003"
+
+
+class FakeSourceCollection:
+    """In-memory `requests`/`sessions` collection keyed by _id."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        doc["_id"] = ObjectId()
+        self.docs[doc["_id"]] = dict(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def find_one_and_update(self, query, update):
+        before = await self.find_one(query)
+        if before is not None:
+            self.docs[query["_id"]].update(update["$set"])
+        return before
+
+    async def find_one_and_replace(self, query, doc):
+        before = await self.find_one(query)
+        if before is not None:
+            self.docs[query["_id"]] = {**doc, "_id": query["_id"]}
+        return before
+
+    async def find_one_and_delete(self, query):
+        return self.docs.pop(query["_id"], None)
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        """Evaluates the single `$group` stage used by the reconciliation."""
+        group = pipeline[0]["$group"]
+        counts = {}
+        for doc in self.docs.values():
+            key = {}
+            for name, expr in group["_id"].items():
+                if isinstance(expr, dict):
+                    date = doc.get(expr["$dateToString"]["date"][1:])
+                    year, week, _ = date.isocalendar() if date else (0, 0, 0)
+                    key[name] = f"{year}-W{week:02d}" if date else None
+                else:
+                    key[name] = doc.get(expr[1:])
+            frozen = tuple(key.items())
+            counts[frozen] = counts.get(frozen, 0) + 1
+        return self._rows(counts)
+
+    async def _rows(self, counts):
+        for key, count in counts.items():
+            yield {"_id": dict(key), "count": count}
+
+
+class FakeRollupCollection:
+    """In-memory `stats_rollups` collection."""
+
+    def __init__(self):
+        self.docs = {}
+        self.fail = False
+
+    async def bulk_write(self, ops, ordered=True):
+        from pymongo import ReplaceOne
+
+        if self.fail:
+            raise RuntimeError("primary stepped down")
+        for op in ops:
+            scope = op._filter["_id"]
+            if isinstance(op, ReplaceOne):
+                self.docs[scope] = dict(op._doc)
+                continue
+            doc = self.docs.setdefault(scope, {"_id": scope})
+            for path, amount in op._doc["$inc"].items():
+                *parents, leaf = path.split(".")
+                node = doc
+                for part in parents:
+                    node = node.setdefault(part, {})
+                node[leaf] = node.get(leaf, 0) + amount
+            doc.update(op._doc["$set"])
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def delete_many(self, query):
+        stale = [s for s in self.docs if s not in query["_id"]["$nin"]]
+        for scope in stale:
+            del self.docs[scope]
+        return SimpleNamespace(deleted_count=len(stale))
+
+
+def _repositories():
+    from backend.app.infrastructure.repositories import (
+        RequestRepository,
+        SessionRepository,
+    )
+    from backend.app.infrastructure.stats_rollups import StatsRollups
+
+    database = SimpleNamespace(
+        requests=FakeSourceCollection(),
+        sessions=FakeSourceCollection(),
+        stats_rollups=FakeRollupCollection(),
+    )
+    rollups = StatsRollups(database)
+    return (
+        RequestRepository(database, rollups=rollups),
+        SessionRepository(database, rollups=rollups),
+        rollups,
+    )
+
+
+async def _populate(requests, sessions):
+    from backend.app.domain.entities import Request, RequestStatusEnum, Session
+
+    first = await requests.create(Request(student_id=STUDENT, subject="Cálculo 1.5"))
+    second = await requests.create(Request(student_id=STUDENT, subject="Física"))
+    third = await requests.create(Request(student_id=STUDENT, subject="Física"))
+
+    await requests.assign_to_advisor(first.id, ADVISOR)
+    taken = await requests.get_by_id(first.id)
+    taken.status = RequestStatusEnum.COMPLETED
+    await requests.update(taken)
+    await requests.delete(third.id)
+
+    session = await sessions.create(
+        Session(
+            request_id=first.id,
+            student_id=STUDENT,
+            advisor_id=ADVISOR,
+            scheduled_at=datetime(2024, 3, 1, 10, 0),
+        )
+    )
+    await sessions.approve_session(session.id, ADVISOR)
+    await sessions.complete_session(session.id)
+    await sessions.create(
+        Session(
+            request_id=second.id,
+            student_id=STUDENT,
+            advisor_id=OTHER_ADVISOR,
+            scheduled_at=datetime(2024, 3, 11, 10, 0),
+        )
+    )
+
+
+class TestStatsRollups:
+    """Tests for StatsRollups."""
+
+    @pytest.mark.asyncio
+    async def test_repositories_keep_counters_incrementally(self):
+        """Test creates, transitions and deletes move the counters."""
+        from backend.app.infrastructure.stats_rollups import advisor_scope, week_key
+
+        requests, sessions, rollups = _repositories()
+        await _populate(requests, sessions)
+
+        stats = await rollups.get()
+        this_week = week_key(datetime.now())
+        assert stats["requests"] == {
+            "total": 2,
+            "status": {"completed": 1, "pending": 1},
+            "subject": {"Cálculo 1.5": 1, "Física": 1},
+            "week": {this_week: 2},
+            "advisor": {ADVISOR: 1},
+        }
+        assert stats["sessions"] == {
+            "total": 2,
+            "status": {"completed": 1, "pending_approval": 1},
+            "week": {"2024-W09": 1, "2024-W11": 1},
+            "advisor": {ADVISOR: 1, OTHER_ADVISOR: 1},
+        }
+
+        advisor = await rollups.get(advisor_scope(ADVISOR))
+        assert advisor["requests"]["status"] == {"completed": 1}
+        assert advisor["sessions"] == {
+            "total": 1,
+            "status": {"completed": 1},
+            "week": {"2024-W09": 1},
+        }
+
+    @pytest.mark.asyncio
+    async def test_reconcile_rebuilds_the_same_counters(self):
+        """Test the aggregation pass repairs drift and drops stale scopes."""
+        from backend.app.infrastructure.stats_rollups import advisor_scope
+
+        requests, sessions, rollups = _repositories()
+        await _populate(requests, sessions)
+        expected = {
+            scope: await rollups.get(scope)
+            for scope in (
+                "global",
+                advisor_scope(ADVISOR),
+                advisor_scope(OTHER_ADVISOR),
+            )
+        }
+
+        rollups.collection.docs["global"]["requests"]["total"] = 999
+        rollups.collection.docs["advisor:gone"] = {"_id": "advisor:gone"}
+
+        result = await rollups.reconcile()
+
+        assert result == {"scopes": 3, "removed": 1}
+        for scope, stats in expected.items():
+            rebuilt = await rollups.get(scope)
+            assert rebuilt["requests"] == stats["requests"]
+            assert rebuilt["sessions"] == stats["sessions"]
+            assert rebuilt["reconciled_at"] is not None
+
+    @pytest.mark.asyncio
+    async def test_failed_update_does_not_fail_the_write(self):
+        """Test a rollup error is counted and left for reconciliation."""
+        from backend.app.domain.entities import Request
+        from backend.app.infrastructure.stats_rollups import rollup_failures
+
+        requests, _, rollups = _repositories()
+        rollups.collection.fail = True
+        before = rollup_failures.values().get(("requests",), 0)
+
+        created = await requests.create(Request(student_id=STUDENT, subject="Física"))
+
+        assert created.id
+        assert rollup_failures.values()[("requests",)] == before + 1
+
+        rollups.collection.fail = False
+        await rollups.reconcile()
+        assert (await rollups.get())["requests"]["total"] == 1
+
+
+class FakeRollups:
+    """Returns the requested scope."""
+
+    async def get(self, scope):
+        return {"requests": {"total": 1}, "sessions": {}, "scope_seen": scope}
+
+
+class TestStatsRoute:
+    """Tests for GET /api/stats."""
+
+    @pytest.fixture(autouse=True)
+    def _admins(self, stored_roles):
+        """Admin tokens below belong to a stored admin."""
+
+    def _get(self, monkeypatch, claims, params=None):
+        from fastapi.testclient import TestClient
+        from backend.app import main
+
+        container = SimpleNamespace(stats_rollups=FakeRollups())
+        monkeypatch.setattr(main, "get_container", lambda: container)
+        token = main.create_access_token({"sub": "a", **claims})
+        return TestClient(main.app).get(
+            "/api/stats", params=params, headers={"Authorization": f"Bearer {token}"}
+        )
+
+    def test_scope_depends_on_role(self, monkeypatch):
+        """Test admins read any scope and advisors only their own."""
+        admin = {"role": "admin", "user_id": "admin-1"}
+        advisor = {"role": "advisor", "user_id": ADVISOR}
+
+        assert self._get(monkeypatch, admin).json()["scope"] == "global"
+        response = self._get(monkeypatch, admin, {"advisor_id": ADVISOR})
+        assert response.json()["scope"] == f"advisor:{ADVISOR}"
+        response = self._get(monkeypatch, advisor, {"advisor_id": OTHER_ADVISOR})
+        assert response.json()["scope"] == f"advisor:{ADVISOR}"
+        assert response.json()["requests"] == {"total": 1}
+
+        student = {"role": "student", "user_id": STUDENT}
+        assert self._get(monkeypatch, student).status_code == 403
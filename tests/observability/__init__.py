@@ -0,0 +1 @@
+# Observability tests package
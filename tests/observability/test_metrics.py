@@ -0,0 +1,85 @@
+"""Tests for the Prometheus metrics registry."""
+import threading
+import pytest
+
+
+class TestCounter:
+    """Tests for Counter."""
+
+    def test_shards_are_summed_across_threads(self):
+        """Test that increments from several threads add up on render."""
+        from backend.app.observability.metrics import Registry
+
+        registry = Registry()
+        counter = registry.counter("test_total", "Test counter", ("route",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc("/a")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert counter.values() == {("/a",): 4000}
+        assert 'test_total{route="/a"} 4000' in registry.render()
+
+    def test_label_count_mismatch_raises(self):
+        """Test that a wrong number of label values is rejected."""
+        from backend.app.observability.metrics import Registry
+
+        counter = Registry().counter("test_total", "Test counter", ("route",))
+        with pytest.raises(ValueError):
+            counter.inc("/a", "extra")
+
+
+class TestHistogram:
+    """Tests for Histogram."""
+
+    def test_render_cumulative_buckets(self):
+        """Test that buckets are cumulative and include +Inf, sum and count."""
+        from backend.app.observability.metrics import Registry
+
+        registry = Registry()
+        histogram = registry.histogram(
+            "test_seconds", "Test histogram", ("op",), buckets=(0.1, 1.0)
+        )
+        histogram.observe(0.05, "read")
+        histogram.observe(0.5, "read")
+        histogram.observe(5.0, "read")
+
+        output = registry.render()
+        assert "# TYPE test_seconds histogram" in output
+        assert 'test_seconds_bucket{op="read",le="0.1"} 1' in output
+        assert 'test_seconds_bucket{op="read",le="1.0"} 2' in output
+        assert 'test_seconds_bucket{op="read",le="+Inf"} 3' in output
+        assert 'test_seconds_count{op="read"} 3' in output
+        assert 'test_seconds_sum{op="read"} 5.55' in output
+
+    def test_registry_returns_same_metric_for_same_name(self):
+        """Test that registering a metric twice reuses the first one."""
+        from backend.app.observability.metrics import Registry
+
+        registry = Registry()
+        first = registry.histogram("test_seconds", "Test histogram")
+        assert registry.histogram("test_seconds", "Test histogram") is first
+
+
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint."""
+
+    def test_exposes_route_templates(self):
+        """Test that HTTP latency is labelled with the route template."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+
+        client = TestClient(app)
+        client.get("/")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'route="/"' in response.text
+        assert "peerhive_graph_circuit_state" in response.text
@@ -0,0 +1,86 @@
+"""Tests for Mongo command monitoring."""
+from types import SimpleNamespace
+
+
+def started(request_id, command_name, command):
+    """Builds a fake CommandStartedEvent."""
+    return SimpleNamespace(
+        request_id=request_id,
+        connection_id=("localhost", 27017),
+        command_name=command_name,
+        command=command,
+    )
+
+
+def succeeded(request_id, command_name, duration_ms, reply):
+    """Builds a fake CommandSucceededEvent."""
+    return SimpleNamespace(
+        request_id=request_id,
+        connection_id=("localhost", 27017),
+        command_name=command_name,
+        duration_micros=int(duration_ms * 1000),
+        database_name="peerhive",
+        reply=reply,
+    )
+
+
+class TestQueryShape:
+    """Tests for query shape normalization."""
+
+    def test_find_shape_ignores_values(self):
+        """Test that filters with different values share a shape."""
+        from backend.app.observability.mongo import query_shape
+
+        a = query_shape("find", {"find": "requests", "filter": {"status": "open"}})
+        b = query_shape("find", {"find": "requests", "filter": {"status": "done"}})
+        assert a == b == "requests.find{status}"
+
+    def test_nested_operators(self):
+        """Test that $or branches and aggregate $match are normalized."""
+        from backend.app.observability.mongo import query_shape
+
+        command = {
+            "findAndModify": "jobs",
+            "query": {"$or": [{"status": 1, "runAt": 2}, {"leaseUntil": 3}]},
+        }
+        assert query_shape("findAndModify", command) == (
+            "jobs.findAndModify{$or[{runAt,status}|{leaseUntil}]}"
+        )
+        pipeline = {"aggregate": "sessions", "pipeline": [{"$match": {"b": 1, "a": 2}}]}
+        assert query_shape("aggregate", pipeline) == "sessions.aggregate{a,b}"
+        assert query_shape("insert", {"insert": "users"}) == "users.insert"
+
+
+class TestMongoCommandListener:
+    """Tests for MongoCommandListener."""
+
+    def test_shape_table_and_slow_log(self):
+        """Test count, percentiles, docs and the slow-query threshold."""
+        from backend.app.observability.mongo import MongoCommandListener
+
+        listener = MongoCommandListener(slow_threshold_ms=50)
+        command = {"find": "requests", "filter": {"status": "open"}}
+        for i, duration in enumerate([5, 10, 80]):
+            listener.started(started(i, "find", command))
+            listener.succeeded(
+                succeeded(i, "find", duration, {"cursor": {"firstBatch": [{}] * i}})
+            )
+
+        (row,) = listener.shape_table()
+        assert row["shape"] == "requests.find{status}"
+        assert row["count"] == 3
+        assert row["p50_ms"] == 10
+        assert row["p99_ms"] == 80
+        assert row["max_docs"] == 2
+        (slow,) = listener.slow_queries()
+        assert slow["shape"] == "requests.find{status}"
+        assert slow["duration_ms"] == 80
+
+    def test_ignores_handshake_commands(self):
+        """Test that driver-internal commands are not recorded."""
+        from backend.app.observability.mongo import MongoCommandListener
+
+        listener = MongoCommandListener()
+        listener.started(started(1, "hello", {"hello": 1}))
+        listener.succeeded(succeeded(1, "hello", 1, {"ok": 1}))
+        assert listener.shape_table() == []
@@ -0,0 +1,115 @@
+"""Tests for the on-demand request profiler."""
+import time
+import pytest
+
+
+def spin(seconds):
+    """Busy loop that shows up in the sampled stacks."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfileRequested:
+    """Tests for profile_requested."""
+
+    def test_header_and_query_flag(self):
+        """Test that the header or the query flag trigger profiling."""
+        from backend.app.observability.profiler import profile_requested
+
+        assert profile_requested({"headers": [(b"x-profile", b"1")]})
+        assert profile_requested({"headers": [], "query_string": b"a=1&__profile=1"})
+        assert not profile_requested({"headers": [], "query_string": b"a=1"})
+        assert not profile_requested({"headers": [(b"x-profile", b"0")]})
+
+
+class TestRequestSampler:
+    """Tests for RequestSampler."""
+
+    @pytest.mark.asyncio
+    async def test_only_samples_the_profiled_request(self):
+        """Test that stacks start at the request frame and skip other work."""
+        from backend.app.observability.profiler import RequestSampler
+
+        target = {"type": "http"}
+
+        async def handle(scope):
+            spin(0.05)
+
+        sampler = RequestSampler(target, interval=0.001)
+        sampler.start()
+        await handle(target)
+        await handle({"type": "http"})
+        sampler.stop()
+
+        collapsed = sampler.collapsed()
+        assert collapsed
+        for line in collapsed.splitlines():
+            assert line.startswith("handle (")
+            assert ";spin (" in line
+        assert sampler.idle_samples > 0
+
+
+class TestProfileStore:
+    """Tests for ProfileStore."""
+
+    def test_prunes_oldest_profiles(self, tmp_path):
+        """Test that the store keeps at most max_profiles."""
+        import os
+        from backend.app.observability.profiler import ProfileStore
+
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        for i in range(3):
+            profile_id = f"{i:032x}"
+            store.save({"id": profile_id, "created_at": f"2026-01-0{i + 1}"}, "a;b 1\n")
+            os.utime(
+                store.collapsed_path(profile_id).replace(".collapsed", ".json"), (i, i)
+            )
+
+        assert [p["id"] for p in store.list()] == [f"{2:032x}", f"{1:032x}"]
+        assert not os.path.exists(store.collapsed_path(f"{0:032x}"))
+
+    def test_rejects_path_traversal(self, tmp_path):
+        """Test that profile ids are validated."""
+        from backend.app.observability.profiler import ProfileStore
+
+        with pytest.raises(ValueError):
+            ProfileStore(str(tmp_path)).collapsed_path("../../etc/passwd")
+
+
+class TestProfilerMiddleware:
+    """Tests for the profiler middleware wiring."""
+
+    def test_admin_request_is_profiled(self, tmp_path, monkeypatch, stored_roles):
+        """Test that only admins get a stored profile."""
+        from fastapi.testclient import TestClient
+        from backend.app import main
+
+        monkeypatch.setattr(main.profile_store, "directory", str(tmp_path))
+        client = TestClient(main.app)
+        admin = main.create_access_token(
+            {"sub": "a", "user_id": "admin-1", "role": "admin"}
+        )
+        student = main.create_access_token({"sub": "s", "role": "student"})
+
+        response = client.get(
+            "/", headers={"Authorization": f"Bearer {student}", "X-Profile": "1"}
+        )
+        assert "x-profile-id" not in response.headers
+
+        response = client.get(
+            "/?__profile=1", headers={"Authorization": f"Bearer {admin}"}
+        )
+        profile_id = response.headers["x-profile-id"]
+
+        listing = client.get(
+            "/api/admin/profiles", headers={"Authorization": f"Bearer {admin}"}
+        )
+        assert [p["id"] for p in listing.json()] == [profile_id]
+        assert listing.json()[0]["path"] == "/"
+
+        download = client.get(
+            f"/api/admin/profiles/{profile_id}",
+            headers={"Authorization": f"Bearer {admin}"},
+        )
+        assert download.status_code == 200
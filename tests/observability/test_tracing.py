@@ -0,0 +1,136 @@
+"""Tests for distributed tracing."""
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture
+def exporter():
+    """Routes finished spans to an in-memory exporter."""
+    from backend.app.observability import tracing
+
+    memory = tracing.InMemorySpanExporter()
+    processor = MagicMock()
+    processor.on_end.side_effect = lambda span: memory.export([span])
+    tracing.tracer.processor = processor
+    yield memory
+    tracing.tracer.processor = None
+
+
+class TestTraceparent:
+    """Tests for W3C traceparent handling."""
+
+    def test_parse_valid_header(self):
+        """Test that a valid traceparent yields trace and parent ids."""
+        from backend.app.observability.tracing import parse_traceparent
+
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        assert parse_traceparent(header) == (
+            "4bf92f3577b34da6a3ce929d0e0e4736",
+            "00f067aa0ba902b7",
+        )
+
+    def test_parse_invalid_header(self):
+        """Test that malformed or all-zero ids are ignored."""
+        from backend.app.observability.tracing import parse_traceparent
+
+        assert parse_traceparent(None) is None
+        assert parse_traceparent("garbage") is None
+        assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+
+
+class TestSpans:
+    """Tests for span nesting across layers."""
+
+    @pytest.mark.asyncio
+    async def test_use_case_and_repository_spans_are_nested(self, exporter):
+        """Test that use case and repository spans share the trace."""
+        from backend.app.application.use_cases.get_user import GetUserUseCase
+        from backend.app.observability.tracing import trace_methods, tracer
+
+        @trace_methods
+        class FakeUserRepository:
+            async def get_by_id(self, user_id):
+                return {"id": user_id}
+
+        use_case = GetUserUseCase(FakeUserRepository())
+        with tracer.start_as_current_span("GET /api/users/{id}") as root:
+            await use_case.execute("u1")
+
+        repo_span, use_case_span, root_span = exporter.spans
+        assert use_case_span.name == "GetUserUseCase.execute"
+        assert repo_span.name == "FakeUserRepository.get_by_id"
+        assert repo_span.parent_id == use_case_span.span_id
+        assert use_case_span.parent_id == root.span_id
+        assert {s.trace_id for s in exporter.spans} == {root.trace_id}
+
+    @pytest.mark.asyncio
+    async def test_exception_marks_span_as_error(self, exporter):
+        """Test that a failing use case records the exception."""
+        from backend.app.application.use_cases.create_user import CreateUserUseCase
+
+        mock_repo = AsyncMock()
+        mock_repo.get_by_email.return_value = {"email": "test@example.com"}
+
+        with pytest.raises(ValueError):
+            await CreateUserUseCase(mock_repo).execute(
+                name="Test", email="test@example.com", password="x", role="student"
+            )
+
+        span = exporter.spans[0]
+        assert span.status == "ERROR"
+        assert span.events[0]["attributes"]["exception.type"] == "ValueError"
+
+    def test_graph_call_forwards_client_request_id(self, exporter):
+        """Test that Graph calls carry the trace id as client-request-id."""
+        from backend.app.observability.tracing import client_request_id, tracer
+        from backend.app.services import graph
+
+        response = MagicMock(status_code=200, headers={"request-id": "graph-req"})
+        with patch.object(
+            graph.requests, "request", return_value=response
+        ) as request, tracer.start_as_current_span("route") as root:
+            graph.graph_request(
+                "GET", "token", f"{graph.GRAPH_API_BASE_URL}/me/onlineMeetings/m1"
+            )
+
+        headers = request.call_args.kwargs["headers"]
+        assert headers["client-request-id"] == client_request_id(root)
+        graph_span = exporter.spans[0]
+        assert graph_span.name == "Graph GET onlineMeetings"
+        assert graph_span.parent_id == root.span_id
+        assert graph_span.attributes["graph.request_id"] == "graph-req"
+
+
+class TestExporters:
+    """Tests for span exporters."""
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        """Test that the batch processor flushes spans to the file on shutdown."""
+        from backend.app.observability import tracing
+
+        path = tmp_path / "traces.jsonl"
+        tracing.configure_tracing("file", str(path))
+        try:
+            with tracing.tracer.start_as_current_span("parent"):
+                with tracing.tracer.start_as_current_span("child"):
+                    pass
+        finally:
+            tracing.shutdown_tracing()
+
+        spans = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [s["name"] for s in spans] == ["child", "parent"]
+        assert spans[0]["parent_id"] == spans[1]["context"]["span_id"]
+        assert spans[1]["kind"] == "SpanKind.INTERNAL"
+
+    def test_middleware_returns_traceparent(self):
+        """Test that responses carry the server span's traceparent."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        response = TestClient(app).get(
+            "/", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+        )
+
+        assert response.headers["traceparent"].startswith(f"00-{trace_id}-")
@@ -0,0 +1,67 @@
+"""Tests for the event loop lag watchdog."""
+import asyncio
+import time
+import pytest
+
+
+def blocking_handler():
+    """Simulates a synchronous call inside an async handler."""
+    time.sleep(0.3)
+
+
+class TestPercentile:
+    """Tests for percentile."""
+
+    def test_nearest_rank(self):
+        """Test nearest-rank percentiles and the empty case."""
+        from backend.app.observability.watchdog import percentile
+
+        samples = [float(i) for i in range(1, 101)]
+        assert percentile(samples, 50) == 50.0
+        assert percentile(samples, 99) == 99.0
+        assert percentile([], 99) == 0.0
+
+
+class TestLoopLagWatchdog:
+    """Tests for LoopLagWatchdog."""
+
+    @pytest.mark.asyncio
+    async def test_captures_blocking_stack_and_route(self):
+        """Test that a blocked loop is reported with its stack and route."""
+        from backend.app.observability.watchdog import LoopLagWatchdog
+
+        watchdog = LoopLagWatchdog(interval=0.01, threshold=0.05)
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.05)
+
+            async def handler(scope):
+                blocking_handler()
+
+            await handler({"type": "http", "path": "/api/auth/login"})
+            await asyncio.sleep(0.05)
+        finally:
+            await watchdog.stop()
+
+        stats = watchdog.stats()
+        assert stats["stalls"] == 1
+        event = stats["events"][0]
+        assert event["route"] == "/api/auth/login"
+        assert any("blocking_handler" in line for line in event["stack"])
+        assert event["lag_ms"] >= 250
+        assert stats["lag_ms"]["max"] >= 250
+
+    @pytest.mark.asyncio
+    async def test_no_stalls_when_loop_is_idle(self):
+        """Test that an idle loop records samples but no stalls."""
+        from backend.app.observability.watchdog import LoopLagWatchdog
+
+        watchdog = LoopLagWatchdog(interval=0.01, threshold=0.2)
+        watchdog.start()
+        await asyncio.sleep(0.1)
+        await watchdog.stop()
+
+        stats = watchdog.stats()
+        assert stats["samples"] > 0
+        assert stats["stalls"] == 0
+        assert stats["running"] is False
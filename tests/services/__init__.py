@@ -0,0 +1 @@
+# Services tests package
@@ -0,0 +1,79 @@
+"""Tests for the calendar service using a mocked Graph API."""
+import json
+from unittest.mock import MagicMock, patch
+
+
+def _schedule_response(payload):
+    response = MagicMock()
+    response.raise_for_status.return_value = None
+    body = {
+        "value": [
+            {
+                "scheduleId": mailbox,
+                "scheduleItems": [
+                    {
+                        "status": "busy",
+                        "start": {"dateTime": "2025-03-03T10:00:00.0000000"},
+                        "end": {"dateTime": "2025-03-03T11:00:00.0000000"},
+                    },
+                    {
+                        "status": "free",
+                        "start": {"dateTime": "2025-03-03T12:00:00.0000000"},
+                        "end": {"dateTime": "2025-03-03T13:00:00.0000000"},
+                    },
+                ],
+            }
+            for mailbox in payload["schedules"]
+        ]
+    }
+    response.content = json.dumps(body).encode()
+    return response
+
+
+class TestGetSchedule:
+    """Tests for get_schedule."""
+
+    def test_chunks_and_caches_mailboxes(self):
+        """Test that mailboxes are chunked and cached per window."""
+        from backend.app.services import calendar, graph
+
+        calendar._free_busy_cache.clear()
+        mailboxes = [f"advisor{i}@example.com" for i in range(45)]
+
+        with patch.object(graph.requests, "request") as mock_post:
+            mock_post.side_effect = lambda method, url, json, **kw: (
+                _schedule_response(json)
+            )
+            result = calendar.get_schedule(
+                "token", mailboxes, "2025-03-03T08:00:00", "2025-03-03T20:00:00"
+            )
+            assert mock_post.call_count == 3
+            assert len(result) == 45
+            assert [b["status"] for b in result["advisor0@example.com"]] == ["busy"]
+
+            calendar.get_schedule(
+                "token", mailboxes[:5], "2025-03-03T08:00:00", "2025-03-03T20:00:00"
+            )
+            assert mock_post.call_count == 3
+
+    def test_mailbox_errors_are_omitted(self):
+        """Test that a mailbox Graph could not read is left out, not free."""
+        from backend.app.services import calendar, graph
+
+        calendar._free_busy_cache.clear()
+        response = _schedule_response({"schedules": ["ok@example.com"]})
+        body = json.loads(response.content)
+        body["value"].append(
+            {"scheduleId": "gone@example.com", "error": {"message": "not found"}}
+        )
+        response.content = json.dumps(body).encode()
+
+        with patch.object(graph.requests, "request", return_value=response):
+            result = calendar.get_schedule(
+                "token",
+                ["ok@example.com", "gone@example.com"],
+                "2025-03-03T08:00:00",
+                "2025-03-03T20:00:00",
+            )
+
+        assert set(result) == {"ok@example.com"}
@@ -0,0 +1,215 @@
+"""Tests for streaming CSV/Parquet session exports."""
+import csv
+import io
+from datetime import datetime
+
+import pytest
+
+ADVISOR = "65f000000000000000000002"
+
+
+def _session(index, verified=True):
+    from backend.app.domain.entities import (
+        AttendanceRecord,
+        Session,
+        SessionStatusEnum,
+        Verification,
+    )
+
+    start = datetime(2024, 3, 1, 10, 0)
+    session = Session(
+        id=f"s{index}",
+        request_id=f"r{index}",
+        student_id="stu",
+        advisor_id=ADVISOR,
+        scheduled_at=start,
+        status=SessionStatusEnum.COMPLETED,
+    )
+    if verified:
+        session.verification = Verification(
+            was_held=True,
+            duration_minutes=50,
+            attendance=[
+                AttendanceRecord("stu", start, datetime(2024, 3, 1, 10, 20), 20),
+                AttendanceRecord(
+                    "stu",
+                    datetime(2024, 3, 1, 10, 25),
+                    datetime(2024, 3, 1, 10, 50),
+                    25,
+                ),
+                AttendanceRecord(ADVISOR, start, datetime(2024, 3, 1, 10, 50), 50),
+            ],
+            notes="ok, sin incidencias",
+        )
+    return session
+
+
+async def _iter(sessions):
+    for session in sessions:
+        yield session
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestFlattenSession:
+    """Tests for flatten_session."""
+
+    def test_summarizes_attendance_per_participant(self):
+        """Test that attendance is reduced to first join, last leave and minutes."""
+        from backend.app.services.export import COLUMN_NAMES, flatten_session
+
+        row = flatten_session(_session(1))
+
+        assert list(row) == COLUMN_NAMES
+        assert row["student_joined_at"] == datetime(2024, 3, 1, 10, 0)
+        assert row["student_left_at"] == datetime(2024, 3, 1, 10, 50)
+        assert row["student_minutes"] == 45
+        assert row["advisor_minutes"] == 50
+        assert row["attendance_records"] == 3
+        assert row["evidence_type"] == "teams_api"
+
+    def test_unverified_session_leaves_columns_empty(self):
+        """Test that sessions without verification keep null columns."""
+        from backend.app.services.export import flatten_session
+
+        row = flatten_session(_session(1, verified=False))
+
+        assert row["status"] == "completed"
+        assert row["was_held"] is None
+        assert row["student_minutes"] is None
+
+
+class TestStreamCsv:
+    """Tests for stream_csv."""
+
+    @pytest.mark.asyncio
+    async def test_emits_one_chunk_per_batch(self):
+        """Test that rows are flushed in batches and parse back."""
+        from backend.app.services.export import COLUMN_NAMES, stream_csv
+
+        sessions = [_session(i, verified=i % 2 == 0) for i in range(5)]
+
+        chunks = await _collect(stream_csv(_iter(sessions), batch_rows=2))
+
+        assert len(chunks) == 3
+        text = b"".join(chunks).decode("utf-8-sig")
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert list(rows[0]) == COLUMN_NAMES
+        assert [r["session_id"] for r in rows] == [f"s{i}" for i in range(5)]
+        assert rows[0]["verification_notes"] == "ok, sin incidencias"
+        assert rows[0]["scheduled_at"] == "2024-03-01T10:00:00"
+        assert rows[1]["was_held"] == ""
+
+
+class TestStreamParquet:
+    """Tests for stream_parquet."""
+
+    @pytest.mark.asyncio
+    async def test_writes_a_row_group_per_batch(self):
+        """Test that the streamed bytes form a valid file with typed columns."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        from backend.app.services.export import stream_parquet
+
+        sessions = [_session(i, verified=i != 3) for i in range(5)]
+
+        chunks = await _collect(stream_parquet(_iter(sessions), row_group_size=2))
+
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+        assert table.column("session_id").to_pylist() == [f"s{i}" for i in range(5)]
+        assert table.column("student_minutes").to_pylist() == [45, 45, 45, None, 45]
+
+
+class FakeSessionRepository:
+    """Yields the given sessions and records the filters."""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.calls = []
+
+    async def iter_sessions(self, **filters):
+        self.calls.append(filters)
+        for session in self.sessions:
+            yield session
+
+
+class TestExportRoute:
+    """Tests for GET /api/admin/exports/sessions."""
+
+    @pytest.fixture(autouse=True)
+    def _admins(self, stored_roles):
+        """Admin tokens below belong to a stored admin."""
+
+    def _client(self, monkeypatch, sessions):
+        from types import SimpleNamespace
+        from fastapi.testclient import TestClient
+        from backend.app import main
+
+        repository = FakeSessionRepository(sessions)
+        container = SimpleNamespace(session_repository=repository)
+        monkeypatch.setattr(main, "get_container", lambda: container)
+        token = main.create_access_token(
+            {"sub": "a", "user_id": "admin-1", "role": "admin"}
+        )
+        return TestClient(main.app), {"Authorization": f"Bearer {token}"}, repository
+
+    def test_streams_csv_attachment(self, monkeypatch):
+        """Test the CSV download and the filters passed to the cursor."""
+        client, auth, repository = self._client(monkeypatch, [_session(1), _session(2)])
+
+        response = client.get(
+            "/api/admin/exports/sessions",
+            params={
+                "scheduled_from": "2024-01-15",
+                "scheduled_to": "2024-06-30",
+                "advisor_id": ADVISOR,
+                "status": "completed",
+            },
+            headers=auth,
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert (
+            response.headers["content-disposition"]
+            == 'attachment; filename="sesiones_20240115_20240630.csv"'
+        )
+        rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+        assert [r["session_id"] for r in rows] == ["s1", "s2"]
+        filters = repository.calls[0]
+        assert filters["scheduled_from"] == datetime(2024, 1, 15)
+        assert filters["advisor_id"] == ADVISOR
+        assert filters["status"].value == "completed"
+
+    def test_validation(self, monkeypatch):
+        """Test auth and parameter checks."""
+        from backend.app import main
+
+        client, auth, _ = self._client(monkeypatch, [])
+        url = "/api/admin/exports/sessions"
+
+        student = main.create_access_token({"sub": "s", "role": "student"})
+        response = client.get(url, headers={"Authorization": f"Bearer {student}"})
+        assert response.status_code == 403
+        for params in (
+            {"format": "xlsx"},
+            {"scheduled_from": "ayer"},
+            {"status": "nope"},
+            {"advisor_id": "x"},
+        ):
+            assert client.get(url, params=params, headers=auth).status_code == 400
+
+    def test_parquet_requires_pyarrow(self, monkeypatch):
+        """Test that Parquet is refused when pyarrow is missing."""
+        from backend.app.services import export
+
+        client, auth, _ = self._client(monkeypatch, [])
+        monkeypatch.setattr(export, "parquet_available", lambda: False)
+
+        response = client.get(
+            "/api/admin/exports/sessions", params={"format": "parquet"}, headers=auth
+        )
+        assert response.status_code == 501
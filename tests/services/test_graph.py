@@ -0,0 +1,296 @@
+"""Tests for the shared Microsoft Graph client."""
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight."""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that identical concurrent calls are coalesced."""
+        from backend.app.services.graph import SingleFlight
+
+        flight = SingleFlight()
+        executions = []
+        release = threading.Event()
+
+        def fetch():
+            executions.append(1)
+            release.wait(1)
+            return {"id": "meeting1"}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert len(executions) == 1
+        assert results == [{"id": "meeting1"}] * 8
+        stats = flight.stats()
+        assert stats["calls"] == 8
+        assert stats["coalesced"] == 7
+        assert stats["in_flight"] == 0
+
+    def test_errors_are_shared_and_key_released(self):
+        """Test that the leader's error reaches waiters and is not cached."""
+        from backend.app.services.graph import SingleFlight
+
+        flight = SingleFlight()
+
+        def failing():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            flight.do("k", failing)
+        assert flight.do("k", lambda: "ok") == "ok"
+
+
+class TestGraphGet:
+    """Tests for graph_get keying."""
+
+    def test_key_includes_user_and_params(self):
+        """Test that different users or params are not coalesced."""
+        from backend.app.services import graph
+
+        with patch.object(graph, "_read_flight") as flight:
+            flight.do.side_effect = lambda key, fn: key
+            key_a = graph.graph_get("token-a", "https://g/me/events", {"$top": 5})
+            key_b = graph.graph_get("token-b", "https://g/me/events", {"$top": 5})
+            key_c = graph.graph_get("token-a", "https://g/me/events", {"$top": 6})
+
+        assert len({key_a, key_b, key_c}) == 3
+        assert "token-a" not in str(key_a)
+
+    def test_key_survives_token_rotation(self):
+        """Test that reads are keyed on the user, not on the token string."""
+        import base64
+        from backend.app.services import graph
+
+        def token(oid, nonce):
+            claims = json.dumps({"oid": oid, "uti": nonce}).encode()
+            payload = base64.urlsafe_b64encode(claims).rstrip(b"=").decode()
+            return f"eyJhbGciOiJub25lIn0.{payload}.sig"
+
+        url = "https://g/me/events"
+        with patch.object(graph, "_read_flight") as flight:
+            flight.do.side_effect = lambda key, fn: key
+            old = graph.graph_get(token("user-1", "a"), url)
+            rotated = graph.graph_get(token("user-1", "b"), url)
+            other = graph.graph_get(token("user-2", "a"), url)
+            by_app_user = graph.graph_get("opaque-1", url, user_key="app-user")
+            by_app_user_rotated = graph.graph_get("opaque-2", url, user_key="app-user")
+
+        assert old == rotated != other
+        assert by_app_user == by_app_user_rotated
+        assert graph.token_user_key("opaque-1") != graph.token_user_key("opaque-2")
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_after_threshold_and_probes(self):
+        """Test closed -> open -> half_open -> closed transitions."""
+        from backend.app.services.graph import CircuitBreaker, CircuitOpenError
+
+        breaker = CircuitBreaker("calendar", failure_threshold=2, reset_timeout=0.05)
+        for _ in range(2):
+            breaker.acquire()
+            breaker.record_failure()
+
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+
+        time.sleep(0.06)
+        assert breaker.state == "half_open"
+        breaker.acquire()
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()  # solo una prueba a la vez
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens(self):
+        """Test that a failing half-open probe reopens the circuit."""
+        from backend.app.services.graph import CircuitBreaker
+
+        breaker = CircuitBreaker("calendar", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        breaker.acquire()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+
+class TestStaleFallback:
+    """Tests for serving stale Graph reads while the circuit is open."""
+
+    def test_serves_last_good_value_and_marks_request(self):
+        """Test stale-while-revalidate behaviour of graph_get."""
+        import requests
+        from backend.app.services import graph
+
+        ok = MagicMock()
+        ok.raise_for_status.return_value = None
+        ok.content = b'{"id": "meeting1"}'
+        url = "https://graph.test/me/onlineMeetings/stale-test"
+
+        breaker = graph._breakers["onlineMeetings"]
+        with patch.object(graph.requests, "request", return_value=ok):
+            assert graph.graph_get("token", url) == {"id": "meeting1"}
+
+        try:
+            with patch.object(
+                graph.requests, "request", side_effect=requests.ConnectionError()
+            ):
+                for _ in range(breaker.failure_threshold):
+                    marker = graph.track_staleness()
+                    assert graph.graph_get("token", url) == {"id": "meeting1"}
+                    assert "age" in marker
+                assert breaker.state == "open"
+
+            with patch.object(graph.requests, "request") as mock_request:
+                marker = graph.track_staleness()
+                assert graph.graph_get("token", url) == {"id": "meeting1"}
+                mock_request.assert_not_called()
+                assert "age" in marker
+
+            with pytest.raises(graph.CircuitOpenError):
+                graph.graph_get("token", url + "-uncached")
+        finally:
+            breaker.record_success()
+
+
+class TestRetryAfter:
+    """Tests for throttling retries in graph_request."""
+
+    def _response(self, status, headers=None, body=None):
+        response = MagicMock()
+        response.status_code = status
+        response.headers = headers or {}
+        response.content = json.dumps(body or {}).encode()
+        if status >= 400:
+            import requests
+
+            response.raise_for_status.side_effect = requests.HTTPError(
+                response=response
+            )
+        else:
+            response.raise_for_status.return_value = None
+        return response
+
+    def test_retry_after_seconds_parses_header(self):
+        """Test seconds, HTTP dates and the exponential fallback."""
+        from email.utils import formatdate
+        from backend.app.services.graph import retry_after_seconds
+
+        assert retry_after_seconds(self._response(429, {"Retry-After": "3"}), 0) == 3
+        future = formatdate(time.time() + 60, usegmt=True)
+        wait = retry_after_seconds(self._response(429, {"Retry-After": future}), 0)
+        assert 55 <= wait <= 60
+        assert retry_after_seconds(self._response(503), 2) == 4
+
+    def test_retries_throttled_request(self):
+        """Test that a 429 is retried after sleeping for Retry-After."""
+        from backend.app.services import graph
+
+        throttled = self._response(429, {"Retry-After": "2"})
+        ok = self._response(200, body={"id": "e1"})
+        with patch.object(
+            graph.requests, "request", side_effect=[throttled, ok]
+        ) as mock_request, patch.object(graph.time, "sleep") as mock_sleep:
+            response = graph.graph_request(
+                "GET", "token", "https://graph.test/me/calendar/events/retry"
+            )
+
+        assert response is ok
+        assert mock_request.call_count == 2
+        mock_sleep.assert_called_once_with(2.0)
+
+    def test_post_is_not_retried_on_503(self):
+        """Test that a create that may have been applied is not sent twice."""
+        import requests
+        from backend.app.services import graph
+
+        unavailable = self._response(503, {"Retry-After": "1"})
+        with patch.object(
+            graph.requests, "request", return_value=unavailable
+        ) as mock_request, patch.object(graph.time, "sleep") as mock_sleep:
+            with pytest.raises(requests.HTTPError):
+                graph.graph_request(
+                    "POST", "token", "https://graph.test/me/onlineMeetings", json={}
+                )
+
+        assert mock_request.call_count == 1
+        mock_sleep.assert_not_called()
+        graph._breakers["onlineMeetings"].record_success()
+
+    def test_post_is_retried_on_429(self):
+        """Test that a throttled create, which Graph did not apply, is retried."""
+        from backend.app.services import graph
+
+        throttled = self._response(429, {"Retry-After": "1"})
+        created = self._response(201, body={"id": "m1"})
+        with patch.object(
+            graph.requests, "request", side_effect=[throttled, created]
+        ) as mock_request, patch.object(graph.time, "sleep"):
+            response = graph.graph_request(
+                "POST", "token", "https://graph.test/me/onlineMeetings", json={}
+            )
+
+        assert response is created
+        assert mock_request.call_count == 2
+
+    def test_gives_up_when_retry_after_exceeds_cap(self):
+        """Test that a long Retry-After surfaces the 429 immediately."""
+        import requests
+        from backend.app.services import graph
+
+        throttled = self._response(429, {"Retry-After": "3600"})
+        with patch.object(
+            graph.requests, "request", return_value=throttled
+        ) as mock_request, patch.object(graph.time, "sleep") as mock_sleep:
+            with pytest.raises(requests.HTTPError):
+                graph.graph_request(
+                    "GET", "token", "https://graph.test/me/calendar/events/capped"
+                )
+
+        assert mock_request.call_count == 1
+        mock_sleep.assert_not_called()
+        graph._breakers["calendar"].record_success()
+
+
+class TestGraphGetAll:
+    """Tests for @odata.nextLink paging."""
+
+    def test_follows_next_link(self):
+        """Test that every page is fetched and concatenated."""
+        from backend.app.services import graph
+
+        base = "https://graph.test/me/calendar/events/paged"
+        pages = {
+            base: {"value": [{"id": "e1"}], "@odata.nextLink": base + "?$skip=1"},
+            base + "?$skip=1": {"value": [{"id": "e2"}]},
+        }
+
+        def fake_request(method, url, params=None, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            response.headers = {}
+            response.raise_for_status.return_value = None
+            response.content = json.dumps(pages[url]).encode()
+            return response
+
+        with patch.object(graph.requests, "request", side_effect=fake_request):
+            items = graph.graph_get_all("token", base, params={"$top": 1})
+
+        assert [item["id"] for item in items] == ["e1", "e2"]
@@ -0,0 +1,209 @@
+"""Tests for the scheduling service and its interval tree."""
+import random
+import pytest
+from unittest.mock import AsyncMock
+from datetime import datetime, timedelta
+
+BASE = datetime(2025, 3, 3, 8, 0)
+
+
+def _hours(start, end):
+    return BASE + timedelta(hours=start), BASE + timedelta(hours=end)
+
+
+class TestIntervalTree:
+    """Tests for IntervalTree."""
+
+    def test_overlapping_matches_brute_force(self):
+        """Test overlap queries against a linear scan."""
+        from backend.app.services.scheduling import IntervalTree, Interval
+
+        rng = random.Random(7)
+        intervals = []
+        for i in range(500):
+            start = BASE + timedelta(minutes=rng.randrange(0, 20000))
+            end = start + timedelta(minutes=rng.choice([30, 60, 90, 240]))
+            intervals.append(Interval(start, end, "session", str(i)))
+        tree = IntervalTree(intervals)
+
+        for _ in range(200):
+            q_start = BASE + timedelta(minutes=rng.randrange(0, 20000))
+            q_end = q_start + timedelta(minutes=rng.randrange(1, 300))
+            expected = sorted(
+                (i for i in intervals if i.start < q_end and i.end > q_start),
+                key=lambda i: (i.start, i.end, i.ref),
+            )
+            found = tree.overlapping(q_start, q_end)
+            assert sorted(found, key=lambda i: (i.start, i.end, i.ref)) == expected
+            assert tree.overlaps(q_start, q_end) == bool(expected)
+
+    def test_remove_keeps_tree_consistent(self):
+        """Test removing intervals."""
+        from backend.app.services.scheduling import IntervalTree, Interval
+
+        first = Interval(*_hours(1, 2), "session", "a")
+        second = Interval(*_hours(1, 2), "session", "b")
+        tree = IntervalTree([first, second])
+
+        assert tree.remove(first) is True
+        assert tree.remove(first) is False
+        assert len(tree) == 1
+        assert tree.overlapping(*_hours(0, 3)) == [second]
+
+    def test_adjacent_intervals_do_not_overlap(self):
+        """Test that intervals are half-open."""
+        from backend.app.services.scheduling import IntervalTree, Interval
+
+        tree = IntervalTree([Interval(*_hours(1, 2), "session")])
+
+        assert tree.overlaps(*_hours(2, 3)) is False
+        assert tree.overlaps(*_hours(0, 1)) is False
+
+
+class TestFreeGaps:
+    """Tests for free slot computation."""
+
+    def test_free_gaps(self):
+        """Test gaps between merged busy blocks."""
+        from backend.app.services.scheduling import free_gaps
+
+        busy = [_hours(1, 2), _hours(1.5, 3), _hours(5, 6)]
+        gaps = free_gaps(busy, *_hours(0, 8), timedelta(hours=1))
+
+        assert gaps == [_hours(0, 1), _hours(3, 5), _hours(6, 8)]
+
+
+class TestSchedulingService:
+    """Tests for SchedulingService using a mocked repository."""
+
+    def _session(self, session_id, advisor_id, student_id, hour, status="approved"):
+        from backend.app.domain.entities import Session, SessionStatusEnum
+
+        return Session(
+            id=session_id,
+            advisor_id=advisor_id,
+            student_id=student_id,
+            scheduled_at=BASE + timedelta(hours=hour),
+            status=SessionStatusEnum(status),
+        )
+
+    def _service(self, sessions, **kwargs):
+        from backend.app.services.scheduling import SchedulingService
+
+        mock_repo = AsyncMock()
+        mock_repo.list_by_advisor.side_effect = lambda pid: [
+            s for s in sessions if s.advisor_id == pid
+        ]
+        mock_repo.list_by_student.side_effect = lambda pid: [
+            s for s in sessions if s.student_id == pid
+        ]
+        return SchedulingService(mock_repo, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_find_conflicts_ignores_cancelled(self):
+        """Test conflict detection skips cancelled sessions."""
+        service = self._service(
+            [
+                self._session("s1", "adv", "stu1", 1),
+                self._session("s2", "adv", "stu2", 3, status="cancelled"),
+            ]
+        )
+
+        conflicts = await service.find_conflicts(["adv"], *_hours(1.5, 2))
+        assert [i.ref for i in conflicts["adv"]] == ["s1"]
+        assert await service.is_available("adv", *_hours(3, 4)) is True
+
+    @pytest.mark.asyncio
+    async def test_index_is_rebuilt_after_ttl(self):
+        """Test that sessions written elsewhere show up once the index expires."""
+        sessions = []
+        cached = self._service(sessions)
+        expiring = self._service(sessions, index_ttl=0)
+        assert await cached.is_available("adv", *_hours(1, 2)) is True
+        assert await expiring.is_available("adv", *_hours(1, 2)) is True
+
+        sessions.append(self._session("s1", "adv", "stu", 1))
+
+        assert await cached.is_available("adv", *_hours(1, 2)) is True
+        assert await expiring.is_available("adv", *_hours(1, 2)) is False
+
+    @pytest.mark.asyncio
+    async def test_create_session_reuses_the_index(self):
+        """Test that CreateSessionUseCase inserts into the index instead of rebuilding it."""
+        from backend.app.application.use_cases.create_session import (
+            CreateSessionUseCase,
+        )
+
+        service = self._service([])
+        repo = service.session_repository
+        repo.create.side_effect = lambda session: session
+        use_case = CreateSessionUseCase(repo, service)
+        assert await service.is_available("adv", *_hours(1, 2)) is True
+        assert await service.is_available("stu1", *_hours(1, 2)) is True
+
+        await use_case.execute(
+            request_id="r1",
+            student_id="stu1",
+            advisor_id="adv",
+            scheduled_at=BASE + timedelta(hours=1),
+        )
+
+        assert repo.list_by_advisor.await_count == 2
+        assert await service.is_available("adv", *_hours(1.5, 2)) is False
+        assert await service.is_available("stu1", *_hours(1.5, 2)) is False
+
+    @pytest.mark.asyncio
+    async def test_create_session_surfaces_the_repository_guard(self):
+        """Test that a conflict only the database sees still raises ValueError."""
+        from backend.app.application.use_cases.create_session import (
+            CreateSessionUseCase,
+        )
+
+        service = self._service([])
+        repo = service.session_repository
+        repo.create.side_effect = ValueError("Schedule conflict")
+        use_case = CreateSessionUseCase(repo, service)
+
+        with pytest.raises(ValueError, match="Schedule conflict"):
+            await use_case.execute(
+                request_id="r2",
+                student_id="stu2",
+                advisor_id="adv",
+                scheduled_at=BASE + timedelta(hours=1, minutes=30),
+            )
+        assert await service.is_available("adv", *_hours(1, 2)) is True
+
+    @pytest.mark.asyncio
+    async def test_suggest_slots_uses_both_agendas(self):
+        """Test common free slots for a student/advisor pair."""
+        service = self._service(
+            [
+                self._session("s1", "adv", "other", 0),
+                self._session("s2", "adv2", "stu", 1),
+            ]
+        )
+
+        slots = await service.suggest_slots("stu", "adv", *_hours(0, 6), limit=2)
+        assert slots == [_hours(2, 3), _hours(3, 4)]
+
+    @pytest.mark.asyncio
+    async def test_add_calendar_events(self):
+        """Test mirroring Outlook events into the index."""
+        service = self._service([])
+        events = [
+            {
+                "id": "evt1",
+                "start": {"dateTime": "2025-03-03T10:00:00.0000000"},
+                "end": {"dateTime": "2025-03-03T11:00:00.0000000"},
+            },
+            {
+                "id": "evt2",
+                "showAs": "free",
+                "start": {"dateTime": "2025-03-03T12:00:00.0000000"},
+                "end": {"dateTime": "2025-03-03T13:00:00.0000000"},
+            },
+        ]
+
+        assert await service.add_calendar_events("adv", events) == 1
+        assert await service.is_available("adv", *_hours(2, 3)) is False
+        assert await service.is_available("adv", *_hours(4, 5)) is True
@@ -0,0 +1,77 @@
+"""Tests for the Teams service."""
+from unittest.mock import MagicMock, patch
+
+
+class TestParseAttendanceReport:
+    """Tests for parse_attendance_report."""
+
+    def test_uses_first_join_and_last_leave(self):
+        """Test that multiple intervals collapse to first join / last leave."""
+        from backend.app.services.teams import parse_attendance_report
+
+        report = {
+            "id": "r1",
+            "meetingId": "m1",
+            "totalParticipantCount": 1,
+            "attendanceRecords": [
+                {
+                    "id": "p1",
+                    "role": "presenter",
+                    "identity": {
+                        "user": {"displayName": "Ana", "userPrincipalName": "ana@x.edu"}
+                    },
+                    "attendanceIntervalRecords": [
+                        {"joinDateTime": "10:00", "leaveDateTime": "10:20"},
+                        {"joinDateTime": "10:30", "leaveDateTime": "10:55"},
+                    ],
+                }
+            ],
+        }
+
+        parsed = parse_attendance_report(report)
+
+        assert parsed["report_id"] == "r1"
+        (record,) = parsed["attendance_records"]
+        assert record["email"] == "ana@x.edu"
+        assert record["display_name"] == "Ana"
+        assert record["join_time"] == "10:00"
+        assert record["leave_time"] == "10:55"
+        assert record["role"] == "presenter"
+
+    def test_anonymous_participant_without_intervals(self):
+        """Test records without user identity or intervals."""
+        from backend.app.services.teams import parse_attendance_report
+
+        parsed = parse_attendance_report({"attendanceRecords": [{"identity": {}}]})
+
+        (record,) = parsed["attendance_records"]
+        assert record["email"] == ""
+        assert record["join_time"] is None
+        assert record["role"] == "attendee"
+
+
+class TestCreateTeamsMeeting:
+    """Tests for create_teams_meeting."""
+
+    def test_external_id_uses_create_or_get(self):
+        """Test that a keyed create goes through the idempotent createOrGet."""
+        from backend.app.services import teams
+
+        response = MagicMock()
+        response.content = b'{"id": "m1", "joinUrl": "https://teams/j/1"}'
+        with patch.object(teams, "graph_request", return_value=response) as request:
+            meeting = teams.create_teams_meeting(
+                "token",
+                "Asesoría",
+                "2025-03-03T10:00:00",
+                "2025-03-03T11:00:00",
+                external_id="peerhive-session-1",
+            )
+
+        method, _, url = request.call_args.args
+        assert (method, url.rsplit("/", 2)[1:]) == (
+            "POST",
+            ["onlineMeetings", "createOrGet"],
+        )
+        assert request.call_args.kwargs["json"]["externalId"] == "peerhive-session-1"
+        assert meeting["meeting_id"] == "m1"
@@ -0,0 +1,97 @@
+"""Tests for the evidence thumbnail pipeline."""
+import os
+import pytest
+
+
+def fake_renderer(source_path, dest_path, max_side, quality):
+    """Writes a marker file instead of resizing."""
+    with open(dest_path, "wb") as f:
+        f.write(f"{max_side}".encode())
+    return {"width": max_side, "height": max_side, "bytes": os.path.getsize(dest_path)}
+
+
+async def _stored(tmp_path, data=b"original-image"):
+    from backend.app.infrastructure.file_storage import FileStorage
+
+    async def chunks():
+        yield data
+
+    storage = FileStorage(str(tmp_path))
+    stored = await storage.save_stream(chunks(), "image/png", "kardex.png")
+    return storage, stored
+
+
+class TestGenerateRenditions:
+    """Tests for generate_renditions."""
+
+    @pytest.mark.asyncio
+    async def test_writes_each_rendition_next_to_original(self, tmp_path):
+        """Test that every rendition is stored alongside the source."""
+        from backend.app.services.thumbnails import RENDITIONS, generate_renditions
+
+        storage, stored = await _stored(tmp_path)
+
+        results = await generate_renditions(storage, stored.id, renderer=fake_renderer)
+
+        assert set(results) == set(RENDITIONS)
+        for name, options in RENDITIONS.items():
+            path = storage.rendition_path(stored.id, name)
+            assert os.path.dirname(path) == os.path.dirname(storage.path(stored.id))
+            with open(path, "rb") as f:
+                assert f.read() == str(options["max_side"]).encode()
+
+    @pytest.mark.asyncio
+    async def test_existing_renditions_are_skipped(self, tmp_path):
+        """Test that retries and duplicate uploads do not redo work."""
+        from backend.app.services.thumbnails import generate_renditions
+
+        storage, stored = await _stored(tmp_path)
+        await generate_renditions(storage, stored.id, renderer=fake_renderer)
+
+        results = await generate_renditions(storage, stored.id, renderer=fake_renderer)
+
+        assert set(results.values()) == {"skipped"}
+
+    @pytest.mark.asyncio
+    async def test_records_throughput_metrics(self, tmp_path):
+        """Test the generated counter and byte counters."""
+        from backend.app.services import thumbnails
+
+        storage, stored = await _stored(tmp_path)
+        before = thumbnails.rendition_bytes.values().get(("source",), 0)
+
+        await thumbnails.generate_renditions(storage, stored.id, renderer=fake_renderer)
+
+        assert (
+            thumbnails.rendition_bytes.values().get(("source",), 0)
+            == before + 2 * stored.size
+        )
+        assert thumbnails.renditions_generated.values()[("thumb", "ok")] >= 1
+
+    @pytest.mark.asyncio
+    async def test_missing_file_raises(self, tmp_path):
+        """Test that unknown ids fail the job."""
+        from backend.app.infrastructure.file_storage import FileStorage
+        from backend.app.services.thumbnails import generate_renditions
+
+        with pytest.raises(LookupError):
+            await generate_renditions(FileStorage(str(tmp_path)), "0" * 64)
+
+
+class TestRenderRendition:
+    """Tests for the Pillow renderer."""
+
+    def test_downscales_to_jpeg(self, tmp_path):
+        """Test that a large PNG becomes a small JPEG within max_side."""
+        Image = pytest.importorskip("PIL.Image")
+        from backend.app.services.thumbnails import render_rendition
+
+        source = tmp_path / "source.png"
+        Image.new("RGBA", (2400, 1200), (10, 120, 200, 255)).save(source)
+
+        result = render_rendition(str(source), str(tmp_path / "thumb.jpg"), 320, 70)
+
+        assert (result["width"], result["height"]) == (320, 160)
+        assert result["bytes"] < os.path.getsize(source)
+        with Image.open(tmp_path / "thumb.jpg") as thumb:
+            assert thumb.format == "JPEG"